@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks, signals  # noqa: F401
+        from .asincrono import instalar_despachador
+        from .metricas import instrumentar_serializadores
+        instrumentar_serializadores()
+        connection_created.connect(instalar_despachador, dispatch_uid='core.instalar_despachador')
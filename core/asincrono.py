@@ -0,0 +1,151 @@
+# core/asincrono.py
+"""
+Soporte para las vistas async de la app móvil (servidas por ASGI con uvicorn).
+
+El ORM async de Django 5.2 (aget, acount, async for...) ejecuta cada consulta
+con sync_to_async(thread_sensitive=True): todas las de una petición pasan por
+el mismo hilo y asyncio.gather no las solapa. Además ese hilo retiene su
+conexión hasta el final de la petición, y con el pool lleno las peticiones
+quedan esperando conexiones que retienen otras (PoolTimeout bajo carga).
+
+Por eso las vistas async no usan el ORM async: en_paralelo() ejecuta cada
+bloque de consultas independiente en un hilo de un ejecutor propio y devuelve
+la conexión al pool en cuanto el bloque termina; consultar() hace lo mismo
+con un solo bloque.
+
+connection.execute_wrapper() solo alcanza a la conexión del hilo actual, así
+que la instrumentación (métricas, detector N+1) se registra con instrumentar()
+en el contexto de la petición y un despachador instalado en cada conexión la
+aplica en cualquier hilo: asgiref copia el contexto a los hilos que usa.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+_instrumentos = ContextVar('instrumentos_bd', default=())
+
+# Más hilos que conexiones en el pool solo harían esperar por una conexión libre
+ejecutor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_HILOS_BD', 10),
+    thread_name_prefix='consultas-async',
+)
+
+
+# ===================================
+# INSTRUMENTACIÓN POR CONTEXTO
+# ===================================
+
+def _despachar(execute, sql, params, many, context):
+    llamada = execute
+    for wrapper in reversed(_instrumentos.get()):
+        llamada = partial(wrapper, llamada)
+    return llamada(sql, params, many, context)
+
+
+def instalar_despachador(sender, connection, **kwargs):
+    """Receptor de connection_created (conectado en CoreConfig.ready)"""
+    if _despachar not in connection.execute_wrappers:
+        # Al principio: un execute_wrapper() abierto en ese momento sigue siendo el último de la lista
+        connection.execute_wrappers.insert(0, _despachar)
+
+
+@contextmanager
+def instrumentar(wrapper):
+    """Aplica un execute_wrapper a todas las consultas del contexto actual, en cualquier hilo o alias"""
+    token = _instrumentos.set(_instrumentos.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _instrumentos.reset(token)
+
+
+# ===================================
+# CONSULTAS EN PARALELO
+# ===================================
+
+def _ejecutar_bloque(bloque):
+    try:
+        return bloque()
+    finally:
+        # Como request_finished: con pool la conexión vuelve al pool
+        close_old_connections()
+
+
+async def en_paralelo(*bloques):
+    """
+    Ejecuta a la vez funciones síncronas independientes (consultas y serialización)
+    y devuelve sus resultados en el mismo orden
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_ejecutar_bloque, thread_sensitive=False, executor=ejecutor)(bloque)
+        for bloque in bloques
+    ))
+
+
+async def consultar(bloque):
+    resultado, = await en_paralelo(bloque)
+    return resultado
+
+
+# ===================================
+# VISTAS
+# ===================================
+
+def respuesta(datos, status=200):
+    """JSON con el mismo codificador que las Response de DRF"""
+    return JsonResponse(datos, status=status, safe=False, encoder=JSONEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+async def autenticar(request):
+    """Usuario del JWT (lanza las mismas excepciones que JWTAuthentication) o None sin cabecera"""
+    from .models import Usuario
+
+    autenticacion = JWTAuthentication()
+    cabecera = autenticacion.get_header(request)
+    token = autenticacion.get_raw_token(cabecera) if cabecera else None
+    if token is None:
+        return None
+    validado = autenticacion.get_validated_token(token)
+    if jwt_settings.USER_ID_CLAIM not in validado:
+        raise InvalidToken("El token no contiene una identificación de usuario reconocible")
+    filtro = {jwt_settings.USER_ID_FIELD: validado[jwt_settings.USER_ID_CLAIM]}
+    usuario = await consultar(lambda: Usuario.objects.filter(**filtro).first())
+    if usuario is None:
+        raise exceptions.AuthenticationFailed("Usuario no encontrado")
+    if not usuario.is_active:
+        raise exceptions.AuthenticationFailed("El usuario está inactivo")
+    return usuario
+
+
+def vista_async(*metodos):
+    """Equivalente async de @api_view(metodos) + IsAuthenticated con JWT"""
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            try:
+                if request.method not in metodos:
+                    raise exceptions.MethodNotAllowed(request.method)
+                usuario = await autenticar(request)
+                if usuario is None:
+                    raise exceptions.NotAuthenticated()
+            except exceptions.APIException as e:
+                detalle = e.detail if isinstance(e.detail, (dict, list)) else {'detail': e.detail}
+                return respuesta(detalle, status=e.status_code)
+            # Para el enrutador de réplicas y el resto de middlewares
+            request.user = usuario
+            return await vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
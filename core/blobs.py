@@ -0,0 +1,126 @@
+# core/blobs.py
+"""
+Almacén local de imágenes direccionado por contenido.
+
+Cada archivo se guarda una sola vez en BLOB_STORAGE_ROOT/<ab>/<sha256> y las
+tablas solo guardan la referencia (modelo Blob). Las imágenes llegan a la API
+en base64 (opcionalmente como data URI) y se descargan desde /api/blobs/<sha256>/.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+DATA_URI = re.compile(r'^data:(?P<tipo>[\w.+-]+/[\w.+-]+)?(;[\w=.+-]+)*;base64,', re.IGNORECASE)
+
+# Firmas de los formatos de imagen habituales
+FIRMAS = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+]
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+def raiz():
+    return Path(settings.BLOB_STORAGE_ROOT)
+
+
+def ruta_blob(sha256):
+    """Ruta del archivo en disco; los dos primeros caracteres del hash hacen de subdirectorio"""
+    return raiz() / sha256[:2] / sha256
+
+
+def detectar_tipo(datos):
+    for firma, tipo in FIRMAS:
+        if datos.startswith(firma):
+            return tipo
+    if datos[:4] == b'RIFF' and datos[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def decodificar_base64(valor):
+    """
+    Devuelve (bytes, content_type) a partir de un texto base64 o data URI.
+    Lanza ValueError si el contenido no es base64 válido.
+    """
+    valor = valor.strip()
+    tipo = None
+    coincidencia = DATA_URI.match(valor)
+    if coincidencia:
+        tipo = coincidencia.group('tipo')
+        valor = valor[coincidencia.end():]
+    valor = ''.join(valor.split())
+    try:
+        datos = base64.b64decode(valor + '=' * (-len(valor) % 4), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('Contenido base64 no válido')
+    if not datos:
+        raise ValueError('Imagen vacía')
+    return datos, tipo or detectar_tipo(datos)
+
+
+def escribir_archivo(datos):
+    """Escribe los bytes en el almacén (si no existían) y devuelve su sha256"""
+    sha256 = hashlib.sha256(datos).hexdigest()
+    destino = ruta_blob(sha256)
+    if destino.exists():
+        return sha256
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: un lector nunca ve un archivo a medias
+    descriptor, temporal = tempfile.mkstemp(dir=destino.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(datos)
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    return sha256
+
+
+def guardar_bytes(datos, content_type=None):
+    """Guarda la imagen y devuelve su fila Blob (deduplicada por contenido)"""
+    from .models import Blob
+
+    sha256 = escribir_archivo(datos)
+    blob, _ = Blob.objects.get_or_create(
+        sha256=sha256,
+        defaults={'content_type': content_type or detectar_tipo(datos), 'tamano': len(datos)},
+    )
+    return blob
+
+
+def guardar_base64(valor):
+    datos, content_type = decodificar_base64(valor)
+    return guardar_bytes(datos, content_type)
+
+
+def leer_base64(sha256, content_type):
+    """Inverso de guardar_base64 (data URI con el contenido del archivo)"""
+    datos = ruta_blob(sha256).read_bytes()
+    return f"data:{content_type};base64,{base64.b64encode(datos).decode('ascii')}"
+
+
+def leer_rango(sha256, inicio, fin):
+    """Generador con los bytes [inicio, fin] del archivo, por bloques"""
+    with open(ruta_blob(sha256), 'rb') as archivo:
+        archivo.seek(inicio)
+        restantes = fin - inicio + 1
+        while restantes > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, restantes))
+            if not bloque:
+                break
+            restantes -= len(bloque)
+            yield bloque
@@ -0,0 +1,31 @@
+# core/checks.py
+"""
+Checks de sistema del proyecto (manage.py check, y al arrancar runserver/migrate).
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends de caché que no se comparten entre procesos
+CACHES_POR_PROCESO = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches, Tags.database)
+def replica_con_cache_compartida(app_configs, **kwargs):
+    """Con réplica, la pegajosidad tras escribir (core/enrutador_bd.py) necesita una caché compartida"""
+    from .enrutador_bd import alias_replica
+
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if alias_replica() is None or backend not in CACHES_POR_PROCESO:
+        return []
+    return [Error(
+        f"La réplica '{alias_replica()}' está configurada pero la caché por defecto es {backend.rsplit('.', 1)[-1]}",
+        hint=(
+            "Cada worker guardaría su propia marca de escritura reciente y otro worker leería de la "
+            "réplica datos que el usuario acaba de escribir. Configure una caché compartida (REDIS_URL)."
+        ),
+        obj='CACHES',
+        id='core.E001',
+    )]
@@ -0,0 +1,268 @@
+# core/conciliacion.py
+"""
+Conciliación de pagos desde extractos bancarios (CSV o JSONL).
+
+Cada línea trae la factura (ID, opcionalmente con prefijo 'F-' o '#'), el
+código de la unidad, el monto y la referencia bancaria; si falta la factura se
+busca la pendiente más antigua de esa unidad con ese monto exacto. El archivo
+se lee de a una línea y se procesa por lotes de chunk_size: por lote, una
+consulta (con bloqueo) arma el índice de facturas en memoria, otra descarta las
+referencias ya registradas, los Pago se insertan con bulk_create y las facturas
+conciliadas pasan a 'pagada' con un solo UPDATE (y se registran en el libro
+de cuentas, core/cuentas.py). Cada lote es su propia
+transacción: la memoria depende del lote y de las unidades del condominio, no
+del tamaño del archivo, y una segunda importación del mismo extracto no
+duplica pagos.
+
+La usan el comando conciliar_pagos y el endpoint facturacion/conciliar-pagos/.
+"""
+import csv
+import io
+import json
+import re
+from collections import Counter, defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cuentas, series
+from .models import Factura, Pago, UnidadHabitacional
+
+# 'factura' es opcional
+COLUMNAS_OBLIGATORIAS = ('unidad', 'monto', 'referencia')
+FORMATOS = ('csv', 'jsonl')
+ESTADOS_ABIERTOS = ('pendiente', 'vencida')
+
+REFERENCIA_FACTURA = re.compile(r'(?:F-?|#)?\s*(\d+)', re.IGNORECASE)
+
+
+class ArchivoInvalido(ValueError):
+    pass
+
+
+def detectar_formato(nombre):
+    """Formato por la extensión del archivo (csv por defecto)"""
+    return 'jsonl' if nombre.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def leer_lineas(archivo, formato):
+    """
+    Genera (número de línea, dict) desde un archivo binario sin cargarlo entero.
+    Lanza ArchivoInvalido al empezar si al CSV le faltan columnas.
+    """
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    if formato == 'jsonl':
+        return _leer_jsonl(texto)
+    lector = csv.DictReader(texto)
+    columnas = {c.strip().lower() for c in lector.fieldnames or ()}
+    faltantes = set(COLUMNAS_OBLIGATORIAS) - columnas
+    if faltantes:
+        raise ArchivoInvalido(f"Faltan columnas: {', '.join(sorted(faltantes))}")
+    return _leer_csv(lector)
+
+
+def _leer_csv(lector):
+    for fila in lector:
+        yield lector.line_num, {(c or '').strip().lower(): v for c, v in fila.items()}
+
+
+def _leer_jsonl(texto):
+    for numero, linea in enumerate(texto, start=1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea, parse_float=Decimal)
+        except ValueError:
+            datos = None
+        yield numero, datos if isinstance(datos, dict) else None
+
+
+class Conciliacion:
+    """
+    Importación de un extracto. procesar() genera un resultado por línea
+    ({'linea', 'estado', 'factura', 'pago', 'detalle'}) y al terminar deja los
+    totales en resumen.
+    """
+
+    def __init__(self, condominio_id, chunk_size=1000, metodo_pago='transferencia', origen=''):
+        self.condominio_id = condominio_id
+        self.chunk_size = chunk_size
+        self.metodo_pago = metodo_pago
+        self.origen = origen
+        self.estados = Counter()
+        self.monto_conciliado = Decimal('0')
+        # código -> ID de las unidades del condominio (acotado por el condominio, no por el archivo)
+        self.unidades = dict(
+            UnidadHabitacional.objects.filter(condominio_id=condominio_id).values_list('codigo', 'id')
+        )
+        self.codigos = {unidad_id: codigo for codigo, unidad_id in self.unidades.items()}
+
+    @property
+    def resumen(self):
+        return {
+            'condominio_id': self.condominio_id,
+            'lineas': sum(self.estados.values()),
+            'conciliadas': self.estados['conciliado'],
+            'monto_conciliado': self.monto_conciliado,
+            'estados': dict(self.estados),
+        }
+
+    def procesar(self, lineas):
+        lote = []
+        for numero, datos in lineas:
+            lote.append((numero, datos))
+            if len(lote) >= self.chunk_size:
+                yield from self._procesar_lote(lote)
+                lote = []
+        if lote:
+            yield from self._procesar_lote(lote)
+
+    # ===================================
+    # LOTES
+    # ===================================
+
+    def _validar(self, numero, datos):
+        """(línea normalizada, None) o (None, resultado de error)"""
+        if datos is None:
+            return None, self._resultado(numero, 'invalida', detalle="Línea ilegible")
+        datos = {str(c).strip().lower(): v for c, v in datos.items()}
+        unidad = str(datos.get('unidad') or '').strip()
+        referencia = str(datos.get('referencia') or '').strip()
+        factura = str(datos.get('factura') or '').strip()
+        try:
+            monto = Decimal(str(datos.get('monto')).strip())
+            if not monto.is_finite() or monto <= 0:
+                raise InvalidOperation
+        except InvalidOperation:
+            return None, self._resultado(numero, 'invalida', detalle="Monto inválido")
+        if not unidad or not referencia:
+            return None, self._resultado(numero, 'invalida', detalle="Faltan la unidad o la referencia")
+        factura_id = None
+        if factura:
+            coincidencia = REFERENCIA_FACTURA.fullmatch(factura)
+            if not coincidencia:
+                return None, self._resultado(numero, 'invalida', detalle=f"Factura inválida: {factura}")
+            factura_id = int(coincidencia.group(1))
+        return {
+            'linea': numero, 'factura_id': factura_id, 'unidad': unidad,
+            'monto': monto, 'referencia': referencia[:255],
+        }, None
+
+    def _procesar_lote(self, lote):
+        resultados = {}
+        validas = []
+        for numero, datos in lote:
+            linea, error = self._validar(numero, datos)
+            if error:
+                resultados[numero] = error
+            else:
+                validas.append(linea)
+
+        if validas:
+            with transaction.atomic():
+                resultados.update(self._conciliar(validas))
+
+        for numero, _ in lote:
+            resultado = resultados[numero]
+            self.estados[resultado['estado']] += 1
+            yield resultado
+
+    def _conciliar(self, lineas):
+        ids = {l['factura_id'] for l in lineas if l['factura_id']}
+        sin_factura = {self.unidades[l['unidad']] for l in lineas if not l['factura_id'] and l['unidad'] in self.unidades}
+
+        # Índice del lote en una consulta: las facturas citadas (en cualquier estado) y
+        # las abiertas de las unidades sin factura, bloqueadas hasta el commit. Sin JOIN,
+        # para que el OR use la clave primaria y el índice (unidad, estado)
+        facturas = {}
+        por_unidad_monto = defaultdict(list)
+        filas = (
+            Factura.objects.filter(Q(id__in=ids) | Q(unidad_habitacional_id__in=sin_factura, estado__in=ESTADOS_ABIERTOS))
+            .select_for_update()
+            .order_by('fecha_vencimiento', 'id')
+            .values_list('id', 'unidad_habitacional_id', 'monto', 'estado')
+        )
+        for factura_id, unidad_id, monto, estado in filas:
+            codigo = self.codigos.get(unidad_id)
+            if codigo is None:
+                continue  # De otro condominio
+            facturas[factura_id] = (codigo, monto, estado)
+            if estado in ESTADOS_ABIERTOS:
+                por_unidad_monto[(codigo, monto)].append(factura_id)
+
+        registradas = set(
+            Pago.objects.filter(
+                referencia_pago__in={l['referencia'] for l in lineas},
+                factura__unidad_habitacional__condominio_id=self.condominio_id,
+            ).values_list('referencia_pago', flat=True)
+        )
+
+        resultados = {}
+        pagos = []  # (línea, Pago)
+        usadas = set()
+        for linea in lineas:
+            numero = linea['linea']
+            if linea['referencia'] in registradas:
+                resultados[numero] = self._resultado(numero, 'duplicado', detalle="Referencia ya registrada")
+                continue
+            factura_id = linea['factura_id']
+            if factura_id is None:
+                candidatas = [f for f in por_unidad_monto.get((linea['unidad'], linea['monto']), ()) if f not in usadas]
+                if not candidatas:
+                    resultados[numero] = self._resultado(
+                        numero, 'no_encontrada', detalle="Ninguna factura abierta de la unidad con ese monto"
+                    )
+                    continue
+                factura_id = candidatas[0]
+            elif factura_id not in facturas:
+                resultados[numero] = self._resultado(numero, 'no_encontrada', factura=factura_id)
+                continue
+
+            codigo, monto, estado = facturas[factura_id]
+            if codigo != linea['unidad']:
+                resultados[numero] = self._resultado(
+                    numero, 'unidad_distinta', factura=factura_id, detalle=f"La factura es de la unidad {codigo}"
+                )
+            elif monto != linea['monto']:
+                resultados[numero] = self._resultado(
+                    numero, 'monto_distinto', factura=factura_id, detalle=f"La factura es por {monto}"
+                )
+            elif estado not in ESTADOS_ABIERTOS or factura_id in usadas:
+                resultados[numero] = self._resultado(numero, 'ya_pagada', factura=factura_id)
+            else:
+                usadas.add(factura_id)
+                registradas.add(linea['referencia'])
+                pagos.append((numero, Pago(
+                    factura_id=factura_id,
+                    monto=linea['monto'],
+                    metodo_pago=self.metodo_pago,
+                    referencia_pago=linea['referencia'],
+                    comprobante=f"Conciliación {self.origen}, línea {numero}",
+                    estado='completado',
+                )))
+
+        if pagos:
+            Pago.objects.bulk_create([pago for _, pago in pagos])
+            Factura.objects.filter(id__in=usadas).update(estado='pagada', updated_at=timezone.now())
+            # Sin señales: las facturas ya vencidas salen de la morosidad de meses cerrados
+            series.invalidar('morosidad')
+            movimientos = []
+            for _, pago in pagos:
+                codigo, monto, estado = facturas[pago.factura_id]
+                unidad_id = self.unidades[codigo]
+                movimientos += cuentas.movimientos_pago(
+                    pago.id, pago.factura_id, None, (unidad_id, pago.monto, pago.estado)
+                )
+                movimientos += cuentas.movimientos_factura(
+                    pago.factura_id, (unidad_id, monto, estado), (unidad_id, monto, 'pagada')
+                )
+            cuentas.registrar(movimientos)
+            for numero, pago in pagos:
+                resultados[numero] = self._resultado(numero, 'conciliado', factura=pago.factura_id, pago=pago.id)
+                self.monto_conciliado += pago.monto
+        return resultados
+
+    def _resultado(self, numero, estado, factura=None, pago=None, detalle=''):
+        return {'linea': numero, 'estado': estado, 'factura': factura, 'pago': pago, 'detalle': detalle}
@@ -0,0 +1,173 @@
+# core/consultas_repetidas.py
+"""
+Detector de consultas N+1: agrupa por plantilla las consultas SQL de una
+petición y señala las que se repiten N_MAS_UNO_UMBRAL veces o más.
+
+Según N_MAS_UNO_MODO, ConsultasRepetidasMiddleware lanza ConsultasRepetidasError
+('error', por defecto al correr los tests), deja un aviso estructurado con la
+pila de llamadas en el log ('log', por defecto) o no hace nada ('off'). Las
+peticiones que escriben solo se registran: al llegar aquí la escritura ya se
+confirmó y un 500 haría que el cliente la reintente. En los tests se
+usa detectar_consultas_repetidas() como context manager, y el comando
+detectar_n_mas_uno recorre todos los endpoints del router.
+"""
+import logging
+import re
+import sys
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .asincrono import instrumentar
+
+logger = logging.getLogger('core.consultas_repetidas')
+
+# Listas de parámetros de longitud variable: IN (%s, %s, ...) cuenta como una sola plantilla
+LISTA_PARAMETROS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+NUMEROS = re.compile(r'\b\d+\b')
+# Lotes de bulk_create: VALUES (...), (...) o, con psycopg 3, INSERT ... SELECT * FROM UNNEST(...)
+INSERCION_POR_LOTES = re.compile(r'^\s*INSERT\b.*(\)\s*,\s*\(|\bUNNEST\()', re.IGNORECASE | re.DOTALL)
+
+MODULOS_PROPIOS = str(Path(settings.BASE_DIR).resolve())
+
+# Middlewares e instrumentación: aparecen en todas las pilas y no aportan nada
+ARCHIVOS_IGNORADOS = {
+    __file__,
+    str(Path(__file__).with_name('metricas.py')),
+    str(Path(__file__).with_name('enrutador_bd.py')),
+    str(Path(__file__).with_name('asincrono.py')),
+    getattr(sys.modules.get(settings.SETTINGS_MODULE), '__file__', None),
+}
+
+
+class ConsultasRepetidasError(Exception):
+    """Una petición repitió la misma consulta por encima del umbral"""
+
+    def __init__(self, descripcion, repetidas):
+        self.repetidas = repetidas
+        super().__init__(descripcion)
+
+
+def plantilla(sql):
+    """Misma plantilla para consultas que solo difieren en los parámetros"""
+    return NUMEROS.sub('N', LISTA_PARAMETROS.sub('(%s...)', sql))
+
+
+def pila_propia():
+    """Marcos de la pila que pertenecen al proyecto (sin Django, DRF ni la instrumentación)"""
+    return [
+        f"{Path(marco.filename).relative_to(MODULOS_PROPIOS)}:{marco.lineno} en {marco.name}"
+        for marco in traceback.extract_stack()
+        if marco.filename.startswith(MODULOS_PROPIOS)
+        and 'site-packages' not in marco.filename
+        and marco.filename not in ARCHIVOS_IGNORADOS
+    ]
+
+
+class DetectorConsultas:
+    """execute_wrapper que cuenta las consultas por plantilla y guarda la pila de las repetidas"""
+
+    def __init__(self, umbral):
+        self.umbral = umbral
+        self.plantillas = Counter()
+        self.pilas = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        # Varias filas por sentencia: repetirla es la inserción por lotes, no un N+1
+        if many or INSERCION_POR_LOTES.match(sql):
+            return execute(sql, params, many, context)
+        clave = plantilla(sql)
+        self.plantillas[clave] += 1
+        # La pila solo se captura una vez por plantilla, al alcanzar el umbral
+        if self.plantillas[clave] == self.umbral:
+            self.pilas[clave] = pila_propia()
+        return execute(sql, params, many, context)
+
+    def repetidas(self):
+        """[(plantilla, repeticiones, pila)] de mayor a menor"""
+        return [
+            (clave, cantidad, self.pilas.get(clave, []))
+            for clave, cantidad in self.plantillas.most_common()
+            if cantidad >= self.umbral
+        ]
+
+
+def describir(repetidas, donde=''):
+    lineas = [f"Consultas N+1{f' en {donde}' if donde else ''}:"]
+    for sql, cantidad, pila in repetidas:
+        lineas.append(f"  {cantidad}x {sql[:300]}")
+        lineas.extend(f"      {marco}" for marco in pila[-5:])
+    return '\n'.join(lineas)
+
+
+@contextmanager
+def detectar_consultas_repetidas(umbral=None, estricto=True):
+    """
+    Para tests:
+
+        with detectar_consultas_repetidas(umbral=5):
+            self.client.get('/api/facturas/')
+
+    Lanza ConsultasRepetidasError al salir si alguna plantilla llegó al umbral
+    (con estricto=False solo devuelve el detector para inspeccionarlo).
+    """
+    detector = DetectorConsultas(umbral or getattr(settings, 'N_MAS_UNO_UMBRAL', 10))
+    with instrumentar(detector):
+        yield detector
+    repetidas = detector.repetidas()
+    if estricto and repetidas:
+        raise ConsultasRepetidasError(describir(repetidas), repetidas)
+
+
+class ConsultasRepetidasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        modo = getattr(settings, 'N_MAS_UNO_MODO', 'log')
+        if modo == 'off':
+            return self.get_response(request)
+
+        with detectar_consultas_repetidas(estricto=False) as detector:
+            response = self.get_response(request)
+        return self.revisar(request, response, detector, modo)
+
+    async def __acall__(self, request):
+        modo = getattr(settings, 'N_MAS_UNO_MODO', 'log')
+        if modo == 'off':
+            return await self.get_response(request)
+
+        with detectar_consultas_repetidas(estricto=False) as detector:
+            response = await self.get_response(request)
+        return self.revisar(request, response, detector, modo)
+
+    def revisar(self, request, response, detector, modo):
+        repetidas = detector.repetidas()
+        if not repetidas:
+            return response
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia else 'sin_ruta'
+        donde = f"{request.method} {request.path} ({vista})"
+        if modo == 'error' and request.method in SAFE_METHODS:
+            raise ConsultasRepetidasError(describir(repetidas, donde), repetidas)
+
+        for sql, cantidad, pila in repetidas:
+            logger.warning(
+                "Consulta N+1 en %s: %d repeticiones de %s", donde, cantidad, sql[:200],
+                extra={'vista': vista, 'ruta': request.path, 'metodo': request.method,
+                       'sql': sql, 'repeticiones': cantidad, 'pila': pila},
+            )
+        return response
@@ -0,0 +1,238 @@
+# core/contadores.py
+"""
+Mantenimiento de los contadores de no leídos por usuario (ContadorUsuario).
+
+Las vistas móviles que crean o marcan como leídos notificaciones y comunicados
+actualizan los contadores de forma incremental dentro de su transacción; las
+operaciones administrativas (CRUD) recalculan a los usuarios afectados.
+Los comunicados que expiran se descuentan, y los programados (fecha de
+publicación futura) se suman, al ejecutar reparar_contadores.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import (
+    ComunicadoLeido, ContadorUsuario, Notificacion, Usuario, UsuarioUnidad,
+)
+
+# Campo del contador para cada tipo de notificación
+CAMPOS_TIPO_NOTIFICACION = {
+    tipo: f'notificaciones_{tipo}' for tipo, _ in Notificacion.TIPO_CHOICES
+}
+
+CAMPOS_NOTIFICACIONES = ['notificaciones_no_leidas', 'notificaciones_urgentes'] + list(CAMPOS_TIPO_NOTIFICACION.values())
+
+
+def _sumar(campo, cantidad):
+    """Expresión F() que suma (o resta) sin bajar de cero"""
+    return Greatest(F(campo) + cantidad, Value(0))
+
+
+def _actualizar(usuario_id, **cambios):
+    """Aplica un UPDATE sobre la fila del usuario; si aún no existe la calcula completa"""
+    if not usuario_id:
+        return
+    actualizadas = ContadorUsuario.objects.filter(pk=usuario_id).update(
+        updated_at=timezone.now(), **cambios
+    )
+    if not actualizadas:
+        recalcular_contadores([usuario_id])
+
+
+def obtener_contador(usuario):
+    """Lectura por clave primaria; crea la fila la primera vez que se consulta"""
+    contador = ContadorUsuario.objects.filter(pk=usuario.pk).first()
+    if contador is None:
+        recalcular_contadores([usuario.pk])
+        contador = ContadorUsuario.objects.get(pk=usuario.pk)
+    return contador
+
+
+# ===================================
+# NOTIFICACIONES
+# ===================================
+
+def notificacion_creada(notificacion):
+    """Suma una notificación nueva (no leída) a los contadores de su usuario"""
+    if not notificacion.usuario_id or notificacion.leida:
+        return
+    cambios = {
+        'notificaciones_no_leidas': F('notificaciones_no_leidas') + 1,
+        CAMPOS_TIPO_NOTIFICACION[notificacion.tipo]: F(CAMPOS_TIPO_NOTIFICACION[notificacion.tipo]) + 1,
+        'ultima_notificacion': notificacion.fecha_envio,
+    }
+    if notificacion.prioridad == 'alta':
+        cambios['notificaciones_urgentes'] = F('notificaciones_urgentes') + 1
+    _actualizar(notificacion.usuario_id, **cambios)
+
+
+def notificaciones_masivas_creadas(usuario_ids, tipo, prioridad, fecha_envio, batch_size=1000):
+    """
+    Suma una notificación nueva del mismo tipo y prioridad a cada usuario con un
+    UPDATE por lote; llamar después de insertarlas (las filas que faltan se calculan)
+    """
+    usuario_ids = sorted({uid for uid in usuario_ids if uid})
+    cambios = {
+        'notificaciones_no_leidas': F('notificaciones_no_leidas') + 1,
+        CAMPOS_TIPO_NOTIFICACION[tipo]: F(CAMPOS_TIPO_NOTIFICACION[tipo]) + 1,
+        'ultima_notificacion': fecha_envio,
+    }
+    if prioridad == 'alta':
+        cambios['notificaciones_urgentes'] = F('notificaciones_urgentes') + 1
+
+    faltantes = []
+    for inicio in range(0, len(usuario_ids), batch_size):
+        lote = usuario_ids[inicio:inicio + batch_size]
+        existentes = set(ContadorUsuario.objects.filter(pk__in=lote).values_list('pk', flat=True))
+        ContadorUsuario.objects.filter(pk__in=existentes).update(updated_at=timezone.now(), **cambios)
+        faltantes.extend(uid for uid in lote if uid not in existentes)
+    if faltantes:
+        recalcular_contadores(faltantes, batch_size=batch_size)
+
+
+def notificacion_leida(notificacion):
+    """Descuenta una notificación que acaba de pasar a leída"""
+    cambios = {
+        'notificaciones_no_leidas': _sumar('notificaciones_no_leidas', -1),
+        CAMPOS_TIPO_NOTIFICACION[notificacion.tipo]: _sumar(CAMPOS_TIPO_NOTIFICACION[notificacion.tipo], -1),
+    }
+    if notificacion.prioridad == 'alta':
+        cambios['notificaciones_urgentes'] = _sumar('notificaciones_urgentes', -1)
+    _actualizar(notificacion.usuario_id, **cambios)
+
+
+def todas_notificaciones_leidas(usuario_id):
+    """Pone a cero los contadores de notificaciones del usuario"""
+    _actualizar(usuario_id, **{campo: 0 for campo in CAMPOS_NOTIFICACIONES})
+
+
+# ===================================
+# COMUNICADOS
+# ===================================
+
+def comunicado_leido(usuario_id, comunicado):
+    """Descuenta un comunicado vigente que el usuario acaba de leer por primera vez"""
+    if comunicado.fecha_expiracion and comunicado.fecha_expiracion < date.today():
+        return  # Los expirados ya no se cuentan
+    cambios = {'comunicados_no_leidos': _sumar('comunicados_no_leidos', -1)}
+    if comunicado.prioridad == 'urgente':
+        cambios['comunicados_urgentes'] = _sumar('comunicados_urgentes', -1)
+    _actualizar(usuario_id, **cambios)
+
+
+def usuarios_de_comunicado(comunicado_id):
+    """IDs de los usuarios con relación activa en alguna unidad del comunicado"""
+    return list(UsuarioUnidad.objects.filter(
+        unidad__comunicadounidad__comunicado_id=comunicado_id,
+        fecha_fin__isnull=True
+    ).values_list('usuario_id', flat=True).distinct())
+
+
+def usuarios_de_unidad(unidad_id):
+    """IDs de los usuarios con relación activa en la unidad"""
+    return list(UsuarioUnidad.objects.filter(
+        unidad_id=unidad_id,
+        fecha_fin__isnull=True
+    ).values_list('usuario_id', flat=True).distinct())
+
+
+# ===================================
+# RECÁLCULO COMPLETO
+# ===================================
+
+def _calcular_lote(usuario_ids):
+    """Calcula los contadores de un lote de usuarios con cuatro consultas agregadas"""
+    contadores = {uid: ContadorUsuario(usuario_id=uid) for uid in usuario_ids}
+
+    # Notificaciones no leídas por tipo y prioridad
+    no_leidas = Notificacion.objects.filter(
+        usuario_id__in=usuario_ids, leida=False
+    ).values('usuario_id', 'tipo', 'prioridad').annotate(total=Count('id'))
+    for fila in no_leidas:
+        contador = contadores[fila['usuario_id']]
+        contador.notificaciones_no_leidas += fila['total']
+        campo = CAMPOS_TIPO_NOTIFICACION.get(fila['tipo'])
+        if campo:
+            setattr(contador, campo, getattr(contador, campo) + fila['total'])
+        if fila['prioridad'] == 'alta':
+            contador.notificaciones_urgentes += fila['total']
+
+    ultimas = Notificacion.objects.filter(
+        usuario_id__in=usuario_ids
+    ).values('usuario_id').annotate(ultima=Max('fecha_envio'))
+    for fila in ultimas:
+        contadores[fila['usuario_id']].ultima_notificacion = fila['ultima']
+
+    # Comunicados publicados y vigentes asignados a las unidades activas de cada
+    # usuario (los mismos que lista listar_comunicados_movil)
+    hoy = date.today()
+    visibles = UsuarioUnidad.objects.filter(
+        Q(unidad__comunicadounidad__comunicado__fecha_expiracion__gte=hoy) |
+        Q(unidad__comunicadounidad__comunicado__fecha_expiracion__isnull=True),
+        usuario_id__in=usuario_ids,
+        fecha_fin__isnull=True,
+        unidad__comunicadounidad__comunicado__isnull=False,
+        unidad__comunicadounidad__comunicado__fecha_publicacion__lte=timezone.now(),
+    ).annotate(
+        comunicado_ref=F('unidad__comunicadounidad__comunicado'),
+        prioridad_ref=F('unidad__comunicadounidad__comunicado__prioridad'),
+        publicacion_ref=F('unidad__comunicadounidad__comunicado__fecha_publicacion'),
+    )
+    no_leidos = visibles.annotate(
+        leido=Exists(ComunicadoLeido.objects.filter(
+            comunicado=OuterRef('comunicado_ref'),
+            usuario=OuterRef('usuario_id')
+        ))
+    ).values('usuario_id').annotate(
+        no_leidos=Count('comunicado_ref', distinct=True, filter=Q(leido=False)),
+        urgentes=Count('comunicado_ref', distinct=True, filter=Q(leido=False, prioridad_ref='urgente')),
+        ultimo=Max('publicacion_ref'),
+    )
+    for fila in no_leidos:
+        contador = contadores[fila['usuario_id']]
+        contador.comunicados_no_leidos = fila['no_leidos']
+        contador.comunicados_urgentes = fila['urgentes']
+        contador.ultimo_comunicado = fila['ultimo']
+
+    return list(contadores.values())
+
+
+def recalcular_contadores(usuario_ids=None, batch_size=1000):
+    """
+    Recalcula desde cero los contadores de los usuarios indicados
+    (todos si usuario_ids es None). Devuelve la cantidad de filas escritas.
+    """
+    if usuario_ids is None:
+        ids = Usuario.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=batch_size)
+    else:
+        ids = sorted({uid for uid in usuario_ids if uid})
+
+    campos = [f.name for f in ContadorUsuario._meta.concrete_fields if not f.primary_key]
+    total = 0
+    lote = []
+    for uid in ids:
+        lote.append(uid)
+        if len(lote) >= batch_size:
+            total += _guardar_lote(lote, campos)
+            lote = []
+    if lote:
+        total += _guardar_lote(lote, campos)
+    return total
+
+
+def _guardar_lote(usuario_ids, campos):
+    with transaction.atomic():
+        filas = _calcular_lote(usuario_ids)
+        for fila in filas:
+            fila.updated_at = timezone.now()
+        ContadorUsuario.objects.bulk_create(
+            filas,
+            update_conflicts=True,
+            unique_fields=['usuario'],
+            update_fields=campos,
+        )
+    return len(filas)
@@ -0,0 +1,373 @@
+# core/cuentas.py
+"""
+Libro de cuentas por unidad: movimientos de solo inserción (MovimientoCuenta)
+y acumulados materializados por unidad (SaldoUnidad).
+
+  - saldo / facturas_pendientes: facturas en estado pendiente o vencida;
+  - total_facturado: todas las facturas;
+  - total_pagado: pagos completados.
+
+Cada escritura de Factura o Pago agrega en su misma transacción uno o dos
+movimientos (dos si cambia de unidad) con la variación de esos acumulados y la
+aplica a la fila de SaldoUnidad, bloqueada mientras tanto. Los save() y
+delete() individuales pasan por las señales de core/signals.py; las
+operaciones masivas (emisión, conciliación) arman sus movimientos y llaman a
+registrar() después de escribir. Así el saldo de una unidad es una lectura por
+clave primaria; el comando verificar_saldos lo compara con las tablas de
+origen y con la suma del libro. Las variaciones se suman también al resumen
+de su condominio (core/resumenes.py).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, Exists, F, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import resumenes
+from .models import Factura, MovimientoCuenta, Pago, SaldoUnidad, UnidadHabitacional
+
+ESTADOS_ABIERTOS = ('pendiente', 'vencida')
+CAMPOS = ('total_facturado', 'total_pagado', 'saldo', 'facturas_pendientes')
+
+CERO = Decimal('0')
+
+# Tramos de antigüedad: (clave, días de atraso desde, hasta); por_vencer aún no vence
+TRAMOS_ANTIGUEDAD = [
+    ('por_vencer', None, -1),
+    ('dias_0_30', 0, 30),
+    ('dias_31_60', 31, 60),
+    ('dias_61_90', 61, 90),
+    ('dias_90_mas', 91, None),
+]
+
+
+# ===================================
+# MOVIMIENTOS
+# ===================================
+
+def _efecto_factura(monto, estado):
+    abierta = estado in ESTADOS_ABIERTOS
+    return {'total_facturado': monto, 'saldo': monto if abierta else CERO, 'facturas_pendientes': int(abierta)}
+
+
+def _efecto_pago(monto, estado):
+    return {'total_pagado': monto if estado == 'completado' else CERO}
+
+
+def _movimientos(antes, despues, efecto, tipos, **referencias):
+    """
+    Movimientos que llevan los acumulados de antes a después; cada uno es None
+    (no existía / se borró) o (unidad_id, monto, estado)
+    """
+    creado, modificado, eliminado = tipos
+    if antes and despues and antes[0] == despues[0]:
+        viejo, nuevo = efecto(*antes[1:]), efecto(*despues[1:])
+        cambios = {campo: nuevo.get(campo, 0) - viejo.get(campo, 0) for campo in CAMPOS}
+        return [MovimientoCuenta(unidad_habitacional_id=despues[0], tipo=modificado, **referencias, **cambios)]
+
+    movimientos = []
+    if antes:
+        cambios = {campo: -valor for campo, valor in efecto(*antes[1:]).items()}
+        tipo = modificado if despues else eliminado
+        movimientos.append(MovimientoCuenta(unidad_habitacional_id=antes[0], tipo=tipo, **referencias, **cambios))
+    if despues:
+        tipo = modificado if antes else creado
+        movimientos.append(MovimientoCuenta(
+            unidad_habitacional_id=despues[0], tipo=tipo, **referencias, **efecto(*despues[1:])
+        ))
+    return movimientos
+
+
+def movimientos_factura(factura_id, antes, despues):
+    return _movimientos(
+        antes, despues, _efecto_factura,
+        ('factura_emitida', 'factura_modificada', 'factura_eliminada'), factura_id=factura_id,
+    )
+
+
+def movimientos_pago(pago_id, factura_id, antes, despues):
+    return _movimientos(
+        antes, despues, _efecto_pago,
+        ('pago_registrado', 'pago_modificado', 'pago_eliminado'), factura_id=factura_id, pago_id=pago_id,
+    )
+
+
+def estado_factura(factura_id):
+    """(unidad_id, monto, estado) guardado de la factura, o None"""
+    return Factura.objects.filter(pk=factura_id).values_list('unidad_habitacional_id', 'monto', 'estado').first()
+
+
+def estado_pago(pago_id):
+    """(unidad_id, monto, estado) guardado del pago, o None"""
+    return Pago.objects.filter(pk=pago_id).values_list(
+        'factura__unidad_habitacional_id', 'monto', 'estado'
+    ).first()
+
+
+# ===================================
+# REGISTRO
+# ===================================
+
+def registrar(movimientos, batch_size=1000):
+    """
+    Inserta los movimientos y los aplica a los saldos de sus unidades. Llamar
+    después de escribir las facturas o pagos, dentro de su transacción.
+    """
+    movimientos = [m for m in movimientos if any(getattr(m, campo) for campo in CAMPOS)]
+    if not movimientos:
+        return
+    with transaction.atomic():
+        saldos = _bloquear({m.unidad_habitacional_id for m in movimientos}, movimientos)
+        for movimiento in movimientos:
+            saldo = saldos[movimiento.unidad_habitacional_id]
+            for campo in CAMPOS:
+                setattr(saldo, campo, getattr(saldo, campo) + getattr(movimiento, campo))
+            movimiento.saldo_resultante = saldo.saldo
+        MovimientoCuenta.objects.bulk_create(movimientos, batch_size=batch_size)
+        ahora = timezone.now()
+        for saldo in saldos.values():
+            saldo.updated_at = ahora
+        guardar_saldos(saldos.values(), batch_size=batch_size)
+        variaciones = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+        for movimiento in movimientos:
+            for campo in CAMPOS:
+                variaciones[movimiento.unidad_habitacional_id][campo] += getattr(movimiento, campo)
+        resumenes.aplicar_cuentas(variaciones)
+
+
+def guardar_saldos(saldos, batch_size=1000):
+    """
+    Escribe los valores finales de filas ya bloqueadas con un INSERT ... ON CONFLICT
+    por lote: bulk_update arma un CASE por fila y campo, muy lento con miles de unidades
+    """
+    SaldoUnidad.objects.bulk_create(
+        list(saldos), batch_size=batch_size, update_conflicts=True,
+        unique_fields=['unidad_habitacional'], update_fields=[*CAMPOS, 'updated_at'],
+    )
+
+
+def _bloquear(unidad_ids, movimientos=()):
+    """
+    Filas de SaldoUnidad bloqueadas (en orden, para no interbloquear). Las que
+    faltan se abren con lo que había antes de estos movimientos: las tablas de
+    origen ya incluyen las escrituras que los originaron.
+    """
+    unidad_ids = sorted(unidad_ids)
+    saldos = {s.pk: s for s in SaldoUnidad.objects.select_for_update().filter(pk__in=unidad_ids).order_by('pk')}
+    faltantes = [uid for uid in unidad_ids if uid not in saldos]
+    if faltantes:
+        aperturas = calcular(faltantes)
+        for movimiento in movimientos:
+            apertura = aperturas.get(movimiento.unidad_habitacional_id)
+            if apertura is not None:
+                for campo in CAMPOS:
+                    apertura[campo] -= getattr(movimiento, campo)
+        abrir_cuentas(aperturas)
+        saldos.update(
+            (s.pk, s) for s in SaldoUnidad.objects.select_for_update().filter(pk__in=faltantes).order_by('pk')
+        )
+    return saldos
+
+
+def abrir_cuentas(aperturas):
+    """Crea SaldoUnidad con su movimiento de apertura ({unidad_id: acumulados}); omite las que ya existen"""
+    def filas(ids):
+        return (
+            [SaldoUnidad(unidad_habitacional_id=uid, **aperturas[uid]) for uid in ids],
+            [
+                MovimientoCuenta(unidad_habitacional_id=uid, tipo='apertura',
+                                 saldo_resultante=aperturas[uid]['saldo'], **aperturas[uid])
+                for uid in ids
+            ],
+        )
+
+    abiertas = list(aperturas)
+    try:
+        with transaction.atomic():
+            saldos, movimientos = filas(aperturas)
+            SaldoUnidad.objects.bulk_create(saldos, batch_size=1000)
+            MovimientoCuenta.objects.bulk_create(movimientos, batch_size=1000)
+    except IntegrityError:
+        # Otra transacción abrió alguna a la vez: se abren de a una
+        abiertas = []
+        for uid in aperturas:
+            try:
+                with transaction.atomic():
+                    saldos, movimientos = filas([uid])
+                    SaldoUnidad.objects.bulk_create(saldos)
+                    MovimientoCuenta.objects.bulk_create(movimientos)
+                abiertas.append(uid)
+            except IntegrityError:
+                pass
+    resumenes.aplicar_cuentas({uid: aperturas[uid] for uid in abiertas})
+
+
+# ===================================
+# LECTURA Y VERIFICACIÓN
+# ===================================
+
+def calcular(unidad_ids):
+    """Acumulados de las unidades calculados desde Factura y Pago (dos consultas agrupadas)"""
+    decimal = DecimalField(max_digits=14, decimal_places=2)
+    valores = {uid: {'total_facturado': CERO, 'total_pagado': CERO, 'saldo': CERO, 'facturas_pendientes': 0}
+               for uid in unidad_ids}
+    abiertas = Q(estado__in=ESTADOS_ABIERTOS)
+    facturas = Factura.objects.filter(unidad_habitacional_id__in=valores).values('unidad_habitacional_id').annotate(
+        facturado=Coalesce(Sum('monto'), Value(CERO), output_field=decimal),
+        pendiente=Coalesce(Sum('monto', filter=abiertas), Value(CERO), output_field=decimal),
+        pendientes=Count('id', filter=abiertas),
+    ).order_by()
+    for fila in facturas:
+        valores[fila['unidad_habitacional_id']].update(
+            total_facturado=fila['facturado'], saldo=fila['pendiente'], facturas_pendientes=fila['pendientes']
+        )
+    pagos = Pago.objects.filter(
+        factura__unidad_habitacional_id__in=valores, estado='completado'
+    ).values('factura__unidad_habitacional_id').annotate(pagado=Sum('monto')).order_by()
+    for fila in pagos:
+        valores[fila['factura__unidad_habitacional_id']]['total_pagado'] = fila['pagado']
+    return valores
+
+
+def saldos_de(unidad_ids):
+    """
+    {unidad_id: acumulados} por clave primaria; las unidades que aún no tienen
+    cuenta se calculan desde las tablas de origen (sin escribir)
+    """
+    unidad_ids = set(unidad_ids)
+    saldos = {
+        fila['unidad_habitacional_id']: fila
+        for fila in SaldoUnidad.objects.filter(pk__in=unidad_ids).values('unidad_habitacional_id', *CAMPOS)
+    }
+    faltantes = unidad_ids - saldos.keys()
+    if faltantes:
+        saldos.update(calcular(faltantes))
+    return saldos
+
+
+def sumas_libro(unidad_ids):
+    """Suma de los movimientos del libro por unidad"""
+    return {
+        fila['unidad_habitacional_id']: fila
+        for fila in MovimientoCuenta.objects.filter(unidad_habitacional_id__in=unidad_ids)
+        .values('unidad_habitacional_id').annotate(**{campo: Sum(campo) for campo in CAMPOS}).order_by()
+    }
+
+
+def verificar(lote, reparar=False):
+    """
+    Diferencias entre SaldoUnidad, Factura/Pago y el libro de las unidades del
+    lote ([{'unidad', 'tipo', 'campos': {campo: (materializado, origen, libro)}}]).
+    Con reparar abre las cuentas que faltan y corrige el resto con un movimiento
+    de corrección. Bloquea las cuentas: llamar dentro de transaction.atomic()
+    """
+    saldos = {s.pk: s for s in SaldoUnidad.objects.select_for_update().filter(pk__in=lote).order_by('pk')}
+    origen = calcular(lote)
+    libro = sumas_libro(lote)
+
+    diferencias, aperturas, correcciones, variaciones = [], {}, [], {}
+    for uid in lote:
+        esperado = origen[uid]
+        sumas = libro.get(uid, {})
+        saldo = saldos.get(uid)
+        campos = {}
+        for campo in CAMPOS:
+            materializado = getattr(saldo, campo) if saldo else None
+            en_libro = sumas.get(campo) or 0
+            if materializado != esperado[campo] or en_libro != esperado[campo]:
+                campos[campo] = (materializado, esperado[campo], en_libro)
+        if not campos:
+            continue
+        diferencias.append({'unidad': uid, 'tipo': 'sin_cuenta' if saldo is None else 'descuadre', 'campos': campos})
+        if not reparar:
+            continue
+        if saldo is None and not sumas:
+            aperturas[uid] = esperado
+            continue
+        # La corrección lleva la suma del libro al valor real y la fila materializada también
+        correcciones.append(MovimientoCuenta(
+            unidad_habitacional_id=uid, tipo='correccion', saldo_resultante=esperado['saldo'],
+            **{campo: esperado[campo] - (sumas.get(campo) or 0) for campo in CAMPOS},
+        ))
+        # El resumen del condominio se mueve lo mismo que la fila materializada
+        variaciones[uid] = {
+            campo: esperado[campo] - (getattr(saldo, campo) if saldo else 0) for campo in CAMPOS
+        }
+        if saldo is None:
+            saldos[uid] = SaldoUnidad(unidad_habitacional_id=uid)
+        for campo in CAMPOS:
+            setattr(saldos[uid], campo, esperado[campo])
+
+    if reparar and (aperturas or correcciones):
+        if aperturas:
+            abrir_cuentas(aperturas)
+        if correcciones:
+            MovimientoCuenta.objects.bulk_create(correcciones)
+            corregidas = [saldos[m.unidad_habitacional_id] for m in correcciones]
+            for saldo in corregidas:
+                saldo.updated_at = timezone.now()
+            guardar_saldos(corregidas)
+            resumenes.aplicar_cuentas(variaciones)
+    return diferencias
+
+
+# ===================================
+# ANTIGÜEDAD DE SALDOS
+# ===================================
+
+def _tramos(hoy):
+    """Un Sum(CASE ...) por tramo sobre fecha_vencimiento: todos salen de la misma pasada"""
+    decimal = DecimalField(max_digits=14, decimal_places=2)
+    columnas = {}
+    for clave, desde, hasta in TRAMOS_ANTIGUEDAD:
+        filtro = {}
+        if desde is not None:
+            filtro['fecha_vencimiento__lte'] = hoy - timedelta(days=desde)
+        if hasta is not None:
+            filtro['fecha_vencimiento__gte'] = hoy - timedelta(days=hasta)
+        columnas[clave] = Sum(Case(When(then='monto', **filtro), default=Value(CERO), output_field=decimal))
+    columnas['total'] = Sum('monto')
+    columnas['facturas'] = Count('id')
+    return columnas
+
+
+def antiguedad_saldos(hoy, nivel='condominio', condominio_id=None, unidad_ids=None):
+    """
+    Deuda (facturas pendientes y vencidas) por tramo de días de atraso a la fecha
+    hoy, agrupada por condominio o por unidad, en una sola consulta
+    """
+    facturas = Factura.objects.filter(estado__in=ESTADOS_ABIERTOS)
+    if condominio_id:
+        facturas = facturas.filter(unidad_habitacional__condominio_id=condominio_id)
+    if unidad_ids is not None:
+        facturas = facturas.filter(unidad_habitacional_id__in=unidad_ids)
+    if nivel == 'unidad':
+        grupos = facturas.values(
+            'unidad_habitacional_id',
+            codigo=F('unidad_habitacional__codigo'),
+            condominio_id=F('unidad_habitacional__condominio_id'),
+            condominio=F('unidad_habitacional__condominio__nombre'),
+        ).order_by('condominio', 'codigo', 'unidad_habitacional_id')
+    else:
+        grupos = facturas.values(
+            condominio_id=F('unidad_habitacional__condominio_id'),
+            condominio=F('unidad_habitacional__condominio__nombre'),
+        ).order_by('condominio', 'condominio_id')
+    return grupos.annotate(**_tramos(hoy))
+
+
+def unidades_con_deuda(condominio_id=None):
+    """
+    Unidades con alguna factura abierta, en el orden del reporte por unidad. Para
+    paginar: se pagina esta consulta y se calcula antiguedad_saldos(unidad_ids=...)
+    solo de la página, con el índice factura_antiguedad_idx
+    """
+    unidades = UnidadHabitacional.objects.filter(
+        Exists(Factura.objects.filter(unidad_habitacional=OuterRef('pk'), estado__in=ESTADOS_ABIERTOS))
+    )
+    if condominio_id:
+        unidades = unidades.filter(condominio_id=condominio_id)
+    return unidades.values('id').order_by('condominio__nombre', 'codigo', 'id')
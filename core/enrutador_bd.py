@@ -0,0 +1,245 @@
+# core/enrutador_bd.py
+"""
+Réplica de lectura para reportes, listados y exportaciones.
+
+ReplicaMiddleware marca como elegibles las peticiones GET/HEAD a vistas de
+solo lectura (las de VISTAS_REPLICA y los listados '<basename>-list' del
+router) y EnrutadorReplica manda sus lecturas al alias DB_REPLICA_ALIAS. Todo
+lo demás (escrituras, comandos, peticiones sin autenticar) va a 'default'.
+
+Se vuelve a la primaria cuando:
+  - el usuario escribió hace menos de DB_REPLICA_PEGAJOSIDAD_SEGUNDOS
+    (lee sus propias escrituras aunque la réplica no las tenga todavía);
+  - la petición ya escribió o está dentro de un transaction.atomic();
+  - la réplica lleva más de DB_REPLICA_MAX_RETRASO_SEGUNDOS de retraso o no
+    responde (se comprueba como mucho cada DB_REPLICA_INTERVALO_SEGUNDOS).
+
+Sin el alias en DATABASES el enrutador no hace nada. En los tests la réplica
+usa TEST['MIRROR'] = 'default'; en desarrollo puede ser otro Postgres local o
+una copia del archivo SQLite.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger('core.enrutador_bd')
+
+# Vistas de solo lectura (view_name) que pueden leer de la réplica además de los listados del router
+VISTAS_REPLICA = {
+    'admin_dashboard',
+    'indicadores-financieros',
+    'reporte-areas-comunes',
+    'reporte-visuales',
+    'reporte-antiguedad-saldos',
+    'morosidad-predicciones',
+    'factura-exportar',
+    'pago-exportar',
+    'registroacceso-exportar',
+    'estadisticas_acceso',
+}
+
+METODOS_LECTURA = ('GET', 'HEAD')
+
+_peticion = ContextVar('lectura_replica', default=None)
+
+
+def alias_replica():
+    """Alias de la réplica si está configurada, si no None"""
+    alias = getattr(settings, 'DB_REPLICA_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def _clave_pegajosa(usuario_id):
+    return f'replica:escritura:{usuario_id}'
+
+
+def marcar_escritura(usuario_id):
+    """El usuario lee de la primaria durante DB_REPLICA_PEGAJOSIDAD_SEGUNDOS"""
+    segundos = getattr(settings, 'DB_REPLICA_PEGAJOSIDAD_SEGUNDOS', 10)
+    if segundos:
+        cache.set(_clave_pegajosa(usuario_id), True, segundos)
+
+
+# ===================================
+# RETRASO DE LA RÉPLICA
+# ===================================
+
+# Postgres en recuperación: 0 si ya aplicó todo lo recibido, si no la antigüedad de la
+# última transacción aplicada (con la primaria inactiva ese valor crece sin haber retraso real)
+SQL_RETRASO = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class MonitorRetraso:
+    """Retraso de la réplica medido como mucho una vez por intervalo (por proceso)"""
+
+    def __init__(self):
+        self.bloqueo = threading.Lock()
+        self.medido = 0.0
+        self.retraso = None
+
+    def medir(self, alias):
+        conexion = connections[alias]
+        try:
+            if conexion.vendor != 'postgresql':
+                return 0.0
+            with conexion.cursor() as cursor:
+                cursor.execute(SQL_RETRASO)
+                return float(cursor.fetchone()[0])
+        except DatabaseError as e:
+            logger.warning("Réplica '%s' no disponible, se lee de la primaria: %s", alias, e)
+            return None
+
+    def disponible(self, alias):
+        intervalo = getattr(settings, 'DB_REPLICA_INTERVALO_SEGUNDOS', 5)
+        ahora = time.monotonic()
+        # Solo un hilo mide; los demás usan el último valor mientras tanto
+        if ahora - self.medido >= intervalo and self.bloqueo.acquire(blocking=False):
+            try:
+                self.retraso = self.medir(alias)
+                self.medido = time.monotonic()
+            finally:
+                self.bloqueo.release()
+        maximo = getattr(settings, 'DB_REPLICA_MAX_RETRASO_SEGUNDOS', 5)
+        if self.retraso is not None and self.retraso > maximo:
+            logger.info("Réplica '%s' con %.1f s de retraso (máximo %s), se lee de la primaria", alias, self.retraso, maximo)
+        return self.retraso is not None and self.retraso <= maximo
+
+
+monitor = MonitorRetraso()
+
+
+# ===================================
+# DECISIÓN POR PETICIÓN
+# ===================================
+
+class LecturaPeticion:
+    """Estado de una petición GET/HEAD; la decisión se toma una vez, cuando ya hay usuario"""
+
+    def __init__(self, request, alias):
+        self.request = request
+        self.alias = alias
+        self.elegible = False
+        self.decision = None
+        self.escribio = False
+
+    def alias_lectura(self):
+        if not self.elegible or self.escribio or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if self.decision is None:
+            # DRF copia el usuario autenticado al HttpRequest; antes de autenticar
+            # (la propia búsqueda del usuario del JWT) se lee de la primaria
+            usuario = getattr(self.request, 'user', None)
+            if usuario is None or not usuario.is_authenticated:
+                return DEFAULT_DB_ALIAS
+            if cache.get(_clave_pegajosa(usuario.pk)) or not monitor.disponible(self.alias):
+                self.decision = DEFAULT_DB_ALIAS
+            else:
+                self.decision = self.alias
+        return self.decision
+
+
+def alias_lectura():
+    """
+    Alias del que debe leer la petición en curso. Para respuestas en streaming
+    (que se generan después de salir del middleware) hay que fijarlo en la vista
+    con queryset.using(alias_lectura()).
+    """
+    estado = _peticion.get()
+    return estado.alias_lectura() if estado is not None else DEFAULT_DB_ALIAS
+
+
+class EnrutadorReplica:
+    def db_for_read(self, model, **hints):
+        estado = _peticion.get()
+        return estado.alias_lectura() if estado is not None else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        estado = _peticion.get()
+        if estado is not None:
+            estado.escribio = True
+        # Explícito: sin esto Django escribiría en la base de la que se leyó la instancia
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primaria tienen los mismos datos
+        bases = {DEFAULT_DB_ALIAS, alias_replica()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación
+        if db == alias_replica():
+            return False
+        return None
+
+
+# ===================================
+# MIDDLEWARE
+# ===================================
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias = alias_replica()
+        token = self.abrir(request, alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _peticion.reset(token)
+        if self.escribio(request, response, alias):
+            marcar_escritura(request.user.pk)
+        return response
+
+    async def __acall__(self, request):
+        alias = alias_replica()
+        token = self.abrir(request, alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _peticion.reset(token)
+        if self.escribio(request, response, alias):
+            await sync_to_async(marcar_escritura)(request.user.pk)
+        return response
+
+    def abrir(self, request, alias):
+        if alias is not None and request.method in METODOS_LECTURA:
+            return _peticion.set(LecturaPeticion(request, alias))
+        return None
+
+    def escribio(self, request, response, alias):
+        if alias is None or request.method in METODOS_LECTURA or response.status_code >= 400:
+            return False
+        usuario = getattr(request, 'user', None)
+        return usuario is not None and usuario.is_authenticated
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        estado = _peticion.get()
+        if estado is None or estado.request is not request:
+            return None
+        vista = request.resolver_match.view_name
+        extra = set(getattr(settings, 'DB_REPLICA_VISTAS', ()))
+        estado.elegible = vista in VISTAS_REPLICA or vista in extra or vista.endswith('-list')
+        return None
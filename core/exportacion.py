@@ -0,0 +1,244 @@
+# core/exportacion.py
+"""
+Respuestas en streaming para reportes y exportaciones grandes.
+
+Las filas se convierten a texto a medida que el iterador las produce y se
+envían en bloques de ~64 KB, así que la memoria no depende de la cantidad de
+filas. Con querysets, pasar .iterator(chunk_size=...) para que tampoco se
+acumulen en la caché del queryset.
+
+El XLSX se arma sin dependencias: es un ZIP de XML que zipfile escribe sobre
+un buffer sin seek (con descriptores de datos), que se vacía en cada bloque.
+Las hojas usan cadenas en línea (sin tabla de cadenas compartidas) y pasan a
+una hoja nueva al llegar al límite de filas de Excel.
+"""
+import csv
+import itertools
+import re
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+TAMANO_BLOQUE = 64 * 1024
+FILAS_POR_HOJA = 1048576  # Límite de Excel, encabezado incluido
+
+
+class _Eco:
+    """'Archivo' que devuelve lo que se le escribe (csv.writer sin buffer)"""
+
+    def write(self, valor):
+        return valor
+
+
+def _agrupar(partes):
+    bloque, tamano = [], 0
+    for parte in partes:
+        bloque.append(parte)
+        tamano += len(parte)
+        if tamano >= TAMANO_BLOQUE:
+            yield ''.join(bloque)
+            bloque, tamano = [], 0
+    if bloque:
+        yield ''.join(bloque)
+
+
+def filas_csv(encabezados, filas):
+    escritor = csv.writer(_Eco())
+    # BOM: Excel abre el archivo como UTF-8
+    yield '﻿' + escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def respuesta_csv(nombre, encabezados, filas):
+    """StreamingHttpResponse con un CSV descargable"""
+    respuesta = StreamingHttpResponse(
+        _agrupar(filas_csv(encabezados, filas)), content_type='text/csv; charset=utf-8'
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return respuesta
+
+
+# ===================================
+# XLSX
+# ===================================
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Caracteres que XML 1.0 no admite (ni escapados)
+_CARACTERES_INVALIDOS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+# Estilos (índice en cellXfs): 1 fecha, 2 fecha y hora, 3 encabezado en negrita
+_ESTILOS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="4">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+_INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews><sheetData>'
+)
+_FIN_HOJA = '</sheetData></worksheet>'
+
+
+class _Buffer:
+    """Destino sin seek para zipfile: acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def _texto(valor):
+    return escape(_CARACTERES_INVALIDOS.sub('', str(valor)))
+
+
+def _celda(valor, zona, estilo=0):
+    # str primero: es el tipo más frecuente
+    if isinstance(valor, str):
+        if not valor:
+            return '<c/>'
+        estilo = f' s="{estilo}"' if estilo else ''
+        return f'<c t="inlineStr"{estilo}><is><t xml:space="preserve">{_texto(valor)}</t></is></c>'
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(zona).replace(tzinfo=None)
+        serial = (valor - _EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c s="2"><v>{serial:.10f}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _EPOCA_EXCEL.date()).days}</v></c>'
+    return _celda(valor.isoformat() if isinstance(valor, time) else str(valor), zona, estilo)
+
+
+def _fila(valores, zona, estilo=0):
+    return '<row>' + ''.join([_celda(v, zona, estilo) for v in valores]) + '</row>'
+
+
+def _libro(hojas):
+    nombres = ''.join(
+        f'<sheet name="{_texto(nombre)}" sheetId="{n}" r:id="rId{n}"/>' for n, nombre in enumerate(hojas, start=1)
+    )
+    relaciones = ''.join(
+        f'<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{n}.xml"/>' for n in range(1, len(hojas) + 1)
+    )
+    tipos = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for n in range(1, len(hojas) + 1)
+    )
+    return {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{tipos}</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{nombres}</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relaciones}<Relationship Id="rId{len(hojas) + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/styles.xml': _ESTILOS,
+    }
+
+
+def filas_xlsx(encabezados, filas, hoja='Datos'):
+    """Genera el XLSX en bloques de bytes; las partes fijas del libro van al final del ZIP"""
+    salida = _Buffer()
+    filas = iter(filas)
+    hojas = []
+    # Las fechas con zona se escriben en la hora local, como en la API
+    zona = timezone.get_current_timezone()
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_DEFLATED) as libro:
+        pendientes = True
+        while pendientes:
+            hojas.append(hoja[:31] if not hojas else f"{hoja[:25]} ({len(hojas) + 1})")
+            with libro.open(f'xl/worksheets/sheet{len(hojas)}.xml', 'w', force_zip64=True) as xml:
+                xml.write((_INICIO_HOJA + _fila(encabezados, zona, estilo=3)).encode())
+                escritas, tamano, bloque = 1, 0, []
+                pendientes = False
+                for fila in filas:
+                    parte = _fila(fila, zona)
+                    bloque.append(parte)
+                    tamano += len(parte)
+                    escritas += 1
+                    if tamano >= TAMANO_BLOQUE:
+                        xml.write(''.join(bloque).encode())
+                        tamano, bloque = 0, []
+                        yield salida.vaciar()
+                    if escritas >= FILAS_POR_HOJA:
+                        # Otra hoja solo si quedan filas
+                        siguiente = next(filas, None)
+                        if siguiente is not None:
+                            filas = itertools.chain([siguiente], filas)
+                            pendientes = True
+                        break
+                xml.write((''.join(bloque) + _FIN_HOJA).encode())
+            yield salida.vaciar()
+        for nombre, contenido in _libro(hojas).items():
+            libro.writestr(nombre, contenido)
+    yield salida.vaciar()
+
+
+def respuesta_xlsx(nombre, encabezados, filas, hoja='Datos'):
+    """StreamingHttpResponse con un XLSX descargable"""
+    respuesta = StreamingHttpResponse(
+        (bloque for bloque in filas_xlsx(encabezados, filas, hoja) if bloque), content_type=CONTENT_TYPE_XLSX
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return respuesta
@@ -0,0 +1,235 @@
+# core/facturacion.py
+"""
+Emisión masiva de facturas de un condominio para un periodo (mes).
+
+generar_facturas() toma los ConceptoCobro del condominio que tocan en el
+periodo según su periodicidad y su vigencia (aplica_desde/aplica_hasta) y las
+unidades ocupadas, arma en memoria las facturas que faltan y las inserta con
+bulk_create en una sola transacción. Es idempotente por (unidad, concepto,
+periodo): lo ya facturado se omite y las corridas de un mismo condominio se
+serializan con un bloqueo sobre su fila. La usan el comando generar_facturas
+y el endpoint facturacion/generar/.
+
+marcar_vencidas() pasa a 'vencida' las facturas pendientes cuyo vencimiento
+ya pasó, con un UPDATE por lotes de IDs en lugar de guardar factura por
+factura, y avisa a cada usuario afectado con una sola notificación que resume
+todas sus facturas vencidas. La ejecuta a diario el comando marcar_vencidas.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from . import contadores, cuentas, series
+from .models import Condominio, ConceptoCobro, Factura, Notificacion, UnidadHabitacional, UsuarioUnidad
+
+# Meses entre dos facturaciones; 'eventual' (multas, reservas) se factura a mano
+MESES_PERIODICIDAD = {'mensual': 1, 'trimestral': 3, 'anual': 12}
+
+
+def leer_periodo(texto):
+    """'AAAA-MM' -> primer día del mes (ValueError si no es válido)"""
+    anio, mes = texto.strip().split('-')
+    return date(int(anio), int(mes), 1)
+
+
+def corresponde(concepto, periodo):
+    """¿Se factura el concepto en el mes que empieza en periodo?"""
+    fin_mes = periodo.replace(day=calendar.monthrange(periodo.year, periodo.month)[1])
+    if concepto.aplica_desde and concepto.aplica_desde > fin_mes:
+        return False
+    if concepto.aplica_hasta and concepto.aplica_hasta < periodo:
+        return False
+    if concepto.periodicidad == 'unico':
+        # Una sola vez por unidad: las ya facturadas se descartan al armar las facturas
+        return True
+    meses = MESES_PERIODICIDAD.get(concepto.periodicidad)
+    if meses is None:
+        return False
+    # Trimestres y años se cuentan desde aplica_desde (o desde enero)
+    ancla = concepto.aplica_desde or date(periodo.year, 1, 1)
+    return ((periodo.year - ancla.year) * 12 + periodo.month - ancla.month) % meses == 0
+
+
+def generar_facturas(condominio_id, periodo, simular=False, batch_size=2000):
+    """
+    Factura el periodo (se normaliza al día 1) y devuelve el resumen de la corrida.
+    Con simular=True calcula lo mismo sin insertar.
+    """
+    periodo = periodo.replace(day=1)
+    hoy = timezone.localdate()
+    emision = hoy if (hoy.year, hoy.month) == (periodo.year, periodo.month) else periodo
+    vencimiento = emision + timedelta(days=getattr(settings, 'FACTURACION_DIAS_VENCIMIENTO', 15))
+
+    with transaction.atomic():
+        # Dos corridas simultáneas del mismo condominio verían las mismas faltantes
+        condominio = Condominio.objects.select_for_update().get(pk=condominio_id)
+
+        conceptos = [
+            concepto for concepto in ConceptoCobro.objects.filter(condominio=condominio).order_by('id')
+            if corresponde(concepto, periodo)
+        ]
+        unidades = list(
+            UnidadHabitacional.objects.filter(condominio=condominio, estado='ocupada')
+            .order_by('id').values_list('id', flat=True)
+        )
+
+        periodicos = [c.id for c in conceptos if c.periodicidad != 'unico']
+        unicos = [c.id for c in conceptos if c.periodicidad == 'unico']
+        existentes = set(
+            Factura.objects.filter(concepto_cobro_id__in=periodicos, periodo=periodo)
+            .values_list('unidad_habitacional_id', 'concepto_cobro_id')
+        )
+        if unicos:
+            existentes.update(
+                Factura.objects.filter(concepto_cobro_id__in=unicos)
+                .values_list('unidad_habitacional_id', 'concepto_cobro_id')
+            )
+
+        nuevas = [
+            Factura(
+                unidad_habitacional_id=unidad_id,
+                concepto_cobro_id=concepto.id,
+                monto=concepto.monto,
+                fecha_emision=emision,
+                fecha_vencimiento=vencimiento,
+                estado='pendiente',
+                descripcion=f"{concepto.nombre} - {periodo:%m/%Y}",
+                periodo=periodo,
+            )
+            for concepto in conceptos
+            for unidad_id in unidades
+            if (unidad_id, concepto.id) not in existentes
+        ]
+        if not simular:
+            Factura.objects.bulk_create(nuevas, batch_size=batch_size)
+            cuentas.registrar(
+                [m for f in nuevas for m in cuentas.movimientos_factura(
+                    f.id, None, (f.unidad_habitacional_id, f.monto, f.estado)
+                )],
+                batch_size=batch_size,
+            )
+            if nuevas:
+                series.invalidar_si_cerrada('morosidad', vencimiento)
+
+    return {
+        'condominio_id': condominio.id,
+        'condominio': condominio.nombre,
+        'periodo': periodo.strftime('%Y-%m'),
+        'simulacion': simular,
+        'unidades': len(unidades),
+        'conceptos': [
+            {'id': c.id, 'nombre': c.nombre, 'periodicidad': c.periodicidad, 'monto': c.monto}
+            for c in conceptos
+        ],
+        'creadas': len(nuevas),
+        'existentes': len(conceptos) * len(unidades) - len(nuevas),
+        'monto_total': sum((f.monto for f in nuevas), Decimal('0')),
+    }
+
+
+# ===================================
+# VENCIMIENTOS
+# ===================================
+
+def marcar_vencidas(condominio_id, hoy=None, simular=False, chunk_size=5000):
+    """
+    Pasa a 'vencida' las facturas pendientes del condominio que vencieron antes
+    de hoy y notifica una vez a cada usuario con relación activa en las unidades
+    afectadas. Cada lote de chunk_size facturas es una transacción corta (0: un
+    solo UPDATE); las que otra transacción tiene bloqueadas (un pago en curso)
+    se saltan y quedan para la próxima corrida. Con simular=True solo cuenta.
+    """
+    hoy = hoy or timezone.localdate()
+    condominio = Condominio.objects.get(pk=condominio_id)
+    pendientes = Factura.objects.filter(
+        unidad_habitacional__condominio_id=condominio_id,
+        estado='pendiente',
+        fecha_vencimiento__lt=hoy,
+    )
+
+    # unidad_id -> [facturas, monto]
+    por_unidad = defaultdict(lambda: [0, Decimal('0')])
+    lotes = 0
+    if simular:
+        for fila in pendientes.values('unidad_habitacional_id').annotate(facturas=Count('id'), monto=Sum('monto')):
+            por_unidad[fila['unidad_habitacional_id']] = [fila['facturas'], fila['monto']]
+    else:
+        while True:
+            with transaction.atomic():
+                lote = pendientes.order_by('id').select_for_update(skip_locked=True, of=('self',))
+                filas = list((lote[:chunk_size] if chunk_size else lote).values_list(
+                    'id', 'unidad_habitacional_id', 'monto'
+                ))
+                if not filas:
+                    break
+                # De pendiente a vencida la deuda no cambia: el libro de cuentas no se toca
+                Factura.objects.filter(id__in=[f[0] for f in filas]).update(
+                    estado='vencida', updated_at=timezone.now()
+                )
+            lotes += 1
+            for _, unidad_id, monto in filas:
+                por_unidad[unidad_id][0] += 1
+                por_unidad[unidad_id][1] += monto
+            if not chunk_size or len(filas) < chunk_size:
+                break
+        if lotes:
+            # Vencieron antes de hoy: cambian cubetas cerradas de la morosidad
+            series.invalidar('morosidad')
+
+    usuarios = defaultdict(set)
+    if por_unidad:
+        relaciones = UsuarioUnidad.objects.filter(
+            unidad__condominio_id=condominio_id, unidad_id__in=list(por_unidad), fecha_fin__isnull=True,
+        ).values_list('usuario_id', 'unidad_id')
+        for usuario_id, unidad_id in relaciones:
+            usuarios[usuario_id].add(unidad_id)
+    if usuarios and not simular:
+        _notificar_vencidas(usuarios, por_unidad)
+
+    return {
+        'condominio_id': condominio.id,
+        'condominio': condominio.nombre,
+        'fecha': hoy.isoformat(),
+        'simulacion': simular,
+        'facturas': sum(f for f, _ in por_unidad.values()),
+        'monto_total': sum((m for _, m in por_unidad.values()), Decimal('0')),
+        'unidades': len(por_unidad),
+        'usuarios_notificados': len(usuarios),
+        'lotes': lotes,
+    }
+
+
+def _notificar_vencidas(usuarios, por_unidad, batch_size=1000):
+    """Una notificación por usuario con el total de sus unidades afectadas"""
+    codigos = dict(
+        UnidadHabitacional.objects.filter(id__in=list(por_unidad)).values_list('id', 'codigo')
+    )
+    notificaciones = []
+    for usuario_id, unidades in usuarios.items():
+        facturas = sum(por_unidad[u][0] for u in unidades)
+        monto = sum((por_unidad[u][1] for u in unidades), Decimal('0'))
+        lista = ', '.join(sorted(codigos[u] for u in unidades))
+        notificaciones.append(Notificacion(
+            usuario_id=usuario_id,
+            unidad_habitacional_id=next(iter(unidades)) if len(unidades) == 1 else None,
+            titulo="Facturas vencidas" if facturas > 1 else "Factura vencida",
+            mensaje=(
+                f"{facturas} factura{'s' if facturas > 1 else ''} por un total de {monto} "
+                f"venci{'eron' if facturas > 1 else 'ó'} sin pagarse (unidad{'es' if len(unidades) > 1 else ''} {lista})."
+            ),
+            tipo='pago',
+            prioridad='alta',
+            tipo_relacion='factura_vencida',
+        ))
+
+    with transaction.atomic():
+        creadas = Notificacion.objects.bulk_create(notificaciones, batch_size=batch_size)
+        contadores.notificaciones_masivas_creadas(
+            usuarios, 'pago', 'alta', creadas[0].fecha_envio, batch_size=batch_size
+        )
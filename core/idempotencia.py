@@ -0,0 +1,70 @@
+# core/idempotencia.py
+"""
+Peticiones POST idempotentes con el encabezado Idempotency-Key.
+
+responder() inserta la clave (única por usuario) en ClaveIdempotencia en la
+misma transacción que la operación. Si la operación lanza una excepción no
+queda nada y el cliente puede reintentar. Si termina, su respuesta (también
+los errores 4xx) se guarda con la clave. Un reintento con la misma clave
+espera en el índice único a que termine la primera petición y recibe la
+respuesta guardada con el encabezado Idempotent-Replayed: true; la misma
+clave con otro cuerpo o en otra ruta es un 422.
+
+Las claves se purgan a las IDEMPOTENCIA_RETENCION_HORAS (purgar_idempotencia).
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import ClaveIdempotencia
+
+ENCABEZADO = 'Idempotency-Key'
+
+
+def huella(request):
+    datos = request.data.dict() if hasattr(request.data, 'dict') else request.data
+    contenido = json.dumps([request.path, datos], sort_keys=True, cls=JSONEncoder)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def responder(request, procesar):
+    """
+    Ejecuta procesar() (sin argumentos, devuelve un Response) una sola vez por
+    clave, dentro de una transacción
+    """
+    clave = request.headers.get(ENCABEZADO, '').strip()
+    if not clave or len(clave) > 255:
+        return Response(
+            {"error": f"El encabezado {ENCABEZADO} es obligatorio (hasta 255 caracteres)"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    firma = huella(request)
+
+    with transaction.atomic():
+        try:
+            # Con la clave en curso en otra transacción, el INSERT espera a que termine
+            with transaction.atomic():
+                registro = ClaveIdempotencia.objects.create(
+                    usuario=request.user, clave=clave, ruta=request.path[:255], huella=firma
+                )
+        except IntegrityError:
+            registro = None
+        if registro is not None:
+            respuesta = procesar()
+            registro.estado_http = respuesta.status_code
+            registro.respuesta = json.dumps(respuesta.data, cls=JSONEncoder)
+            registro.save(update_fields=['estado_http', 'respuesta'])
+            return respuesta
+
+    previo = ClaveIdempotencia.objects.get(usuario=request.user, clave=clave)
+    if previo.huella != firma:
+        return Response(
+            {"error": f"{ENCABEZADO} ya usada con otra petición"}, status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(
+        json.loads(previo.respuesta), status=previo.estado_http, headers={'Idempotent-Replayed': 'true'}
+    )
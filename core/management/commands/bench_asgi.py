@@ -0,0 +1,209 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.management.commands.bench_endpoints import percentil
+from core.models import Usuario
+
+# (nombre, vista síncrona servida por WSGI, versión async servida por ASGI)
+ENDPOINTS = [
+    ('dashboard', 'movil_dashboard', 'movil_dashboard_async'),
+    ('cuotas', 'movil_consultar_cuotas', 'movil_consultar_cuotas_async'),
+    ('notificaciones', 'movil_notificaciones_lista', 'movil_notificaciones_lista_async'),
+]
+
+DESPLIEGUES = {
+    'wsgi': ['smart_condominium_backend.wsgi:application'],
+    'asgi': ['smart_condominium_backend.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara los endpoints móviles síncronos bajo gunicorn (WSGI) con sus versiones async '
+        'bajo gunicorn + uvicorn (ASGI): latencia y capacidad (mayor concurrencia que cumple el '
+        'objetivo de p95 sin errores). Levanta los dos servidores en puertos locales'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn por despliegue (defecto: 2)')
+        parser.add_argument('--hilos', type=int, default=1,
+                            help='Hilos por worker WSGI; más de 1 usa el worker gthread (defecto: 1)')
+        parser.add_argument('--niveles', default='1,4,16,32',
+                            help='Clientes concurrentes a probar, separados por coma (defecto: 1,4,16,32)')
+        parser.add_argument('--peticiones', type=int, default=200,
+                            help='Peticiones por endpoint y nivel (defecto: 200)')
+        parser.add_argument('--objetivo-ms', type=float, default=500.0,
+                            help='p95 máximo para contar un nivel dentro de la capacidad (defecto: 500)')
+        parser.add_argument('--endpoints', default='', help='Nombres separados por coma (por defecto, todos)')
+        parser.add_argument('--salida', help='Guarda los resultados en JSON')
+
+    def handle(self, *args, **options):
+        niveles = sorted({int(n) for n in options['niveles'].split(',') if n.strip()})
+        seleccion = {n.strip() for n in options['endpoints'].split(',') if n.strip()}
+        endpoints = [e for e in ENDPOINTS if not seleccion or e[0] in seleccion]
+        if not endpoints or not niveles:
+            raise CommandError("Nada que medir: revise --endpoints y --niveles")
+        tokens = self.tokens(max(niveles))
+        # Los servidores abren sus propias conexiones: aquí no se necesita ninguna
+        connections.close_all()
+
+        resultados = {}
+        for despliegue in DESPLIEGUES:
+            puerto = puerto_libre()
+            servidor = self.arrancar(despliegue, puerto, options['workers'], options['hilos'])
+            try:
+                for nombre, vista_sync, vista_async in endpoints:
+                    url = f"http://127.0.0.1:{puerto}{reverse(vista_async if despliegue == 'asgi' else vista_sync)}"
+                    for nivel in niveles:
+                        r = self.medir(url, tokens, nivel, options['peticiones'])
+                        resultados.setdefault(nombre, {}).setdefault(despliegue, {})[str(nivel)] = r
+                        self.stdout.write(
+                            f"{despliegue} {nombre:16} {nivel:3} clientes  {r['rps']:7.1f} rps  "
+                            f"p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  errores {r['errores']}"
+                        )
+            finally:
+                servidor.terminate()
+                servidor.wait(timeout=30)
+
+        self.resumen(resultados, options['objetivo_ms'])
+        if options['salida']:
+            informe = {
+                'generado': timezone.now().isoformat(),
+                'workers': options['workers'],
+                'hilos_wsgi': options['hilos'],
+                'objetivo_ms': options['objetivo_ms'],
+                'endpoints': resultados,
+            }
+            Path(options['salida']).write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+    def tokens(self, cantidad):
+        usuarios = list(Usuario.objects.filter(
+            tipo='residente', estado='activo', usuariounidad__fecha_fin__isnull=True,
+        ).distinct().order_by('id')[:cantidad])
+        if not usuarios:
+            raise CommandError("No hay residentes activos con unidad: siembre datos antes de medir")
+        return [str(RefreshToken.for_user(usuarios[i % len(usuarios)]).access_token) for i in range(cantidad)]
+
+    # ===================================
+    # SERVIDORES
+    # ===================================
+
+    def arrancar(self, despliegue, puerto, workers, hilos):
+        comando = [
+            sys.executable, '-m', 'gunicorn', *DESPLIEGUES[despliegue],
+            '--workers', str(workers), '--bind', f'127.0.0.1:{puerto}', '--log-level', 'warning',
+        ]
+        if despliegue == 'wsgi' and hilos > 1:
+            comando += ['--threads', str(hilos)]
+        entorno = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            'N_MAS_UNO_MODO': 'off',  # El detector añade su propio costo a cada petición medida
+        }
+        self.stdout.write(f"Arrancando {despliegue} en el puerto {puerto}: {' '.join(comando[2:])}")
+        servidor = subprocess.Popen(comando, cwd=settings.BASE_DIR, env=entorno)
+
+        # Listo cuando responde (401 sin token basta)
+        limite = time.monotonic() + 60
+        while time.monotonic() < limite:
+            if servidor.poll() is not None:
+                raise CommandError(f"El servidor {despliegue} terminó al arrancar (código {servidor.returncode})")
+            try:
+                requests.get(f"http://127.0.0.1:{puerto}{reverse('movil_dashboard')}", timeout=2)
+                return servidor
+            except requests.ConnectionError:
+                time.sleep(0.5)
+        servidor.terminate()
+        raise CommandError(f"El servidor {despliegue} no respondió en 60 s")
+
+    # ===================================
+    # MEDICIÓN
+    # ===================================
+
+    def medir(self, url, tokens, nivel, n_peticiones):
+        muestras = []
+        bloqueo = threading.Lock()
+        barrera = threading.Barrier(nivel + 1)
+        por_cliente = [n_peticiones // nivel + (i < n_peticiones % nivel) for i in range(nivel)]
+
+        def cliente(indice):
+            sesion = requests.Session()
+            sesion.headers['Authorization'] = f"Bearer {tokens[indice]}"
+            propias = []
+            try:
+                sesion.get(url, timeout=60)  # Calentamiento: conexión HTTP y pool del worker
+                barrera.wait()
+                for _ in range(por_cliente[indice]):
+                    inicio = time.perf_counter()
+                    try:
+                        estado = sesion.get(url, timeout=60).status_code
+                    except requests.RequestException:
+                        estado = 0
+                    propias.append((time.perf_counter() - inicio, estado))
+            except threading.BrokenBarrierError:
+                pass
+            except Exception:
+                barrera.abort()
+                raise
+            finally:
+                sesion.close()
+                with bloqueo:
+                    muestras.extend(propias)
+
+        hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(nivel)]
+        for hilo in hilos:
+            hilo.start()
+        inicio = time.perf_counter()
+        try:
+            barrera.wait()
+            inicio = time.perf_counter()
+        except threading.BrokenBarrierError:
+            pass
+        for hilo in hilos:
+            hilo.join()
+        total = time.perf_counter() - inicio
+
+        latencias = sorted(m[0] * 1000 for m in muestras)
+        estados = Counter(m[1] for m in muestras)
+        return {
+            'rps': round(len(muestras) / total, 2) if total else 0.0,
+            'p50_ms': round(percentil(latencias, 50), 2),
+            'p95_ms': round(percentil(latencias, 95), 2),
+            'max_ms': round(latencias[-1], 2) if latencias else 0.0,
+            'errores': sum(c for estado, c in estados.items() if estado == 0 or estado >= 400),
+            'estados': {str(estado): c for estado, c in sorted(estados.items())},
+        }
+
+    def resumen(self, resultados, objetivo_ms):
+        self.stdout.write(f"\nCapacidad: mayor concurrencia con p95 <= {objetivo_ms:g} ms y sin errores")
+        for nombre, por_despliegue in resultados.items():
+            partes = []
+            for despliegue, niveles in por_despliegue.items():
+                validos = [int(n) for n, r in niveles.items() if r['p95_ms'] <= objetivo_ms and not r['errores']]
+                mejor = max(niveles.values(), key=lambda r: r['rps'])
+                partes.append(
+                    f"{despliegue}: {max(validos) if validos else 0:3} clientes, máx. {mejor['rps']:.1f} rps"
+                )
+            self.stdout.write(f"  {nombre:16} " + "   ".join(partes))
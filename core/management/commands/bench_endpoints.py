@@ -0,0 +1,319 @@
+import json
+import math
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models.signals import post_save
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.contadores import recalcular_contadores
+from core.metricas import MedidorConsultas
+from core.models import *
+
+# PNG de 1x1: basta para recorrer el flujo de acceso facial sin depender de una cámara
+IMAGEN_PRUEBA = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=='
+)
+
+PERCENTILES = [50, 90, 95, 99]
+
+# Tablas que escriben los escenarios que no son GET, en orden de creación: al terminar se borra lo que
+# crearon las peticiones del benchmark (y nada más, aunque la base la usen otros a la vez)
+TABLAS_ESCRITURA = [RegistroAcceso, IncidenteSeguridad, Notificacion]
+
+# Tablas que leen los escenarios: vacías, las mediciones no dicen nada
+TABLAS_LECTURA = [UnidadHabitacional, Factura, Pago, Notificacion, RegistroAcceso, Bitacora]
+
+
+def escenarios():
+    """Endpoints medidos: (nombre, método, URL, perfil del cliente, cuerpo)"""
+    return [
+        ('movil_dashboard', 'get', reverse('movil_dashboard'), 'residente', None),
+        ('movil_cuotas', 'get', reverse('movil_consultar_cuotas'), 'residente', None),
+        ('movil_notificaciones', 'get', reverse('movil_notificaciones_lista'), 'residente', None),
+        ('movil_notificaciones_resumen', 'get', reverse('movil_notificaciones_resumen'), 'residente', None),
+        ('movil_notificaciones_resumen_v2', 'get', reverse('movil_notificaciones_resumen') + '?version=2', 'residente', None),
+        ('admin_dashboard', 'get', reverse('admin_dashboard'), 'administrador', None),
+        ('reportes_financieros', 'get', reverse('indicadores-financieros'), 'administrador', None),
+        ('reportes_areas_comunes', 'get', reverse('reporte-areas-comunes'), 'administrador', None),
+        ('reportes_visuales', 'get', reverse('reporte-visuales'), 'administrador', None),
+        ('bitacora', 'get', reverse('bitacora-list'), 'administrador', None),
+        ('ia_estadisticas_acceso', 'get', reverse('estadisticas_acceso'), 'seguridad', None),
+        ('ia_procesar_acceso', 'post', reverse('procesar_acceso_facial'), 'seguridad', 'acceso_facial'),
+    ]
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide los endpoints críticos de la API con clientes autenticados concurrentes '
+        '(RPS, percentiles de latencia, consultas y tiempo de BD por petición). '
+        'Usa los datos existentes: sembrar antes con populate_* o populate_carga_db'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=8, help='Clientes concurrentes (defecto: 8)')
+        parser.add_argument('--peticiones', type=int, default=200,
+                            help='Peticiones por endpoint, repartidas entre los clientes (defecto: 200)')
+        parser.add_argument('--calentamiento', type=int, default=3,
+                            help='Peticiones por cliente que no se miden (defecto: 3)')
+        parser.add_argument('--endpoints', default='',
+                            help='Nombres separados por coma (por defecto, todos)')
+        parser.add_argument('--salida', help='Guarda los resultados como línea base (JSON)')
+        parser.add_argument('--comparar', help='Línea base (JSON) contra la que buscar regresiones')
+        parser.add_argument('--tolerancia', type=float, default=20.0,
+                            help='Margen en %% para latencia y RPS antes de marcar una regresión (defecto: 20)')
+        parser.add_argument('--escrituras', action='store_true',
+                            help='Incluye los endpoints que escriben (ia_procesar_acceso); lo que crean se borra al terminar')
+
+    def handle(self, *args, **options):
+        # El detector de N+1 lanzaría errores con DEBUG: aquí solo se mide
+        with override_settings(N_MAS_UNO_MODO='off'):
+            self.ejecutar(options)
+
+    def ejecutar(self, options):
+        self.host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and ':' not in h), 'localhost')
+        vacias = [modelo._meta.model_name for modelo in TABLAS_LECTURA if not modelo.objects.exists()]
+        if vacias:
+            raise CommandError(
+                f"Tablas sin datos: {', '.join(vacias)}. Siembre antes de medir (populate_carga_db)"
+            )
+        tokens = self.tokens(options['clientes'])
+
+        seleccion = {n.strip() for n in options['endpoints'].split(',') if n.strip()}
+        lista = [e for e in escenarios() if not seleccion or e[0] in seleccion]
+        desconocidos = seleccion - {e[0] for e in lista}
+        if desconocidos:
+            raise CommandError(f"Endpoints desconocidos: {', '.join(sorted(desconocidos))}")
+
+        cuerpos = {'acceso_facial': self.cuerpo_acceso_facial()}
+
+        resultados = {}
+        for nombre, metodo, url, perfil, cuerpo in lista:
+            if not tokens.get(perfil):
+                self.stdout.write(self.style.WARNING(f"{nombre}: no hay usuarios '{perfil}' activos, se omite"))
+                continue
+            if cuerpo and cuerpos[cuerpo] is None:
+                self.stdout.write(self.style.WARNING(f"{nombre}: faltan datos para el cuerpo de la petición, se omite"))
+                continue
+            if metodo != 'get' and not options['escrituras']:
+                self.stdout.write(self.style.WARNING(f"{nombre}: escribe en la base, se omite (usar --escrituras)"))
+                continue
+            creadas = self.registrar_creadas() if metodo != 'get' else None
+            try:
+                resultados[nombre] = self.medir(
+                    metodo, url, tokens[perfil], cuerpos.get(cuerpo),
+                    options['clientes'], options['peticiones'], options['calentamiento'],
+                )
+            finally:
+                if creadas is not None:
+                    self.limpiar(creadas)
+            self.imprimir(nombre, resultados[nombre])
+
+        informe = {
+            'generado': timezone.now().isoformat(),
+            'motor': connection.vendor,
+            'clientes': options['clientes'],
+            'peticiones': options['peticiones'],
+            'endpoints': resultados,
+        }
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+            self.stdout.write(f"Línea base guardada en {options['salida']}")
+
+        if options['comparar']:
+            self.comparar(informe, options['comparar'], options['tolerancia'])
+
+    # ===================================
+    # PREPARACIÓN
+    # ===================================
+
+    def tokens(self, n_clientes):
+        """Un token JWT por cliente y perfil (usuarios distintos cuando los hay)"""
+        perfiles = {
+            'residente': Usuario.objects.filter(
+                tipo='residente', estado='activo',
+                usuariounidad__fecha_fin__isnull=True,
+            ).distinct(),
+            'administrador': Usuario.objects.filter(tipo='administrador', estado='activo'),
+            'seguridad': Usuario.objects.filter(tipo='seguridad', estado='activo'),
+        }
+        tokens = {}
+        for perfil, usuarios in perfiles.items():
+            usuarios = list(usuarios.order_by('id')[:n_clientes])
+            tokens[perfil] = [
+                str(RefreshToken.for_user(usuarios[i % len(usuarios)]).access_token)
+                for i in range(n_clientes)
+            ] if usuarios else []
+        if not any(tokens.values()):
+            raise CommandError("No hay usuarios activos: siembre datos antes de medir")
+        return tokens
+
+    def cuerpo_acceso_facial(self):
+        camara_id = CamaraSeguridad.objects.filter(esta_activa=True).values_list('id', flat=True).first()
+        if camara_id is None:
+            return None
+        return {'camara_id': camara_id, 'imagen': IMAGEN_PRUEBA, 'direccion': 'entrada'}
+
+    def registrar_creadas(self):
+        """
+        {modelo: [pk]} que se va llenando con las filas que crean las peticiones del benchmark.
+        Los clientes corren en este proceso: post_save solo ve lo que crean ellos.
+        """
+        creadas = {modelo: [] for modelo in TABLAS_ESCRITURA}
+
+        def creada(sender, instance, created, raw=False, **kwargs):
+            if created and not raw:
+                creadas[sender].append(instance.pk)
+
+        self._receptor_creadas = creada
+        for modelo in TABLAS_ESCRITURA:
+            post_save.connect(creada, sender=modelo, weak=False)
+        return creadas
+
+    def limpiar(self, creadas):
+        """Borra las filas creadas durante la medición para que no se acumulen entre corridas"""
+        for modelo in TABLAS_ESCRITURA:
+            post_save.disconnect(self._receptor_creadas, sender=modelo)
+        notificaciones = creadas[Notificacion]
+        usuarios = set(Notificacion.objects.filter(pk__in=notificaciones).values_list('usuario_id', flat=True))
+        with transaction.atomic():
+            borradas = {
+                modelo._meta.model_name: modelo.objects.filter(pk__in=creadas[modelo]).delete()[0]
+                for modelo in reversed(TABLAS_ESCRITURA)
+            }
+            # Los borrados de notificaciones no son reales: sin tombstones para la sincronización
+            RegistroEliminacion.objects.filter(modelo='notificacion', objeto_id__in=notificaciones).delete()
+        recalcular_contadores(usuarios)
+        self.stdout.write(f"  limpieza: {borradas}")
+
+    # ===================================
+    # MEDICIÓN
+    # ===================================
+
+    def medir(self, metodo, url, tokens, cuerpo, n_clientes, n_peticiones, calentamiento):
+        muestras = []
+        fallos = []
+        estados = Counter()
+        bloqueo = threading.Lock()
+        barrera = threading.Barrier(n_clientes + 1)
+        por_cliente = [n_peticiones // n_clientes + (i < n_peticiones % n_clientes) for i in range(n_clientes)]
+
+        def cliente(indice):
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {tokens[indice]}", HTTP_HOST=self.host)
+            peticion = getattr(client, metodo)
+            argumentos = {'data': cuerpo, 'content_type': 'application/json'} if cuerpo else {}
+            propias = []
+            try:
+                for _ in range(calentamiento):
+                    peticion(url, **argumentos)
+                barrera.wait()
+                for _ in range(por_cliente[indice]):
+                    medidor = MedidorConsultas()
+                    # Las conexiones son por hilo: el wrapper solo ve las consultas de este cliente
+                    with connection.execute_wrapper(medidor):
+                        inicio = time.perf_counter()
+                        respuesta = peticion(url, **argumentos)
+                        duracion = time.perf_counter() - inicio
+                    propias.append((duracion, medidor.consultas, medidor.segundos, respuesta.status_code))
+                    # Igual que request_finished en un servidor real: sin pool ni CONN_MAX_AGE la
+                    # conexión se cierra y la siguiente petición paga de nuevo la conexión
+                    close_old_connections()
+            except Exception as e:
+                # Sin esto el resto de los hilos quedaría esperando en la barrera
+                fallos.append(e)
+                barrera.abort()
+            finally:
+                connections.close_all()
+                with bloqueo:
+                    muestras.extend(propias)
+
+        hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(n_clientes)]
+        for hilo in hilos:
+            hilo.start()
+        inicio = time.perf_counter()
+        try:
+            barrera.wait()
+            inicio = time.perf_counter()
+        except threading.BrokenBarrierError:
+            pass
+        for hilo in hilos:
+            hilo.join()
+        total = time.perf_counter() - inicio
+        if fallos:
+            raise CommandError(f"{url}: {fallos[0]!r}")
+
+        latencias = sorted(m[0] * 1000 for m in muestras)
+        for m in muestras:
+            estados[m[3]] += 1
+        n = len(muestras) or 1
+        return {
+            'rps': round(len(muestras) / total, 2) if total else 0.0,
+            **{f'p{p}_ms': round(percentil(latencias, p), 2) for p in PERCENTILES},
+            'max_ms': round(latencias[-1], 2) if latencias else 0.0,
+            'consultas': round(sum(m[1] for m in muestras) / n, 2),
+            'db_ms': round(sum(m[2] for m in muestras) * 1000 / n, 2),
+            'errores': sum(c for estado, c in estados.items() if estado >= 400),
+            'estados': {str(estado): c for estado, c in sorted(estados.items())},
+        }
+
+    def imprimir(self, nombre, r):
+        linea = (
+            f"{nombre:32} {r['rps']:8.1f} rps  p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  "
+            f"p99 {r['p99_ms']:7.1f} ms  {r['consultas']:5.1f} consultas  BD {r['db_ms']:6.1f} ms"
+        )
+        if r['errores']:
+            self.stdout.write(self.style.WARNING(f"{linea}  errores {r['errores']} {r['estados']}"))
+        else:
+            self.stdout.write(linea)
+
+    # ===================================
+    # COMPARACIÓN CON LA LÍNEA BASE
+    # ===================================
+
+    def comparar(self, informe, ruta, tolerancia):
+        try:
+            base = json.loads(Path(ruta).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer la línea base {ruta}: {e}")
+
+        margen = 1 + tolerancia / 100
+        regresiones = []
+        for nombre, actual in informe['endpoints'].items():
+            anterior = base.get('endpoints', {}).get(nombre)
+            if anterior is None:
+                continue
+            # La cantidad de consultas es determinista: cualquier aumento es una regresión
+            if actual['consultas'] > anterior['consultas']:
+                regresiones.append(f"{nombre}: consultas {anterior['consultas']} -> {actual['consultas']}")
+            if actual['p95_ms'] > anterior['p95_ms'] * margen:
+                regresiones.append(f"{nombre}: p95 {anterior['p95_ms']} ms -> {actual['p95_ms']} ms")
+            if actual['rps'] * margen < anterior['rps']:
+                regresiones.append(f"{nombre}: rps {anterior['rps']} -> {actual['rps']}")
+            if actual['errores'] > anterior['errores']:
+                regresiones.append(f"{nombre}: errores {anterior['errores']} -> {actual['errores']}")
+
+        if base.get('motor') != informe['motor'] or base.get('clientes') != informe['clientes']:
+            self.stdout.write(self.style.WARNING(
+                f"La línea base se midió con {base.get('motor')} y {base.get('clientes')} clientes; "
+                f"ahora {informe['motor']} y {informe['clientes']}"
+            ))
+        if regresiones:
+            raise CommandError("Regresiones respecto a la línea base:\n  " + "\n  ".join(regresiones))
+        self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la línea base"))
@@ -0,0 +1,287 @@
+import random
+import re
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.management.siembra import sin_auto_now_add
+from core.models import *
+
+# Tablas grandes: ninguna consulta crítica debe recorrerlas secuencialmente
+MODELOS_VIGILADOS = [Notificacion, Factura, UsuarioUnidad, Reserva, RegistroAcceso, IncidenteSeguridad, Bitacora]
+
+SEQ_SCAN_POSTGRES = re.compile(r'Seq Scan on "?(\w+)"?')
+SCAN_SQLITE = re.compile(r'\bSCAN (\w+)(\s+USING\b)?')
+TIEMPO_POSTGRES = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+class Revertir(Exception):
+    """Deshace los datos sembrados al terminar el benchmark"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra un volumen grande de datos, ejecuta EXPLAIN ANALYZE sobre las consultas '
+        'de los endpoints críticos y falla si alguna recorre secuencialmente una tabla grande'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0,
+                            help='Multiplicador del volumen sembrado (1.0 = 2.000 unidades, ~600.000 filas)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador aleatorio')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Filas por bulk_create (defecto: 5000)')
+        parser.add_argument('--sin-sembrar', action='store_true',
+                            help='No siembra datos; mide sobre los datos existentes')
+        parser.add_argument('--conservar', action='store_true',
+                            help='Conserva los datos sembrados (por defecto se revierten al terminar)')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f"Motor no soportado: {connection.vendor}")
+
+        self.random = random.Random(options['semilla'])
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        fallos = []
+
+        try:
+            with transaction.atomic():
+                if not options['sin_sembrar']:
+                    self.sembrar(options['escala'])
+                self.actualizar_estadisticas()
+                fallos = self.medir_consultas()
+                if not options['conservar']:
+                    raise Revertir()
+        except Revertir:
+            self.stdout.write("Datos sembrados revertidos.")
+
+        if fallos:
+            raise CommandError(
+                "Consultas con recorrido secuencial: " + "; ".join(
+                    f"{nombre} ({', '.join(tablas)})" for nombre, tablas in fallos
+                )
+            )
+        self.stdout.write(self.style.SUCCESS("Todas las consultas críticas usan índices"))
+
+    # ===================================
+    # SIEMBRA
+    # ===================================
+
+    def insertar(self, modelo, filas):
+        """bulk_create por lotes a partir de un generador (sin cargar todo en memoria)"""
+        total = 0
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, self.batch_size))
+            if not lote:
+                break
+            modelo.objects.bulk_create(lote, batch_size=self.batch_size)
+            total += len(lote)
+        self.stdout.write(f"  {modelo.__name__}: {total}")
+        return total
+
+    def fecha_hora_aleatoria(self, dias):
+        return timezone.now() - timedelta(seconds=self.random.randint(0, dias * 86400))
+
+    def sembrar(self, escala):
+        self.stdout.write("Sembrando datos de benchmark...")
+        rnd = self.random
+        n_condominios = max(1, int(10 * escala))
+        n_unidades = max(10, int(2000 * escala))
+        hoy = date.today()
+        prefijo = f"bench{int(time.time())}"
+
+        condominios = Condominio.objects.bulk_create(
+            [Condominio(nombre=f"Benchmark {i}") for i in range(n_condominios)]
+        )
+        conceptos = ConceptoCobro.objects.bulk_create([
+            ConceptoCobro(nombre='Cuota de mantenimiento mensual', tipo='cuota_mensual', monto=Decimal('100.00'), condominio=c)
+            for c in condominios
+        ])
+        areas = AreaComun.objects.bulk_create([
+            AreaComun(nombre=f"Área {i}", condominio=c) for c in condominios for i in range(5)
+        ])
+
+        unidades = UnidadHabitacional.objects.bulk_create([
+            UnidadHabitacional(condominio=condominios[i % n_condominios], codigo=f"{prefijo}-{i}", tipo='departamento', estado='ocupada')
+            for i in range(n_unidades)
+        ], batch_size=self.batch_size)
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(
+                nombre=f"Residente {i}", apellidos='Benchmark', ci=f"{prefijo}-{i}",
+                email=f"{prefijo}-{i}@benchmark.local", tipo='residente', estado='activo',
+                password='!',  # Sin contraseña utilizable: no se hashea nada
+            )
+            for i in range(n_unidades)
+        ], batch_size=self.batch_size)
+        # En SQLite bulk_create no siempre devuelve los IDs
+        if usuarios[0].pk is None:
+            usuarios = list(Usuario.objects.filter(ci__startswith=f"{prefijo}-").order_by('id'))
+            unidades = list(UnidadHabitacional.objects.filter(codigo__startswith=f"{prefijo}-").order_by('id'))
+
+        self.insertar(UsuarioUnidad, (
+            UsuarioUnidad(
+                usuario=usuario, unidad=unidad, tipo_relacion='residente',
+                fecha_inicio=hoy - timedelta(days=730),
+                fecha_fin=hoy - timedelta(days=30) if rnd.random() < 0.2 else None,
+            )
+            for usuario, unidad in zip(usuarios, unidades)
+        ))
+
+        conceptos_por_condominio = {c.condominio_id: c for c in conceptos}
+        self.insertar(Factura, (
+            Factura(
+                unidad_habitacional=unidad, concepto_cobro=conceptos_por_condominio[unidad.condominio_id],
+                monto=Decimal('100.00'), periodo=(hoy - timedelta(days=30 * mes)).replace(day=1),
+                fecha_emision=hoy - timedelta(days=30 * mes), fecha_vencimiento=hoy - timedelta(days=30 * mes - 15),
+                estado=rnd.choices(['pagada', 'pendiente', 'vencida'], [8, 1, 1])[0],
+            )
+            for unidad in unidades for mes in range(24)
+        ))
+
+        with sin_auto_now_add(Notificacion, RegistroAcceso, IncidenteSeguridad, Bitacora):
+            tipos = [tipo for tipo, _ in Notificacion.TIPO_CHOICES]
+            self.insertar(Notificacion, (
+                Notificacion(
+                    usuario=usuario, titulo='Notificación de benchmark', mensaje='Mensaje',
+                    tipo=rnd.choice(tipos), prioridad=rnd.choice(['baja', 'media', 'alta']),
+                    fecha_envio=self.fecha_hora_aleatoria(365), created_at=timezone.now(),
+                    leida=rnd.random() < 0.8,
+                )
+                for usuario in usuarios for _ in range(50)
+            ))
+
+            metodos = [metodo for metodo, _ in RegistroAcceso.METODO_CHOICES]
+            self.insertar(RegistroAcceso, (
+                RegistroAcceso(
+                    usuario=rnd.choice(usuarios), tipo='peatonal', direccion=rnd.choice(['entrada', 'salida']),
+                    metodo=rnd.choice(metodos), fecha_hora=self.fecha_hora_aleatoria(365),
+                    created_at=timezone.now(), reconocimiento_exitoso=rnd.random() < 0.9,
+                )
+                for _ in range(n_unidades * 100)
+            ))
+
+            tipos_incidente = [tipo for tipo, _ in IncidenteSeguridad.TIPO_CHOICES]
+            gravedades = [gravedad for gravedad, _ in IncidenteSeguridad.GRAVEDAD_CHOICES]
+            self.insertar(IncidenteSeguridad, (
+                IncidenteSeguridad(
+                    tipo=rnd.choice(tipos_incidente), descripcion='Incidente de benchmark',
+                    gravedad=rnd.choice(gravedades), fecha_hora=self.fecha_hora_aleatoria(365),
+                    created_at=timezone.now(),
+                )
+                for _ in range(n_unidades * 10)
+            ))
+
+            self.insertar(Bitacora, (
+                Bitacora(
+                    usuario=rnd.choice(usuarios), accion='Consultar', modulo='Benchmark',
+                    created_at=self.fecha_hora_aleatoria(365),
+                )
+                for _ in range(n_unidades * 100)
+            ))
+
+        self.insertar(Reserva, (
+            Reserva(
+                area_comun=rnd.choice(areas), usuario=rnd.choice(usuarios),
+                fecha_reserva=hoy + timedelta(days=rnd.randint(-365, 60)),
+                hora_inicio=dtime(10), hora_fin=dtime(12),
+                estado=rnd.choice(['pendiente', 'confirmada', 'cancelada', 'completada']),
+            )
+            for _ in range(n_unidades * 25)
+        ))
+
+    def actualizar_estadisticas(self):
+        """El planificador necesita estadísticas actualizadas tras la siembra"""
+        with connection.cursor() as cursor:
+            for modelo in MODELOS_VIGILADOS:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(modelo._meta.db_table)}")
+
+    # ===================================
+    # CONSULTAS CRÍTICAS
+    # ===================================
+
+    def consultas(self):
+        """Las mismas consultas que ejecutan los endpoints (nombre, queryset)"""
+        relacion = UsuarioUnidad.objects.filter(fecha_fin__isnull=True).order_by('-id').first()
+        if relacion is None:
+            raise CommandError("No hay datos: ejecute sin --sin-sembrar")
+        usuario = relacion.usuario
+        area = Reserva.objects.order_by('-id').values_list('area_comun_id', flat=True).first()
+        ahora = timezone.now()
+        hoy = date.today()
+
+        unidades_activas = UnidadHabitacional.objects.filter(
+            usuariounidad__usuario=usuario,
+            usuariounidad__fecha_fin__isnull=True
+        ).distinct()
+
+        return [
+            ('dashboard_movil: unidades activas', unidades_activas),
+            ('dashboard_movil: notificaciones no leídas',
+             Notificacion.objects.filter(usuario=usuario, leida=False).order_by('-fecha_envio')[:10]),
+            ('dashboard_movil: facturas pendientes',
+             Factura.objects.filter(
+                 unidad_habitacional__in=unidades_activas,
+                 estado__in=['pendiente', 'vencida'],
+                 fecha_emision__gte=hoy - timedelta(days=90)
+             )[:10]),
+            ('consultar_cuotas_servicios: facturas 6 meses',
+             Factura.objects.filter(
+                 unidad_habitacional__in=unidades_activas,
+                 fecha_emision__gte=hoy - timedelta(days=180)
+             ).order_by('-fecha_emision', '-estado')),
+            ('listar_notificaciones_movil: últimos 30 días',
+             Notificacion.objects.filter(
+                 usuario=usuario, fecha_envio__gte=ahora - timedelta(days=30)
+             ).order_by('-fecha_envio', '-prioridad')),
+            ('contadores: usuarios activos de una unidad',
+             UsuarioUnidad.objects.filter(unidad_id=relacion.unidad_id, fecha_fin__isnull=True).values('usuario_id')),
+            ('reservas: disponibilidad de un área',
+             Reserva.objects.filter(area_comun_id=area, fecha_reserva=hoy, estado__in=['pendiente', 'confirmada'])),
+            ('obtener_estadisticas_acceso: accesos faciales 24h',
+             RegistroAcceso.objects.filter(fecha_hora__gte=ahora - timedelta(hours=24), metodo='facial')),
+            ('obtener_estadisticas_acceso: últimos accesos faciales',
+             RegistroAcceso.objects.filter(metodo='facial').order_by('-fecha_hora')[:10]),
+            ('registros-acceso: listado',
+             RegistroAcceso.objects.order_by('-fecha_hora')[:10]),
+            ('dashboard_movil: alertas de seguridad',
+             IncidenteSeguridad.objects.filter(
+                 fecha_hora__gte=ahora - timedelta(hours=24), gravedad__in=['alta', 'media']
+             ).order_by('-fecha_hora')[:3]),
+            ('incidentes-seguridad: listado',
+             IncidenteSeguridad.objects.order_by('-fecha_hora')[:10]),
+            ('bitacora: listado',
+             Bitacora.objects.order_by('-created_at')[:10]),
+        ]
+
+    def medir_consultas(self):
+        vigiladas = {modelo._meta.db_table for modelo in MODELOS_VIGILADOS}
+        fallos = []
+        self.stdout.write("\nPlanes de ejecución:")
+        for nombre, queryset in self.consultas():
+            if connection.vendor == 'postgresql':
+                plan = queryset.explain(analyze=True)
+                tiempo = TIEMPO_POSTGRES.search(plan)
+                milisegundos = float(tiempo.group(1)) if tiempo else 0.0
+                secuenciales = set(SEQ_SCAN_POSTGRES.findall(plan))
+            else:
+                plan = queryset.explain()
+                inicio = time.perf_counter()
+                list(queryset)
+                milisegundos = (time.perf_counter() - inicio) * 1000
+                secuenciales = {tabla for tabla, indice in SCAN_SQLITE.findall(plan) if not indice}
+
+            secuenciales &= vigiladas
+            if secuenciales:
+                fallos.append((nombre, sorted(secuenciales)))
+                self.stdout.write(self.style.ERROR(f"  SEQ {milisegundos:9.2f} ms  {nombre}"))
+            else:
+                self.stdout.write(f"  OK  {milisegundos:9.2f} ms  {nombre}")
+            if self.verbosity > 1 or secuenciales:
+                self.stdout.write("      " + plan.replace("\n", "\n      "))
+        return fallos
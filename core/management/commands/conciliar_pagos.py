@@ -0,0 +1,78 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core import conciliacion
+from core.models import Bitacora, Condominio, Pago
+
+
+class Command(BaseCommand):
+    help = (
+        'Concilia los pagos de un extracto bancario CSV o JSONL (columnas factura, unidad, monto, '
+        'referencia) contra las facturas abiertas de un condominio. Reimportar el mismo extracto '
+        'no duplica pagos: las referencias ya registradas se informan como duplicadas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del extracto')
+        parser.add_argument('--condominio', type=int, required=True, help='ID del condominio')
+        parser.add_argument('--formato', choices=conciliacion.FORMATOS,
+                            help='Por defecto según la extensión (.jsonl/.ndjson o csv)')
+        parser.add_argument('--metodo-pago', default='transferencia',
+                            choices=[m for m, _ in Pago.METODO_PAGO_CHOICES])
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Líneas por transacción (defecto: 1000)')
+        parser.add_argument('--reporte', help='Guarda el resultado de cada línea en este CSV')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.is_file():
+            raise CommandError(f"No existe el archivo {ruta}")
+        condominio = Condominio.objects.filter(pk=options['condominio']).first()
+        if condominio is None:
+            raise CommandError(f"Condominio {options['condominio']} no encontrado")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size debe ser mayor que 0")
+
+        proceso = conciliacion.Conciliacion(
+            condominio.id, chunk_size=options['chunk_size'],
+            metodo_pago=options['metodo_pago'], origen=ruta.name,
+        )
+        inicio = time.perf_counter()
+        with ruta.open('rb') as archivo:
+            try:
+                lineas = conciliacion.leer_lineas(archivo, options['formato'] or conciliacion.detectar_formato(ruta.name))
+            except (conciliacion.ArchivoInvalido, UnicodeDecodeError) as e:
+                raise CommandError(f"Archivo inválido: {e}")
+
+            reporte = open(options['reporte'], 'w', newline='', encoding='utf-8') if options['reporte'] else None
+            try:
+                escritor = csv.DictWriter(reporte, fieldnames=['linea', 'estado', 'factura', 'pago', 'detalle']) if reporte else None
+                if escritor:
+                    escritor.writeheader()
+                for resultado in proceso.procesar(lineas):
+                    if escritor:
+                        escritor.writerow(resultado)
+                    elif resultado['estado'] != 'conciliado':
+                        self.stdout.write(
+                            f"Línea {resultado['linea']}: {resultado['estado']} {resultado['detalle']}".rstrip()
+                        )
+            finally:
+                if reporte:
+                    reporte.close()
+
+        resumen = {**proceso.resumen, 'archivo': ruta.name, 'duracion_ms': round((time.perf_counter() - inicio) * 1000)}
+        Bitacora.objects.create(
+            accion='conciliar_pagos',
+            modulo='Finanzas',
+            detalles=json.dumps(resumen, cls=DjangoJSONEncoder, ensure_ascii=False),
+        )
+        estados = ', '.join(f"{estado}: {n}" for estado, n in sorted(resumen['estados'].items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"{condominio.nombre}: {resumen['conciliadas']} de {resumen['lineas']} líneas conciliadas "
+            f"(total {resumen['monto_conciliado']}) en {resumen['duracion_ms']} ms [{estados}]"
+        ))
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import NoReverseMatch, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.consultas_repetidas import describir, detectar_consultas_repetidas
+from core.models import Usuario
+from core.urls import router
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta una vez cada endpoint del router (listado y detalle) sobre los datos existentes '
+        'y falla si alguno repite la misma consulta SQL N_MAS_UNO_UMBRAL veces o más'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--umbral', type=int, default=None,
+                            help='Repeticiones a partir de las cuales se marca (defecto: N_MAS_UNO_UMBRAL)')
+        parser.add_argument('--usuario', help='Email del usuario con el que se consulta (defecto: primer staff activo)')
+
+    def handle(self, *args, **options):
+        umbral = options['umbral'] or getattr(settings, 'N_MAS_UNO_UMBRAL', 10)
+        usuario = self.obtener_usuario(options['usuario'])
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and ':' not in h), 'localhost')
+        client = Client(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(usuario).access_token}",
+            HTTP_HOST=host,
+        )
+        self.stdout.write(f"Recorriendo {len(router.registry)} endpoints como {usuario.email} (umbral {umbral})...")
+
+        infractores = []
+        # El middleware no debe interferir: aquí el detector se aplica a mano
+        with override_settings(N_MAS_UNO_MODO='off'):
+            for prefijo, viewset, basename in router.registry:
+                for url in self.urls(viewset, basename):
+                    with detectar_consultas_repetidas(umbral, estricto=False) as detector:
+                        respuesta = client.get(url)
+                    total = sum(detector.plantillas.values())
+                    repetidas = detector.repetidas()
+                    linea = f"  {url:60} {respuesta.status_code}  {total:4} consultas"
+                    if repetidas:
+                        infractores.append((url, repetidas))
+                        self.stdout.write(self.style.ERROR(f"{linea}  N+1: {repetidas[0][1]}x"))
+                    else:
+                        self.stdout.write(linea)
+
+        if infractores:
+            for url, repetidas in infractores:
+                self.stdout.write(describir(repetidas, url))
+            raise CommandError(f"{len(infractores)} endpoint(s) con consultas N+1")
+        self.stdout.write(self.style.SUCCESS("Ningún endpoint repite consultas por encima del umbral"))
+
+    def obtener_usuario(self, email):
+        usuarios = Usuario.objects.filter(is_active=True)
+        usuario = (
+            usuarios.filter(email=email).first() if email
+            else usuarios.filter(is_staff=True).order_by('id').first()
+            or usuarios.filter(tipo='administrador').order_by('id').first()
+        )
+        if usuario is None:
+            raise CommandError("No se encontró un usuario con el que consultar: siembre datos o use --usuario")
+        return usuario
+
+    def urls(self, viewset, basename):
+        """Listado y, si hay datos, el detalle del primer objeto"""
+        urls = []
+        try:
+            urls.append(reverse(f'{basename}-list'))
+        except NoReverseMatch:
+            pass
+        queryset = getattr(viewset, 'queryset', None)
+        if queryset is not None:
+            pk = queryset.model.objects.order_by('pk').values_list('pk', flat=True).first()
+            if pk is not None:
+                try:
+                    urls.append(reverse(f'{basename}-detail', args=[pk]))
+                except NoReverseMatch:
+                    pass
+        return urls
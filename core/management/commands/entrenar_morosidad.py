@@ -0,0 +1,56 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import morosidad
+from core.facturacion import leer_periodo
+from core.models import Bitacora
+
+
+class Command(BaseCommand):
+    help = (
+        'Entrena el modelo de riesgo de morosidad con el historial de pagos de los últimos meses '
+        '(el último se usa para validar) y lo deja activo para puntuar_morosidad'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', help='Último mes de entrenamiento, AAAA-MM (defecto: hace 3 meses)')
+        parser.add_argument('--meses', type=int, default=6, help='Meses de entrenamiento (defecto: 6)')
+        parser.add_argument('--l2', type=float, default=1.0, help='Regularización L2 (defecto: 1.0)')
+        parser.add_argument('--no-activar', action='store_true', help='Guarda el modelo sin activarlo')
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        try:
+            hasta = leer_periodo(options['hasta']) if options['hasta'] else morosidad.sumar_meses(hoy.replace(day=1), -3)
+        except ValueError:
+            raise CommandError(f"Periodo inválido: {options['hasta']} (formato AAAA-MM)")
+        if options['meses'] < 2:
+            raise CommandError("--meses debe ser al menos 2 (uno se usa para validar)")
+
+        periodos = [morosidad.sumar_meses(hasta, -i) for i in range(options['meses'])]
+        inicio = time.perf_counter()
+        try:
+            modelo = morosidad.entrenar(periodos, hoy=hoy, l2=options['l2'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not options['no_activar']:
+            morosidad.activar(modelo)
+
+        validacion = json.loads(modelo.parametros)['validacion']
+        Bitacora.objects.create(
+            accion='entrenar_morosidad',
+            modulo='Finanzas',
+            detalles=json.dumps({
+                'modelo': modelo.id, 'version': modelo.version, 'activo': not options['no_activar'],
+                'validacion': validacion, 'duracion_ms': round((time.perf_counter() - inicio) * 1000),
+            }),
+        )
+        auc = f"{validacion['auc']:.4f}" if validacion['auc'] is not None else "-"
+        self.stdout.write(self.style.SUCCESS(
+            f"{modelo} ({modelo.descripcion}): AUC {auc} en {validacion['periodo']} "
+            f"({validacion['unidades']} unidades, morosidad {validacion['tasa_morosidad']:.1%}) "
+            f"en {time.perf_counter() - inicio:.2f} s" + ("" if not options['no_activar'] else " [inactivo]")
+        ))
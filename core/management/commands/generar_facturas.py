@@ -0,0 +1,52 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.facturacion import generar_facturas, leer_periodo
+from core.models import Condominio
+
+
+class Command(BaseCommand):
+    help = (
+        'Emite las facturas de un periodo para las unidades ocupadas según la periodicidad de cada '
+        'ConceptoCobro. Idempotente: lo ya facturado (unidad, concepto, periodo) se omite'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--condominio', type=int, action='append', dest='condominios',
+                            help='ID del condominio (se puede repetir). Por defecto, todos.')
+        parser.add_argument('--periodo', help='Mes a facturar, AAAA-MM (defecto: el mes en curso)')
+        parser.add_argument('--simular', action='store_true', help='Calcula sin insertar')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Filas por INSERT de bulk_create (defecto: 2000)')
+
+    def handle(self, *args, **options):
+        try:
+            periodo = leer_periodo(options['periodo']) if options['periodo'] else date.today().replace(day=1)
+        except ValueError:
+            raise CommandError(f"Periodo inválido: {options['periodo']} (formato AAAA-MM)")
+
+        condominios = Condominio.objects.order_by('id')
+        if options['condominios']:
+            condominios = condominios.filter(id__in=options['condominios'])
+        ids = list(condominios.values_list('id', flat=True))
+        if not ids:
+            raise CommandError("No hay condominios que facturar")
+
+        total = 0
+        for condominio_id in ids:
+            inicio = time.perf_counter()
+            resultado = generar_facturas(
+                condominio_id, periodo, simular=options['simular'], batch_size=options['batch_size']
+            )
+            total += resultado['creadas']
+            self.stdout.write(
+                f"{resultado['condominio']}: {resultado['creadas']} facturas "
+                f"({resultado['existentes']} ya emitidas, {resultado['unidades']} unidades, "
+                f"{len(resultado['conceptos'])} conceptos, total {resultado['monto_total']}) "
+                f"en {time.perf_counter() - inicio:.2f} s"
+            )
+
+        accion = "se emitirían" if options['simular'] else "emitidas"
+        self.stdout.write(self.style.SUCCESS(f"Periodo {periodo:%Y-%m}: {total} facturas {accion}"))
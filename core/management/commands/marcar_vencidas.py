@@ -0,0 +1,80 @@
+import json
+import logging
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.facturacion import marcar_vencidas
+from core.models import Bitacora, Condominio
+
+logger = logging.getLogger('core.facturacion')
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa a 'vencida' las facturas pendientes con fecha de vencimiento anterior a hoy y "
+        "notifica una vez a cada usuario afectado. Pensado para cron diario, p. ej. "
+        "'15 0 * * * python manage.py marcar_vencidas'. Cada corrida queda en la bitácora"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--condominio', type=int, action='append', dest='condominios',
+                            help='ID del condominio (se puede repetir). Por defecto, todos.')
+        parser.add_argument('--fecha', help='Fecha de referencia, AAAA-MM-DD (defecto: hoy)')
+        parser.add_argument('--simular', action='store_true', help='Cuenta sin modificar ni notificar')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Facturas por transacción; 0 = un solo UPDATE por condominio (defecto: 5000)')
+
+    def handle(self, *args, **options):
+        try:
+            hoy = date.fromisoformat(options['fecha']) if options['fecha'] else None
+        except ValueError:
+            raise CommandError(f"Fecha inválida: {options['fecha']} (formato AAAA-MM-DD)")
+        if options['chunk_size'] < 0:
+            raise CommandError("--chunk-size no puede ser negativo")
+
+        condominios = Condominio.objects.order_by('id')
+        if options['condominios']:
+            condominios = condominios.filter(id__in=options['condominios'])
+        ids = list(condominios.values_list('id', flat=True))
+        if not ids:
+            raise CommandError("No hay condominios que revisar")
+
+        inicio_total = time.perf_counter()
+        resultados = []
+        for condominio_id in ids:
+            inicio = time.perf_counter()
+            resultado = marcar_vencidas(
+                condominio_id, hoy=hoy, simular=options['simular'], chunk_size=options['chunk_size']
+            )
+            resultado['duracion_ms'] = round((time.perf_counter() - inicio) * 1000)
+            resultados.append(resultado)
+            self.stdout.write(
+                f"{resultado['condominio']}: {resultado['facturas']} facturas vencidas "
+                f"({resultado['unidades']} unidades, {resultado['usuarios_notificados']} usuarios, "
+                f"total {resultado['monto_total']}, {resultado['lotes']} lotes) en {resultado['duracion_ms']} ms"
+            )
+
+        resumen = {
+            'fecha': resultados[0]['fecha'],
+            'simulacion': options['simular'],
+            'chunk_size': options['chunk_size'],
+            'facturas': sum(r['facturas'] for r in resultados),
+            'usuarios_notificados': sum(r['usuarios_notificados'] for r in resultados),
+            'duracion_ms': round((time.perf_counter() - inicio_total) * 1000),
+            'condominios': resultados,
+        }
+        Bitacora.objects.create(
+            accion='marcar_vencidas_simulacion' if options['simular'] else 'marcar_vencidas',
+            modulo='Facturación',
+            detalles=json.dumps(resumen, cls=DjangoJSONEncoder, ensure_ascii=False),
+        )
+        logger.info("marcar_vencidas: %s facturas, %s usuarios notificados en %s ms",
+                    resumen['facturas'], resumen['usuarios_notificados'], resumen['duracion_ms'])
+
+        accion = "pasarían" if options['simular'] else "pasaron"
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['facturas']} facturas {accion} a vencida en {resumen['duracion_ms']} ms"
+        ))
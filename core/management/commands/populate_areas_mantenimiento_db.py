@@ -1,5 +1,5 @@
 import random
-from django.core.management.base import BaseCommand
+from core.management.siembra import SiembraCommand
 from faker import Faker
 from core.models import *
 from django.utils import timezone
@@ -7,8 +7,8 @@ from datetime import timedelta, datetime
 
 fake = Faker('es_ES')
 
-class Command(BaseCommand):
-    help = 'Pobla la base de datos con áreas comunes, reservas, categorías de mantenimiento, solicitudes y tareas'
+class Command(SiembraCommand):
+    help = 'Pobla la base de datos con áreas comunes, reservas, categorías de mantenimiento, solicitudes y tareas (--scale multiplica reservas y solicitudes)'
 
     def handle(self, *args, **kwargs):
         self.stdout.write("Iniciando población de áreas comunes y mantenimiento...")
@@ -25,7 +25,6 @@ class Command(BaseCommand):
     def crear_areas_comunes(self):
         self.stdout.write("Creando áreas comunes...")
         
-        self.areas_comunes = []
         tipos_areas = [
             {'nombre': 'Piscina', 'capacidad': (20, 50), 'precio': (30, 80)},
             {'nombre': 'Salón de Eventos', 'capacidad': (30, 100), 'precio': (50, 150)},
@@ -43,30 +42,31 @@ class Command(BaseCommand):
         
         condominios = Condominio.objects.all()
         
-        for condominio in condominios:
-            for tipo_area in tipos_areas:
-                capacidad_min, capacidad_max = tipo_area['capacidad']
-                precio_min, precio_max = tipo_area['precio']
-                
-                area = AreaComun.objects.create(
-                    nombre=f"{tipo_area['nombre']} - {condominio.nombre.split()[-1]}",  # Usar última palabra del nombre
-                    descripcion=fake.paragraph(nb_sentences=2),
-                    capacidad=random.randint(capacidad_min, capacidad_max),
-                    horario_apertura=timezone.datetime.strptime('07:00', '%H:%M').time(),
-                    horario_cierre=timezone.datetime.strptime('22:00', '%H:%M').time(),
-                    precio_por_hora=round(random.uniform(precio_min, precio_max), 2),
-                    reglas_uso=fake.paragraph(nb_sentences=3),
-                    requiere_aprobacion=random.choice([True, False]),
-                    condominio=condominio
-                )
-                self.areas_comunes.append(area)
+        def generar_areas():
+            for condominio in condominios:
+                for tipo_area in tipos_areas:
+                    capacidad_min, capacidad_max = tipo_area['capacidad']
+                    precio_min, precio_max = tipo_area['precio']
+
+                    yield AreaComun(
+                        nombre=f"{tipo_area['nombre']} - {condominio.nombre.split()[-1]}",  # Usar última palabra del nombre
+                        descripcion=fake.paragraph(nb_sentences=2),
+                        capacidad=random.randint(capacidad_min, capacidad_max),
+                        horario_apertura=timezone.datetime.strptime('07:00', '%H:%M').time(),
+                        horario_cierre=timezone.datetime.strptime('22:00', '%H:%M').time(),
+                        precio_por_hora=round(random.uniform(precio_min, precio_max), 2),
+                        reglas_uso=fake.paragraph(nb_sentences=3),
+                        requiere_aprobacion=random.choice([True, False]),
+                        condominio=condominio
+                    )
+
+        self.areas_comunes = self.crear(AreaComun, generar_areas())
         
         self.stdout.write(f"Áreas comunes creadas: {len(self.areas_comunes)}")
 
     def crear_categorias_mantenimiento(self):
         self.stdout.write("Creando categorías de mantenimiento...")
         
-        self.categorias_mantenimiento = []
         categorias = [
             'Plomería y Tuberías',
             'Sistema Eléctrico',
@@ -84,14 +84,14 @@ class Command(BaseCommand):
         
         condominios = Condominio.objects.all()
         
-        for condominio in condominios:
-            for nombre in categorias:
-                categoria = CategoriaMantenimiento.objects.create(
-                    nombre=nombre,
-                    descripcion=fake.sentence(),
-                    condominio=condominio
-                )
-                self.categorias_mantenimiento.append(categoria)
+        self.categorias_mantenimiento = self.crear(CategoriaMantenimiento, (
+            CategoriaMantenimiento(
+                nombre=nombre,
+                descripcion=fake.sentence(),
+                condominio=condominio
+            )
+            for condominio in condominios for nombre in categorias
+        ))
         
         self.stdout.write(f"Categorías de mantenimiento creadas: {len(self.categorias_mantenimiento)}")
 
@@ -100,63 +100,64 @@ class Command(BaseCommand):
         
         estados = ['pendiente', 'confirmada', 'cancelada', 'completada']
         # Obtener residentes activos (con relación activa a unidades)
-        residentes_activos = Usuario.objects.filter(
+        residentes_activos = list(Usuario.objects.filter(
             usuariounidad__tipo_relacion='residente',
             usuariounidad__fecha_fin__isnull=True
-        ).distinct()
+        ).distinct().values_list('id', flat=True))
+        if not residentes_activos:
+            self.stdout.write("Reservas creadas: 0")
+            return
         
-        reservas_creadas = 0
         hoy = datetime.now().date()
-        
-        for area in self.areas_comunes:
-            # Crear 5-8 reservas por área (pasadas y futuras)
-            for _ in range(random.randint(5, 8)):
-                if not residentes_activos.exists():
-                    continue
-                    
-                usuario = random.choice(residentes_activos)
-                
-                # 60% reservas futuras, 40% pasadas
-                if random.random() < 0.6:
-                    fecha_reserva = fake.date_between(start_date='+1d', end_date='+60d')
-                else:
-                    fecha_reserva = fake.date_between(start_date='-60d', end_date='-1d')
-                
-                # Generar horas dentro del horario del área (8 AM - 10 PM)
-                hora_inicio_hour = random.randint(8, 21)
-                hora_inicio = timezone.datetime.strptime(f'{hora_inicio_hour:02d}:00', '%H:%M').time()
-                
-                duracion = random.randint(1, 4)  # 1-4 horas de duración
-                hora_fin_hour = (hora_inicio_hour + duracion) % 24
-                hora_fin = timezone.datetime.strptime(f'{hora_fin_hour:02d}:00', '%H:%M').time()
-                
-                # Determinar estado basado en fecha
-                if fecha_reserva < hoy:
-                    estado = random.choices(
-                        ['completada', 'cancelada'], 
-                        weights=[0.8, 0.2]
-                    )[0]
-                else:
-                    estado = random.choices(
-                        ['confirmada', 'pendiente', 'cancelada'], 
-                        weights=[0.6, 0.3, 0.1]
-                    )[0]
-                
-                # Calcular monto total (áreas gratuitas tienen precio 0)
-                monto_total = area.precio_por_hora * duracion
-                
-                reserva = Reserva.objects.create(
-                    area_comun=area,
-                    usuario=usuario,
-                    fecha_reserva=fecha_reserva,
-                    hora_inicio=hora_inicio,
-                    hora_fin=hora_fin,
-                    estado=estado,
-                    monto_total=round(monto_total, 2),
-                    motivo=fake.sentence(),
-                    numero_invitados=random.randint(1, min(area.capacidad, 20))
-                )
-                reservas_creadas += 1
+
+        def generar_reservas():
+            for area in self.areas_comunes:
+                # Crear 5-8 reservas por área (pasadas y futuras), por --scale
+                for _ in range(self.cantidad(random.randint(5, 8))):
+                    usuario_id = random.choice(residentes_activos)
+
+                    # 60% reservas futuras, 40% pasadas
+                    if random.random() < 0.6:
+                        fecha_reserva = fake.date_between(start_date='+1d', end_date='+60d')
+                    else:
+                        fecha_reserva = fake.date_between(start_date='-60d', end_date='-1d')
+
+                    # Generar horas dentro del horario del área (8 AM - 10 PM)
+                    hora_inicio_hour = random.randint(8, 21)
+                    hora_inicio = timezone.datetime.strptime(f'{hora_inicio_hour:02d}:00', '%H:%M').time()
+
+                    duracion = random.randint(1, 4)  # 1-4 horas de duración
+                    hora_fin_hour = (hora_inicio_hour + duracion) % 24
+                    hora_fin = timezone.datetime.strptime(f'{hora_fin_hour:02d}:00', '%H:%M').time()
+
+                    # Determinar estado basado en fecha
+                    if fecha_reserva < hoy:
+                        estado = random.choices(
+                            ['completada', 'cancelada'], 
+                            weights=[0.8, 0.2]
+                        )[0]
+                    else:
+                        estado = random.choices(
+                            ['confirmada', 'pendiente', 'cancelada'], 
+                            weights=[0.6, 0.3, 0.1]
+                        )[0]
+
+                    # Calcular monto total (áreas gratuitas tienen precio 0)
+                    monto_total = area.precio_por_hora * duracion
+
+                    yield Reserva(
+                        area_comun=area,
+                        usuario_id=usuario_id,
+                        fecha_reserva=fecha_reserva,
+                        hora_inicio=hora_inicio,
+                        hora_fin=hora_fin,
+                        estado=estado,
+                        monto_total=round(monto_total, 2),
+                        motivo=fake.sentence(),
+                        numero_invitados=random.randint(1, min(area.capacidad, 20))
+                    )
+
+        reservas_creadas = self.insertar(Reserva, generar_reservas())
         
         self.stdout.write(f"Reservas creadas: {reservas_creadas}")
 
@@ -168,65 +169,61 @@ class Command(BaseCommand):
         creador_tipos = ['residente', 'administracion', 'sistema']
         
         # Obtener usuarios que pueden reportar (residentes, propietarios, administradores)
-        usuarios_reporta = Usuario.objects.filter(
+        usuarios_reporta = list(Usuario.objects.filter(
             tipo__in=['residente', 'propietario', 'administrador']
-        )
+        ).values_list('id', flat=True))
         
         # Obtener unidades ocupadas
-        unidades_ocupadas = UnidadHabitacional.objects.filter(estado='ocupada')
-        
-        solicitudes_creadas = 0
-        
-        # Crear 30 solicitudes variadas
-        for _ in range(30):
-            categoria = random.choice(self.categorias_mantenimiento)
-            usuario = random.choice(usuarios_reporta)
-            
-            # 60% para unidades, 30% para áreas comunes, 10% sin ubicación específica
-            rand_val = random.random()
-            if rand_val < 0.6 and unidades_ocupadas.exists():
-                unidad_habitacional = random.choice(unidades_ocupadas)
-                area_comun = None
-            elif rand_val < 0.9 and self.areas_comunes:
-                unidad_habitacional = None
-                area_comun = random.choice(self.areas_comunes)
-            else:
-                unidad_habitacional = None
-                area_comun = None
-            
-            # Determinar prioridad realista basada en el tipo de problema
-            if categoria.nombre in ['Plomería', 'Sistema Eléctrico', 'Ascensores']:
-                prioridad = random.choices(['alta', 'urgente', 'media'], weights=[0.4, 0.4, 0.2])[0]
-            elif categoria.nombre in ['Seguridad', 'Aire Acondicionado']:
-                prioridad = random.choices(['alta', 'media', 'baja'], weights=[0.3, 0.5, 0.2])[0]
-            else:
-                prioridad = random.choices(['media', 'baja', 'alta'], weights=[0.5, 0.3, 0.2])[0]
-            
-            solicitud = SolicitudMantenimiento.objects.create(
-                unidad_habitacional=unidad_habitacional,
-                area_comun=area_comun,
-                categoria_mantenimiento=categoria,
-                usuario_reporta=usuario,
-                titulo=fake.sentence(nb_words=4),
-                descripcion=fake.paragraph(nb_sentences=3),
-                prioridad=prioridad,
-                estado=random.choice(estados),
-                fecha_limite=fake.date_between(start_date='+1d', end_date='+30d'),
-                creador_tipo=random.choice(creador_tipos)
-            )
-            
-            # Si está completada, asignar fecha de completado realista
-            if solicitud.estado == 'completado':
-                fecha_completado = fake.date_between(
-                    start_date=solicitud.fecha_reporte.date(), 
-                    end_date=min(solicitud.fecha_limite, datetime.now().date())
-                )
-                solicitud.fecha_completado = timezone.make_aware(
-                    datetime.combine(fecha_completado, datetime.now().time())
+        unidades_ocupadas = list(UnidadHabitacional.objects.filter(estado='ocupada').values_list('id', flat=True))
+
+        if not usuarios_reporta or not self.categorias_mantenimiento:
+            self.stdout.write("Solicitudes de mantenimiento creadas: 0")
+            return
+
+        def generar_solicitudes():
+            # Crear 30 solicitudes variadas (por --scale)
+            for _ in range(self.cantidad(30)):
+                categoria = random.choice(self.categorias_mantenimiento)
+
+                # 60% para unidades, 30% para áreas comunes, 10% sin ubicación específica
+                rand_val = random.random()
+                if rand_val < 0.6 and unidades_ocupadas:
+                    unidad_habitacional_id = random.choice(unidades_ocupadas)
+                    area_comun = None
+                elif rand_val < 0.9 and self.areas_comunes:
+                    unidad_habitacional_id = None
+                    area_comun = random.choice(self.areas_comunes)
+                else:
+                    unidad_habitacional_id = None
+                    area_comun = None
+
+                # Determinar prioridad realista basada en el tipo de problema
+                if categoria.nombre in ['Plomería', 'Sistema Eléctrico', 'Ascensores']:
+                    prioridad = random.choices(['alta', 'urgente', 'media'], weights=[0.4, 0.4, 0.2])[0]
+                elif categoria.nombre in ['Seguridad', 'Aire Acondicionado']:
+                    prioridad = random.choices(['alta', 'media', 'baja'], weights=[0.3, 0.5, 0.2])[0]
+                else:
+                    prioridad = random.choices(['media', 'baja', 'alta'], weights=[0.5, 0.3, 0.2])[0]
+
+                estado = random.choice(estados)
+                # Si está completada, la fecha de completado es la de hoy (la fecha de reporte es ahora)
+                fecha_completado = timezone.now() if estado == 'completado' else None
+
+                yield SolicitudMantenimiento(
+                    unidad_habitacional_id=unidad_habitacional_id,
+                    area_comun=area_comun,
+                    categoria_mantenimiento=categoria,
+                    usuario_reporta_id=random.choice(usuarios_reporta),
+                    titulo=fake.sentence(nb_words=4),
+                    descripcion=fake.paragraph(nb_sentences=3),
+                    prioridad=prioridad,
+                    estado=estado,
+                    fecha_limite=fake.date_between(start_date='+1d', end_date='+30d'),
+                    fecha_completado=fecha_completado,
+                    creador_tipo=random.choice(creador_tipos)
                 )
-                solicitud.save()
-            
-            solicitudes_creadas += 1
+
+        solicitudes_creadas = self.insertar(SolicitudMantenimiento, generar_solicitudes())
         
         self.stdout.write(f"Solicitudes de mantenimiento creadas: {solicitudes_creadas}")
 
@@ -234,78 +231,67 @@ class Command(BaseCommand):
         self.stdout.write("Creando tareas de mantenimiento...")
         
         estados = ['pendiente', 'en_proceso', 'completado', 'cancelado']
-        solicitudes = SolicitudMantenimiento.objects.all()
-        tecnicos = Usuario.objects.filter(tipo='mantenimiento')
-        
-        tareas_creadas = 0
-        
-        for solicitud in solicitudes:
+        solicitudes = list(SolicitudMantenimiento.objects.filter(
+            estado__in=['asignado', 'en_proceso', 'completado']
+        ).values_list('id', flat=True))
+        tecnicos = list(Usuario.objects.filter(tipo='mantenimiento').values_list('id', flat=True))
+
+        def generar_tareas():
             # Crear 1-3 tareas por solicitud (solo para asignadas, en proceso o completadas)
-            if solicitud.estado in ['asignado', 'en_proceso', 'completado']:
-                num_tareas = random.randint(1, 3)
-                
-                for i in range(num_tareas):
-                    tecnico = random.choice(tecnicos) if tecnicos.exists() else None
-                    
-                    tarea = TareaMantenimiento.objects.create(
-                        solicitud_mantenimiento=solicitud,
-                        usuario_asignado=tecnico,
+            for solicitud_id in solicitudes:
+                for i in range(random.randint(1, 3)):
+                    costo_estimado = round(random.uniform(50.0, 500.0), 2)
+                    tarea = TareaMantenimiento(
+                        solicitud_mantenimiento_id=solicitud_id,
+                        usuario_asignado_id=random.choice(tecnicos) if tecnicos else None,
                         descripcion=fake.paragraph(nb_sentences=2),
                         estado=random.choice(estados),
                         fecha_limite=fake.date_between(start_date='+1d', end_date='+15d'),
-                        costo_estimado=round(random.uniform(50.0, 500.0), 2)
+                        costo_estimado=costo_estimado
                     )
-                    
+
                     # Si la tarea está completada, asignar datos reales
                     if tarea.estado == 'completado':
-                        fecha_completado = fake.date_between(
-                            start_date=tarea.fecha_asignacion.date(), 
-                            end_date=min(tarea.fecha_limite, datetime.now().date())
-                        )
-                        tarea.fecha_completado = timezone.make_aware(
-                            datetime.combine(fecha_completado, datetime.now().time())
-                        )
+                        tarea.fecha_completado = timezone.now()
                         # Costo real puede variar ±25% del estimado
                         variacion = random.uniform(0.75, 1.25)
-                        tarea.costo_real = round(tarea.costo_estimado * variacion, 2)
-                        tarea.save()
-                    
-                    tareas_creadas += 1
+                        tarea.costo_real = round(costo_estimado * variacion, 2)
+                    yield tarea
+
+        tareas_creadas = self.insertar(TareaMantenimiento, generar_tareas())
         
         self.stdout.write(f"Tareas de mantenimiento creadas: {tareas_creadas}")
 
     def crear_mantenimiento_preventivo(self):
         self.stdout.write("Creando mantenimientos preventivos...")
         
-        tecnicos = Usuario.objects.filter(tipo='mantenimiento')
-        
-        mantenimientos_creados = 0
+        tecnicos = list(Usuario.objects.filter(tipo='mantenimiento').values_list('id', flat=True))
         periodicidades = [7, 15, 30, 90, 180, 365]  # días
-        
-        for categoria in self.categorias_mantenimiento:
-            # Crear mantenimiento preventivo para el 50% de las categorías
-            if random.choice([True, False]):
+
+        def generar_mantenimientos():
+            for categoria in self.categorias_mantenimiento:
+                # Crear mantenimiento preventivo para el 50% de las categorías
+                if not random.choice([True, False]):
+                    continue
                 # Decidir si es para área común o general
                 if random.choice([True, False]) and self.areas_comunes:
                     area_comun = random.choice(self.areas_comunes)
                 else:
                     area_comun = None
-                    
-                tecnico = random.choice(tecnicos) if tecnicos.exists() else None
-                
+
                 periodicidad = random.choice(periodicidades)
                 ultima_ejecucion = fake.date_between(start_date='-90d', end_date='-7d')
-                
-                mantenimiento = MantenimientoPreventivo.objects.create(
+
+                yield MantenimientoPreventivo(
                     categoria_mantenimiento=categoria,
                     area_comun=area_comun,
                     descripcion=f"Mantenimiento preventivo de {categoria.nombre.lower()}",
                     periodicidad_dias=periodicidad,
                     ultima_ejecucion=ultima_ejecucion,
                     proxima_ejecucion=ultima_ejecucion + timedelta(days=periodicidad),
-                    responsable=tecnico
+                    responsable_id=random.choice(tecnicos) if tecnicos else None
                 )
-                
-                mantenimientos_creados += 1
+
+        mantenimientos_creados = self.insertar(MantenimientoPreventivo, generar_mantenimientos())
         
-        self.stdout.write(f"Mantenimientos preventivos creados: {mantenimientos_creados}")
\ No newline at end of file
+        self.stdout.write(f"Mantenimientos preventivos creados: {mantenimientos_creados}")
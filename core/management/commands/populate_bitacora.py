@@ -1,5 +1,5 @@
 import random
-from django.core.management.base import BaseCommand
+from core.management.siembra import SiembraCommand, sin_auto_now_add
 from faker import Faker
 from core.models import *
 from django.utils import timezone
@@ -7,10 +7,11 @@ from datetime import datetime, timedelta
 
 fake = Faker('es_ES')
 
-class Command(BaseCommand):
-    help = 'Pobla la base de datos con 10 registros de bitácora del sistema'
+class Command(SiembraCommand):
+    help = 'Pobla la base de datos con 10 registros de bitácora del sistema (--scale multiplica la cantidad)'
 
     def handle(self, *args, **kwargs):
+        self.verbosity = kwargs['verbosity']
         self.stdout.write("Iniciando población de bitácora del sistema...")
 
         self.crear_registros_bitacora()
@@ -54,11 +55,22 @@ class Command(BaseCommand):
             {'accion': 'error_sistema', 'modulo': 'Sistema', 'descripcion': 'Error detectado en módulo'},
         ]
         
+        # Últimos registros y áreas: se consultan una sola vez, no por cada registro
+        self.nuevo_usuario = Usuario.objects.order_by('-id').first()
+        self.ultima_factura = Factura.objects.select_related('unidad_habitacional').order_by('-id').first()
+        self.ultimo_pago = Pago.objects.order_by('-id').first()
+        self.ultimo_comunicado = Comunicado.objects.select_related('autor').order_by('-id').first()
+        self.areas = list(AreaComun.objects.values_list('nombre', flat=True))
+        
         # Crear 10 registros de bitácora con fechas distribuidas en los últimos 7 días
-        registros_creados = 0
         hoy = timezone.now()
+        with sin_auto_now_add(Bitacora):
+            registros_creados = self.insertar(Bitacora, self.generar_registros(hoy, todos_usuarios, acciones_modulos))
         
-        for i in range(10):
+        self.stdout.write(f"Registros de bitácora creados: {registros_creados}")
+
+    def generar_registros(self, hoy, todos_usuarios, acciones_modulos):
+        for i in range(self.cantidad(10)):
             # Distribuir los registros en los últimos 7 días
             dias_atras = random.randint(0, 7)
             minutos_atras = random.randint(0, 1439)  # 0-1439 minutos en un día
@@ -76,7 +88,10 @@ class Command(BaseCommand):
             # Generar detalles específicos según la acción
             detalles = self.generar_detalles_bitacora(accion_modulo['accion'], usuario)
             
-            bitacora = Bitacora.objects.create(
+            if self.verbosity > 1:
+                self.stdout.write(f"  Registro {i+1}: {accion_modulo['accion']} - {accion_modulo['modulo']}")
+            
+            yield Bitacora(
                 usuario=usuario,
                 accion=accion_modulo['accion'],
                 modulo=accion_modulo['modulo'],
@@ -91,11 +106,6 @@ class Command(BaseCommand):
                 ]),
                 created_at=fecha_registro
             )
-            
-            registros_creados += 1
-            self.stdout.write(f"  Registro {i+1}: {accion_modulo['accion']} - {accion_modulo['modulo']}")
-        
-        self.stdout.write(f"Registros de bitácora creados: {registros_creados}")
 
     def generar_detalles_bitacora(self, accion, usuario):
         """Genera detalles específicos para cada tipo de acción"""
@@ -110,7 +120,7 @@ class Command(BaseCommand):
             return f"Usuario {usuario.email} actualizó su contraseña de forma segura"
         
         elif accion == 'crear_usuario':
-            nuevo_usuario = Usuario.objects.order_by('-id').first()
+            nuevo_usuario = self.nuevo_usuario
             if nuevo_usuario:
                 return f"Nuevo usuario creado: {nuevo_usuario.email} ({nuevo_usuario.get_tipo_display()})"
             return "Nuevo usuario registrado en el sistema"
@@ -120,27 +130,26 @@ class Command(BaseCommand):
             return f"Usuario {usuario.email} actualizó sus {campos}"
         
         elif accion == 'crear_factura':
-            factura = Factura.objects.order_by('-id').first()
+            factura = self.ultima_factura
             if factura:
                 return f"Factura #{factura.id} creada para {factura.unidad_habitacional.codigo} - ${factura.monto}"
             return "Nueva factura generada en el sistema"
         
         elif accion == 'pago_registrado':
-            pago = Pago.objects.order_by('-id').first()
+            pago = self.ultimo_pago
             if pago:
                 return f"Pago #{pago.id} registrado por ${pago.monto} via {pago.get_metodo_pago_display()}"
             return "Transacción de pago procesada exitosamente"
         
         elif accion == 'crear_comunicado':
-            comunicado = Comunicado.objects.order_by('-id').first()
+            comunicado = self.ultimo_comunicado
             if comunicado:
                 return f"Comunicado '{comunicado.titulo[:30]}...' publicado por {comunicado.autor.nombre}"
             return "Nuevo comunicado publicado en el sistema"
         
         elif accion == 'reserva_creada' and usuario:
-            area = AreaComun.objects.order_by('?').first()
-            if area:
-                return f"Reserva creada por {usuario.nombre} para {area.nombre}"
+            if self.areas:
+                return f"Reserva creada por {usuario.nombre} para {random.choice(self.areas)}"
             return f"Usuario {usuario.nombre} realizó una reserva de área común"
         
         elif accion == 'solicitud_mantenimiento' and usuario:
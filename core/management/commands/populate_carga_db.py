@@ -0,0 +1,304 @@
+import multiprocessing
+import random
+import time
+from collections import Counter
+from datetime import datetime, time as dtime, timedelta
+from decimal import Decimal
+
+import django
+from django.core.management.base import CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from faker import Faker
+
+from core.contadores import recalcular_contadores
+from core.management.siembra import SiembraCommand, TablaCruda, copiar_filas
+from core.morosidad import sumar_meses
+from core.models import *
+
+# Volumen de cada condominio (≈ 150.000 filas con --scale 1)
+UNIDADES_POR_CONDOMINIO = 500
+MESES_FACTURADOS = 24
+NOTIFICACIONES_POR_USUARIO = 100
+ACCESOS_POR_UNIDAD = 100
+BITACORA_POR_UNIDAD = 50
+
+# Tablas cuyos IDs reparte el proceso principal entre los fragmentos
+MODELOS_CON_RANGO = [UnidadHabitacional, Usuario, Factura]
+
+ACCIONES_BITACORA = [
+    ('login_exitoso', 'Autenticación'), ('logout', 'Autenticación'),
+    ('pago_registrado', 'Finanzas'), ('reserva_creada', 'Reservas'),
+    ('reconocimiento_facial', 'IA Seguridad'), ('registro_visitante', 'Seguridad'),
+]
+
+
+class Command(SiembraCommand):
+    help = (
+        'Genera un dataset de pruebas de carga (unidades, residentes, facturas, pagos, notificaciones, '
+        'accesos y bitácora) repartido por condominio entre --workers procesos; en PostgreSQL cada '
+        'proceso escribe con COPY FROM STDIN. --scale 1 son 20 condominios (~3M filas)'
+    )
+    batch_size_defecto = 5000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Procesos generadores; cada uno toma condominios completos (defecto: 1)')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError("--workers debe ser al menos 1")
+        if workers > 1 and connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f"{connection.vendor} no admite escrituras concurrentes: se usa un solo proceso"
+            ))
+            workers = 1
+
+        semilla = options['seed'] if options['seed'] is not None else random.randrange(2 ** 31)
+        ahora = timezone.now()
+        inicio = time.monotonic()
+
+        fragmentos = self.preparar_fragmentos(self.cantidad(20), semilla, ahora)
+        self.stdout.write(
+            f"Generando {len(fragmentos)} condominios con {workers} proceso(s) (semilla {semilla})..."
+        )
+
+        totales = Counter()
+        # Los procesos hijos abren sus propias conexiones: no deben heredar la del padre
+        # (ni un pool de conexiones, cuyos hilos no sobreviven al fork)
+        connections.close_all()
+        for alias in connections:
+            if getattr(connections[alias], 'pool', None) is not None:
+                connections[alias].close_pool()
+        if workers == 1:
+            resultados = map(generar_fragmento, fragmentos)
+            self.recorrer_resultados(resultados, totales, len(fragmentos))
+        else:
+            with multiprocessing.Pool(workers, initializer=inicializar_proceso) as pool:
+                resultados = pool.imap_unordered(generar_fragmento, fragmentos)
+                self.recorrer_resultados(resultados, totales, len(fragmentos))
+
+        self.finalizar(fragmentos)
+
+        segundos = time.monotonic() - inicio
+        total = sum(totales.values())
+        for tabla, cantidad in sorted(totales.items()):
+            self.stdout.write(f"  {tabla}: {cantidad}")
+        self.stdout.write(self.style.SUCCESS(
+            f"¡Dataset de carga generado! {total} filas en {segundos:.1f}s ({total / segundos:,.0f} filas/s)"
+        ))
+
+    def preparar_fragmentos(self, n_condominios, semilla, ahora):
+        """
+        Crea los condominios y sus conceptos de cobro, y reserva a cada fragmento
+        un rango contiguo de IDs de unidades, usuarios y facturas.
+        """
+        unidades = UNIDADES_POR_CONDOMINIO
+        tamanos = {
+            UnidadHabitacional: unidades,
+            Usuario: unidades,
+            Factura: unidades * MESES_FACTURADOS,
+        }
+        with transaction.atomic():
+            condominios = self.crear(Condominio, (
+                Condominio(nombre=f"Condominio Carga {semilla}-{i + 1}", direccion='Dataset de pruebas de carga')
+                for i in range(n_condominios)
+            ))
+            conceptos = self.crear(ConceptoCobro, (
+                ConceptoCobro(
+                    nombre='Cuota de mantenimiento mensual', tipo='cuota_mensual',
+                    monto=Decimal(random.Random(f"{semilla}-{i}").randint(50, 200)),
+                    periodicidad='mensual', condominio=c,
+                )
+                for i, c in enumerate(condominios)
+            ))
+            # El rango se reserva desde el máximo actual; las secuencias se ajustan al terminar
+            bases = {
+                modelo: (modelo.objects.order_by('-pk').values_list('pk', flat=True).first() or 0)
+                for modelo in MODELOS_CON_RANGO
+            }
+
+        password = self.password('12345678')
+        return [
+            {
+                'indice': i,
+                'semilla': semilla,
+                'ahora': ahora,
+                'password': password,
+                'batch_size': self.batch_size,
+                'condominio_id': condominio.pk,
+                'concepto_id': concepto.pk,
+                'monto': concepto.monto,
+                'bases': {
+                    modelo._meta.model_name: bases[modelo] + i * tamanos[modelo]
+                    for modelo in MODELOS_CON_RANGO
+                },
+            }
+            for i, (condominio, concepto) in enumerate(zip(condominios, conceptos))
+        ]
+
+    def recorrer_resultados(self, resultados, totales, n_fragmentos):
+        for hechos, (condominio_id, conteo) in enumerate(resultados, start=1):
+            totales.update(conteo)
+            self.stdout.write(f"  Condominio {condominio_id}: {sum(conteo.values())} filas ({hechos}/{n_fragmentos})")
+
+    def finalizar(self, fragmentos):
+        """Ajusta las secuencias tras insertar IDs explícitos y deja listas las estadísticas"""
+        modelos = MODELOS_CON_RANGO + [UsuarioUnidad, Pago, Notificacion, RegistroAcceso, Bitacora]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), modelos):
+                cursor.execute(sql)
+            if connection.vendor == 'postgresql':
+                for modelo in modelos:
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(modelo._meta.db_table)}")
+
+        self.reconstruir_cuentas([fragmento['condominio_id'] for fragmento in fragmentos])
+
+        self.stdout.write("Recalculando contadores de no leídos...")
+        recalcular_contadores([
+            fragmento['bases']['usuario'] + k + 1
+            for fragmento in fragmentos for k in range(UNIDADES_POR_CONDOMINIO)
+        ])
+
+
+# ===================================
+# GENERACIÓN DE UN FRAGMENTO (un condominio por proceso)
+# ===================================
+
+def inicializar_proceso():
+    # Con spawn (Windows/macOS) el proceso hijo arranca sin Django configurado
+    django.setup()
+    connections.close_all()
+
+
+def generar_fragmento(fragmento):
+    """
+    Genera y escribe todas las filas de un condominio en una transacción.
+    Solo depende de la semilla y del índice del fragmento, así que el resultado
+    es el mismo con cualquier número de procesos.
+    """
+    clave = f"{fragmento['semilla']}-{fragmento['indice']}"
+    rnd = random.Random(clave)
+    fake = Faker('es_ES')
+    fake.seed_instance(clave)
+
+    ahora = fragmento['ahora']
+    hoy = ahora.date()
+    condominio_id = fragmento['condominio_id']
+    batch_size = fragmento['batch_size']
+    base_unidad = fragmento['bases']['unidadhabitacional']
+    base_usuario = fragmento['bases']['usuario']
+    base_factura = fragmento['bases']['factura']
+    ids_unidades = range(base_unidad + 1, base_unidad + UNIDADES_POR_CONDOMINIO + 1)
+    ids_usuarios = range(base_usuario + 1, base_usuario + UNIDADES_POR_CONDOMINIO + 1)
+
+    def fecha_hora(dias):
+        return ahora - timedelta(seconds=rnd.randint(0, dias * 86400))
+
+    conteo = Counter()
+
+    def copiar(modelo, filas, con_id=False):
+        tabla = TablaCruda(modelo, ahora, con_id=con_id)
+        conteo[modelo._meta.db_table] += copiar_filas(tabla, filas(tabla), batch_size)
+
+    with transaction.atomic():
+        copiar(UnidadHabitacional, lambda t: (
+            t.fila(
+                id=unidad_id, condominio_id=condominio_id,
+                codigo=f"T{k // 100 + 1}-{k % 100 + 1:03d}",
+                tipo=rnd.choices(['departamento', 'casa', 'local'], weights=[80, 15, 5])[0],
+                metros_cuadrados=Decimal(rnd.randint(4000, 18000)) / 100, estado='ocupada',
+            )
+            for k, unidad_id in enumerate(ids_unidades)
+        ), con_id=True)
+
+        copiar(Usuario, lambda t: (
+            t.fila(
+                id=usuario_id, tipo='residente', nombre=fake.first_name(), apellidos=fake.last_name(),
+                ci=f"CARGA-{condominio_id}-{k}", email=f"residente{k}.c{condominio_id}@carga.local",
+                telefono=fake.numerify('7#######'), password=fragmento['password'],
+                genero=rnd.choice(['M', 'F']), estado='activo',
+            )
+            for k, usuario_id in enumerate(ids_usuarios)
+        ), con_id=True)
+
+        copiar(UsuarioUnidad, lambda t: (
+            t.fila(
+                usuario_id=usuario_id, unidad_id=unidad_id, tipo_relacion='residente',
+                fecha_inicio=hoy - timedelta(days=MESES_FACTURADOS * 31), es_principal=True,
+            )
+            for usuario_id, unidad_id in zip(ids_usuarios, ids_unidades)
+        ))
+
+        # Facturas mensuales: las antiguas casi siempre pagadas, las recientes pendientes
+        facturas_pagadas = []
+
+        def generar_facturas(t):
+            factura_id = base_factura
+            for unidad_id in ids_unidades:
+                for mes in range(MESES_FACTURADOS, 0, -1):
+                    factura_id += 1
+                    emision = sumar_meses(hoy.replace(day=1), -mes)
+                    if mes > 2:
+                        estado = rnd.choices(['pagada', 'vencida'], weights=[92, 8])[0]
+                    else:
+                        estado = rnd.choices(['pagada', 'pendiente'], weights=[40, 60])[0]
+                    if estado == 'pagada':
+                        facturas_pagadas.append((factura_id, emision))
+                    yield t.fila(
+                        id=factura_id, unidad_habitacional_id=unidad_id,
+                        concepto_cobro_id=fragmento['concepto_id'], monto=fragmento['monto'],
+                        fecha_emision=emision, fecha_vencimiento=emision + timedelta(days=15),
+                        periodo=emision, estado=estado,
+                        descripcion=f"Cuota de mantenimiento {emision:%m/%Y}",
+                    )
+
+        copiar(Factura, generar_facturas, con_id=True)
+
+        metodos = [metodo for metodo, _ in Pago.METODO_PAGO_CHOICES]
+        copiar(Pago, lambda t: (
+            t.fila(
+                factura_id=factura_id, monto=fragmento['monto'], metodo_pago=rnd.choice(metodos),
+                referencia_pago=f"PAG-{factura_id}", estado='completado',
+                fecha_pago=timezone.make_aware(datetime.combine(
+                    emision + timedelta(days=rnd.randint(0, 20)), dtime(rnd.randint(8, 20), rnd.randint(0, 59))
+                )),
+            )
+            for factura_id, emision in facturas_pagadas
+        ))
+
+        tipos = [tipo for tipo, _ in Notificacion.TIPO_CHOICES]
+        copiar(Notificacion, lambda t: (
+            t.fila(
+                usuario_id=usuario_id, titulo=fake.sentence(nb_words=4), mensaje=fake.sentence(nb_words=12),
+                tipo=rnd.choice(tipos), prioridad=rnd.choices(['baja', 'media', 'alta'], weights=[3, 5, 2])[0],
+                fecha_envio=fecha_hora(365), enviada=True, leida=rnd.random() < 0.8,
+            )
+            for usuario_id in ids_usuarios for _ in range(NOTIFICACIONES_POR_USUARIO)
+        ))
+
+        metodos_acceso = ['facial', 'tarjeta', 'manual']
+        copiar(RegistroAcceso, lambda t: (
+            t.fila(
+                usuario_id=rnd.choice(ids_usuarios), tipo='peatonal',
+                direccion=rnd.choice(['entrada', 'salida']),
+                metodo=rnd.choices(metodos_acceso, weights=[6, 3, 1])[0],
+                fecha_hora=fecha_hora(365), reconocimiento_exitoso=rnd.random() < 0.85,
+                confidence_score=Decimal(rnd.randint(8500, 9900)) / 10000,
+            )
+            for _ in range(UNIDADES_POR_CONDOMINIO * ACCESOS_POR_UNIDAD)
+        ))
+
+        copiar(Bitacora, lambda t: (
+            t.fila(
+                usuario_id=rnd.choice(ids_usuarios), accion=accion, modulo=modulo,
+                detalles=fake.sentence(nb_words=8), ip_address=fake.ipv4(),
+                user_agent='Dart/3.0 (dart:io)', created_at=fecha_hora(180),
+            )
+            for accion, modulo in (rnd.choice(ACCIONES_BITACORA) for _ in range(UNIDADES_POR_CONDOMINIO * BITACORA_POR_UNIDAD))
+        ))
+
+    return condominio_id, conteo
@@ -1,14 +1,15 @@
 import random
-from django.core.management.base import BaseCommand
+from core.management.siembra import SiembraCommand, sin_auto_now_add
 from faker import Faker
 from core.models import *
+from core.contadores import recalcular_contadores
 from django.utils import timezone
 from datetime import date, timedelta
 
 fake = Faker('es_ES')
 
-class Command(BaseCommand):
-    help = 'Pobla la base de datos con conceptos de cobro, facturas, pagos, comunicados y notificaciones'
+class Command(SiembraCommand):
+    help = 'Pobla la base de datos con conceptos de cobro, facturas, pagos, comunicados y notificaciones (--scale multiplica comunicados y notificaciones)'
 
     def handle(self, *args, **kwargs):
         self.stdout.write("Iniciando población de datos de cobros y comunicaciones...")
@@ -17,6 +18,8 @@ class Command(BaseCommand):
         self.crear_facturas_y_pagos()
         self.crear_comunicados()
         self.crear_notificaciones()
+        self.reconstruir_cuentas()
+        recalcular_contadores()
 
         self.stdout.write(self.style.SUCCESS("¡Datos de cobros y comunicaciones poblados exitosamente!"))
 
@@ -42,58 +45,55 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR("No hay condominios en la base de datos."))
             return
 
-        for condominio in condominios:
-            for concepto_data in conceptos_data:
-                monto_min, monto_max = concepto_data['monto_base']
-                # Variar el monto por condominio para hacerlo más realista
-                monto = round(random.uniform(monto_min, monto_max), 2)
-                
-                concepto = ConceptoCobro.objects.create(
-                    nombre=concepto_data['nombre'],
-                    descripcion=fake.sentence(),
-                    tipo=concepto_data['tipo'],
-                    monto=monto,
-                    periodicidad=concepto_data['periodicidad'],
-                    aplica_desde=timezone.now().date() - timedelta(days=30),
-                    aplica_hasta=timezone.now().date().replace(year=timezone.now().year + 1),
-                    condominio=condominio
-                )
-                self.conceptos.append(concepto)
+        def generar_conceptos():
+            for condominio in condominios:
+                for concepto_data in conceptos_data:
+                    monto_min, monto_max = concepto_data['monto_base']
+                    # Variar el monto por condominio para hacerlo más realista
+                    monto = round(random.uniform(monto_min, monto_max), 2)
+
+                    yield ConceptoCobro(
+                        nombre=concepto_data['nombre'],
+                        descripcion=fake.sentence(),
+                        tipo=concepto_data['tipo'],
+                        monto=monto,
+                        periodicidad=concepto_data['periodicidad'],
+                        aplica_desde=timezone.now().date() - timedelta(days=30),
+                        aplica_hasta=timezone.now().date().replace(year=timezone.now().year + 1),
+                        condominio=condominio
+                    )
+
+        self.conceptos = self.crear(ConceptoCobro, generar_conceptos())
 
         self.stdout.write(self.style.SUCCESS(f"Conceptos de cobro creados: {len(self.conceptos)}"))
 
     def crear_facturas_y_pagos(self):
         self.stdout.write("Creando facturas y pagos...")
         
-        unidades = UnidadHabitacional.objects.all()
-        estados_factura = ['pendiente', 'pagada', 'vencida', 'cancelada']
         metodos_pago = ['tarjeta', 'transferencia', 'efectivo', 'app']
-        estados_pago = ['completado', 'pendiente', 'fallido']
-
-        self.facturas = []
         hoy = date.today()
 
-        for unidad in unidades:
-            # Obtener conceptos que aplican a este condominio
-            conceptos_condominio = [c for c in self.conceptos if c.condominio_id == unidad.condominio_id]
-            
-            if not conceptos_condominio:
-                continue
-
-            # Crear facturas para los últimos 6 meses
-            for meses_atras in range(6, 0, -1):
-                fecha_base = hoy.replace(day=1) - timedelta(days=30 * meses_atras)
-                
-                for concepto in conceptos_condominio:
-                    # Solo crear facturas para conceptos mensuales o únicos
-                    if concepto.periodicidad not in ['mensual', 'unico']:
-                        continue
-                    
-                    # 80% de probabilidad de crear factura para este concepto
-                    if random.random() < 0.8:
+        conceptos_por_condominio = {}
+        for concepto in self.conceptos:
+            # Solo crear facturas para conceptos mensuales o únicos
+            if concepto.periodicidad in ['mensual', 'unico']:
+                conceptos_por_condominio.setdefault(concepto.condominio_id, []).append(concepto)
+
+        unidades = list(UnidadHabitacional.objects.order_by('id').values_list('id', 'condominio_id'))
+
+        def generar_facturas():
+            for unidad_id, condominio_id in unidades:
+                # Crear facturas para los últimos 6 meses
+                for meses_atras in range(6, 0, -1):
+                    fecha_base = hoy.replace(day=1) - timedelta(days=30 * meses_atras)
+
+                    for concepto in conceptos_por_condominio.get(condominio_id, []):
+                        # 80% de probabilidad de crear factura para este concepto
+                        if random.random() >= 0.8:
+                            continue
                         fecha_emision = fecha_base
                         fecha_vencimiento = fecha_base + timedelta(days=15)
-                        
+
                         # Determinar estado basado en fechas
                         if fecha_vencimiento < hoy - timedelta(days=30):
                             estado = random.choices(
@@ -111,8 +111,8 @@ class Command(BaseCommand):
                                 weights=[0.3, 0.7]
                             )[0]
 
-                        factura = Factura.objects.create(
-                            unidad_habitacional=unidad,
+                        yield Factura(
+                            unidad_habitacional_id=unidad_id,
                             concepto_cobro=concepto,
                             monto=concepto.monto,
                             descripcion=f"{concepto.nombre} - {fecha_emision.strftime('%B %Y')}",
@@ -121,26 +121,35 @@ class Command(BaseCommand):
                             estado=estado,
                             periodo=fecha_emision.replace(day=1)
                         )
-                        self.facturas.append(factura)
-
-                        # Crear pago si la factura está pagada
-                        if factura.estado == 'pagada':
-                            fecha_pago = fecha_vencimiento - timedelta(days=random.randint(0, 10))
-                            if fecha_pago < fecha_emision:
-                                fecha_pago = fecha_emision + timedelta(days=1)
-                            
-                            Pago.objects.create(
-                                factura=factura,
-                                monto=factura.monto,
-                                fecha_pago=fecha_pago,
-                                metodo_pago=random.choice(metodos_pago),
-                                referencia_pago=f"PAGO-{factura.id}-{random.randint(1000,9999)}",
-                                estado='completado',
-                                comprobante=f"https://comprobantes.com/{factura.id}.pdf"
-                            )
-
-        self.stdout.write(f"Facturas creadas: {len(self.facturas)}")
-        self.stdout.write(f"Pagos creados: {Pago.objects.count()}")
+
+        def generar_pagos(facturas):
+            # Crear pago si la factura está pagada
+            for factura in facturas:
+                if factura.estado != 'pagada':
+                    continue
+                fecha_pago = factura.fecha_vencimiento - timedelta(days=random.randint(0, 10))
+                if fecha_pago < factura.fecha_emision:
+                    fecha_pago = factura.fecha_emision + timedelta(days=1)
+
+                yield Pago(
+                    factura=factura,
+                    monto=factura.monto,
+                    fecha_pago=fecha_pago,
+                    metodo_pago=random.choice(metodos_pago),
+                    referencia_pago=f"PAGO-{factura.id}-{random.randint(1000,9999)}",
+                    estado='completado',
+                    comprobante=f"https://comprobantes.com/{factura.id}.pdf"
+                )
+
+        facturas_creadas = 0
+        pagos_creados = 0
+        # Los pagos de cada lote se insertan en cuanto el lote de facturas tiene ID
+        for lote in self.insertar_lotes(Factura, generar_facturas()):
+            facturas_creadas += len(lote)
+            pagos_creados += self.insertar(Pago, generar_pagos(lote))
+
+        self.stdout.write(f"Facturas creadas: {facturas_creadas}")
+        self.stdout.write(f"Pagos creados: {pagos_creados}")
 
     def crear_comunicados(self):
         self.stdout.write("Creando comunicados...")
@@ -149,73 +158,63 @@ class Command(BaseCommand):
         destinatarios_opciones = ['todos', 'propietarios', 'residentes', 'personal']
         
         # Buscar administradores
-        admins = Usuario.objects.filter(tipo='administrador')
-        if not admins.exists():
+        admins = list(Usuario.objects.filter(tipo='administrador'))
+        if not admins:
             self.stdout.write(self.style.ERROR("No hay usuarios administradores para asignar como autores"))
             return
 
-        self.comunicados = []
-        
-        # Crear 15 comunicados variados
-        for i in range(15):
-            autor = random.choice(admins)
-            fecha_publicacion = fake.date_between(start_date='-60d', end_date='today')
-            
-            comunicado = Comunicado.objects.create(
-                titulo=fake.sentence(nb_words=8),
-                contenido=fake.paragraph(nb_sentences=5),
-                autor=autor,
-                prioridad=random.choice(prioridades),
-                fecha_publicacion=fecha_publicacion,
-                fecha_expiracion=fecha_publicacion + timedelta(days=random.randint(7, 30)),
-                destinatarios=random.choice(destinatarios_opciones)
-            )
-            self.comunicados.append(comunicado)
-
-            # Asignar a unidades según el tipo de destinatario
-            if comunicado.destinatarios == 'todos':
-                unidades = UnidadHabitacional.objects.all()
-            elif comunicado.destinatarios == 'propietarios':
-                # Obtener unidades que tienen propietarios activos
-                unidades_con_propietarios = UnidadHabitacional.objects.filter(
-                    usuariounidad__tipo_relacion='propietario',
-                    usuariounidad__fecha_fin__isnull=True
-                ).distinct()
-                unidades = unidades_con_propietarios
-            elif comunicado.destinatarios == 'residentes':
-                # Obtener unidades ocupadas (con residentes)
-                unidades_ocupadas = UnidadHabitacional.objects.filter(estado='ocupada')
-                unidades = unidades_ocupadas
-            else:  # personal
-                # Para personal, no asignar a unidades específicas
-                continue
+        # Unidades candidatas por tipo de destinatario (una consulta por tipo, no por comunicado)
+        unidades_por_destinatario = {
+            'todos': list(UnidadHabitacional.objects.values_list('id', flat=True)),
+            # Unidades que tienen propietarios activos
+            'propietarios': list(UnidadHabitacional.objects.filter(
+                usuariounidad__tipo_relacion='propietario',
+                usuariounidad__fecha_fin__isnull=True
+            ).distinct().values_list('id', flat=True)),
+            # Unidades ocupadas (con residentes)
+            'residentes': list(UnidadHabitacional.objects.filter(estado='ocupada').values_list('id', flat=True)),
+        }
+        usuarios_por_unidad = {}
+        for unidad_id, usuario_id in UsuarioUnidad.objects.filter(
+            fecha_fin__isnull=True
+        ).values_list('unidad_id', 'usuario_id').distinct():
+            usuarios_por_unidad.setdefault(unidad_id, []).append(usuario_id)
 
-            # Asignar a un subconjunto de unidades (máximo 10 para no saturar)
-            if unidades.exists():
-                unidades_seleccionadas = random.sample(
-                    list(unidades), 
-                    min(10, unidades.count())
+        # Crear 15 comunicados variados (por --scale)
+        def generar_comunicados():
+            for i in range(self.cantidad(15)):
+                fecha_publicacion = fake.date_between(start_date='-60d', end_date='today')
+                yield Comunicado(
+                    titulo=fake.sentence(nb_words=8),
+                    contenido=fake.paragraph(nb_sentences=5),
+                    autor=random.choice(admins),
+                    prioridad=random.choice(prioridades),
+                    fecha_publicacion=fecha_publicacion,
+                    fecha_expiracion=fecha_publicacion + timedelta(days=random.randint(7, 30)),
+                    destinatarios=random.choice(destinatarios_opciones)
                 )
-                
-                for unidad in unidades_seleccionadas:
-                    ComunicadoUnidad.objects.create(
-                        comunicado=comunicado,
-                        unidad_habitacional=unidad
-                    )
 
-                    # Crear registros de lectura para algunos usuarios de la unidad
-                    usuarios_unidad = Usuario.objects.filter(
-                        usuariounidad__unidad=unidad,
-                        usuariounidad__fecha_fin__isnull=True
-                    ).distinct()
-                    
-                    for usuario in usuarios_unidad:
-                        # 60% de probabilidad de que el usuario haya leído el comunicado
-                        if random.random() < 0.6:
-                            ComunicadoLeido.objects.get_or_create(
-                                comunicado=comunicado,
-                                usuario=usuario
-                            )
+        self.comunicados = self.crear(Comunicado, generar_comunicados())
+
+        asignaciones = []
+        lecturas = []
+        for comunicado in self.comunicados:
+            # Para personal, no asignar a unidades específicas
+            unidades = unidades_por_destinatario.get(comunicado.destinatarios, [])
+
+            # Asignar a un subconjunto de unidades (máximo 10 para no saturar)
+            for unidad_id in random.sample(unidades, min(10, len(unidades))):
+                asignaciones.append(ComunicadoUnidad(comunicado=comunicado, unidad_habitacional_id=unidad_id))
+
+                # Crear registros de lectura para algunos usuarios de la unidad
+                for usuario_id in usuarios_por_unidad.get(unidad_id, []):
+                    # 60% de probabilidad de que el usuario haya leído el comunicado
+                    if random.random() < 0.6:
+                        lecturas.append(ComunicadoLeido(comunicado=comunicado, usuario_id=usuario_id))
+
+        self.insertar(ComunicadoUnidad, asignaciones)
+        # Un usuario con varias unidades puede aparecer dos veces: se ignora el duplicado
+        self.insertar(ComunicadoLeido, lecturas, ignore_conflicts=True)
 
         self.stdout.write(f"Comunicados creados: {len(self.comunicados)}")
         self.stdout.write(f"Comunicados-Unidad creados: {ComunicadoUnidad.objects.count()}")
@@ -228,63 +227,69 @@ class Command(BaseCommand):
         prioridades = ['alta', 'media', 'baja']
         
         # Obtener usuarios activos
-        usuarios_activos = Usuario.objects.filter(estado='activo')
-        
-        # Crear 50 notificaciones variadas
-        notificaciones_creadas = 0
+        usuarios_activos = list(Usuario.objects.filter(estado='activo').values_list('id', flat=True))
+        if not usuarios_activos:
+            return
         
-        for i in range(50):
-            usuario = random.choice(usuarios_activos)
-            tipo = random.choice(tipos)
-            
-            # Determinar contenido según el tipo
-            if tipo == 'pago':
-                titulo = random.choice([
-                    "Recordatorio de pago pendiente",
-                    "Pago confirmado exitosamente",
-                    "Factura vencida - Acción requerida"
-                ])
-            elif tipo == 'seguridad':
-                titulo = random.choice([
-                    "Alerta de seguridad en área común",
-                    "Visitante registrado en entrada",
-                    "Incidente reportado - Zona de estacionamiento"
-                ])
-            elif tipo == 'reserva':
-                titulo = random.choice([
-                    "Reserva de área común confirmada",
-                    "Recordatorio: Reserva para mañana",
-                    "Solicitud de reserva rechazada"
-                ])
-            elif tipo == 'comunicado':
-                titulo = random.choice([
-                    "Nuevo comunicado disponible",
-                    "Aviso importante de administración",
-                    "Reunión de condominio programada"
-                ])
-            elif tipo == 'mantenimiento':
-                titulo = random.choice([
-                    "Solicitud de mantenimiento recibida",
-                    "Mantenimiento programado para su unidad",
-                    "Reporte de mantenimiento completado"
-                ])
-            else:  # sistema
-                titulo = random.choice([
-                    "Actualización del sistema",
-                    "Mantenimiento programado de la plataforma",
-                    "Nueva funcionalidad disponible"
-                ])
-
-            notificacion = Notificacion.objects.create(
-                usuario=usuario,
-                titulo=titulo,
-                mensaje=fake.text(max_nb_chars=120),
-                tipo=tipo,
-                prioridad=random.choice(prioridades),
-                enviada=random.choice([True, False]),
-                leida=random.choice([True, False, False]),  # 66% de no leídas
-                fecha_envio=fake.date_time_this_month()
-            )
-            notificaciones_creadas += 1
-
-        self.stdout.write(f"Notificaciones creadas: {notificaciones_creadas}")
\ No newline at end of file
+        # Crear 50 notificaciones variadas (por --scale)
+        def generar_notificaciones():
+            for i in range(self.cantidad(50)):
+                yield self.generar_notificacion(random.choice(usuarios_activos), random.choice(tipos), prioridades)
+
+        with sin_auto_now_add(Notificacion):
+            notificaciones_creadas = self.insertar(Notificacion, generar_notificaciones())
+
+        self.stdout.write(f"Notificaciones creadas: {notificaciones_creadas}")
+
+    def generar_notificacion(self, usuario_id, tipo, prioridades):
+        """Genera (sin guardar) una notificación de prueba"""
+        # Determinar contenido según el tipo
+        if tipo == 'pago':
+            titulo = random.choice([
+                "Recordatorio de pago pendiente",
+                "Pago confirmado exitosamente",
+                "Factura vencida - Acción requerida"
+            ])
+        elif tipo == 'seguridad':
+            titulo = random.choice([
+                "Alerta de seguridad en área común",
+                "Visitante registrado en entrada",
+                "Incidente reportado - Zona de estacionamiento"
+            ])
+        elif tipo == 'reserva':
+            titulo = random.choice([
+                "Reserva de área común confirmada",
+                "Recordatorio: Reserva para mañana",
+                "Solicitud de reserva rechazada"
+            ])
+        elif tipo == 'comunicado':
+            titulo = random.choice([
+                "Nuevo comunicado disponible",
+                "Aviso importante de administración",
+                "Reunión de condominio programada"
+            ])
+        elif tipo == 'mantenimiento':
+            titulo = random.choice([
+                "Solicitud de mantenimiento recibida",
+                "Mantenimiento programado para su unidad",
+                "Reporte de mantenimiento completado"
+            ])
+        else:  # sistema
+            titulo = random.choice([
+                "Actualización del sistema",
+                "Mantenimiento programado de la plataforma",
+                "Nueva funcionalidad disponible"
+            ])
+
+        ahora = timezone.now()
+        return Notificacion(
+            usuario_id=usuario_id,
+            titulo=titulo,
+            mensaje=fake.text(max_nb_chars=120),
+            tipo=tipo,
+            prioridad=random.choice(prioridades),
+            enviada=random.choice([True, False]),
+            leida=random.choice([True, False, False]),  # 66% de no leídas
+            fecha_envio=fake.date_time_this_month(tzinfo=timezone.get_current_timezone()),
+            created_at=ahora
+        )
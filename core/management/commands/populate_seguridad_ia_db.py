@@ -1,5 +1,5 @@
 import random
-from django.core.management.base import BaseCommand
+from core.management.siembra import SiembraCommand, sin_auto_now_add
 from faker import Faker
 from core.models import *
 from django.utils import timezone
@@ -7,8 +7,8 @@ from datetime import datetime, timedelta
 
 fake = Faker('es_ES')
 
-class Command(BaseCommand):
-    help = 'Pobla la base de datos con datos de seguridad: vehículos, registros de acceso, visitantes, incidentes y cámaras'
+class Command(SiembraCommand):
+    help = 'Pobla la base de datos con datos de seguridad: vehículos, registros de acceso, visitantes, incidentes y cámaras (--scale multiplica los volúmenes diarios)'
 
     def handle(self, *args, **kwargs):
         self.stdout.write("Iniciando población de datos de seguridad con IA...")
@@ -24,7 +24,6 @@ class Command(BaseCommand):
     def crear_camaras_seguridad(self):
         self.stdout.write("Creando cámaras de seguridad...")
         
-        self.camaras = []
         tipos_camara = [
             {'tipo': 'entrada_principal', 'nombre': 'Entrada Principal', 'cantidad': (2, 3)},
             {'tipo': 'estacionamiento', 'nombre': 'Estacionamiento', 'cantidad': (3, 5)},
@@ -34,21 +33,23 @@ class Command(BaseCommand):
         
         condominios = Condominio.objects.all()
         
-        for condominio in condominios:
-            for tipo_cam in tipos_camara:
-                cantidad_min, cantidad_max = tipo_cam['cantidad']
-                cantidad = random.randint(cantidad_min, cantidad_max)
-                
-                for i in range(1, cantidad + 1):
-                    camara = CamaraSeguridad.objects.create(
-                        condominio=condominio,
-                        nombre=f"{tipo_cam['nombre']} {i} - {condominio.nombre.split()[-1]}",
-                        ubicacion=self.generar_ubicacion_camara(tipo_cam['tipo']),
-                        tipo_camara=tipo_cam['tipo'],
-                        url_stream=f"rtsp://{condominio.nombre.lower().replace(' ', '_')}_{tipo_cam['tipo']}_{i}.stream",
-                        esta_activa=random.choices([True, False], weights=[0.85, 0.15])[0]
-                    )
-                    self.camaras.append(camara)
+        def generar_camaras():
+            for condominio in condominios:
+                for tipo_cam in tipos_camara:
+                    cantidad_min, cantidad_max = tipo_cam['cantidad']
+                    cantidad = random.randint(cantidad_min, cantidad_max)
+
+                    for i in range(1, cantidad + 1):
+                        yield CamaraSeguridad(
+                            condominio=condominio,
+                            nombre=f"{tipo_cam['nombre']} {i} - {condominio.nombre.split()[-1]}",
+                            ubicacion=self.generar_ubicacion_camara(tipo_cam['tipo']),
+                            tipo_camara=tipo_cam['tipo'],
+                            url_stream=f"rtsp://{condominio.nombre.lower().replace(' ', '_')}_{tipo_cam['tipo']}_{i}.stream",
+                            esta_activa=random.choices([True, False], weights=[0.85, 0.15])[0]
+                        )
+
+        self.camaras = self.crear(CamaraSeguridad, generar_camaras())
         
         self.stdout.write(f"Cámaras de seguridad creadas: {len(self.camaras)}")
 
@@ -78,10 +79,10 @@ class Command(BaseCommand):
         self.stdout.write("Creando vehículos de residentes...")
         
         # Obtener residentes activos con unidades
-        residentes_con_unidad = Usuario.objects.filter(
+        residentes_con_unidad = list(Usuario.objects.filter(
             usuariounidad__tipo_relacion='residente',
             usuariounidad__fecha_fin__isnull=True
-        ).distinct()
+        ).distinct().values_list('id', flat=True))
         
         marcas_modelos = {
             'Toyota': ['Corolla', 'Camry', 'RAV4', 'Hilux', 'Yaris'],
@@ -95,38 +96,37 @@ class Command(BaseCommand):
         
         colores = ['Rojo', 'Azul', 'Negro', 'Blanco', 'Gris', 'Plateado', 'Verde', 'Azul Marino']
         
-        vehiculos_creados = 0
         residentes_seleccionados = random.sample(
-            list(residentes_con_unidad), 
-            min(50, residentes_con_unidad.count())  # Máximo 50 vehículos
+            residentes_con_unidad, 
+            min(self.cantidad(50), len(residentes_con_unidad))  # Máximo 50 vehículos (por --scale)
         )
-        
-        for residente in residentes_seleccionados:
-            marca = random.choice(list(marcas_modelos.keys()))
-            modelo = random.choice(marcas_modelos[marca])
-            año = random.randint(2010, 2023)
-            
-            # Generar placa realista (formato boliviano: XXX-###)
-            letras = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
-            numeros = ''.join(random.choices('0123456789', k=3))
-            placa = f"{letras}-{numeros}"
-            
-            # Verificar que la placa sea única
-            while Vehiculo.objects.filter(placa=placa).exists():
-                letras = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
-                numeros = ''.join(random.choices('0123456789', k=3))
-                placa = f"{letras}-{numeros}"
-            
-            vehiculo = Vehiculo.objects.create(
-                usuario=residente,
-                placa=placa,
-                marca=marca,
-                modelo=f"{modelo} {año}",
-                color=random.choice(colores),
-                autorizado=random.choices([True, False], weights=[0.95, 0.05])[0],
-                datos_ocr=f"Placa: {placa}, Marca: {marca}, Color: {random.choice(colores)}"
-            )
-            vehiculos_creados += 1
+        placas_usadas = set(Vehiculo.objects.values_list('placa', flat=True))
+
+        def generar_vehiculos():
+            for residente_id in residentes_seleccionados:
+                marca = random.choice(list(marcas_modelos.keys()))
+                modelo = random.choice(marcas_modelos[marca])
+                año = random.randint(2010, 2023)
+
+                # Generar placa realista (formato boliviano: XXX-###), única
+                placa = None
+                while placa is None or placa in placas_usadas:
+                    letras = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
+                    numeros = ''.join(random.choices('0123456789', k=3))
+                    placa = f"{letras}-{numeros}"
+                placas_usadas.add(placa)
+
+                yield Vehiculo(
+                    usuario_id=residente_id,
+                    placa=placa,
+                    marca=marca,
+                    modelo=f"{modelo} {año}",
+                    color=random.choice(colores),
+                    autorizado=random.choices([True, False], weights=[0.95, 0.05])[0],
+                    datos_ocr=f"Placa: {placa}, Marca: {marca}, Color: {random.choice(colores)}"
+                )
+
+        vehiculos_creados = self.insertar(Vehiculo, generar_vehiculos())
         
         self.stdout.write(f"Vehículos creados: {vehiculos_creados}")
 
@@ -134,73 +134,73 @@ class Command(BaseCommand):
         self.stdout.write("Creando registros de acceso...")
         
         # Obtener vehículos autorizados
-        vehiculos_autorizados = Vehiculo.objects.filter(autorizado=True)
+        vehiculos_autorizados = list(Vehiculo.objects.filter(autorizado=True).values_list('id', 'usuario_id'))
         
         # Obtener residentes activos
-        residentes_activos = Usuario.objects.filter(
+        residentes_activos = list(Usuario.objects.filter(
             usuariounidad__tipo_relacion='residente',
             usuariounidad__fecha_fin__isnull=True,
             estado='activo'
-        ).distinct()
+        ).distinct().values_list('id', flat=True))
         
-        registros_creados = 0
         hoy = timezone.now()
-        
-        # Crear registros de los últimos 30 días
-        for dias_atras in range(30, 0, -1):
-            fecha_base = hoy - timedelta(days=dias_atras)
-            
-            # Generar entre 20-50 registros por día
-            registros_dia = random.randint(20, 50)
-            
-            for _ in range(registros_dia):
-                # 70% peatonal, 30% vehicular
-                tipo_acceso = random.choices(['peatonal', 'vehicular'], weights=[0.7, 0.3])[0]
-                
-                if tipo_acceso == 'peatonal' and residentes_activos.exists():
-                    usuario = random.choice(residentes_activos)
-                    vehiculo = None
-                    metodo = random.choices(['facial', 'tarjeta', 'manual'], weights=[0.6, 0.3, 0.1])[0]
-                elif tipo_acceso == 'vehicular' and vehiculos_autorizados.exists():
-                    vehiculo = random.choice(vehiculos_autorizados)
-                    usuario = vehiculo.usuario
-                    metodo = 'placa'
-                else:
-                    continue
-                
-                # 85% de reconocimiento exitoso para métodos automáticos
-                reconocimiento_exitoso = metodo in ['facial', 'placa'] and random.choices([True, False], weights=[0.85, 0.15])[0]
-                
-                # Confidence score realista
-                if reconocimiento_exitoso:
-                    confidence = round(random.uniform(0.85, 0.99), 4)
-                else:
-                    confidence = round(random.uniform(0.10, 0.70), 4) if random.choice([True, False]) else None
-                
-                # Generar hora aleatoria del día
-                hora_acceso = fecha_base.replace(
-                    hour=random.randint(6, 22),
-                    minute=random.randint(0, 59),
-                    second=random.randint(0, 59)
-                )
-                
-                # Determinar dirección (entrada/salida) - más entradas en la mañana, salidas en la tarde
-                if hora_acceso.hour < 12:
-                    direccion = random.choices(['entrada', 'salida'], weights=[0.7, 0.3])[0]
-                else:
-                    direccion = random.choices(['entrada', 'salida'], weights=[0.3, 0.7])[0]
-                
-                registro = RegistroAcceso.objects.create(
-                    usuario=usuario,
-                    vehiculo=vehiculo,
-                    tipo=tipo_acceso,
-                    direccion=direccion,
-                    metodo=metodo,
-                    fecha_hora=hora_acceso,
-                    reconocimiento_exitoso=reconocimiento_exitoso,
-                    confidence_score=confidence
-                )
-                registros_creados += 1
+
+        def generar_registros():
+            # Crear registros de los últimos 30 días
+            for dias_atras in range(30, 0, -1):
+                fecha_base = hoy - timedelta(days=dias_atras)
+
+                # Generar entre 20-50 registros por día (por --scale)
+                for _ in range(self.cantidad(random.randint(20, 50))):
+                    # 70% peatonal, 30% vehicular
+                    tipo_acceso = random.choices(['peatonal', 'vehicular'], weights=[0.7, 0.3])[0]
+
+                    if tipo_acceso == 'peatonal' and residentes_activos:
+                        usuario_id = random.choice(residentes_activos)
+                        vehiculo_id = None
+                        metodo = random.choices(['facial', 'tarjeta', 'manual'], weights=[0.6, 0.3, 0.1])[0]
+                    elif tipo_acceso == 'vehicular' and vehiculos_autorizados:
+                        vehiculo_id, usuario_id = random.choice(vehiculos_autorizados)
+                        metodo = 'placa'
+                    else:
+                        continue
+
+                    # 85% de reconocimiento exitoso para métodos automáticos
+                    reconocimiento_exitoso = metodo in ['facial', 'placa'] and random.choices([True, False], weights=[0.85, 0.15])[0]
+
+                    # Confidence score realista
+                    if reconocimiento_exitoso:
+                        confidence = round(random.uniform(0.85, 0.99), 4)
+                    else:
+                        confidence = round(random.uniform(0.10, 0.70), 4) if random.choice([True, False]) else None
+
+                    # Generar hora aleatoria del día
+                    hora_acceso = fecha_base.replace(
+                        hour=random.randint(6, 22),
+                        minute=random.randint(0, 59),
+                        second=random.randint(0, 59)
+                    )
+
+                    # Determinar dirección (entrada/salida) - más entradas en la mañana, salidas en la tarde
+                    if hora_acceso.hour < 12:
+                        direccion = random.choices(['entrada', 'salida'], weights=[0.7, 0.3])[0]
+                    else:
+                        direccion = random.choices(['entrada', 'salida'], weights=[0.3, 0.7])[0]
+
+                    yield RegistroAcceso(
+                        usuario_id=usuario_id,
+                        vehiculo_id=vehiculo_id,
+                        tipo=tipo_acceso,
+                        direccion=direccion,
+                        metodo=metodo,
+                        fecha_hora=hora_acceso,
+                        reconocimiento_exitoso=reconocimiento_exitoso,
+                        confidence_score=confidence,
+                        created_at=hoy
+                    )
+
+        with sin_auto_now_add(RegistroAcceso):
+            registros_creados = self.insertar(RegistroAcceso, generar_registros())
         
         self.stdout.write(f"Registros de acceso creados: {registros_creados}")
 
@@ -208,58 +208,62 @@ class Command(BaseCommand):
         self.stdout.write("Creando registros de visitantes...")
         
         # Obtener residentes activos que pueden recibir visitas
-        residentes_anfitriones = Usuario.objects.filter(
+        residentes_anfitriones = list(Usuario.objects.filter(
             usuariounidad__tipo_relacion='residente',
             usuariounidad__fecha_fin__isnull=True,
             estado='activo'
-        ).distinct()
+        ).distinct().values_list('id', flat=True))
+        if not residentes_anfitriones:
+            self.stdout.write("Visitantes creados: 0")
+            return
         
-        visitantes_creados = 0
         hoy = timezone.now()
-        
-        # Crear visitas de los últimos 60 días
-        for dias_atras in range(60, 0, -1):
-            fecha_base = hoy - timedelta(days=dias_atras)
-            
-            # Generar entre 5-15 visitas por día
-            visitas_dia = random.randint(5, 15)
-            
-            for _ in range(visitas_dia):
-                anfitrion = random.choice(residentes_anfitriones)
-                
-                # 30% de visitas con vehículo
-                tiene_vehiculo = random.random() < 0.3
-                placa_vehiculo = fake.license_plate() if tiene_vehiculo else None
-                
-                # Generar fecha de entrada
-                fecha_entrada = fecha_base.replace(
-                    hour=random.randint(8, 20),
-                    minute=random.randint(0, 59)
-                )
-                
-                # 80% de visitas ya tienen fecha de salida
-                tiene_salida = random.random() < 0.8
-                if tiene_salida:
-                    # Salida entre 1-8 horas después
-                    horas_visita = random.randint(1, 8)
-                    fecha_salida = fecha_entrada + timedelta(hours=horas_visita)
-                else:
-                    fecha_salida = None
-                
-                visitante = Visitante.objects.create(
-                    nombre=f"{fake.first_name()} {fake.last_name()}",
-                    documento_identidad=fake.random_number(digits=8),
-                    telefono=fake.phone_number(),
-                    motivo_visita=random.choice([
-                        "Visita familiar", "Entrega de paquete", "Reunión social",
-                        "Mantenimiento", "Entrega de comida", "Visita médica"
-                    ]),
-                    anfitrion=anfitrion,
-                    fecha_entrada=fecha_entrada,
-                    fecha_salida=fecha_salida,
-                    placa_vehiculo=placa_vehiculo
-                )
-                visitantes_creados += 1
+
+        def generar_visitantes():
+            # Crear visitas de los últimos 60 días
+            for dias_atras in range(60, 0, -1):
+                fecha_base = hoy - timedelta(days=dias_atras)
+
+                # Generar entre 5-15 visitas por día (por --scale)
+                for _ in range(self.cantidad(random.randint(5, 15))):
+                    anfitrion_id = random.choice(residentes_anfitriones)
+
+                    # 30% de visitas con vehículo
+                    tiene_vehiculo = random.random() < 0.3
+                    placa_vehiculo = fake.license_plate() if tiene_vehiculo else None
+
+                    # Generar fecha de entrada
+                    fecha_entrada = fecha_base.replace(
+                        hour=random.randint(8, 20),
+                        minute=random.randint(0, 59)
+                    )
+
+                    # 80% de visitas ya tienen fecha de salida
+                    tiene_salida = random.random() < 0.8
+                    if tiene_salida:
+                        # Salida entre 1-8 horas después
+                        horas_visita = random.randint(1, 8)
+                        fecha_salida = fecha_entrada + timedelta(hours=horas_visita)
+                    else:
+                        fecha_salida = None
+
+                    yield Visitante(
+                        nombre=f"{fake.first_name()} {fake.last_name()}",
+                        documento_identidad=fake.random_number(digits=8),
+                        telefono=fake.phone_number(),
+                        motivo_visita=random.choice([
+                            "Visita familiar", "Entrega de paquete", "Reunión social",
+                            "Mantenimiento", "Entrega de comida", "Visita médica"
+                        ]),
+                        anfitrion_id=anfitrion_id,
+                        fecha_entrada=fecha_entrada,
+                        fecha_salida=fecha_salida,
+                        placa_vehiculo=placa_vehiculo,
+                        created_at=hoy
+                    )
+
+        with sin_auto_now_add(Visitante):
+            visitantes_creados = self.insertar(Visitante, generar_visitantes())
         
         self.stdout.write(f"Visitantes creados: {visitantes_creados}")
 
@@ -271,26 +275,23 @@ class Command(BaseCommand):
             'acceso_no_autorizado', 'mascota_suelta', 'vehiculo_mal_estacionado'
         ]
         
-        gravedades = ['baja', 'media', 'alta']
-        estados = ['pendiente', 'investigando', 'resuelto', 'falso_positivo']
-        
         # Obtener personal de seguridad para asignar incidentes
-        personal_seguridad = Usuario.objects.filter(tipo='seguridad', estado='activo')
+        personal_seguridad = list(Usuario.objects.filter(tipo='seguridad', estado='activo').values_list('id', flat=True))
         
-        incidentes_creados = 0
         hoy = timezone.now()
-        
-        # Crear incidentes de los últimos 90 días
-        for dias_atras in range(90, 0, -1):
-            fecha_base = hoy - timedelta(days=dias_atras)
-            
-            # Generar entre 0-3 incidentes por día (no todos los días tienen incidentes)
-            if random.random() < 0.6:  # 60% de probabilidad de tener incidentes ese día
-                incidentes_dia = random.randint(1, 3)
-                
-                for _ in range(incidentes_dia):
+
+        def generar_incidentes():
+            # Crear incidentes de los últimos 90 días
+            for dias_atras in range(90, 0, -1):
+                fecha_base = hoy - timedelta(days=dias_atras)
+
+                # Generar entre 0-3 incidentes por día (no todos los días tienen incidentes)
+                if random.random() >= 0.6:  # 60% de probabilidad de tener incidentes ese día
+                    continue
+
+                for _ in range(self.cantidad(random.randint(1, 3))):
                     tipo = random.choice(tipos_incidente)
-                    
+
                     # Asignar gravedad según el tipo de incidente
                     if tipo in ['acceso_no_autorizado', 'persona_no_autorizada']:
                         gravedad = random.choices(['alta', 'media', 'baja'], weights=[0.6, 0.3, 0.1])[0]
@@ -298,7 +299,7 @@ class Command(BaseCommand):
                         gravedad = random.choices(['media', 'alta', 'baja'], weights=[0.5, 0.3, 0.2])[0]
                     else:
                         gravedad = random.choices(['baja', 'media', 'alta'], weights=[0.6, 0.3, 0.1])[0]
-                    
+
                     # Asignar estado según la fecha (incidentes antiguos más probables de estar resueltos)
                     if dias_atras > 30:
                         estado = random.choices(['resuelto', 'falso_positivo', 'investigando'], weights=[0.7, 0.2, 0.1])[0]
@@ -306,16 +307,16 @@ class Command(BaseCommand):
                         estado = random.choices(['investigando', 'resuelto', 'pendiente'], weights=[0.4, 0.4, 0.2])[0]
                     else:
                         estado = random.choices(['pendiente', 'investigando', 'resuelto'], weights=[0.5, 0.3, 0.2])[0]
-                    
+
                     # Asignar personal si está en investigación o resuelto
-                    usuario_asignado = None
-                    if estado in ['investigando', 'resuelto'] and personal_seguridad.exists():
-                        usuario_asignado = random.choice(personal_seguridad)
-                    
+                    usuario_asignado_id = None
+                    if estado in ['investigando', 'resuelto'] and personal_seguridad:
+                        usuario_asignado_id = random.choice(personal_seguridad)
+
                     # Confidence score para incidentes detectados por IA
                     confidence = round(random.uniform(0.70, 0.98), 4) if random.random() < 0.8 else None
-                    
-                    incidente = IncidenteSeguridad.objects.create(
+
+                    yield IncidenteSeguridad(
                         tipo=tipo,
                         descripcion=self.generar_descripcion_incidente(tipo),
                         ubicacion=random.choice([
@@ -329,9 +330,12 @@ class Command(BaseCommand):
                         gravedad=gravedad,
                         estado=estado,
                         confidence_score=confidence,
-                        usuario_asignado=usuario_asignado
+                        usuario_asignado_id=usuario_asignado_id,
+                        created_at=hoy
                     )
-                    incidentes_creados += 1
+
+        with sin_auto_now_add(IncidenteSeguridad):
+            incidentes_creados = self.insertar(IncidenteSeguridad, generar_incidentes())
         
         self.stdout.write(f"Incidentes de seguridad creados: {incidentes_creados}")
 
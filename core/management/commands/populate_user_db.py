@@ -1,5 +1,5 @@
 import random
-from django.core.management.base import BaseCommand
+from core.management.siembra import SiembraCommand
 from faker import Faker
 from core.models import *
 from django.utils import timezone
@@ -7,8 +7,8 @@ from datetime import date, timedelta
 
 fake = Faker('es_ES')
 
-class Command(BaseCommand):
-    help = 'Pobla la base de datos con condominios, unidades, usuarios, roles y permisos'
+class Command(SiembraCommand):
+    help = 'Pobla la base de datos con condominios, unidades, usuarios, roles y permisos (--scale multiplica los condominios)'
 
     def handle(self, *args, **kwargs):
         self.stdout.write("Iniciando población de base de datos...")
@@ -17,6 +17,7 @@ class Command(BaseCommand):
         self.crear_condominios()
         self.crear_unidades_habitacionales()
         self.crear_usuarios_y_relaciones()
+        self.reconstruir_cuentas()
 
         self.stdout.write(self.style.SUCCESS("¡Base de datos poblada exitosamente!"))
 
@@ -48,7 +49,6 @@ class Command(BaseCommand):
         self.stdout.write(f"Permisos creados: {len(permisos)}")
 
     def crear_condominios(self):
-        self.condominios = []
         nombres = [
             'Condominio Las Palmas', 
             'Condominio Vista Mar', 
@@ -57,109 +57,114 @@ class Command(BaseCommand):
             'Condominio Valle Azul'
         ]
 
-        for nombre in nombres:
-            condominio = Condominio.objects.create(
-                nombre=nombre,
+        # Con --scale > 1 se repiten los nombres con un sufijo numérico
+        self.condominios = self.crear(Condominio, (
+            Condominio(
+                nombre=nombres[i % len(nombres)] + (f" {i // len(nombres) + 1}" if i >= len(nombres) else ''),
                 direccion=fake.address(),
                 telefono=fake.phone_number(),
                 email=fake.email()
             )
-            self.condominios.append(condominio)
+            for i in range(self.cantidad(len(nombres)))
+        ))
 
         self.stdout.write(f"Condominios creados: {len(self.condominios)}")
 
     def crear_unidades_habitacionales(self):
         self.unidades_por_condominio = {}
-        
+
+        def generar_unidades():
+            for condominio in self.condominios:
+                num_unidades = random.randint(40, 50)  # Entre 40 y 50 unidades por condominio
+                for i in range(1, num_unidades + 1):
+                    yield UnidadHabitacional(
+                        condominio=condominio,
+                        codigo=f"{condominio.nombre[:3].upper()}-{i:03d}",
+                        tipo=random.choice(['departamento', 'casa', 'local', 'oficina']),
+                        metros_cuadrados=random.uniform(60.0, 200.0),
+                        estado=random.choice(['ocupada', 'desocupada', 'en_construccion']),
+                    )
+
+        for unidad in self.crear(UnidadHabitacional, generar_unidades()):
+            self.unidades_por_condominio.setdefault(unidad.condominio_id, []).append(unidad)
+
         for condominio in self.condominios:
-            unidades_condominio = []
-            num_unidades = random.randint(40, 50)  # Entre 40 y 50 unidades por condominio
-            
-            for i in range(1, num_unidades + 1):
-                unidad = UnidadHabitacional.objects.create(
-                    condominio=condominio,
-                    codigo=f"{condominio.nombre[:3].upper()}-{i:03d}",
-                    tipo=random.choice(['departamento', 'casa', 'local', 'oficina']),
-                    metros_cuadrados=random.uniform(60.0, 200.0),
-                    estado=random.choice(['ocupada', 'desocupada', 'en_construccion']),
-                )
-                unidades_condominio.append(unidad)
-            
-            self.unidades_por_condominio[condominio.id] = unidades_condominio
-            self.stdout.write(f"Condominio {condominio.nombre}: {len(unidades_condominio)} unidades creadas")
+            self.stdout.write(f"Condominio {condominio.nombre}: {len(self.unidades_por_condominio.get(condominio.id, []))} unidades creadas")
 
     def crear_usuarios_y_relaciones(self):
         admin_counter = 1
-        
+        self.emails_usados = set(Usuario.objects.values_list('email', flat=True))
+
+        # Los usuarios se generan en memoria y se insertan al final por lotes;
+        # las relaciones guardan el índice del usuario en la lista
+        usuarios = []
+        relaciones = []
+
         for condominio in self.condominios:
-            unidades = self.unidades_por_condominio[condominio.id]
-            
-            self.stdout.write(f"\nCreando usuarios para {condominio.nombre}...")
-            
+            unidades = self.unidades_por_condominio.get(condominio.id, [])
+            inicio_condominio = len(usuarios)
+
             # 1. CREAR ADMINISTRADORES (2 por condominio)
             for i in range(2):
-                admin = self.crear_usuario_base(
+                usuarios.append(self.crear_usuario_base(
                     tipo='administrador',
                     email=f"admin{admin_counter}@mail.com",
                     condominio=condominio
-                )
+                ))
                 admin_counter += 1
-                self.stdout.write(f"  Administrador creado: {admin.email}")
 
             # 2. CREAR PERSONAL DE SEGURIDAD (5 por condominio)
             for i in range(5):
-                seguridad = self.crear_usuario_base(
-                    tipo='seguridad',
-                    condominio=condominio
-                )
-                self.stdout.write(f"  Seguridad creado: {seguridad.email}")
+                usuarios.append(self.crear_usuario_base(tipo='seguridad', condominio=condominio))
 
             # 3. CREAR PERSONAL DE MANTENIMIENTO (10 por condominio)
             for i in range(10):
-                mantenimiento = self.crear_usuario_base(
-                    tipo='mantenimiento',
-                    condominio=condominio
-                )
-                self.stdout.write(f"  Mantenimiento creado: {mantenimiento.email}")
+                usuarios.append(self.crear_usuario_base(tipo='mantenimiento', condominio=condominio))
 
             # 4. CREAR PROPIETARIOS Y RESIDENTES PARA UNIDADES OCUPADAS
             unidades_ocupadas = [u for u in unidades if u.estado == 'ocupada']
-            self.stdout.write(f"  Unidades ocupadas: {len(unidades_ocupadas)}")
             
             for unidad in unidades_ocupadas:
                 # Crear propietario para cada unidad ocupada
-                propietario = self.crear_usuario_base(
-                    tipo='propietario',
-                    condominio=condominio
-                )
-                
-                # Crear relación propietario-unidad
-                UsuarioUnidad.objects.create(
-                    usuario=propietario,
-                    unidad=unidad,
-                    tipo_relacion='propietario',
-                    fecha_inicio=fake.date_between(start_date='-5y', end_date='today'),
-                    es_principal=True
-                )
+                usuarios.append(self.crear_usuario_base(tipo='propietario', condominio=condominio))
+                relaciones.append((
+                    len(usuarios) - 1, unidad, 'propietario',
+                    fake.date_between(start_date='-5y', end_date='today'), True
+                ))
                 
                 # Crear residentes (entre 1 y 5 por unidad)
                 num_residentes = random.randint(1, 5)
                 for i in range(num_residentes):
-                    residente = self.crear_usuario_base(
-                        tipo='residente',
-                        condominio=condominio
-                    )
-                    
-                    # Crear relación residente-unidad
-                    UsuarioUnidad.objects.create(
-                        usuario=residente,
-                        unidad=unidad,
-                        tipo_relacion='residente',
-                        fecha_inicio=fake.date_between(start_date='-2y', end_date='today'),
-                        es_principal=(i == 0)  # El primer residente es principal
-                    )
-                
-                self.stdout.write(f"  Unidad {unidad.codigo}: {num_residentes} residentes + 1 propietario")
+                    usuarios.append(self.crear_usuario_base(tipo='residente', condominio=condominio))
+                    relaciones.append((
+                        len(usuarios) - 1, unidad, 'residente',
+                        fake.date_between(start_date='-2y', end_date='today'),
+                        i == 0  # El primer residente es principal
+                    ))
+
+            self.stdout.write(
+                f"{condominio.nombre}: {len(usuarios) - inicio_condominio} usuarios, "
+                f"{len(unidades_ocupadas)} unidades ocupadas"
+            )
+
+        usuarios = self.crear(Usuario, usuarios)
+
+        self.insertar(UsuarioUnidad, (
+            UsuarioUnidad(
+                usuario=usuarios[indice],
+                unidad=unidad,
+                tipo_relacion=tipo_relacion,
+                fecha_inicio=fecha_inicio,
+                es_principal=es_principal
+            )
+            for indice, unidad, tipo_relacion, fecha_inicio, es_principal in relaciones
+        ))
+
+        # Asignar Rol correspondiente
+        self.insertar(UsuarioRol, (
+            UsuarioRol(usuario=usuario, rol=self.rol_objs[usuario.tipo.capitalize()])
+            for usuario in usuarios if usuario.tipo.capitalize() in self.rol_objs
+        ), ignore_conflicts=True)
 
         # Estadísticas finales
         total_usuarios = Usuario.objects.count()
@@ -172,7 +177,7 @@ class Command(BaseCommand):
         self.stdout.write(f"Total relaciones usuario-unidad: {total_relaciones}")
 
     def crear_usuario_base(self, tipo, email=None, condominio=None):
-        """Crea un usuario base con datos aleatorios"""
+        """Genera (sin guardar) un usuario base con datos aleatorios"""
         nombre = fake.first_name()
         apellidos = fake.last_name()
         genero = random.choice(['M', 'F'])
@@ -185,11 +190,12 @@ class Command(BaseCommand):
             
             # Asegurar que el email sea único
             counter = 1
-            while Usuario.objects.filter(email=email).exists():
+            while email in self.emails_usados:
                 email = f"{base_email}{counter}@mail.com"
                 counter += 1
+        self.emails_usados.add(email)
 
-        usuario = Usuario.objects.create(
+        return Usuario(
             email=email,
             nombre=nombre,
             apellidos=apellidos,
@@ -201,17 +207,8 @@ class Command(BaseCommand):
             estado='activo',
             is_active=True,
             is_staff=(tipo == 'administrador'),
+            password=self.password('12345678'),  # Mismo hash para todos los usuarios de prueba
         )
-        usuario.set_password('12345678')
-        usuario.save()
-
-        # Asignar Rol correspondiente
-        rol_nombre = tipo.capitalize()
-        rol = self.rol_objs.get(rol_nombre)
-        if rol:
-            UsuarioRol.objects.get_or_create(usuario=usuario, rol=rol)
-
-        return usuario
 
     def crear_camaras_seguridad(self):
         """OPCIONAL: Crear cámaras de seguridad para cada condominio"""
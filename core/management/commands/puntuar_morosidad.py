@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import morosidad
+from core.facturacion import leer_periodo
+from core.models import Bitacora, ModeloIA
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula el riesgo de morosidad del mes para las unidades que aún no lo tienen con el modelo '
+        'activo. Se puede correr varias veces en el mes: solo agrega las unidades nuevas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', help='Mes a puntuar, AAAA-MM (defecto: el mes en curso)')
+        parser.add_argument('--modelo', type=int, help='ID del ModeloIA (defecto: el activo)')
+        parser.add_argument('--recalcular', action='store_true', help='Vuelve a puntuar todas las unidades del mes')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Unidades por lote (defecto: 50000)')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Filas por INSERT de bulk_create (defecto: 2000)')
+
+    def handle(self, *args, **options):
+        try:
+            periodo = leer_periodo(options['periodo']) if options['periodo'] else timezone.localdate().replace(day=1)
+        except ValueError:
+            raise CommandError(f"Periodo inválido: {options['periodo']} (formato AAAA-MM)")
+        if options['modelo']:
+            modelo = ModeloIA.objects.filter(pk=options['modelo']).first()
+        else:
+            modelo = morosidad.modelo_activo()
+        if modelo is None or not modelo.parametros:
+            raise CommandError("No hay un modelo entrenado (ver entrenar_morosidad)")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size debe ser mayor que 0")
+
+        inicio = time.perf_counter()
+        resultado = morosidad.puntuar(
+            modelo, periodo, chunk_size=options['chunk_size'], batch_size=options['batch_size'],
+            recalcular=options['recalcular'],
+        )
+        resultado['duracion_ms'] = round((time.perf_counter() - inicio) * 1000)
+        Bitacora.objects.create(accion='puntuar_morosidad', modulo='Finanzas', detalles=json.dumps(resultado))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['modelo']}, {resultado['periodo']}: {resultado['unidades']} unidades puntuadas "
+            f"({resultado['ya_puntuadas']} ya tenían score, {resultado['riesgo_alto']} con riesgo >= 0.5) "
+            f"en {resultado['duracion_ms']} ms"
+        ))
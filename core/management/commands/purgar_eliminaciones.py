@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import RegistroEliminacion
+
+class Command(BaseCommand):
+    help = 'Elimina los registros de borrado (sincronización móvil) más antiguos que la retención configurada'
+
+    def handle(self, *args, **kwargs):
+        dias = getattr(settings, 'MOVIL_SYNC_RETENCION_DIAS', 30)
+        limite = timezone.now() - timedelta(days=dias)
+
+        borrados, _ = RegistroEliminacion.objects.filter(eliminado_en__lt=limite).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Registros de borrado purgados: {borrados} (anteriores a {dias} días)"))
@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import ClaveIdempotencia
+
+class Command(BaseCommand):
+    help = 'Elimina las claves Idempotency-Key más antiguas que la retención configurada'
+
+    def handle(self, *args, **kwargs):
+        horas = getattr(settings, 'IDEMPOTENCIA_RETENCION_HORAS', 24)
+        limite = timezone.now() - timedelta(hours=horas)
+
+        borradas, _ = ClaveIdempotencia.objects.filter(created_at__lt=limite).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Claves de idempotencia purgadas: {borradas} (anteriores a {horas} horas)"))
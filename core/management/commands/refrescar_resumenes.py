@@ -0,0 +1,61 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import resumenes
+from core.models import Bitacora, Condominio
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula completos los resúmenes del dashboard por condominio (facturación y usuarios por tipo) '
+        'y pliega los incrementos pendientes. Pensado para correr cada noche: corrige lo que no pasa por '
+        'los incrementos. Con --plegar solo pliega (cada minuto, para que los incrementos no se acumulen)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--condominio', type=int, action='append', dest='condominios',
+                            help='ID del condominio (se puede repetir). Por defecto, todos.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Condominios por transacción (defecto: 100)')
+        parser.add_argument('--plegar', action='store_true', help='Solo suma los incrementos pendientes a los resúmenes')
+
+    def handle(self, *args, **options):
+        if options['plegar']:
+            inicio = time.perf_counter()
+            plegados = self.plegar()
+            self.stdout.write(self.style.SUCCESS(
+                f"Incrementos plegados: {plegados} en {round((time.perf_counter() - inicio) * 1000)} ms"
+            ))
+            return
+
+        condominios = Condominio.objects.order_by('id')
+        if options['condominios']:
+            condominios = condominios.filter(pk__in=options['condominios'])
+        ids = list(condominios.values_list('id', flat=True))
+
+        inicio = time.perf_counter()
+        total = 0
+        # Por lotes: cada uno bloquea sus filas solo mientras se recalcula
+        for desde in range(0, len(ids), options['batch_size']):
+            total += resumenes.refrescar(ids[desde:desde + options['batch_size']])
+        plegados = self.plegar()
+
+        duracion = round((time.perf_counter() - inicio) * 1000)
+        Bitacora.objects.create(
+            accion='refrescar_resumenes',
+            modulo='Finanzas',
+            detalles=json.dumps({'condominios': total, 'incrementos_plegados': plegados, 'duracion_ms': duracion}),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Resúmenes recalculados: {total} condominios y {plegados} incrementos plegados en {duracion} ms"
+        ))
+
+    def plegar(self):
+        total = 0
+        # Por tandas: cada una es una transacción corta
+        while True:
+            plegados = resumenes.plegar()
+            if not plegados:
+                return total
+            total += plegados
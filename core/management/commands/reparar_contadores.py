@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core.contadores import recalcular_contadores
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los contadores de no leídos (notificaciones y comunicados) de cada usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, action='append', dest='usuarios',
+                            help='ID de usuario a recalcular (se puede repetir). Por defecto, todos.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Usuarios por lote/transacción (defecto: 1000)')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recalculando contadores de no leídos...")
+
+        total = recalcular_contadores(options['usuarios'], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Contadores recalculados: {total} usuarios"))
@@ -0,0 +1,63 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from core import cuentas
+from core.models import Bitacora, UnidadHabitacional
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el saldo materializado de cada unidad (SaldoUnidad) con sus facturas y pagos y con '
+        'la suma de su libro de movimientos. Con --reparar abre las cuentas que faltan y corrige las '
+        'diferencias agregando un movimiento de corrección (el libro nunca se modifica)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--condominio', type=int, action='append', dest='condominios',
+                            help='ID del condominio (se puede repetir). Por defecto, todos.')
+        parser.add_argument('--reparar', action='store_true', help='Corrige las diferencias encontradas')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Unidades por transacción (defecto: 1000)')
+
+    def handle(self, *args, **options):
+        unidades = UnidadHabitacional.objects.order_by('id')
+        if options['condominios']:
+            unidades = unidades.filter(condominio_id__in=options['condominios'])
+        ids = list(unidades.values_list('id', flat=True))
+
+        inicio = time.perf_counter()
+        revisadas, diferencias = 0, []
+        for desde in range(0, len(ids), options['batch_size']):
+            lote = ids[desde:desde + options['batch_size']]
+            # Con las cuentas bloqueadas las escrituras concurrentes esperan y no aparecen como diferencias
+            with transaction.atomic():
+                diferencias += cuentas.verificar(lote, options['reparar'])
+            revisadas += len(lote)
+
+        for diferencia in diferencias[:50]:
+            detalle = ', '.join(f"{campo} {valores[0]} / {valores[1]} / {valores[2]}"
+                                for campo, valores in diferencia['campos'].items())
+            self.stdout.write(f"Unidad #{diferencia['unidad']} ({diferencia['tipo']}): {detalle}")
+        if len(diferencias) > 50:
+            self.stdout.write(f"... y {len(diferencias) - 50} más")
+
+        resumen = {
+            'unidades': revisadas,
+            'diferencias': len(diferencias),
+            'reparadas': len(diferencias) if options['reparar'] else 0,
+            'duracion_ms': round((time.perf_counter() - inicio) * 1000),
+        }
+        Bitacora.objects.create(
+            accion='verificar_saldos_reparar' if options['reparar'] else 'verificar_saldos',
+            modulo='Finanzas',
+            detalles=json.dumps({**resumen, 'detalle': diferencias[:200]}, cls=DjangoJSONEncoder),
+        )
+        estilo = self.style.SUCCESS if not diferencias or options['reparar'] else self.style.WARNING
+        accion = "corregidas" if options['reparar'] else "encontradas"
+        self.stdout.write(estilo(
+            f"{revisadas} unidades revisadas: {len(diferencias)} diferencias {accion} en {resumen['duracion_ms']} ms"
+            + (" (campos: materializado / origen / libro)" if diferencias else "")
+        ))
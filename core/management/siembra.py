@@ -0,0 +1,234 @@
+# core/management/siembra.py
+"""
+Base común de los comandos populate_* (y bench_queries).
+
+Las filas se generan en memoria y se insertan con bulk_create en lotes de
+--batch-size, cada lote en su propia transacción. --scale multiplica los
+volúmenes de cada comando y --seed fija random y Faker para que dos
+ejecuciones con la misma semilla generen los mismos datos.
+
+Para los volúmenes de pruebas de carga, TablaCruda y copiar_filas escriben
+filas en crudo con COPY FROM STDIN (PostgreSQL) sin instanciar modelos.
+
+Ni bulk_create ni COPY pasan por las señales: los comandos que siembran
+unidades, facturas, pagos o usuarios terminan con reconstruir_cuentas().
+"""
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from faker import Faker
+
+from core import cuentas, resumenes
+from core.models import Condominio, UnidadHabitacional
+
+
+@contextmanager
+def sin_auto_now_add(*modelos):
+    """Permite fijar fechas históricas en campos auto_now_add durante la siembra"""
+    campos = [
+        campo for modelo in modelos for campo in modelo._meta.concrete_fields
+        if getattr(campo, 'auto_now_add', False)
+    ]
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+class SiembraCommand(BaseCommand):
+    batch_size_defecto = 2000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiplicador de los volúmenes generados (defecto: 1.0)')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Semilla de random/Faker para obtener siempre los mismos datos')
+        parser.add_argument('--batch-size', type=int, default=self.batch_size_defecto,
+                            help=f'Filas por bulk_create/transacción (defecto: {self.batch_size_defecto})')
+
+    def execute(self, *args, **options):
+        self.escala = options.get('scale', 1.0)
+        self.batch_size = options.get('batch_size') or self.batch_size_defecto
+        self._passwords = {}
+        if options.get('seed') is not None:
+            random.seed(options['seed'])
+            Faker.seed(options['seed'])
+        return super().execute(*args, **options)
+
+    def cantidad(self, base):
+        """Volumen base multiplicado por --scale (al menos 1)"""
+        return max(1, round(base * self.escala))
+
+    def password(self, texto_plano):
+        """Hash calculado una sola vez por contraseña plantilla"""
+        if texto_plano not in self._passwords:
+            self._passwords[texto_plano] = make_password(texto_plano)
+        return self._passwords[texto_plano]
+
+    def insertar_lotes(self, modelo, filas, ignore_conflicts=False):
+        """
+        Inserta las filas de un iterable (normalmente un generador) por lotes y
+        devuelve cada lote ya creado, para generar a partir de él las filas dependientes.
+        """
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, self.batch_size))
+            if not lote:
+                return
+            with transaction.atomic():
+                creadas = modelo.objects.bulk_create(lote, ignore_conflicts=ignore_conflicts)
+            yield creadas
+
+    def insertar(self, modelo, filas, ignore_conflicts=False):
+        """Inserta todas las filas por lotes y devuelve cuántas se insertaron"""
+        return sum(len(lote) for lote in self.insertar_lotes(modelo, filas, ignore_conflicts))
+
+    def crear(self, modelo, filas, ignore_conflicts=False):
+        """Como insertar(), pero devuelve la lista de objetos creados (con su ID)"""
+        creadas = []
+        for lote in self.insertar_lotes(modelo, filas, ignore_conflicts):
+            creadas.extend(lote)
+        return creadas
+
+    def reconstruir_cuentas(self, condominio_ids=None):
+        """
+        Abre o corrige las cuentas de las unidades (como verificar_saldos --reparar)
+        y recalcula los resúmenes del dashboard de los condominios (por defecto, todos)
+        """
+        unidades = UnidadHabitacional.objects.order_by('id')
+        if condominio_ids is not None:
+            unidades = unidades.filter(condominio_id__in=condominio_ids)
+        ids = list(unidades.values_list('id', flat=True))
+        self.stdout.write(f"Reconstruyendo las cuentas de {len(ids)} unidades y los resúmenes...")
+        for desde in range(0, len(ids), self.batch_size):
+            with transaction.atomic():
+                cuentas.verificar(ids[desde:desde + self.batch_size], reparar=True)
+        if condominio_ids is None:
+            condominio_ids = list(Condominio.objects.order_by('id').values_list('id', flat=True))
+        # Por lotes, como refrescar_resumenes: cada uno bloquea sus resúmenes solo mientras se recalcula
+        for desde in range(0, len(condominio_ids), 100):
+            resumenes.refrescar(condominio_ids[desde:desde + 100])
+        while resumenes.plegar():
+            pass
+
+
+# ===================================
+# CARGA EN CRUDO (COPY)
+# ===================================
+
+class TablaCruda:
+    """
+    Columnas de un modelo y sus valores por defecto, para generar filas como
+    tuplas sin pasar por el ORM. Los campos auto_now/auto_now_add toman `ahora`.
+    """
+
+    def __init__(self, modelo, ahora, con_id=False):
+        self.modelo = modelo
+        self.campos = [
+            campo for campo in modelo._meta.concrete_fields
+            if con_id or not campo.primary_key
+        ]
+        self.columnas = [campo.column for campo in self.campos]
+        self.plantilla = []
+        for campo in self.campos:
+            if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False):
+                valor = ahora
+            elif campo.primary_key:
+                valor = None
+            else:
+                valor = campo.get_default()
+            self.plantilla.append((campo.attname, valor))
+
+    def fila(self, **valores):
+        """Tupla en el orden de las columnas; lo no indicado toma el valor por defecto"""
+        return tuple(valores.get(nombre, defecto) for nombre, defecto in self.plantilla)
+
+
+def _texto_copy(valor):
+    """Valor en el formato de texto de COPY (\\N para NULL, separadores escapados)"""
+    if valor is None:
+        return '\\N'
+    if valor is True:
+        return 't'
+    if valor is False:
+        return 'f'
+    if isinstance(valor, str):
+        return valor.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    return str(valor)
+
+
+class FlujoCopy:
+    """Archivo de solo lectura que va generando las líneas de COPY a medida que se leen"""
+
+    def __init__(self, filas):
+        self.filas = iter(filas)
+        self.pendiente = ''
+        self.total = 0
+
+    def read(self, size=-1):
+        partes = [self.pendiente]
+        largo = len(self.pendiente)
+        while size < 0 or largo < size:
+            fila = next(self.filas, None)
+            if fila is None:
+                break
+            linea = '\t'.join(map(_texto_copy, fila)) + '\n'
+            partes.append(linea)
+            largo += len(linea)
+            self.total += 1
+        datos = ''.join(partes)
+        if size < 0:
+            self.pendiente = ''
+            return datos
+        self.pendiente = datos[size:]
+        return datos[:size]
+
+
+def copiar_filas(tabla, filas, batch_size=5000):
+    """
+    Vuelca un iterable de tuplas (TablaCruda.fila) en la tabla del modelo y
+    devuelve cuántas filas escribió. En PostgreSQL usa un único COPY FROM STDIN
+    alimentado por el generador (psycopg2 o psycopg 3); en otros motores,
+    executemany por lotes.
+    """
+    meta = tabla.modelo._meta
+    columnas = ', '.join(connection.ops.quote_name(c) for c in tabla.columnas)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            sql = f"COPY {connection.ops.quote_name(meta.db_table)} ({columnas}) FROM STDIN"
+            flujo = FlujoCopy(filas)
+            if hasattr(cursor, 'copy_expert'):
+                # psycopg2
+                cursor.copy_expert(sql, flujo, size=256 * 1024)
+            else:
+                # psycopg 3
+                with cursor.copy(sql) as copia:
+                    while bloque := flujo.read(256 * 1024):
+                        copia.write(bloque)
+            return flujo.total
+
+        sql = (
+            f"INSERT INTO {connection.ops.quote_name(meta.db_table)} ({columnas}) "
+            f"VALUES ({', '.join(['%s'] * len(tabla.columnas))})"
+        )
+        total = 0
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, batch_size))
+            if not lote:
+                return total
+            cursor.executemany(sql, [
+                [campo.get_db_prep_save(valor, connection) for campo, valor in zip(tabla.campos, fila)]
+                for fila in lote
+            ])
+            total += len(lote)
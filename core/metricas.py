@@ -0,0 +1,298 @@
+# core/metricas.py
+"""
+Instrumentación por petición, agrupada por nombre de ruta (view_name) y método.
+
+MetricasMiddleware mide la latencia, las consultas SQL y su tiempo (con un
+execute_wrapper registrado con asincrono.instrumentar), el tiempo de serialización de DRF y el tamaño de
+la respuesta. Añade la cabecera Server-Timing, acumula un histograma en memoria
+desde que arrancó el proceso (uno por proceso; Prometheus calcula las tasas con
+rate()) que /api/admin/metrics/ expone en formato de texto de Prometheus junto
+con las estadísticas del pool de conexiones, y deja en el log las peticiones
+que superan el presupuesto de consultas o de latencia.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .asincrono import instrumentar
+
+logger = logging.getLogger('core.metricas')
+
+# Límites (segundos) de las cubetas del histograma de latencia
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIJO = 'smartcondominio'
+
+_medicion = ContextVar('medicion', default=None)
+# Por contexto y no en la medición: los bloques de en_paralelo() serializan a la vez
+_serializando = ContextVar('serializando', default=False)
+
+
+class MedidorConsultas:
+    """execute_wrapper que acumula cantidad de consultas y tiempo en base de datos"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+class Medicion:
+    """Datos de la petición en curso"""
+
+    def __init__(self):
+        self.consultas = MedidorConsultas()
+        self.serializacion = 0.0
+
+
+# ===================================
+# SERIALIZACIÓN
+# ===================================
+
+def _cronometrar_data(propiedad):
+    """Envuelve la propiedad .data de un serializer; solo cuenta la llamada más externa"""
+    def data(serializer):
+        medicion = _medicion.get()
+        if medicion is None or _serializando.get():
+            return propiedad.fget(serializer)
+        token = _serializando.set(True)
+        inicio = time.perf_counter()
+        try:
+            return propiedad.fget(serializer)
+        finally:
+            _serializando.reset(token)
+            medicion.serializacion += time.perf_counter() - inicio
+    data.cronometrada = True
+    return property(data, doc=propiedad.__doc__)
+
+
+def instrumentar_serializadores():
+    """Se llama una vez desde CoreConfig.ready()"""
+    from rest_framework import serializers
+
+    for clase in (serializers.BaseSerializer, serializers.Serializer, serializers.ListSerializer):
+        propiedad = clase.__dict__.get('data')
+        if propiedad is not None and not getattr(propiedad.fget, 'cronometrada', False):
+            clase.data = _cronometrar_data(propiedad)
+
+
+# ===================================
+# HISTOGRAMA ACUMULADO
+# ===================================
+
+class EstadisticaRuta:
+    __slots__ = ('cubetas', 'cantidad', 'latencia', 'consultas', 'tiempo_bd', 'serializacion', 'bytes', 'errores')
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_LATENCIA) + 1)
+        self.cantidad = 0
+        self.latencia = 0.0
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.serializacion = 0.0
+        self.bytes = 0
+        self.errores = 0
+
+    def sumar(self, otra):
+        for i, valor in enumerate(otra.cubetas):
+            self.cubetas[i] += valor
+        for campo in self.__slots__[1:]:
+            setattr(self, campo, getattr(self, campo) + getattr(otra, campo))
+
+
+class Histograma:
+    """Estadísticas por ruta desde que arrancó el proceso: solo crecen, como piden los contadores de Prometheus"""
+
+    def __init__(self):
+        self.rutas = {}
+        self.bloqueo = threading.Lock()
+
+    def registrar(self, clave, latencia, consultas, tiempo_bd, serializacion, tamano, error):
+        indice = next((i for i, limite in enumerate(LIMITES_LATENCIA) if latencia <= limite), len(LIMITES_LATENCIA))
+        with self.bloqueo:
+            estadistica = self.rutas.get(clave)
+            if estadistica is None:
+                estadistica = self.rutas[clave] = EstadisticaRuta()
+            estadistica.cubetas[indice] += 1
+            estadistica.cantidad += 1
+            estadistica.latencia += latencia
+            estadistica.consultas += consultas
+            estadistica.tiempo_bd += tiempo_bd
+            estadistica.serializacion += serializacion
+            estadistica.bytes += tamano
+            estadistica.errores += error
+
+    def agregado(self):
+        """Copia de {(vista, método): EstadisticaRuta}, para exportar sin retener el bloqueo"""
+        total = {}
+        with self.bloqueo:
+            for clave, estadistica in self.rutas.items():
+                total.setdefault(clave, EstadisticaRuta()).sumar(estadistica)
+        return total
+
+
+histograma = Histograma()
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def exportar_prometheus():
+    """Histograma acumulado en formato de texto de Prometheus (0.0.4)"""
+    datos = sorted(histograma.agregado().items())
+    lineas = [
+        f"# HELP {PREFIJO}_peticion_duracion_segundos Latencia por ruta (este proceso)",
+        f"# TYPE {PREFIJO}_peticion_duracion_segundos histogram",
+    ]
+    for (vista, metodo), e in datos:
+        etiquetas = f'vista="{_etiqueta(vista)}",metodo="{_etiqueta(metodo)}"'
+        acumulado = 0
+        for limite, cantidad in zip(LIMITES_LATENCIA + ('+Inf',), e.cubetas):
+            acumulado += cantidad
+            lineas.append(f'{PREFIJO}_peticion_duracion_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'{PREFIJO}_peticion_duracion_segundos_sum{{{etiquetas}}} {e.latencia:.6f}')
+        lineas.append(f'{PREFIJO}_peticion_duracion_segundos_count{{{etiquetas}}} {e.cantidad}')
+
+    acumulados = [
+        ('consultas_sql', 'Consultas SQL ejecutadas', 'consultas', '{}'),
+        ('tiempo_bd_segundos', 'Tiempo en base de datos', 'tiempo_bd', '{:.6f}'),
+        ('serializacion_segundos', 'Tiempo de serialización DRF', 'serializacion', '{:.6f}'),
+        ('respuesta_bytes', 'Bytes de respuesta (sin contar streaming)', 'bytes', '{}'),
+        ('errores', 'Respuestas con estado 5xx', 'errores', '{}'),
+    ]
+    for nombre, descripcion, campo, formato in acumulados:
+        lineas.append(f"# HELP {PREFIJO}_{nombre} {descripcion} por ruta (este proceso)")
+        lineas.append(f"# TYPE {PREFIJO}_{nombre} counter")
+        for (vista, metodo), e in datos:
+            valor = formato.format(getattr(e, campo))
+            lineas.append(f'{PREFIJO}_{nombre}{{vista="{_etiqueta(vista)}",metodo="{_etiqueta(metodo)}"}} {valor}')
+    lineas.extend(metricas_pool())
+    return '\n'.join(lineas) + '\n'
+
+
+# Estadísticas de psycopg_pool que solo crecen desde que arrancó el proceso; el resto son instantáneas
+CONTADORES_POOL = {
+    'requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors', 'returns_bad',
+    'connections_num', 'connections_ms', 'connections_errors', 'connections_lost', 'usage_ms',
+}
+
+
+def metricas_pool():
+    """Estadísticas de psycopg_pool de cada alias con pool, agrupadas por familia (un TYPE por métrica)"""
+    familias = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        ocupadas = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+        esperas = stats.get('requests_queued', 0)
+        derivadas = {
+            # Fracción del máximo en uso: cerca de 1 las peticiones empiezan a esperar
+            'saturacion': ocupadas / stats['pool_max'] if stats.get('pool_max') else 0,
+            'espera_media_ms': stats.get('requests_wait_ms', 0) / esperas if esperas else 0,
+        }
+        for clave, valor in list(stats.items()) + list(derivadas.items()):
+            familias.setdefault(clave, []).append((alias, valor))
+
+    lineas = []
+    for clave, muestras in familias.items():
+        nombre = f"{PREFIJO}_db_pool_{clave.removeprefix('pool_')}"
+        tipo = 'counter' if clave in CONTADORES_POOL else 'gauge'
+        lineas.append(f"# HELP {nombre} psycopg_pool {clave} ({'desde que arrancó el proceso' if tipo == 'counter' else 'actual'})")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for alias, valor in muestras:
+            valor = f"{valor:g}" if isinstance(valor, float) else valor
+            lineas.append(f'{nombre}{{alias="{_etiqueta(alias)}"}} {valor}')
+    return lineas
+
+
+# ===================================
+# MIDDLEWARE
+# ===================================
+
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.presupuesto_consultas = getattr(settings, 'METRICAS_PRESUPUESTO_CONSULTAS', 50)
+        self.presupuesto_ms = getattr(settings, 'METRICAS_PRESUPUESTO_MS', 1000)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with instrumentar(medicion.consultas):
+                response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with instrumentar(medicion.consultas):
+                response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    def registrar(self, request, response, medicion, latencia):
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia else 'sin_ruta'
+        if response.streaming:
+            tamano = int(response.get('Content-Length') or 0)
+        else:
+            tamano = len(response.content)
+        consultas = medicion.consultas
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={consultas.segundos * 1000:.1f};desc="{consultas.consultas} consultas"',
+            f'ser;dur={medicion.serializacion * 1000:.1f}',
+            f'total;dur={latencia * 1000:.1f}',
+        ])
+
+        histograma.registrar(
+            (vista, request.method), latencia, consultas.consultas, consultas.segundos,
+            medicion.serializacion, tamano, int(response.status_code >= 500),
+        )
+
+        if consultas.consultas > self.presupuesto_consultas or latencia * 1000 > self.presupuesto_ms:
+            logger.warning(
+                "Petición fuera de presupuesto: %s %s (%s) %.0f ms, %d consultas, %.0f ms en BD",
+                request.method, request.path, vista, latencia * 1000, consultas.consultas, consultas.segundos * 1000,
+                extra={
+                    'vista': vista,
+                    'metodo': request.method,
+                    'ruta': request.path,
+                    'estado': response.status_code,
+                    'latencia_ms': round(latencia * 1000, 1),
+                    'consultas': consultas.consultas,
+                    'tiempo_bd_ms': round(consultas.segundos * 1000, 1),
+                    'serializacion_ms': round(medicion.serializacion * 1000, 1),
+                    'bytes': tamano,
+                },
+            )
+        return response
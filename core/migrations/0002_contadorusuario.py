@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorUsuario',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('notificaciones_no_leidas', models.IntegerField(default=0)),
+                ('notificaciones_urgentes', models.IntegerField(default=0)),
+                ('notificaciones_pago', models.IntegerField(default=0)),
+                ('notificaciones_seguridad', models.IntegerField(default=0)),
+                ('notificaciones_reserva', models.IntegerField(default=0)),
+                ('notificaciones_comunicado', models.IntegerField(default=0)),
+                ('notificaciones_mantenimiento', models.IntegerField(default=0)),
+                ('notificaciones_sistema', models.IntegerField(default=0)),
+                ('ultima_notificacion', models.DateTimeField(blank=True, null=True)),
+                ('comunicados_no_leidos', models.IntegerField(default=0)),
+                ('comunicados_urgentes', models.IntegerField(default=0)),
+                ('ultimo_comunicado', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'contador_usuario',
+            },
+        ),
+    ]
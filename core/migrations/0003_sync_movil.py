@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_contadorusuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroEliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('notificacion', 'Notificación'), ('comunicado', 'Comunicado'), ('factura', 'Factura'), ('reserva', 'Reserva')], max_length=30)),
+                ('objeto_id', models.BigIntegerField()),
+                ('eliminado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'registro_eliminacion',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='comunicado',
+            index=models.Index(fields=['updated_at'], name='comunicado_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comunicadoleido',
+            index=models.Index(fields=['usuario', 'fecha_leido'], name='comunicadoleido_usr_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['unidad_habitacional', 'updated_at'], name='factura_unidad_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'updated_at'], name='notificacion_usr_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['usuario', 'updated_at'], name='reserva_usuario_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='registroeliminacion',
+            name='unidad_habitacional',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.unidadhabitacional'),
+        ),
+        migrations.AddField(
+            model_name='registroeliminacion',
+            name='usuario',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='registroeliminacion',
+            index=models.Index(fields=['modelo', 'eliminado_en'], name='eliminacion_modelo_fecha_idx'),
+        ),
+    ]
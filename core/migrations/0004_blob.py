@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_sync_movil'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(default='application/octet-stream', max_length=100)),
+                ('tamano', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'blob',
+            },
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='foto_perfil_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.blob'),
+        ),
+        migrations.AddField(
+            model_name='registroacceso',
+            name='foto_evidencia_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.blob'),
+        ),
+        migrations.AddField(
+            model_name='visitante',
+            name='foto_entrada_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.blob'),
+        ),
+        migrations.AddField(
+            model_name='visitante',
+            name='foto_salida_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.blob'),
+        ),
+        migrations.AddField(
+            model_name='incidenteseguridad',
+            name='evidencia_foto_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.blob'),
+        ),
+    ]
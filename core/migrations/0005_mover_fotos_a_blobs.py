@@ -0,0 +1,71 @@
+# Copia las imágenes base64 guardadas en columnas de texto al almacén de blobs.
+# Se procesa por lotes (cada uno en su propia transacción) para no cargar
+# todas las imágenes en memoria ni bloquear las tablas durante toda la migración.
+
+from django.db import migrations, transaction
+
+from core import blobs
+
+TAMANO_LOTE = 200
+
+CAMPOS = [
+    ('Usuario', 'foto_perfil'),
+    ('RegistroAcceso', 'foto_evidencia'),
+    ('Visitante', 'foto_entrada'),
+    ('Visitante', 'foto_salida'),
+    ('IncidenteSeguridad', 'evidencia_foto'),
+]
+
+
+def mover_fotos(apps, schema_editor):
+    Blob = apps.get_model('core', 'Blob')
+    for nombre_modelo, campo in CAMPOS:
+        Modelo = apps.get_model('core', nombre_modelo)
+        referencia = f'{campo}_blob'
+        pendientes = Modelo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''}).order_by('pk')
+        ultimo = None
+        while True:
+            lote = pendientes if ultimo is None else pendientes.filter(pk__gt=ultimo)
+            filas = list(lote.values_list('pk', campo)[:TAMANO_LOTE])
+            if not filas:
+                break
+            ultimo = filas[-1][0]
+
+            nuevos = {}
+            asignaciones = {}
+            for pk, valor in filas:
+                try:
+                    datos, content_type = blobs.decodificar_base64(valor)
+                except ValueError:
+                    continue  # Valor corrupto: se descarta igual que al eliminar la columna
+                sha256 = blobs.escribir_archivo(datos)
+                nuevos.setdefault(sha256, Blob(sha256=sha256, content_type=content_type, tamano=len(datos)))
+                asignaciones.setdefault(sha256, []).append(pk)
+
+            with transaction.atomic():
+                Blob.objects.bulk_create(nuevos.values(), ignore_conflicts=True)
+                for sha256, pks in asignaciones.items():
+                    Modelo.objects.filter(pk__in=pks).update(**{f'{referencia}_id': sha256})
+
+
+def restaurar_fotos(apps, schema_editor):
+    Blob = apps.get_model('core', 'Blob')
+    for nombre_modelo, campo in CAMPOS:
+        Modelo = apps.get_model('core', nombre_modelo)
+        referencia = f'{campo}_blob'
+        tipos = dict(Blob.objects.values_list('sha256', 'content_type'))
+        filas = Modelo.objects.filter(**{f'{referencia}__isnull': False}).values_list('pk', f'{referencia}_id')
+        for pk, sha256 in filas.iterator(chunk_size=TAMANO_LOTE):
+            Modelo.objects.filter(pk=pk).update(**{campo: blobs.leer_base64(sha256, tipos[sha256])})
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0004_blob'),
+    ]
+
+    operations = [
+        migrations.RunPython(mover_fotos, restaurar_fotos),
+    ]
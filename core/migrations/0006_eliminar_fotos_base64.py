@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_mover_fotos_a_blobs'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='usuario',
+            name='foto_perfil',
+        ),
+        migrations.RemoveField(
+            model_name='registroacceso',
+            name='foto_evidencia',
+        ),
+        migrations.RemoveField(
+            model_name='visitante',
+            name='foto_entrada',
+        ),
+        migrations.RemoveField(
+            model_name='visitante',
+            name='foto_salida',
+        ),
+        migrations.RemoveField(
+            model_name='incidenteseguridad',
+            name='evidencia_foto',
+        ),
+        migrations.RenameField(
+            model_name='usuario',
+            old_name='foto_perfil_blob',
+            new_name='foto_perfil',
+        ),
+        migrations.RenameField(
+            model_name='registroacceso',
+            old_name='foto_evidencia_blob',
+            new_name='foto_evidencia',
+        ),
+        migrations.RenameField(
+            model_name='visitante',
+            old_name='foto_entrada_blob',
+            new_name='foto_entrada',
+        ),
+        migrations.RenameField(
+            model_name='visitante',
+            old_name='foto_salida_blob',
+            new_name='foto_salida',
+        ),
+        migrations.RenameField(
+            model_name='incidenteseguridad',
+            old_name='evidencia_foto_blob',
+            new_name='evidencia_foto',
+        ),
+    ]
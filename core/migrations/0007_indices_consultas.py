@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_eliminar_fotos_base64'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=models.Index(fields=['-created_at'], name='bitacora_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['unidad_habitacional', 'estado', '-fecha_emision'], name='factura_unidad_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('estado__in', ['pendiente', 'vencida'])), fields=['unidad_habitacional', '-fecha_emision'], name='factura_unidad_deuda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidenteseguridad',
+            index=models.Index(fields=['-fecha_hora', 'gravedad'], name='incidente_fecha_gravedad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', '-fecha_envio'], name='notificacion_usr_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'leida', '-fecha_envio'], name='notificacion_usr_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroacceso',
+            index=models.Index(fields=['metodo', '-fecha_hora'], name='registroacceso_metodo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroacceso',
+            index=models.Index(fields=['-fecha_hora'], name='registroacceso_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['area_comun', 'fecha_reserva', 'estado'], name='reserva_area_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuariounidad',
+            index=models.Index(fields=['usuario', 'fecha_fin'], name='usuariounidad_usr_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuariounidad',
+            index=models.Index(condition=models.Q(('fecha_fin__isnull', True)), fields=['unidad', 'usuario'], name='usuariounidad_activa_idx'),
+        ),
+    ]
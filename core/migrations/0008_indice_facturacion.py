@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['concepto_cobro', 'periodo'], name='factura_concepto_periodo_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_indice_facturacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['referencia_pago'], name='pago_referencia_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:12
+
+# Crea el libro de cuentas por unidad y abre la cuenta de cada unidad existente
+# con un movimiento de apertura calculado desde sus facturas y pagos.
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+TAMANO_LOTE = 1000
+
+
+def abrir_cuentas(apps, schema_editor):
+    UnidadHabitacional = apps.get_model('core', 'UnidadHabitacional')
+    Factura = apps.get_model('core', 'Factura')
+    Pago = apps.get_model('core', 'Pago')
+    SaldoUnidad = apps.get_model('core', 'SaldoUnidad')
+    MovimientoCuenta = apps.get_model('core', 'MovimientoCuenta')
+
+    ids = list(UnidadHabitacional.objects.order_by('pk').values_list('pk', flat=True))
+    abiertas = Q(estado__in=['pendiente', 'vencida'])
+    for inicio in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[inicio:inicio + TAMANO_LOTE]
+        valores = {uid: {'total_facturado': 0, 'total_pagado': 0, 'saldo': 0, 'facturas_pendientes': 0} for uid in lote}
+        for fila in Factura.objects.filter(unidad_habitacional_id__in=lote).values('unidad_habitacional_id').annotate(
+            facturado=Sum('monto'), pendiente=Sum('monto', filter=abiertas), pendientes=Count('id', filter=abiertas)
+        ).order_by():
+            valores[fila['unidad_habitacional_id']].update(
+                total_facturado=fila['facturado'], saldo=fila['pendiente'] or 0, facturas_pendientes=fila['pendientes']
+            )
+        for fila in Pago.objects.filter(factura__unidad_habitacional_id__in=lote, estado='completado').values(
+            'factura__unidad_habitacional_id'
+        ).annotate(pagado=Sum('monto')).order_by():
+            valores[fila['factura__unidad_habitacional_id']]['total_pagado'] = fila['pagado']
+
+        SaldoUnidad.objects.bulk_create([SaldoUnidad(unidad_habitacional_id=uid, **v) for uid, v in valores.items()])
+        MovimientoCuenta.objects.bulk_create([
+            MovimientoCuenta(unidad_habitacional_id=uid, tipo='apertura', saldo_resultante=v['saldo'], **v)
+            for uid, v in valores.items() if any(v.values())
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_indice_referencia_pago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoUnidad',
+            fields=[
+                ('unidad_habitacional', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo_cuenta', serialize=False, to='core.unidadhabitacional')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('facturas_pendientes', models.IntegerField(default=0)),
+                ('total_facturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MovimientoCuenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('apertura', 'Apertura'), ('factura_emitida', 'Factura emitida'), ('factura_modificada', 'Factura modificada'), ('factura_eliminada', 'Factura eliminada'), ('pago_registrado', 'Pago registrado'), ('pago_modificado', 'Pago modificado'), ('pago_eliminado', 'Pago eliminado'), ('correccion', 'Corrección')], max_length=30)),
+                ('total_facturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('facturas_pendientes', models.IntegerField(default=0)),
+                ('saldo_resultante', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('factura', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.factura')),
+                ('pago', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.pago')),
+                ('unidad_habitacional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_cuenta', to='core.unidadhabitacional')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['unidad_habitacional', 'id'], name='movimiento_unidad_idx')],
+            },
+        ),
+        migrations.RunPython(abrir_cuentas, migrations.RunPython.noop),
+    ]
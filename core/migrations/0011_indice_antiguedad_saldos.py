@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_libro_cuentas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('estado__in', ['pendiente', 'vencida'])), fields=['unidad_habitacional', 'fecha_vencimiento'], include=('monto',), name='factura_antiguedad_idx'),
+        ),
+    ]
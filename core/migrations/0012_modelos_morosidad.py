@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_indice_antiguedad_saldos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModeloIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('version', models.CharField(max_length=50)),
+                ('descripcion', models.TextField(blank=True, null=True)),
+                ('precision', models.DecimalField(blank=True, decimal_places=4, max_digits=5, null=True)),
+                ('fecha_entrenamiento', models.DateField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('activo', 'Activo'), ('inactivo', 'Inactivo'), ('entrenando', 'Entrenando'), ('error', 'Error')], default='inactivo', max_length=20)),
+                ('parametros', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PrediccionMorosidad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_morosidad', models.DecimalField(decimal_places=4, max_digits=5)),
+                ('fecha_prediccion', models.DateField()),
+                ('periodo_predicho', models.DateField()),
+                ('variables_utilizadas', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modelo_ia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.modeloia')),
+                ('unidad_habitacional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.unidadhabitacional')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['modelo_ia', 'periodo_predicho', '-score_morosidad'], name='prediccion_ranking_idx')],
+                'constraints': [models.UniqueConstraint(fields=('modelo_ia', 'periodo_predicho', 'unidad_habitacional'), name='prediccion_modelo_periodo_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:34
+
+# Crea los resúmenes del dashboard y los calcula para los condominios existentes
+# desde los saldos por unidad y las relaciones UsuarioUnidad activas.
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+CAMPOS = ('total_facturado', 'total_pagado', 'saldo', 'facturas_pendientes')
+
+
+def calcular_resumenes(apps, schema_editor):
+    Condominio = apps.get_model('core', 'Condominio')
+    SaldoUnidad = apps.get_model('core', 'SaldoUnidad')
+    UsuarioUnidad = apps.get_model('core', 'UsuarioUnidad')
+    ResumenCondominio = apps.get_model('core', 'ResumenCondominio')
+    ResumenUsuariosCondominio = apps.get_model('core', 'ResumenUsuariosCondominio')
+
+    ahora = timezone.now()
+    sumas = {
+        fila.pop('unidad_habitacional__condominio_id'): fila
+        for fila in SaldoUnidad.objects.values('unidad_habitacional__condominio_id').annotate(
+            **{campo: Sum(campo) for campo in CAMPOS}
+        ).order_by()
+    }
+    ResumenCondominio.objects.bulk_create([
+        ResumenCondominio(
+            condominio_id=condominio_id, refrescado_en=ahora,
+            **{campo: sumas.get(condominio_id, {}).get(campo) or 0 for campo in CAMPOS},
+        )
+        for condominio_id in Condominio.objects.values_list('pk', flat=True)
+    ], batch_size=1000)
+    ResumenUsuariosCondominio.objects.bulk_create([
+        ResumenUsuariosCondominio(condominio_id=condominio_id, tipo=tipo, total=total)
+        for condominio_id, tipo, total in UsuarioUnidad.objects.filter(fecha_fin__isnull=True).values_list(
+            'unidad__condominio_id', 'usuario__tipo'
+        ).annotate(total=Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_claves_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCondominio',
+            fields=[
+                ('condominio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='core.condominio')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('facturas_pendientes', models.IntegerField(default=0)),
+                ('total_facturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refrescado_en', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenUsuariosCondominio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_usuarios', to='core.condominio')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('condominio', 'tipo'), name='resumen_usuarios_tipo_uniq')],
+            },
+        ),
+        migrations.RunPython(calcular_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_resumenes_condominio'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('estado__in', ['pendiente', 'vencida'])), fields=['fecha_vencimiento'], include=('estado',), name='factura_vencimiento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(condition=models.Q(('estado', 'completado')), fields=['fecha_pago'], include=('monto',), name='pago_fecha_idx'),
+        ),
+    ]
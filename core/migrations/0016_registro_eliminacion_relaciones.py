@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_indices_series'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registroeliminacion',
+            name='modelo',
+            field=models.CharField(choices=[('notificacion', 'Notificación'), ('comunicado', 'Comunicado'), ('factura', 'Factura'), ('reserva', 'Reserva'), ('usuario_unidad', 'Relación usuario-unidad')], max_length=30),
+        ),
+    ]
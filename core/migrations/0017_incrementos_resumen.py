@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_registro_eliminacion_relaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncrementoResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(blank=True, default='', max_length=20)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('facturas_pendientes', models.IntegerField(default=0)),
+                ('total_facturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('usuarios', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incrementos_resumen', to='core.condominio')),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_incrementos_resumen'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='factura',
+            name='factura_unidad_deuda_idx',
+        ),
+        migrations.AlterField(
+            model_name='factura',
+            name='unidad_habitacional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.unidadhabitacional'),
+        ),
+        migrations.AlterField(
+            model_name='notificacion',
+            name='usuario',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
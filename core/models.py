@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.exceptions import ValidationError
+from django.db import transaction
 
 class UsuarioManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -96,6 +97,11 @@ class UsuarioUnidad(models.Model):
     class Meta:
         unique_together = ('usuario', 'unidad', 'tipo_relacion')
         db_table = 'usuario_unidad'
+        indexes = [
+            # Unidades activas de un usuario (fecha_fin IS NULL) y usuarios activos de una unidad
+            models.Index(fields=['usuario', 'fecha_fin'], name='usuariounidad_usr_fin_idx'),
+            models.Index(fields=['unidad', 'usuario'], name='usuariounidad_activa_idx', condition=models.Q(fecha_fin__isnull=True)),
+        ]
 
     def __str__(self):
         return f"{self.usuario} - {self.unidad} ({self.get_tipo_relacion_display()})"
@@ -139,7 +145,7 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
 
     token_notificacion = models.CharField(max_length=255, blank=True, null=True)
-    foto_perfil = models.TextField(blank=True, null=True)
+    foto_perfil = models.ForeignKey('Blob', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     datos_faciales = models.TextField(blank=True, null=True)
 
     is_active = models.BooleanField(default=True)
@@ -247,7 +253,8 @@ class Factura(models.Model):
         ('cancelada', 'Cancelada'),
     ]
 
-    unidad_habitacional = models.ForeignKey('UnidadHabitacional', on_delete=models.CASCADE)
+    # Sin índice propio: lo cubren los índices de Meta que empiezan por la unidad
+    unidad_habitacional = models.ForeignKey('UnidadHabitacional', on_delete=models.CASCADE, db_index=False)
     concepto_cobro = models.ForeignKey('ConceptoCobro', on_delete=models.PROTECT)
     monto = models.DecimalField(max_digits=10, decimal_places=2)
     fecha_emision = models.DateField()
@@ -259,9 +266,33 @@ class Factura(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['unidad_habitacional', 'updated_at'], name='factura_unidad_updated_idx'),
+            # Facturas de las unidades del usuario por estado y fecha (cuotas, dashboard)
+            models.Index(fields=['unidad_habitacional', 'estado', '-fecha_emision'], name='factura_unidad_estado_idx'),
+            # Lo ya facturado de un concepto en un periodo (emisión masiva, core/facturacion.py)
+            models.Index(fields=['concepto_cobro', 'periodo'], name='factura_concepto_periodo_idx'),
+            # Antigüedad de saldos por unidad (core/cuentas.py): cubre la consulta sin leer la tabla
+            models.Index(
+                fields=['unidad_habitacional', 'fecha_vencimiento'], include=['monto'],
+                name='factura_antiguedad_idx', condition=models.Q(estado__in=['pendiente', 'vencida'])
+            ),
+            # Morosidad por cubeta de vencimiento (core/series.py)
+            models.Index(
+                fields=['fecha_vencimiento'], include=['estado'],
+                name='factura_vencimiento_idx', condition=models.Q(estado__in=['pendiente', 'vencida'])
+            ),
+        ]
+
     def __str__(self):
         return f"Factura #{self.id} - {self.unidad_habitacional}"
 
+    def save(self, *args, **kwargs):
+        # El libro de cuentas (core/cuentas.py) se escribe en post_save: misma transacción
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 class Pago(models.Model):
     METODO_PAGO_CHOICES = [
         ('tarjeta', 'Tarjeta'),
@@ -287,9 +318,178 @@ class Pago(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Referencias ya registradas al conciliar extractos (core/conciliacion.py)
+            models.Index(fields=['referencia_pago'], name='pago_referencia_idx'),
+            # Ingresos por cubeta de fecha (core/series.py): la cubeta abierta sin leer la tabla
+            models.Index(
+                fields=['fecha_pago'], include=['monto'],
+                name='pago_fecha_idx', condition=models.Q(estado='completado')
+            ),
+        ]
+
     def __str__(self):
         return f"Pago #{self.id} - {self.metodo_pago} - {self.estado}"
 
+    def save(self, *args, **kwargs):
+        # El libro de cuentas (core/cuentas.py) se escribe en post_save: misma transacción
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+# ===================================
+# IDEMPOTENCIA (core/idempotencia.py)
+# ===================================
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta de una petición POST con encabezado Idempotency-Key: los reintentos
+    con la misma clave la reciben otra vez en lugar de repetir la operación
+    """
+    usuario = models.ForeignKey('Usuario', on_delete=models.CASCADE, related_name='+')
+    clave = models.CharField(max_length=255)
+    ruta = models.CharField(max_length=255)
+    huella = models.CharField(max_length=64)  # SHA-256 de la ruta y el cuerpo
+    estado_http = models.PositiveSmallIntegerField(null=True, blank=True)
+    respuesta = models.TextField(blank=True, null=True)  # JSON como TEXT
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'clave_idempotencia'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'clave'], name='idempotencia_usuario_clave_uniq'),
+        ]
+        indexes = [
+            # Purga por antigüedad (purgar_idempotencia)
+            models.Index(fields=['created_at'], name='idempotencia_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} ({self.ruta})"
+
+
+# ===================================
+# CUENTAS POR UNIDAD
+# ===================================
+
+class MovimientoCuenta(models.Model):
+    """
+    Libro de cuentas por unidad, de solo inserción (ver core/cuentas.py). Cada fila
+    es el efecto de una escritura de Factura o Pago sobre los acumulados de la
+    unidad; su suma por unidad coincide con SaldoUnidad.
+    """
+    TIPO_CHOICES = [
+        ('apertura', 'Apertura'),
+        ('factura_emitida', 'Factura emitida'),
+        ('factura_modificada', 'Factura modificada'),
+        ('factura_eliminada', 'Factura eliminada'),
+        ('pago_registrado', 'Pago registrado'),
+        ('pago_modificado', 'Pago modificado'),
+        ('pago_eliminado', 'Pago eliminado'),
+        ('correccion', 'Corrección'),
+    ]
+
+    unidad_habitacional = models.ForeignKey('UnidadHabitacional', on_delete=models.CASCADE, related_name='movimientos_cuenta')
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    # Sin FK real: el libro conserva los movimientos de facturas y pagos borrados
+    factura = models.ForeignKey('Factura', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    pago = models.ForeignKey('Pago', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+
+    # Variación de cada acumulado de SaldoUnidad
+    total_facturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    facturas_pendientes = models.IntegerField(default=0)
+    saldo_resultante = models.DecimalField(max_digits=14, decimal_places=2)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['unidad_habitacional', 'id'], name='movimiento_unidad_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.saldo:+} - unidad #{self.unidad_habitacional_id}"
+
+
+class SaldoUnidad(models.Model):
+    """
+    Acumulados de la cuenta de una unidad, materializados desde MovimientoCuenta:
+    deuda (facturas pendientes o vencidas), total facturado y total pagado
+    (pagos completados). Se comprueban con el comando verificar_saldos.
+    """
+    unidad_habitacional = models.OneToOneField('UnidadHabitacional', on_delete=models.CASCADE, primary_key=True, related_name='saldo_cuenta')
+
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    facturas_pendientes = models.IntegerField(default=0)
+    total_facturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Saldo unidad #{self.unidad_habitacional_id}: {self.saldo}"
+
+
+# ===================================
+# RESUMEN POR CONDOMINIO (DASHBOARD)
+# ===================================
+
+class ResumenCondominio(models.Model):
+    """
+    Hechos del dashboard de administración: la suma de los SaldoUnidad de las
+    unidades del condominio, sin los IncrementoResumen todavía sin plegar. Se
+    pliega y se recalcula con el comando refrescar_resumenes (ver core/resumenes.py).
+    """
+    condominio = models.OneToOneField('Condominio', on_delete=models.CASCADE, primary_key=True, related_name='resumen')
+
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    facturas_pendientes = models.IntegerField(default=0)
+    total_facturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    refrescado_en = models.DateTimeField(null=True, blank=True)  # Último recálculo completo
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Resumen condominio #{self.condominio_id}"
+
+class ResumenUsuariosCondominio(models.Model):
+    """Relaciones UsuarioUnidad activas del condominio por tipo de usuario"""
+    condominio = models.ForeignKey('Condominio', on_delete=models.CASCADE, related_name='resumen_usuarios')
+    tipo = models.CharField(max_length=20)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['condominio', 'tipo'], name='resumen_usuarios_tipo_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.condominio_id} - {self.tipo}: {self.total}"
+
+class IncrementoResumen(models.Model):
+    """
+    Variación de los resúmenes de un condominio pendiente de plegar: solo
+    inserción, así las escrituras concurrentes del condominio no esperan por la
+    fila de ResumenCondominio. tipo vacío: cuentas; si no, usuarios de ese tipo.
+    """
+    condominio = models.ForeignKey('Condominio', on_delete=models.CASCADE, related_name='incrementos_resumen')
+    tipo = models.CharField(max_length=20, blank=True, default='')
+
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    facturas_pendientes = models.IntegerField(default=0)
+    total_facturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    usuarios = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Incremento #{self.pk} del condominio #{self.condominio_id}"
+
 # ===================================
 # COMUNICACIÓN
 # ===================================
@@ -321,6 +521,11 @@ class Comunicado(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='comunicado_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.titulo} ({self.get_prioridad_display()})"
 
@@ -342,6 +547,9 @@ class ComunicadoLeido(models.Model):
 
     class Meta:
         unique_together = ('comunicado', 'usuario')
+        indexes = [
+            models.Index(fields=['usuario', 'fecha_leido'], name='comunicadoleido_usr_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.usuario} leyó {self.comunicado} el {self.fecha_leido}"
@@ -374,18 +582,94 @@ class Notificacion(models.Model):
     enviada = models.BooleanField(default=False)
     leida = models.BooleanField(default=False)
 
-    usuario = models.ForeignKey('Usuario', on_delete=models.SET_NULL, null=True, blank=True)
+    # Sin índice propio: lo cubren los índices de Meta que empiezan por el usuario
+    usuario = models.ForeignKey('Usuario', on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     unidad_habitacional = models.ForeignKey('UnidadHabitacional', on_delete=models.SET_NULL, null=True, blank=True)
 
     relacion_con_id = models.IntegerField(blank=True, null=True)
     tipo_relacion = models.CharField(max_length=50, blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'updated_at'], name='notificacion_usr_updated_idx'),
+            # Bandeja del usuario (últimos 30 días) y no leídas más recientes
+            models.Index(fields=['usuario', '-fecha_envio'], name='notificacion_usr_fecha_idx'),
+            models.Index(fields=['usuario', 'leida', '-fecha_envio'], name='notificacion_usr_leida_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.tipo}"
 
 
+# ===================================
+# SINCRONIZACIÓN Y CONTADORES (MÓVIL)
+# ===================================
+
+class RegistroEliminacion(models.Model):
+    """
+    Registro de borrados (tombstones) para la sincronización incremental móvil.
+    Se alimenta con señales post_delete (ver core/signals.py).
+    """
+    MODELO_CHOICES = [
+        ('notificacion', 'Notificación'),
+        ('comunicado', 'Comunicado'),
+        ('factura', 'Factura'),
+        ('reserva', 'Reserva'),
+        # El usuario dejó la unidad: su próxima sincronización es completa
+        ('usuario_unidad', 'Relación usuario-unidad'),
+    ]
+
+    modelo = models.CharField(max_length=30, choices=MODELO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    # Alcance del borrado (sin FK real: el objeto ya no existe)
+    usuario = models.ForeignKey('Usuario', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    unidad_habitacional = models.ForeignKey('UnidadHabitacional', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    eliminado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'registro_eliminacion'
+        indexes = [
+            models.Index(fields=['modelo', 'eliminado_en'], name='eliminacion_modelo_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id} eliminado el {self.eliminado_en}"
+
+
+class ContadorUsuario(models.Model):
+    """
+    Contadores de no leídos por usuario, mantenidos por las vistas que crean
+    o marcan como leídos notificaciones y comunicados (ver core/contadores.py).
+    Se reconstruyen con el comando reparar_contadores.
+    """
+    usuario = models.OneToOneField('Usuario', on_delete=models.CASCADE, primary_key=True, related_name='contador')
+
+    notificaciones_no_leidas = models.IntegerField(default=0)
+    notificaciones_urgentes = models.IntegerField(default=0)
+    notificaciones_pago = models.IntegerField(default=0)
+    notificaciones_seguridad = models.IntegerField(default=0)
+    notificaciones_reserva = models.IntegerField(default=0)
+    notificaciones_comunicado = models.IntegerField(default=0)
+    notificaciones_mantenimiento = models.IntegerField(default=0)
+    notificaciones_sistema = models.IntegerField(default=0)
+    ultima_notificacion = models.DateTimeField(blank=True, null=True)
+
+    comunicados_no_leidos = models.IntegerField(default=0)
+    comunicados_urgentes = models.IntegerField(default=0)
+    ultimo_comunicado = models.DateTimeField(blank=True, null=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'contador_usuario'
+
+    def __str__(self):
+        return f"Contadores de {self.usuario_id}"
+
+
 class AreaComun(models.Model):
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
@@ -423,6 +707,13 @@ class Reserva(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'updated_at'], name='reserva_usuario_updated_idx'),
+            # Disponibilidad de un área en una fecha
+            models.Index(fields=['area_comun', 'fecha_reserva', 'estado'], name='reserva_area_fecha_idx'),
+        ]
+
     def clean(self):
         if self.hora_fin <= self.hora_inicio:
             raise ValidationError("La hora de fin debe ser mayor que la hora de inicio.")
@@ -504,6 +795,28 @@ class MantenimientoPreventivo(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+# ===================================
+# ALMACÉN DE IMÁGENES
+# ===================================
+
+class Blob(models.Model):
+    """
+    Imagen guardada fuera de la base de datos (ver core/blobs.py).
+    El archivo vive en BLOB_STORAGE_ROOT y se identifica por su sha256,
+    así que el mismo contenido se guarda una sola vez.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=100, default='application/octet-stream')
+    tamano = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'blob'
+
+    def __str__(self):
+        return f"{self.sha256} ({self.content_type}, {self.tamano} bytes)"
+
+
 # ===================================
 # SEGURIDAD CON IA - MODELOS FALTANTES
 # ===================================
@@ -548,12 +861,19 @@ class RegistroAcceso(models.Model):
     direccion = models.CharField(max_length=10, choices=DIRECCION_CHOICES)
     metodo = models.CharField(max_length=20, choices=METODO_CHOICES)
     fecha_hora = models.DateTimeField(auto_now_add=True)
-    foto_evidencia = models.TextField(blank=True, null=True)
+    foto_evidencia = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     reconocimiento_exitoso = models.BooleanField(default=False)
     confidence_score = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Estadísticas y últimos accesos por método (reconocimiento facial)
+            models.Index(fields=['metodo', '-fecha_hora'], name='registroacceso_metodo_idx'),
+            models.Index(fields=['-fecha_hora'], name='registroacceso_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"{self.get_direccion_display()} - {self.get_metodo_display()} - {self.fecha_hora}"
 
@@ -566,8 +886,8 @@ class Visitante(models.Model):
     anfitrion = models.ForeignKey(Usuario, on_delete=models.CASCADE)
     fecha_entrada = models.DateTimeField(auto_now_add=True)
     fecha_salida = models.DateTimeField(null=True, blank=True)
-    foto_entrada = models.TextField(blank=True, null=True)
-    foto_salida = models.TextField(blank=True, null=True)
+    foto_entrada = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    foto_salida = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     placa_vehiculo = models.CharField(max_length=20, blank=True, null=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -608,7 +928,7 @@ class IncidenteSeguridad(models.Model):
     fecha_hora = models.DateTimeField(auto_now_add=True)
     gravedad = models.CharField(max_length=10, choices=GRAVEDAD_CHOICES, default='media')
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
-    evidencia_foto = models.TextField(blank=True, null=True)
+    evidencia_foto = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     evidencia_video = models.TextField(blank=True, null=True)
     confidence_score = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True)
     usuario_reporta = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='incidentes_reportados')
@@ -617,10 +937,19 @@ class IncidenteSeguridad(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Alertas recientes por gravedad y listado ordenado por fecha
+            models.Index(fields=['-fecha_hora', 'gravedad'], name='incidente_fecha_gravedad_idx'),
+        ]
+
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.fecha_hora}"
 
-"""
+# ===================================
+# RIESGO DE MOROSIDAD (core/morosidad.py)
+# ===================================
+
 class ModeloIA(models.Model):
     ESTADO_CHOICES = [
         ('activo', 'Activo'),
@@ -632,10 +961,11 @@ class ModeloIA(models.Model):
     nombre = models.CharField(max_length=100)
     version = models.CharField(max_length=50)
     descripcion = models.TextField(blank=True, null=True)
-    precision = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True)
+    precision = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True)  # AUC en validación
     fecha_entrenamiento = models.DateField(null=True, blank=True)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='inactivo')
-    
+    parametros = models.TextField(blank=True, null=True)  # JSON como TEXT: variables, escalado, coeficientes, métricas
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -649,12 +979,25 @@ class PrediccionMorosidad(models.Model):
     fecha_prediccion = models.DateField()
     periodo_predicho = models.DateField()  # Mes/Año predicho (usar día 01)
     variables_utilizadas = models.TextField(blank=True, null=True)  # JSON como TEXT
-    
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # Una predicción por unidad, modelo y mes: la puntuación mensual es incremental
+            models.UniqueConstraint(
+                fields=['modelo_ia', 'periodo_predicho', 'unidad_habitacional'], name='prediccion_modelo_periodo_uniq'
+            ),
+        ]
+        indexes = [
+            # Ranking de riesgo del mes (endpoint morosidad/predicciones/)
+            models.Index(fields=['modelo_ia', 'periodo_predicho', '-score_morosidad'], name='prediccion_ranking_idx'),
+        ]
+
     def __str__(self):
         return f"Predicción {self.unidad_habitacional} - {self.score_morosidad}"
 
+"""
 class ConfiguracionSistema(models.Model):
     clave = models.CharField(max_length=100, unique=True)
     valor = models.TextField(blank=True, null=True)
@@ -678,6 +1021,11 @@ class Bitacora(models.Model):  # Nombre simplificado como solicitaste
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='bitacora_created_idx'),
+        ]
+
     def __str__(self):
         usuario_nombre = self.usuario.nombre if self.usuario else "Sistema"
         return f"{usuario_nombre} - {self.accion} - {self.created_at}"
@@ -0,0 +1,332 @@
+# core/morosidad.py
+"""
+Riesgo de morosidad por unidad (ModeloIA / PrediccionMorosidad).
+
+variables() arma el historial de pago de cada unidad a una fecha de corte:
+solo facturas emitidas y pagos registrados antes del corte, de los últimos
+MESES_HISTORIAL meses. Son dos columnas de fechas por factura (vencimiento y
+primer pago) traídas en una consulta y procesadas en una pasada vectorizada
+de pandas: días de atraso, proporción pagada y a tiempo, rachas de atraso,
+montos y deuda.
+
+La etiqueta de un mes es si la unidad dejó alguna factura emitida ese mes sin
+pagar a los DIAS_GRACIA días del vencimiento. entrenar() ajusta una regresión
+logística (numpy, IRLS con regularización L2) con las variables al inicio de
+cada mes y sus etiquetas, valida con el último mes y guarda coeficientes y
+escalado en ModeloIA.parametros. puntuar() calcula el riesgo de un mes para
+las unidades que aún no lo tienen con ese modelo (incremental: volver a
+correrla solo agrega las unidades nuevas) y lo guarda con bulk_create.
+
+Lo usan los comandos entrenar_morosidad y puntuar_morosidad y el endpoint
+morosidad/predicciones/.
+"""
+import json
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FloatField, Min, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Factura, ModeloIA, PrediccionMorosidad, UnidadHabitacional
+
+NOMBRE_MODELO = 'morosidad'
+MESES_HISTORIAL = 12
+DIAS_GRACIA = 30
+
+VARIABLES = (
+    'facturas',                 # vencidas a la fecha de corte, en la ventana
+    'ratio_pagadas',            # pagadas antes del corte / vencidas
+    'ratio_a_tiempo',           # pagadas hasta el día del vencimiento / vencidas
+    'dias_atraso_promedio',     # las impagas cuentan hasta el corte
+    'dias_atraso_max',
+    'racha_atraso',             # facturas atrasadas seguidas más recientes
+    'racha_atraso_max',
+    'monto_promedio',
+    'deuda_relativa',           # deuda vencida / monto promedio
+    'dias_desde_ultimo_pago',
+)
+
+
+def sumar_meses(periodo, meses):
+    """Primer día del mes desplazado en meses"""
+    indice = periodo.year * 12 + periodo.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _inicio_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+# ===================================
+# VARIABLES
+# ===================================
+
+def _facturas(desde, hasta, pagos_hasta=None, rango=None):
+    """
+    DataFrame con las facturas (no canceladas) emitidas en [desde, hasta) y la
+    fecha de su primer pago completado antes de pagos_hasta (NaT si no hay).
+    Las 'pagada' sin Pago registrado toman como fecha de pago su updated_at.
+    """
+    pagos = Q(pago__estado='completado')
+    if pagos_hasta:
+        pagos &= Q(pago__fecha_pago__lt=_inicio_dia(pagos_hasta))
+    facturas = Factura.objects.filter(fecha_emision__gte=desde, fecha_emision__lt=hasta).exclude(estado='cancelada')
+    if rango:
+        facturas = facturas.filter(unidad_habitacional_id__gte=rango[0], unidad_habitacional_id__lte=rango[1])
+    filas = (
+        facturas.values_list('id', 'unidad_habitacional_id', 'fecha_vencimiento', 'estado', 'updated_at')
+        .annotate(monto_f=Cast('monto', FloatField()), primer_pago=Min('pago__fecha_pago', filter=pagos))
+        .order_by()
+    )
+    df = pd.DataFrame.from_records(
+        filas.iterator(chunk_size=20000),
+        columns=['id', 'unidad', 'vencimiento', 'estado', 'updated_at', 'monto', 'pagada_en'],
+    )
+    df['vencimiento'] = pd.to_datetime(df['vencimiento'])
+    pagada_en = df['pagada_en'].where(df['pagada_en'].notna(), df['updated_at'].where(df['estado'] == 'pagada'))
+    pagada_en = pd.to_datetime(pagada_en, utc=True).dt.tz_convert(settings.TIME_ZONE).dt.tz_localize(None).dt.normalize()
+    if pagos_hasta:
+        pagada_en = pagada_en.where(pagada_en < pd.Timestamp(pagos_hasta))
+    df['pagada_en'] = pagada_en
+    df['monto'] = df['monto'].astype(float)
+    return df.drop(columns=['estado', 'updated_at'])
+
+
+def calcular_variables(df, corte, unidad_ids):
+    """VARIABLES de cada unidad de unidad_ids (índice) a partir del DataFrame de _facturas"""
+    corte = pd.Timestamp(corte)
+    ventana = (corte - pd.Timestamp(sumar_meses(corte.date(), -MESES_HISTORIAL))).days
+    defectos = {
+        'facturas': 0, 'ratio_pagadas': 1.0, 'ratio_a_tiempo': 1.0, 'dias_atraso_promedio': 0.0,
+        'dias_atraso_max': 0, 'racha_atraso': 0, 'racha_atraso_max': 0, 'monto_promedio': 0.0,
+        'deuda_relativa': 0.0, 'dias_desde_ultimo_pago': ventana,
+    }
+    indice = pd.Index(unidad_ids, name='unidad')
+    if df.empty:
+        return pd.DataFrame(defectos, index=indice, columns=VARIABLES).astype(float)
+
+    v = df[df['vencimiento'] < corte].sort_values(['unidad', 'vencimiento', 'id'])
+    pagada = v['pagada_en'].notna()
+    dias = (v['pagada_en'].fillna(corte) - v['vencimiento']).dt.days.clip(lower=0)
+    atrasada = dias > 0
+    v = v.assign(
+        dias=dias, pagada=pagada, a_tiempo=pagada & ~atrasada, atrasada=atrasada,
+        deuda=v['monto'].where(~pagada, 0.0),
+    )
+    por_unidad = v.groupby('unidad')
+    resultado = por_unidad.agg(
+        facturas=('dias', 'size'),
+        ratio_pagadas=('pagada', 'mean'),
+        ratio_a_tiempo=('a_tiempo', 'mean'),
+        dias_atraso_promedio=('dias', 'mean'),
+        dias_atraso_max=('dias', 'max'),
+        deuda=('deuda', 'sum'),
+    )
+
+    # Rachas: cada factura al día abre un bloque nuevo; la racha es cuántas atrasadas tiene el bloque
+    bloque = (~v['atrasada']).groupby(v['unidad']).cumsum()
+    rachas = v['atrasada'].groupby([v['unidad'], bloque]).sum()
+    resultado['racha_atraso_max'] = rachas.groupby(level=0).max()
+    ultimo = bloque.groupby(v['unidad']).max()
+    resultado['racha_atraso'] = pd.Series(
+        rachas.reindex(pd.MultiIndex.from_arrays([ultimo.index, ultimo.to_numpy()])).to_numpy(), index=ultimo.index
+    )
+
+    emitidas = df.groupby('unidad')
+    resultado = resultado.reindex(indice)
+    resultado['monto_promedio'] = emitidas['monto'].mean()
+    resultado['dias_desde_ultimo_pago'] = (corte - emitidas['pagada_en'].max()).dt.days
+    resultado['deuda_relativa'] = (resultado['deuda'] / resultado['monto_promedio']).replace([np.inf, -np.inf], np.nan)
+    return resultado[list(VARIABLES)].fillna(defectos).astype(float)
+
+
+def variables(corte, unidad_ids):
+    """VARIABLES a la fecha de corte de las unidades (IDs ordenados)"""
+    if not unidad_ids:
+        return calcular_variables(pd.DataFrame(), corte, [])
+    df = _facturas(
+        sumar_meses(corte, -MESES_HISTORIAL), corte, pagos_hasta=corte, rango=(unidad_ids[0], unidad_ids[-1])
+    )
+    return calcular_variables(df, corte, unidad_ids)
+
+
+def etiquetas(periodo, hoy):
+    """
+    1.0 si la unidad dejó alguna factura emitida en el mes sin pagar a los
+    DIAS_GRACIA días del vencimiento, si no 0.0. Solo cuentan las facturas cuyo
+    plazo de gracia ya terminó a la fecha hoy.
+    """
+    df = _facturas(periodo, sumar_meses(periodo, 1))
+    limite = df['vencimiento'] + pd.Timedelta(days=DIAS_GRACIA)
+    df = df[limite < pd.Timestamp(hoy)]
+    morosa = df['pagada_en'].isna() | (df['pagada_en'] > limite[df.index])
+    return morosa.groupby(df['unidad']).any().astype(float).sort_index()
+
+
+# ===================================
+# MODELO
+# ===================================
+
+def _ajustar(X, y, l2=1.0, iteraciones=50):
+    """Regresión logística por IRLS (Newton) con L2 sin penalizar el intercepto"""
+    X = np.column_stack([np.ones(len(X)), X])
+    pesos = np.zeros(X.shape[1])
+    penalizacion = np.full(X.shape[1], l2)
+    penalizacion[0] = 0.0
+    for _ in range(iteraciones):
+        p = 1.0 / (1.0 + np.exp(-(X @ pesos)))
+        gradiente = X.T @ (p - y) + penalizacion * pesos
+        hessiano = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalizacion)
+        paso = np.linalg.solve(hessiano, gradiente)
+        pesos -= paso
+        if np.abs(paso).max() < 1e-6:
+            break
+    return pesos
+
+
+def probabilidad(X, parametros):
+    """Score de morosidad (0 a 1) de cada fila del DataFrame de variables"""
+    columnas = parametros['variables']
+    z = (X[columnas].to_numpy() - np.array(parametros['media'])) / np.array(parametros['escala'])
+    return 1.0 / (1.0 + np.exp(-(parametros['intercepto'] + z @ np.array(parametros['coeficientes']))))
+
+
+def _auc(y, p):
+    positivos = int(y.sum())
+    negativos = len(y) - positivos
+    if not positivos or not negativos:
+        return None
+    rangos = pd.Series(p).rank().to_numpy()
+    return float((rangos[y == 1].sum() - positivos * (positivos + 1) / 2) / (positivos * negativos))
+
+
+def entrenar(periodos, hoy=None, l2=1.0):
+    """
+    Entrena con las variables al inicio de cada periodo y sus etiquetas; el
+    último periodo con datos se reserva para validar y luego se reajusta con
+    todos. Devuelve el ModeloIA creado (inactivo, ver activar()). ValueError si
+    no hay datos suficientes.
+    """
+    hoy = hoy or timezone.localdate()
+    conjuntos = []
+    for periodo in sorted(periodos):
+        y = etiquetas(periodo, hoy)
+        if len(y):
+            conjuntos.append((periodo, variables(periodo, list(y.index)), y))
+    if len(conjuntos) < 2:
+        raise ValueError("Se necesitan al menos dos meses con facturas ya vencidas para entrenar y validar")
+
+    def ajustar(datos):
+        X = pd.concat([x for _, x, _ in datos])
+        y = pd.concat([y for _, _, y in datos]).to_numpy()
+        if y.min() == y.max():
+            raise ValueError("Las etiquetas tienen una sola clase: no hay con qué entrenar")
+        media = X.mean().to_numpy()
+        escala = X.std(ddof=0).replace(0, 1).to_numpy()
+        pesos = _ajustar((X.to_numpy() - media) / escala, y, l2=l2)
+        return {
+            'variables': list(VARIABLES), 'media': media.tolist(), 'escala': escala.tolist(),
+            'intercepto': float(pesos[0]), 'coeficientes': pesos[1:].tolist(),
+        }, len(y), float(y.mean())
+
+    parametros, _, _ = ajustar(conjuntos[:-1])
+    periodo_validacion, X_val, y_val = conjuntos[-1]
+    p_val = probabilidad(X_val, parametros)
+    y_val = y_val.to_numpy()
+    metricas = {
+        'auc': _auc(y_val, p_val),
+        'log_loss': float(-np.mean(y_val * np.log(np.clip(p_val, 1e-9, 1)) + (1 - y_val) * np.log(np.clip(1 - p_val, 1e-9, 1)))),
+        'tasa_morosidad': float(y_val.mean()),
+        'unidades': len(y_val),
+        'periodo': f"{periodo_validacion:%Y-%m}",
+    }
+
+    parametros, muestras, tasa = ajustar(conjuntos)
+    parametros.update({
+        'meses_historial': MESES_HISTORIAL, 'dias_gracia': DIAS_GRACIA, 'l2': l2,
+        'periodos': [f"{periodo:%Y-%m}" for periodo, _, _ in conjuntos],
+        'muestras': muestras, 'tasa_morosidad': tasa, 'validacion': metricas,
+    })
+    version = ModeloIA.objects.filter(nombre=NOMBRE_MODELO).count() + 1
+    return ModeloIA.objects.create(
+        nombre=NOMBRE_MODELO,
+        version=str(version),
+        descripcion=(
+            f"Regresión logística, {len(conjuntos)} meses ({parametros['periodos'][0]} a "
+            f"{parametros['periodos'][-1]}), {muestras} muestras"
+        ),
+        precision=round(metricas['auc'], 4) if metricas['auc'] is not None else None,
+        fecha_entrenamiento=hoy,
+        estado='inactivo',
+        parametros=json.dumps(parametros),
+    )
+
+
+def activar(modelo):
+    """Deja el modelo como el único activo de su nombre"""
+    with transaction.atomic():
+        ModeloIA.objects.filter(nombre=modelo.nombre, estado='activo').exclude(pk=modelo.pk).update(
+            estado='inactivo', updated_at=timezone.now()
+        )
+        modelo.estado = 'activo'
+        modelo.save(update_fields=['estado', 'updated_at'])
+
+
+def modelo_activo():
+    return ModeloIA.objects.filter(nombre=NOMBRE_MODELO, estado='activo').order_by('-id').first()
+
+
+# ===================================
+# PUNTUACIÓN
+# ===================================
+
+def puntuar(modelo, periodo, hoy=None, chunk_size=50000, batch_size=2000, recalcular=False):
+    """
+    Guarda el score del mes periodo (variables al primer día del mes) de las
+    unidades que todavía no lo tienen con este modelo; con recalcular, de todas.
+    Las unidades se procesan por rangos de chunk_size, una transacción por rango.
+    """
+    hoy = hoy or timezone.localdate()
+    parametros = json.loads(modelo.parametros)
+    existentes = PrediccionMorosidad.objects.filter(modelo_ia=modelo, periodo_predicho=periodo)
+    if recalcular:
+        existentes.delete()
+    pendientes = list(
+        UnidadHabitacional.objects.exclude(id__in=existentes.values('unidad_habitacional_id'))
+        .order_by('id').values_list('id', flat=True)
+    )
+
+    creadas, riesgo_alto = 0, 0
+    for desde in range(0, len(pendientes), chunk_size):
+        lote = pendientes[desde:desde + chunk_size]
+        X = variables(periodo, lote)
+        scores = probabilidad(X, parametros)
+        detalles = X.round(4).to_dict('records')
+        predicciones = [
+            PrediccionMorosidad(
+                unidad_habitacional_id=unidad_id,
+                modelo_ia=modelo,
+                score_morosidad=round(float(score), 4),
+                fecha_prediccion=hoy,
+                periodo_predicho=periodo,
+                variables_utilizadas=json.dumps(detalle),
+            )
+            for unidad_id, score, detalle in zip(X.index, scores, detalles)
+        ]
+        with transaction.atomic():
+            # Una corrida simultánea del mismo mes no duplica (restricción única)
+            PrediccionMorosidad.objects.bulk_create(predicciones, batch_size=batch_size, ignore_conflicts=True)
+        creadas += len(predicciones)
+        riesgo_alto += int((scores >= 0.5).sum())
+
+    return {
+        'modelo': str(modelo),
+        'periodo': f"{periodo:%Y-%m}",
+        'unidades': creadas,
+        'ya_puntuadas': existentes.count() - creadas,
+        'riesgo_alto': riesgo_alto,
+    }
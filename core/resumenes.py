@@ -0,0 +1,306 @@
+# core/resumenes.py
+"""
+Hechos del dashboard de administración por condominio.
+
+ResumenCondominio guarda lo facturado, pagado y pendiente: la suma de los
+SaldoUnidad de sus unidades (core/cuentas.py). ResumenUsuariosCondominio guarda
+las relaciones UsuarioUnidad activas por tipo de usuario. El dashboard lee
+unas pocas filas en lugar de agrupar facturas, pagos y relaciones de toda la
+base.
+
+Se actualizan por incrementos, en la misma transacción que el cambio de
+origen: cuentas.registrar() y cuentas.abrir_cuentas() agregan la variación de
+las cuentas de las unidades y las señales de UsuarioUnidad y Usuario la de los
+usuarios. Los incrementos son filas nuevas de IncrementoResumen, sin tocar el
+resumen: con un UPDATE de la fila del condominio todas las escrituras del
+condominio esperaban a la anterior hasta su commit. Lo que se lee es siempre
+resumen + incrementos pendientes, en una sola consulta.
+
+  - plegar() suma los incrementos a los resúmenes y los borra (refrescar_resumenes
+    --plegar, cada minuto): los mantiene en unas pocas filas;
+  - refrescar() recalcula completos los resúmenes como lo real menos lo
+    pendiente, y corrige lo que no pasa por los incrementos (bulk_create de
+    UsuarioUnidad, update() de querysets). refrescar_resumenes, cada noche.
+
+Ambos bloquean las filas de los condominios en orden de ID. Los condominios
+que todavía no tienen fila (sembrados sin señales) se calculan en vivo al
+leer: tablero() nunca los deja fuera.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, DateTimeField, F, Sum, Value
+from django.utils import timezone
+
+from .models import (
+    Condominio, IncrementoResumen, ResumenCondominio, ResumenUsuariosCondominio, SaldoUnidad, UnidadHabitacional,
+    UsuarioUnidad,
+)
+
+# Los acumulados de SaldoUnidad
+CAMPOS = ('total_facturado', 'total_pagado', 'saldo', 'facturas_pendientes')
+
+
+def aplicar_cuentas(variaciones):
+    """
+    Agrega a cada condominio la variación de las cuentas de sus unidades
+    ({unidad_id: {campo: variación}}). Llamar dentro de la transacción que
+    escribió los SaldoUnidad.
+    """
+    condominios = dict(UnidadHabitacional.objects.filter(pk__in=variaciones).values_list('id', 'condominio_id'))
+    cambios = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+    for unidad_id, variacion in variaciones.items():
+        if unidad_id in condominios:
+            for campo in CAMPOS:
+                cambios[condominios[unidad_id]][campo] += variacion.get(campo) or 0
+    IncrementoResumen.objects.bulk_create([
+        IncrementoResumen(condominio_id=condominio_id, **valores)
+        for condominio_id, valores in sorted(cambios.items()) if any(valores.values())
+    ])
+
+
+def aplicar_usuarios(variaciones):
+    """Agrega {(condominio_id, tipo): variación} a los usuarios por tipo"""
+    IncrementoResumen.objects.bulk_create([
+        IncrementoResumen(condominio_id=condominio_id, tipo=tipo, usuarios=valor)
+        for (condominio_id, tipo), valor in sorted(variaciones.items()) if valor and condominio_id and tipo
+    ])
+
+
+def usuarios_de_relaciones(relaciones):
+    """{(condominio_id, tipo): cantidad} de un queryset de UsuarioUnidad (solo las activas)"""
+    filas = (
+        relaciones.filter(fecha_fin__isnull=True)
+        .values_list('unidad__condominio_id', 'usuario__tipo')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    return {(condominio_id, tipo): total for condominio_id, tipo, total in filas}
+
+
+# ===================================
+# PLEGADO Y RECÁLCULO
+# ===================================
+
+def _sumar(condominio_ids, cuentas, usuarios, ahora):
+    """Suma las variaciones a las filas de los condominios, bloqueándolas en orden de ID"""
+    for condominio_id in sorted(condominio_ids):
+        variacion = {campo: F(campo) + valor for campo, valor in cuentas.get(condominio_id, {}).items() if valor}
+        ResumenCondominio.objects.filter(pk=condominio_id).update(updated_at=ahora, **variacion)
+    for (condominio_id, tipo), valor in sorted(usuarios.items()):
+        if not valor:
+            continue
+        filas = ResumenUsuariosCondominio.objects.filter(condominio_id=condominio_id, tipo=tipo)
+        # Sin carrera: la fila del condominio está bloqueada
+        if not filas.update(total=F('total') + valor):
+            ResumenUsuariosCondominio.objects.create(condominio_id=condominio_id, tipo=tipo, total=valor)
+
+
+def _agrupar(filas):
+    """Suma filas (condominio_id, tipo, *CAMPOS, usuarios) en ({condominio_id: {campo}}, {(condominio_id, tipo): usuarios})"""
+    cuentas = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+    usuarios = defaultdict(int)
+    for condominio_id, tipo, *valores, cantidad in filas:
+        if tipo:
+            usuarios[(condominio_id, tipo)] += cantidad
+        else:
+            for campo, valor in zip(CAMPOS, valores):
+                cuentas[condominio_id][campo] += valor
+    return cuentas, usuarios
+
+
+def plegar(limite=10000):
+    """
+    Suma a los resúmenes hasta limite incrementos pendientes (los más antiguos) y
+    los borra. Devuelve cuántos plegó: se llama hasta que devuelva 0
+    """
+    with transaction.atomic():
+        # skip_locked: dos plegados a la vez toman incrementos distintos
+        filas = list(
+            IncrementoResumen.objects.select_for_update(skip_locked=True).order_by('id')
+            .values_list('id', 'condominio_id', 'tipo', *CAMPOS, 'usuarios')[:limite]
+        )
+        if not filas:
+            return 0
+        cuentas, usuarios = _agrupar(fila[1:] for fila in filas)
+        condominio_ids = {fila[1] for fila in filas}
+        # Sin fila: se crea con lo real menos lo pendiente, que incluye estos incrementos
+        existentes = set(ResumenCondominio.objects.filter(pk__in=condominio_ids).values_list('pk', flat=True))
+        if condominio_ids - existentes:
+            refrescar(sorted(condominio_ids - existentes))
+        _sumar(condominio_ids, cuentas, usuarios, timezone.now())
+        IncrementoResumen.objects.filter(pk__in=[fila[0] for fila in filas]).delete()
+    return len(filas)
+
+
+def refrescar(condominio_ids=None):
+    """
+    Recalcula completos los resúmenes de los condominios (por defecto, todos)
+    como lo real menos los incrementos todavía sin plegar
+    """
+    condominios = Condominio.objects.order_by('id')
+    if condominio_ids is not None:
+        condominios = condominios.filter(pk__in=condominio_ids)
+    ids = list(condominios.values_list('id', flat=True))
+    if not ids:
+        return 0
+
+    with transaction.atomic():
+        # Bloquear antes de leer: un plegado en curso termina primero y queda incluido
+        list(ResumenCondominio.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk'))
+        ahora = timezone.now()
+        pendientes = IncrementoResumen.objects.filter(condominio_id__in=ids)
+        # Lo real y lo pendiente salen de la misma consulta (misma instantánea): un incremento
+        # confirmado entre dos consultas se contaría en una y no en la otra
+        cuentas = (
+            SaldoUnidad.objects.filter(unidad_habitacional__condominio_id__in=ids)
+            .values_list('unidad_habitacional__condominio_id')
+            .annotate(signo=Value(1), **{campo: Sum(campo) for campo in CAMPOS})
+            .order_by()
+            .union(
+                pendientes.filter(tipo='').values_list('condominio_id')
+                .annotate(signo=Value(-1), **{campo: Sum(campo) for campo in CAMPOS})
+                .order_by(),
+                all=True,
+            )
+        )
+        sumas = {condominio_id: dict.fromkeys(CAMPOS, 0) for condominio_id in ids}
+        for condominio_id, signo, *valores in cuentas:
+            for campo, valor in zip(CAMPOS, valores):
+                sumas[condominio_id][campo] += signo * valor
+        ResumenCondominio.objects.bulk_create(
+            [
+                ResumenCondominio(condominio_id=condominio_id, refrescado_en=ahora, updated_at=ahora, **valores)
+                for condominio_id, valores in sumas.items()
+            ],
+            batch_size=1000, update_conflicts=True, unique_fields=['condominio'],
+            update_fields=[*CAMPOS, 'refrescado_en', 'updated_at'],
+        )
+
+        relaciones = (
+            UsuarioUnidad.objects.filter(unidad__condominio_id__in=ids, fecha_fin__isnull=True)
+            .values_list('unidad__condominio_id', 'usuario__tipo')
+            .annotate(signo=Value(1), total=Count('id'))
+            .order_by()
+            .union(
+                pendientes.exclude(tipo='').values_list('condominio_id', 'tipo')
+                .annotate(signo=Value(-1), total=Sum('usuarios'))
+                .order_by(),
+                all=True,
+            )
+        )
+        usuarios = defaultdict(int)
+        for condominio_id, tipo, signo, total in relaciones:
+            usuarios[(condominio_id, tipo)] += signo * total
+        ResumenUsuariosCondominio.objects.filter(condominio_id__in=ids).delete()
+        ResumenUsuariosCondominio.objects.bulk_create(
+            [
+                ResumenUsuariosCondominio(condominio_id=condominio_id, tipo=tipo, total=total)
+                for (condominio_id, tipo), total in sorted(usuarios.items())
+            ],
+            batch_size=1000,
+        )
+    return len(ids)
+
+
+# ===================================
+# LECTURA
+# ===================================
+
+def en_vivo(condominio_ids):
+    """
+    ({condominio_id: {campo: valor}}, {(condominio_id, tipo): total}) calculados
+    desde las cuentas y las relaciones sin escribir nada
+    """
+    from .cuentas import saldos_de  # cuentas importa este módulo
+
+    unidades = dict(
+        UnidadHabitacional.objects.filter(condominio_id__in=condominio_ids).values_list('id', 'condominio_id')
+    )
+    sumas = {condominio_id: dict.fromkeys(CAMPOS, 0) for condominio_id in condominio_ids}
+    for unidad_id, valores in saldos_de(unidades).items():
+        for campo in CAMPOS:
+            sumas[unidades[unidad_id]][campo] += valores[campo]
+    usuarios = usuarios_de_relaciones(UsuarioUnidad.objects.filter(unidad__condominio_id__in=condominio_ids))
+    return sumas, usuarios
+
+
+# Origen de cada fila de la lectura combinada
+RESUMEN, USUARIOS, INCREMENTO = 1, 2, 3
+
+
+def leer():
+    """
+    ({condominio_id: {campo: valor}}, {(condominio_id, tipo): total}, frescura)
+    de los condominios con resumen, sumando sus incrementos pendientes. Una sola
+    consulta: un plegado concurrente no se cuenta dos veces ni se pierde
+    """
+    sin_fecha = Value(None, output_field=DateTimeField())
+    ceros = [Value(0)] * len(CAMPOS)
+    filas = ResumenCondominio.objects.values_list(
+        Value(RESUMEN), 'condominio_id', Value(''), *CAMPOS, Value(0), 'updated_at', 'refrescado_en'
+    ).union(
+        ResumenUsuariosCondominio.objects.values_list(
+            Value(USUARIOS), 'condominio_id', 'tipo', *ceros, 'total', sin_fecha, sin_fecha
+        ),
+        IncrementoResumen.objects.values_list(
+            Value(INCREMENTO), 'condominio_id', 'tipo', *CAMPOS, 'usuarios', 'created_at', sin_fecha
+        ),
+        all=True,
+    )
+    con_resumen, valores, momentos, refrescos = set(), [], [], []
+    for origen, condominio_id, tipo, *cantidades, momento, refrescado in filas:
+        if origen == RESUMEN:
+            con_resumen.add(condominio_id)
+            if refrescado:
+                refrescos.append(refrescado)
+        if momento:
+            momentos.append(momento)
+        valores.append((condominio_id, tipo, *cantidades))
+    cuentas, usuarios = _agrupar(valores)
+    return (
+        {condominio_id: cuentas[condominio_id] for condominio_id in con_resumen},
+        {clave: total for clave, total in usuarios.items() if clave[0] in con_resumen},
+        # Frescura: último incremento y recálculo completo más antiguo
+        {'calculado_en': max(momentos, default=None), 'refrescado_en': min(refrescos, default=None)},
+    )
+
+
+def tablero():
+    """
+    Usuarios por tipo y facturación de cada condominio para el dashboard, con la
+    frescura de los resúmenes. Los condominios sin fila se calculan en vivo
+    """
+    nombres = dict(Condominio.objects.values_list('id', 'nombre'))
+    facturacion, usuarios, frescura = leer()
+
+    faltantes = [condominio_id for condominio_id in nombres if condominio_id not in facturacion]
+    if faltantes:
+        sumas, vivos = en_vivo(faltantes)
+        facturacion.update(sumas)
+        usuarios.update(vivos)
+        frescura['calculado_en'] = timezone.now()
+
+    return {
+        'usuarios_por_condominio_y_tipo': sorted(
+            (
+                {'condominio_nombre': nombres[condominio_id], 'tipo_usuario': tipo, 'total': total}
+                for (condominio_id, tipo), total in usuarios.items() if total > 0 and condominio_id in nombres
+            ),
+            key=lambda fila: (fila['condominio_nombre'], fila['tipo_usuario']),
+        ),
+        'facturacion_por_condominio': sorted(
+            (
+                {
+                    'condominio_nombre': nombres[condominio_id],
+                    'total_facturado': valores['total_facturado'],
+                    'total_pagado': valores['total_pagado'],
+                    'total_pendiente': valores['saldo'],
+                }
+                for condominio_id, valores in facturacion.items() if condominio_id in nombres
+            ),
+            key=lambda fila: fila['condominio_nombre'],
+        ),
+        'condominios_en_vivo': len(faltantes),
+        **frescura,
+    }
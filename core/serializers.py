@@ -1,5 +1,44 @@
+from decimal import Decimal
+
+from django.urls import reverse
 from rest_framework import serializers
 from .models import *
+from . import blobs
+
+# ===============================
+# CAMPOS COMUNES
+# ===============================
+
+class BlobImagenField(serializers.Field):
+    """
+    Imagen guardada en el almacén de blobs: se recibe en base64 (o data URI)
+    y se devuelve como URL de descarga, sin los bytes de la imagen.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        kwargs.setdefault('allow_null', True)
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        # Solo hace falta la clave (sha256), no la fila Blob
+        for atributo in self.source_attrs[:-1]:
+            instance = getattr(instance, atributo)
+        return getattr(instance, f'{self.source_attrs[-1]}_id')
+
+    def to_representation(self, value):
+        url = reverse('descargar_blob', args=[value])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_internal_value(self, data):
+        if not data:
+            return None
+        if not isinstance(data, str):
+            raise serializers.ValidationError('Se esperaba una imagen en base64')
+        try:
+            return blobs.guardar_base64(data)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
 
 # ===============================
 # CONDOMINIO / UNIDAD HABITACIONAL
@@ -43,6 +82,7 @@ class UnidadHabitacionalSelectSerializer(serializers.ModelSerializer):
 
 class UsuarioBasicoSerializer(serializers.ModelSerializer):
     """Serializer básico para Usuario (sin relaciones complejas)"""
+    foto_perfil = BlobImagenField(read_only=True)
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     
     class Meta:
@@ -109,12 +149,50 @@ class UsuarioSerializer(serializers.ModelSerializer):
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     roles = serializers.StringRelatedField(many=True, read_only=True)
     permisos = serializers.StringRelatedField(many=True, read_only=True)
+    foto_perfil = BlobImagenField()
 
     class Meta:
         model = Usuario
         exclude = ['password']
         read_only_fields = ['email', 'fecha_registro', 'is_active', 'is_staff']
 
+class UsuarioResumenSerializer(serializers.ModelSerializer):
+    """Serializer plano de Usuario para relaciones anidadas (no genera consultas extra)"""
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+
+    class Meta:
+        model = Usuario
+        fields = ['id', 'nombre', 'apellidos', 'email', 'tipo', 'tipo_display', 'telefono']
+
+
+# Relaciones que necesita UsuarioSerializer completo (para prefetch_related)
+USUARIO_PREFETCH = [
+    'usuariounidad_set__unidad__condominio', 'unidades_habitacionales__condominio',
+    'usuario_roles__rol', 'groups', 'user_permissions',
+]
+
+
+def campos_expandidos(request):
+    """Conjunto de relaciones pedidas con ?expand=a,b"""
+    if request is None:
+        return set()
+    valor = request.query_params.get('expand', '')
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+class ExpandirUsuarioMixin:
+    """
+    Los campos de Meta.campos_usuario se serializan con UsuarioResumenSerializer;
+    con ?expand=usuario se devuelve el UsuarioSerializer completo.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'usuario' in campos_expandidos(self.context.get('request')):
+            for campo in self.Meta.campos_usuario:
+                fields[campo] = UsuarioSerializer(read_only=True)
+        return fields
+
+
 class UsuarioSelectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Usuario
@@ -235,12 +313,21 @@ class PagoSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class RegistrarPagoSerializer(serializers.Serializer):
+    """Cuerpo de pagos/registrar/ (el monto por defecto es el saldo de la factura)"""
+    factura_id = serializers.IntegerField()
+    monto = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    metodo_pago = serializers.ChoiceField(choices=Pago.METODO_PAGO_CHOICES, default='app')
+    referencia_pago = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    comprobante = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
 # ===============================
 # COMUNICACIÓN
 # ===============================
 
-class ComunicadoSerializer(serializers.ModelSerializer):
-    autor = UsuarioSerializer(read_only=True)
+class ComunicadoSerializer(ExpandirUsuarioMixin, serializers.ModelSerializer):
+    autor = UsuarioResumenSerializer(read_only=True)
     autor_id = serializers.PrimaryKeyRelatedField(
         queryset=Usuario.objects.all(),
         source='autor',
@@ -253,6 +340,7 @@ class ComunicadoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comunicado
         fields = '__all__'
+        campos_usuario = ['autor']
 
 
 class ComunicadoUnidadSerializer(serializers.ModelSerializer):
@@ -286,8 +374,8 @@ class ComunicadoLeidoSerializer(serializers.ModelSerializer):
 # NOTIFICACIONES
 # ===============================
 
-class NotificacionSerializer(serializers.ModelSerializer):
-    usuario = UsuarioSerializer(read_only=True)
+class NotificacionSerializer(ExpandirUsuarioMixin, serializers.ModelSerializer):
+    usuario = UsuarioResumenSerializer(read_only=True)
     usuario_id = serializers.PrimaryKeyRelatedField(
         queryset=Usuario.objects.all(),
         source='usuario',
@@ -311,6 +399,7 @@ class NotificacionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notificacion
         fields = '__all__'
+        campos_usuario = ['usuario']
 
 
 # ===============================
@@ -373,48 +462,57 @@ class MantenimientoPreventivoSerializer(serializers.ModelSerializer):
 # IA Y SEGURIDAD - SERIALIZERS
 # ===================================
 
-class VehiculoSerializer(serializers.ModelSerializer):
-    usuario = UsuarioSerializer(read_only=True)
+class VehiculoSerializer(ExpandirUsuarioMixin, serializers.ModelSerializer):
+    usuario = UsuarioResumenSerializer(read_only=True)
     
     class Meta:
         model = Vehiculo
         fields = '__all__'
+        campos_usuario = ['usuario']
 
 class VehiculoSelectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vehiculo
         fields = '__all__'
 
-class RegistroAccesoSerializer(serializers.ModelSerializer):
-    usuario = UsuarioSerializer(read_only=True)
+class RegistroAccesoSerializer(ExpandirUsuarioMixin, serializers.ModelSerializer):
+    foto_evidencia = BlobImagenField()
+    usuario = UsuarioResumenSerializer(read_only=True)
     vehiculo = VehiculoSerializer(read_only=True)
     
     class Meta:
         model = RegistroAcceso
         fields = '__all__'
+        campos_usuario = ['usuario']
 
-class VisitanteSerializer(serializers.ModelSerializer):
-    anfitrion = UsuarioSerializer(read_only=True)
+class VisitanteSerializer(ExpandirUsuarioMixin, serializers.ModelSerializer):
+    foto_entrada = BlobImagenField()
+    foto_salida = BlobImagenField()
+    anfitrion = UsuarioResumenSerializer(read_only=True)
     
     class Meta:
         model = Visitante
         fields = '__all__'
+        campos_usuario = ['anfitrion']
 
-class IncidenteSeguridadSerializer(serializers.ModelSerializer):
-    usuario_reporta = UsuarioSerializer(read_only=True)
-    usuario_asignado = UsuarioSerializer(read_only=True)
+class IncidenteSeguridadSerializer(ExpandirUsuarioMixin, serializers.ModelSerializer):
+    evidencia_foto = BlobImagenField()
+    usuario_reporta = UsuarioResumenSerializer(read_only=True)
+    usuario_asignado = UsuarioResumenSerializer(read_only=True)
     
     class Meta:
         model = IncidenteSeguridad
         fields = '__all__'
+        campos_usuario = ['usuario_reporta', 'usuario_asignado']
 
 
-class BitacoraSerializer(serializers.ModelSerializer):
-    usuario = UsuarioSerializer(read_only=True)
+class BitacoraSerializer(ExpandirUsuarioMixin, serializers.ModelSerializer):
+    usuario = UsuarioResumenSerializer(read_only=True)
     
     class Meta:
         model = Bitacora
         fields = '__all__'
+        campos_usuario = ['usuario']
 
 class CamaraSeguridadSerializer(serializers.ModelSerializer):
     condominio = CondominioBasicoSerializer(read_only=True)
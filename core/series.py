@@ -0,0 +1,203 @@
+# core/series.py
+"""
+Series temporales para los reportes (ingresos, morosidad).
+
+Una Serie agrupa un queryset por cubetas de día, semana (lunes) o mes de la
+zona horaria actual (Trunc, en cualquier base); las cubetas sin datos se
+completan con ceros en lugar de faltar.
+
+Las cubetas cerradas (anteriores a la que contiene hoy) se guardan en la caché
+durante SERIES_CACHE_SEGUNDOS; en cada llamada solo se recalcula la cubeta
+abierta y las que falten. Las claves llevan una generación por serie que
+invalidar() incrementa al confirmarse una escritura que cae en una cubeta
+cerrada (señales de Factura y Pago, conciliación y facturación masiva). Con
+varios workers y sin caché compartida (REDIS_URL) la invalidación no llega a
+los demás procesos: la expiración acota cuánto sirven cubetas viejas.
+
+Las cubetas que se van a guardar se calculan en la primaria: una réplica
+atrasada no queda cacheada.
+"""
+import time as reloj
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, DateField, DateTimeField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import Factura, Pago
+
+GRANULARIDADES = ('dia', 'semana', 'mes')
+_TRUNC = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+
+MAX_CUBETAS = 1000
+
+
+def inicio_cubeta(fecha, granularidad):
+    """Primer día de la cubeta que contiene la fecha"""
+    if granularidad == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def siguiente_cubeta(inicio, granularidad):
+    if granularidad == 'semana':
+        return inicio + timedelta(days=7)
+    if granularidad == 'mes':
+        return date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+    return inicio + timedelta(days=1)
+
+
+def cubetas(desde, hasta, granularidad):
+    """Inicios de las cubetas que cubren [desde, hasta]"""
+    actual = inicio_cubeta(desde, granularidad)
+    resultado = []
+    while actual <= hasta:
+        resultado.append(actual)
+        actual = siguiente_cubeta(actual, granularidad)
+    return resultado
+
+
+def _clave_generacion(nombre):
+    return f'series:{nombre}:generacion'
+
+
+def _generacion(nombre):
+    # Si la caché la perdió, una generación nueva no reutiliza claves viejas
+    return cache.get_or_set(_clave_generacion(nombre), reloj.time_ns, None)
+
+
+def invalidar(*nombres):
+    """Descarta las cubetas cerradas de las series al confirmarse la transacción"""
+    def incrementar():
+        for nombre in nombres:
+            try:
+                cache.incr(_clave_generacion(nombre))
+            except ValueError:
+                pass  # Sin generación: la próxima lectura empieza una nueva
+    transaction.on_commit(incrementar)
+
+
+def invalidar_si_cerrada(nombre, *fechas):
+    """invalidar() si alguna fecha (date o datetime) cae antes de hoy, en una cubeta cerrada"""
+    hoy = timezone.localdate()
+    for fecha in fechas:
+        if isinstance(fecha, datetime):
+            fecha = timezone.localdate(fecha)
+        if fecha is not None and fecha < hoy:
+            invalidar(nombre)
+            return
+
+
+class Serie:
+    """
+    Agregados (medidas: {nombre: Sum/Count...}) de un queryset por cubetas de
+    su campo de fecha. calcular() devuelve [{'cubeta': date, **medidas}].
+    """
+
+    def __init__(self, nombre, consulta, campo, medidas):
+        self.nombre = nombre
+        self.consulta = consulta
+        self.campo = campo
+        self.medidas = medidas
+        self.con_hora = isinstance(consulta.model._meta.get_field(campo), DateTimeField)
+
+    def calcular(self, desde, hasta, granularidad):
+        zona = timezone.get_current_timezone()
+        inicios = cubetas(desde, hasta, granularidad)
+        abierta = inicio_cubeta(timezone.localdate(), granularidad)
+        # La generación se lee antes de consultar: si una escritura la incrementa
+        # mientras tanto, lo calculado queda bajo la generación vieja
+        generacion = _generacion(self.nombre)
+        claves = {
+            inicio: f'series:{self.nombre}:{generacion}:{granularidad}:{zona}:{inicio.isoformat()}'
+            for inicio in inicios if inicio < abierta
+        }
+        guardadas = cache.get_many(list(claves.values()))
+        valores = {inicio: guardadas[clave] for inicio, clave in claves.items() if clave in guardadas}
+
+        faltantes = [inicio for inicio in inicios if inicio not in valores]
+        if faltantes:
+            cerradas = [inicio for inicio in faltantes if inicio < abierta]
+            alias = DEFAULT_DB_ALIAS if cerradas else self.consulta.db
+            # Un solo rango de la primera a la última faltante: en general, solo la cubeta abierta
+            valores.update(self._consultar(faltantes[0], faltantes[-1], granularidad, zona, alias))
+            if cerradas:
+                cache.set_many(
+                    {claves[inicio]: valores[inicio] for inicio in cerradas},
+                    getattr(settings, 'SERIES_CACHE_SEGUNDOS', 600),
+                )
+        return [{'cubeta': inicio, **valores[inicio]} for inicio in inicios]
+
+    def _consultar(self, primera, ultima, granularidad, zona, alias):
+        """{inicio de cubeta: {medida: valor}} de primera a ultima, con ceros donde no hay filas"""
+        fin = siguiente_cubeta(ultima, granularidad)
+        if self.con_hora:
+            rango = {
+                f'{self.campo}__gte': timezone.make_aware(datetime.combine(primera, time.min), zona),
+                f'{self.campo}__lt': timezone.make_aware(datetime.combine(fin, time.min), zona),
+            }
+            cubeta = Trunc(self.campo, _TRUNC[granularidad], output_field=DateField(), tzinfo=zona)
+        else:
+            rango = {f'{self.campo}__gte': primera, f'{self.campo}__lt': fin}
+            cubeta = Trunc(self.campo, _TRUNC[granularidad], output_field=DateField())
+        datos = (
+            self.consulta.using(alias).filter(**rango)
+            .annotate(cubeta=cubeta)
+            .values('cubeta')
+            .annotate(**self.medidas)
+            .order_by()
+        )
+        # Las cubetas sin filas no vuelven de la consulta: se completan aquí con ceros
+        valores = {inicio: dict.fromkeys(self.medidas, 0) for inicio in cubetas(primera, ultima, granularidad)}
+        for fila in datos:
+            inicio = fila.pop('cubeta')
+            if isinstance(inicio, datetime):
+                inicio = inicio.date()
+            valores[inicio] = {medida: valor or 0 for medida, valor in fila.items()}
+        return valores
+
+
+def leer_rango(parametros, cubetas_defecto=12):
+    """
+    (desde, hasta, granularidad) desde ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&granularidad=dia|semana|mes.
+    Por defecto, las últimas cubetas_defecto cubetas mensuales hasta hoy. ValueError si no es válido.
+    """
+    granularidad = parametros.get('granularidad') or 'mes'
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida: {granularidad} (opciones: {', '.join(GRANULARIDADES)})")
+    try:
+        hasta = date.fromisoformat(parametros['hasta']) if parametros.get('hasta') else timezone.localdate()
+        if parametros.get('desde'):
+            desde = date.fromisoformat(parametros['desde'])
+        else:
+            desde = inicio_cubeta(hasta, granularidad)
+            for _ in range(cubetas_defecto - 1):
+                desde = inicio_cubeta(desde - timedelta(days=1), granularidad)
+    except ValueError:
+        raise ValueError("Fechas inválidas (formato AAAA-MM-DD)")
+    if desde > hasta:
+        raise ValueError("'desde' no puede ser posterior a 'hasta'")
+    if (hasta - desde).days // {'dia': 1, 'semana': 7, 'mes': 28}[granularidad] >= MAX_CUBETAS:
+        raise ValueError(f"El rango supera las {MAX_CUBETAS} cubetas")
+    return desde, hasta, granularidad
+
+
+# ===================================
+# SERIES DE LOS REPORTES
+# ===================================
+
+# Pagos completados por fecha de pago (no cambia: auto_now_add)
+INGRESOS = Serie('ingresos', Pago.objects.filter(estado='completado'), 'fecha_pago', {'total': Sum('monto')})
+
+# Facturas abiertas por mes de vencimiento
+MOROSIDAD = Serie(
+    'morosidad',
+    Factura.objects.filter(estado__in=('pendiente', 'vencida')),
+    'fecha_vencimiento',
+    {'pendientes': Count('id', filter=Q(estado='pendiente')), 'vencidas': Count('id', filter=Q(estado='vencida'))},
+)
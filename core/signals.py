@@ -0,0 +1,230 @@
+# core/signals.py
+from decimal import Decimal
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cuentas, resumenes, series
+from .models import (
+    Comunicado, ComunicadoUnidad, Condominio, Factura, Notificacion, Pago, RegistroEliminacion, Reserva,
+    ResumenCondominio, SaldoUnidad, UnidadHabitacional, Usuario, UsuarioUnidad,
+)
+
+# ===================================
+# SINCRONIZACIÓN MÓVIL - REGISTRO DE BORRADOS
+# ===================================
+
+@receiver(post_delete, sender=Notificacion)
+def registrar_eliminacion_notificacion(sender, instance, **kwargs):
+    RegistroEliminacion.objects.create(
+        modelo='notificacion', objeto_id=instance.pk, usuario_id=instance.usuario_id
+    )
+
+@receiver(post_delete, sender=Comunicado)
+def registrar_eliminacion_comunicado(sender, instance, **kwargs):
+    RegistroEliminacion.objects.create(modelo='comunicado', objeto_id=instance.pk)
+
+@receiver(post_delete, sender=Factura)
+def registrar_eliminacion_factura(sender, instance, **kwargs):
+    RegistroEliminacion.objects.create(
+        modelo='factura', objeto_id=instance.pk, unidad_habitacional_id=instance.unidad_habitacional_id
+    )
+
+@receiver(post_delete, sender=Reserva)
+def registrar_eliminacion_reserva(sender, instance, **kwargs):
+    RegistroEliminacion.objects.create(
+        modelo='reserva', objeto_id=instance.pk, usuario_id=instance.usuario_id
+    )
+
+@receiver(post_delete, sender=ComunicadoUnidad)
+def registrar_eliminacion_comunicado_unidad(sender, instance, origin=None, **kwargs):
+    """Quitar un comunicado de una unidad lo borra de los dispositivos de sus usuarios"""
+    if _modelo_origen(origin) is ComunicadoUnidad:
+        RegistroEliminacion.objects.create(
+            modelo='comunicado', objeto_id=instance.comunicado_id, unidad_habitacional_id=instance.unidad_habitacional_id
+        )
+
+@receiver(pre_save, sender=UsuarioUnidad)
+def capturar_relacion_sincronizacion(sender, instance, raw=False, **kwargs):
+    instance._relacion_activa_antes = (
+        UsuarioUnidad.objects.filter(pk=instance.pk, fecha_fin__isnull=True).values_list('usuario_id', 'unidad_id').first()
+        if instance.pk and not raw else None
+    )
+
+def _registrar_fin_relacion(usuario_id, unidad_id, relacion_id):
+    RegistroEliminacion.objects.create(
+        modelo='usuario_unidad', objeto_id=relacion_id, usuario_id=usuario_id, unidad_habitacional_id=unidad_id
+    )
+
+@receiver(post_save, sender=UsuarioUnidad)
+def registrar_fin_relacion(sender, instance, raw=False, **kwargs):
+    """Al terminar (o cambiar) una relación activa el usuario deja de ver lo de esa unidad"""
+    antes = getattr(instance, '_relacion_activa_antes', None)
+    if raw or antes is None:
+        return
+    if instance.fecha_fin is not None or antes != (instance.usuario_id, instance.unidad_id):
+        _registrar_fin_relacion(*antes, instance.pk)
+
+@receiver(post_delete, sender=UsuarioUnidad)
+def registrar_eliminacion_relacion(sender, instance, **kwargs):
+    if instance.fecha_fin is None:
+        _registrar_fin_relacion(instance.usuario_id, instance.unidad_id, instance.pk)
+
+@receiver(post_save, sender=ComunicadoUnidad)
+def marcar_comunicado_modificado(sender, instance, created, **kwargs):
+    """Asignar un comunicado a una unidad lo vuelve 'nuevo' para la sincronización"""
+    if created:
+        Comunicado.objects.filter(pk=instance.comunicado_id).update(updated_at=timezone.now())
+
+
+# ===================================
+# LIBRO DE CUENTAS POR UNIDAD (core/cuentas.py)
+# ===================================
+
+def _modelo_origen(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _borrado_directo(origin):
+    """Al borrar una unidad o un condominio su cuenta se borra con ella: no hay nada que registrar"""
+    return _modelo_origen(origin) in (Factura, Pago)
+
+
+@receiver(pre_save, sender=Factura)
+def capturar_factura(sender, instance, raw=False, **kwargs):
+    instance._cuenta_antes = cuentas.estado_factura(instance.pk) if instance.pk and not raw else None
+
+@receiver(post_save, sender=Factura)
+def registrar_factura(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    despues = (instance.unidad_habitacional_id, Decimal(str(instance.monto)), instance.estado)
+    cuentas.registrar(cuentas.movimientos_factura(instance.pk, instance._cuenta_antes, despues))
+
+@receiver(pre_delete, sender=Factura)
+def registrar_eliminacion_factura_cuenta(sender, instance, origin=None, **kwargs):
+    if _borrado_directo(origin):
+        cuentas.registrar(cuentas.movimientos_factura(instance.pk, cuentas.estado_factura(instance.pk), None))
+
+@receiver(pre_save, sender=Pago)
+def capturar_pago(sender, instance, raw=False, **kwargs):
+    instance._cuenta_antes = cuentas.estado_pago(instance.pk) if instance.pk and not raw else None
+
+@receiver(post_save, sender=Pago)
+def registrar_pago(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    despues = (instance.factura.unidad_habitacional_id, Decimal(str(instance.monto)), instance.estado)
+    cuentas.registrar(cuentas.movimientos_pago(instance.pk, instance.factura_id, instance._cuenta_antes, despues))
+
+@receiver(pre_delete, sender=Pago)
+def registrar_eliminacion_pago_cuenta(sender, instance, origin=None, **kwargs):
+    if _borrado_directo(origin):
+        cuentas.registrar(cuentas.movimientos_pago(instance.pk, instance.factura_id, cuentas.estado_pago(instance.pk), None))
+
+@receiver(post_save, sender=UnidadHabitacional)
+def abrir_cuenta_unidad(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        SaldoUnidad.objects.get_or_create(unidad_habitacional=instance)
+
+
+# ===================================
+# RESUMEN POR CONDOMINIO (core/resumenes.py)
+# ===================================
+
+def _relacion_activa(pk):
+    return resumenes.usuarios_de_relaciones(UsuarioUnidad.objects.filter(pk=pk))
+
+
+@receiver(pre_save, sender=UsuarioUnidad)
+def capturar_usuario_unidad(sender, instance, raw=False, **kwargs):
+    instance._resumen_antes = _relacion_activa(instance.pk) if instance.pk and not raw else {}
+
+@receiver(post_save, sender=UsuarioUnidad)
+def resumir_usuario_unidad(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    variaciones = dict(_relacion_activa(instance.pk))
+    for clave, total in instance._resumen_antes.items():
+        variaciones[clave] = variaciones.get(clave, 0) - total
+    resumenes.aplicar_usuarios(variaciones)
+
+@receiver(pre_delete, sender=UsuarioUnidad)
+def resumir_eliminacion_usuario_unidad(sender, instance, origin=None, **kwargs):
+    # Al borrar la unidad o el condominio el resumen se recalcula o se borra con ellos
+    if _modelo_origen(origin) in (UsuarioUnidad, Usuario):
+        resumenes.aplicar_usuarios({clave: -total for clave, total in _relacion_activa(instance.pk).items()})
+
+@receiver(pre_save, sender=Usuario)
+def capturar_tipo_usuario(sender, instance, raw=False, update_fields=None, **kwargs):
+    # El login guarda solo last_login: no hace falta leer el tipo anterior
+    capturar = instance.pk and not raw and (update_fields is None or 'tipo' in update_fields)
+    instance._tipo_antes = Usuario.objects.filter(pk=instance.pk).values_list('tipo', flat=True).first() if capturar else None
+
+@receiver(post_save, sender=Usuario)
+def resumir_tipo_usuario(sender, instance, raw=False, **kwargs):
+    tipo_antes = getattr(instance, '_tipo_antes', None)
+    if raw or tipo_antes is None or tipo_antes == instance.tipo:
+        return
+    variaciones = {}
+    for (condominio_id, tipo), total in resumenes.usuarios_de_relaciones(instance.usuariounidad_set.all()).items():
+        variaciones[(condominio_id, tipo)] = total
+        variaciones[(condominio_id, tipo_antes)] = -total
+    resumenes.aplicar_usuarios(variaciones)
+
+@receiver(pre_save, sender=UnidadHabitacional)
+def capturar_condominio_unidad(sender, instance, raw=False, **kwargs):
+    instance._condominio_antes = (
+        UnidadHabitacional.objects.filter(pk=instance.pk).values_list('condominio_id', flat=True).first()
+        if instance.pk and not raw else None
+    )
+
+@receiver(post_save, sender=UnidadHabitacional)
+def resumir_unidad(sender, instance, raw=False, **kwargs):
+    # Mover una unidad de condominio mueve su cuenta y sus usuarios
+    antes = getattr(instance, '_condominio_antes', None)
+    if not raw and antes is not None and antes != instance.condominio_id:
+        resumenes.refrescar([antes, instance.condominio_id])
+
+@receiver(post_delete, sender=UnidadHabitacional)
+def resumir_eliminacion_unidad(sender, instance, origin=None, **kwargs):
+    if _modelo_origen(origin) is UnidadHabitacional:
+        resumenes.refrescar([instance.condominio_id])
+
+@receiver(post_save, sender=Condominio)
+def crear_resumen_condominio(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ResumenCondominio.objects.get_or_create(condominio=instance, defaults={'refrescado_en': timezone.now()})
+
+
+# ===================================
+# SERIES DE REPORTES (core/series.py)
+# ===================================
+
+@receiver(pre_save, sender=Factura)
+def capturar_vencimiento_factura(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Un pago guarda solo estado y updated_at: el vencimiento no cambió
+    capturar = instance.pk and not raw and (update_fields is None or 'fecha_vencimiento' in update_fields)
+    instance._vencimiento_antes = (
+        Factura.objects.filter(pk=instance.pk).values_list('fecha_vencimiento', flat=True).first() if capturar else None
+    )
+
+@receiver(post_save, sender=Factura)
+def invalidar_series_factura(sender, instance, raw=False, **kwargs):
+    if not raw:
+        series.invalidar_si_cerrada('morosidad', instance.fecha_vencimiento, getattr(instance, '_vencimiento_antes', None))
+
+@receiver(post_delete, sender=Factura)
+def invalidar_series_eliminacion_factura(sender, instance, **kwargs):
+    series.invalidar_si_cerrada('morosidad', instance.fecha_vencimiento)
+
+@receiver(post_save, sender=Pago)
+def invalidar_series_pago(sender, instance, raw=False, **kwargs):
+    if not raw:
+        series.invalidar_si_cerrada('ingresos', instance.fecha_pago)
+
+@receiver(post_delete, sender=Pago)
+def invalidar_series_eliminacion_pago(sender, instance, **kwargs):
+    series.invalidar_si_cerrada('ingresos', instance.fecha_pago)
@@ -1,3 +1,1017 @@
-from django.test import TestCase
+import base64
+import io
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import (
+    blobs, conciliacion, contadores, cuentas, enrutador_bd, exportacion, facturacion, metricas, resumenes, series,
+)
+from core.management.siembra import SiembraCommand
+from core.morosidad import sumar_meses
+from core.models import (
+    Blob, ClaveIdempotencia, Comunicado, ComunicadoUnidad, Condominio, ConceptoCobro, ContadorUsuario, Factura,
+    IncrementoResumen, MovimientoCuenta, Notificacion, Pago, RegistroEliminacion, ResumenCondominio, SaldoUnidad,
+    UnidadHabitacional, Usuario, UsuarioUnidad,
+)
+from core.consultas_repetidas import ConsultasRepetidasError, detectar_consultas_repetidas
+from core.views import FacturaViewSet, PagoViewSet, generar_token_sync, leer_token_sync
+
+
+class CuentasTestCase(TestCase):
+    """Datos base: un condominio con dos unidades ocupadas y una cuota mensual"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.condominio = Condominio.objects.create(nombre='Condominio Pruebas')
+        cls.unidad = UnidadHabitacional.objects.create(
+            condominio=cls.condominio, codigo='A-101', tipo='departamento', estado='ocupada'
+        )
+        cls.otra_unidad = UnidadHabitacional.objects.create(
+            condominio=cls.condominio, codigo='A-102', tipo='departamento', estado='ocupada'
+        )
+        cls.concepto = ConceptoCobro.objects.create(
+            nombre='Cuota de mantenimiento', tipo='cuota_mensual', monto=Decimal('150.00'),
+            periodicidad='mensual', condominio=cls.condominio,
+        )
+
+    def crear_factura(self, unidad=None, monto='150.00', estado='pendiente'):
+        hoy = date.today()
+        return Factura.objects.create(
+            unidad_habitacional=unidad or self.unidad, concepto_cobro=self.concepto, monto=Decimal(monto),
+            fecha_emision=hoy, fecha_vencimiento=hoy + timedelta(days=15), estado=estado,
+        )
+
+    def saldo(self, unidad=None):
+        cuenta = SaldoUnidad.objects.get(pk=(unidad or self.unidad).pk)
+        return {campo: getattr(cuenta, campo) for campo in cuentas.CAMPOS}
+
+    def assertCuadra(self, *unidades):
+        """Materializado, tablas de origen y suma del libro coinciden"""
+        ids = [u.pk for u in unidades or (self.unidad, self.otra_unidad)]
+        origen = cuentas.calcular(ids)
+        libro = cuentas.sumas_libro(ids)
+        for uid in ids:
+            cuenta = SaldoUnidad.objects.filter(pk=uid).values(*cuentas.CAMPOS).first()
+            if cuenta is None:
+                self.assertFalse(any(origen[uid].values()), f"Unidad {uid} sin cuenta y con movimientos")
+                continue
+            for campo in cuentas.CAMPOS:
+                self.assertEqual(cuenta[campo], origen[uid][campo], f"{campo} materializado de la unidad {uid}")
+                en_libro = libro.get(uid, {}).get(campo) or 0
+                self.assertEqual(en_libro, origen[uid][campo], f"{campo} en el libro de la unidad {uid}")
+
+
+class SenalesCuentasTests(CuentasTestCase):
+
+    def test_factura_nueva_abre_la_cuenta(self):
+        self.crear_factura()
+        self.assertEqual(self.saldo(), {
+            'total_facturado': Decimal('150.00'), 'total_pagado': Decimal('0'),
+            'saldo': Decimal('150.00'), 'facturas_pendientes': 1,
+        })
+        self.assertCuadra()
+
+    def test_pago_completado_y_factura_pagada(self):
+        factura = self.crear_factura()
+        Pago.objects.create(factura=factura, monto=factura.monto, metodo_pago='transferencia', estado='completado')
+        factura.estado = 'pagada'
+        factura.save()
+        self.assertEqual(self.saldo()['total_pagado'], Decimal('150.00'))
+        self.assertEqual(self.saldo()['saldo'], Decimal('0'))
+        self.assertEqual(self.saldo()['facturas_pendientes'], 0)
+        self.assertCuadra()
+
+    def test_pago_pendiente_no_suma_hasta_completarse(self):
+        factura = self.crear_factura()
+        pago = Pago.objects.create(factura=factura, monto=factura.monto, metodo_pago='efectivo')
+        self.assertEqual(self.saldo()['total_pagado'], Decimal('0'))
+        pago.estado = 'completado'
+        pago.save(update_fields=['estado'])
+        self.assertEqual(self.saldo()['total_pagado'], Decimal('150.00'))
+        self.assertCuadra()
+
+    def test_cambio_de_unidad_mueve_el_saldo(self):
+        factura = self.crear_factura(monto='80.00')
+        factura.unidad_habitacional = self.otra_unidad
+        factura.save()
+        self.assertEqual(self.saldo()['total_facturado'], Decimal('0'))
+        self.assertEqual(self.saldo(self.otra_unidad)['saldo'], Decimal('80.00'))
+        self.assertCuadra()
+
+    def test_borrar_factura_revierte_factura_y_pagos(self):
+        factura = self.crear_factura()
+        Pago.objects.create(factura=factura, monto=Decimal('50.00'), metodo_pago='efectivo', estado='completado')
+        factura.delete()
+        self.assertFalse(any(self.saldo().values()))
+        self.assertCuadra()
+
+    def test_borrar_unidad_con_facturas(self):
+        self.crear_factura()
+        unidad_id = self.unidad.pk
+        self.unidad.delete()
+        self.assertFalse(SaldoUnidad.objects.filter(pk=unidad_id).exists())
+        self.assertFalse(MovimientoCuenta.objects.filter(unidad_habitacional_id=unidad_id).exists())
+
+
+class OperacionesMasivasTests(CuentasTestCase):
+
+    def test_emision_masiva_registra_los_movimientos(self):
+        resultado = facturacion.generar_facturas(self.condominio.pk, date.today().replace(day=1))
+        self.assertEqual(resultado['creadas'], 2)
+        self.assertEqual(self.saldo()['saldo'], Decimal('150.00'))
+        self.assertEqual(self.saldo(self.otra_unidad)['facturas_pendientes'], 1)
+        self.assertCuadra()
+
+        # Repetir el periodo no duplica facturas ni movimientos
+        movimientos = MovimientoCuenta.objects.count()
+        facturacion.generar_facturas(self.condominio.pk, date.today().replace(day=1))
+        self.assertEqual(MovimientoCuenta.objects.count(), movimientos)
+
+    def test_conciliacion_paga_las_facturas(self):
+        factura = self.crear_factura()
+        self.crear_factura(unidad=self.otra_unidad, monto='90.00')
+        archivo = io.BytesIO(
+            f"factura,unidad,monto,referencia\n"
+            f"F-{factura.pk},A-101,150.00,TRX-1\n"
+            f",A-102,90.00,TRX-2\n"
+            f",A-102,90.00,TRX-3\n".encode()
+        )
+        proceso = conciliacion.Conciliacion(self.condominio.pk)
+        estados = [r['estado'] for r in proceso.procesar(conciliacion.leer_lineas(archivo, 'csv'))]
+
+        self.assertEqual(estados, ['conciliado', 'conciliado', 'no_encontrada'])
+        self.assertEqual(proceso.resumen['monto_conciliado'], Decimal('240.00'))
+        self.assertEqual(self.saldo()['saldo'], Decimal('0'))
+        self.assertEqual(self.saldo(self.otra_unidad)['total_pagado'], Decimal('90.00'))
+        self.assertCuadra()
+
+
+class VerificarSaldosTests(CuentasTestCase):
+
+    def verificar(self, *args):
+        salida = io.StringIO()
+        call_command('verificar_saldos', *args, stdout=salida)
+        return salida.getvalue()
+
+    def test_sin_diferencias(self):
+        self.crear_factura()
+        self.assertIn('0 diferencias', self.verificar())
+
+    def test_repara_un_descuadre(self):
+        self.crear_factura()
+        # Una escritura que no pasó por el libro
+        Factura.objects.filter(unidad_habitacional=self.unidad).update(monto=Decimal('200.00'))
+        self.assertIn('1 diferencias encontradas', self.verificar())
+
+        self.assertIn('1 diferencias corregidas', self.verificar('--reparar'))
+        self.assertEqual(self.saldo()['saldo'], Decimal('200.00'))
+        self.assertTrue(MovimientoCuenta.objects.filter(unidad_habitacional=self.unidad, tipo='correccion').exists())
+        self.assertCuadra()
+        self.assertIn('0 diferencias', self.verificar())
+
+    def test_abre_las_cuentas_sembradas_sin_senales(self):
+        hoy = date.today()
+        Factura.objects.bulk_create([
+            Factura(unidad_habitacional=unidad, concepto_cobro=self.concepto, monto=Decimal('150.00'),
+                    fecha_emision=hoy, fecha_vencimiento=hoy, estado='vencida')
+            for unidad in (self.unidad, self.otra_unidad)
+        ])
+        self.assertEqual(self.saldo()['saldo'], Decimal('0'))
+
+        siembra = SiembraCommand(stdout=io.StringIO())
+        siembra.batch_size = 1
+        siembra.reconstruir_cuentas([self.condominio.pk])
+        self.assertEqual(self.saldo()['saldo'], Decimal('150.00'))
+        self.assertCuadra()
+
+
+class ResumenesTests(CuentasTestCase):
+
+    def facturacion(self):
+        filas = resumenes.tablero()['facturacion_por_condominio']
+        return next(fila for fila in filas if fila['condominio_nombre'] == self.condominio.nombre)
+
+    def test_el_resumen_sigue_a_las_cuentas(self):
+        factura = self.crear_factura()
+        Pago.objects.create(factura=factura, monto=Decimal('40.00'), metodo_pago='efectivo', estado='completado')
+        self.assertEqual(self.facturacion(), {
+            'condominio_nombre': self.condominio.nombre, 'total_facturado': Decimal('150.00'),
+            'total_pagado': Decimal('40.00'), 'total_pendiente': Decimal('150.00'),
+        })
+
+    def test_condominio_sin_resumen_se_calcula_en_vivo(self):
+        self.crear_factura()
+        ResumenCondominio.objects.filter(pk=self.condominio.pk).delete()
+        tablero = resumenes.tablero()
+        self.assertEqual(tablero['condominios_en_vivo'], 1)
+        self.assertEqual(self.facturacion()['total_pendiente'], Decimal('150.00'))
+
+    def test_las_escrituras_no_tocan_la_fila_del_resumen(self):
+        antes = ResumenCondominio.objects.get(pk=self.condominio.pk).saldo
+        self.crear_factura()
+        self.assertEqual(ResumenCondominio.objects.get(pk=self.condominio.pk).saldo, antes)
+        self.assertTrue(IncrementoResumen.objects.filter(condominio=self.condominio).exists())
+        self.assertEqual(self.facturacion()['total_pendiente'], Decimal('150.00'))
+
+    def test_plegar_suma_y_borra_los_incrementos(self):
+        self.crear_factura()
+        self.crear_factura(unidad=self.otra_unidad, monto='90.00')
+        self.assertEqual(resumenes.plegar(), 2)
+        self.assertFalse(IncrementoResumen.objects.exists())
+        self.assertEqual(ResumenCondominio.objects.get(pk=self.condominio.pk).saldo, Decimal('240.00'))
+        self.assertEqual(self.facturacion()['total_pendiente'], Decimal('240.00'))
+        self.assertEqual(resumenes.plegar(), 0)
+
+    def test_refrescar_con_incrementos_pendientes_no_cuenta_dos_veces(self):
+        self.crear_factura()
+        resumenes.refrescar([self.condominio.pk])
+        self.assertEqual(self.facturacion()['total_pendiente'], Decimal('150.00'))
+        resumenes.plegar()
+        self.assertEqual(self.facturacion()['total_pendiente'], Decimal('150.00'))
+
+    def test_usuarios_por_tipo(self):
+        usuario = Usuario.objects.create_user(
+            email='residente@pruebas.com', password='x', nombre='Ana', apellidos='Pérez', ci='123', tipo='residente'
+        )
+        relacion = UsuarioUnidad.objects.create(
+            usuario=usuario, unidad=self.unidad, tipo_relacion='propietario', fecha_inicio=date.today()
+        )
+        filas = resumenes.tablero()['usuarios_por_condominio_y_tipo']
+        self.assertIn({'condominio_nombre': self.condominio.nombre, 'tipo_usuario': 'residente', 'total': 1}, filas)
+
+        resumenes.plegar()
+        relacion.fecha_fin = date.today()
+        relacion.save()
+        self.assertEqual(resumenes.tablero()['usuarios_por_condominio_y_tipo'], [])
+
+
+
+class MovilTestCase(CuentasTestCase):
+    """Un residente con relación activa en la unidad y un cliente autenticado como él"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.residente = Usuario.objects.create_user(
+            email='residente@movil.com', password='x', nombre='Eva', apellidos='Mamani', ci='789', tipo='residente'
+        )
+        cls.relacion = UsuarioUnidad.objects.create(
+            usuario=cls.residente, unidad=cls.unidad, tipo_relacion='propietario', fecha_inicio=date.today()
+        )
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.residente)
+
+    def notificar(self, tipo='pago', prioridad='media', **campos):
+        return Notificacion.objects.create(
+            usuario=self.residente, titulo='Aviso', mensaje='...', tipo=tipo, prioridad=prioridad, **campos
+        )
+
+
+class ContadoresTests(MovilTestCase):
+    CAMPOS = [f.name for f in ContadorUsuario._meta.concrete_fields if f.name not in ('usuario', 'updated_at')]
+
+    def contador(self):
+        return ContadorUsuario.objects.filter(pk=self.residente.pk).values(*self.CAMPOS).first()
+
+    def assertIgualAlRecalculo(self):
+        """Lo mantenido de forma incremental coincide con recalcular desde cero"""
+        incremental = self.contador()
+        contadores.recalcular_contadores([self.residente.pk])
+        self.assertEqual(incremental, self.contador())
+
+    def test_marcar_leida(self):
+        urgente = self.notificar(prioridad='alta')
+        self.notificar()
+        self.notificar(tipo='seguridad')
+        contadores.recalcular_contadores([self.residente.pk])
+
+        url = reverse('movil_notificaciones_leer', args=[urgente.pk])
+        self.assertEqual(self.cliente.post(url).status_code, 200)
+        # Marcarla otra vez no descuenta dos veces
+        self.cliente.post(url)
+
+        contador = self.contador()
+        self.assertEqual(contador['notificaciones_no_leidas'], 2)
+        self.assertEqual(contador['notificaciones_urgentes'], 0)
+        self.assertEqual(contador['notificaciones_pago'], 1)
+        self.assertIgualAlRecalculo()
+
+    def test_leer_todas(self):
+        self.notificar(prioridad='alta')
+        self.notificar(tipo='reserva')
+        contadores.recalcular_contadores([self.residente.pk])
+
+        respuesta = self.cliente.post(reverse('movil_notificaciones_leer_todas'))
+        self.assertEqual(respuesta.json()['cantidad_marcadas'], 2)
+        self.assertFalse(any(self.contador()[campo] for campo in contadores.CAMPOS_NOTIFICACIONES))
+        self.assertIgualAlRecalculo()
+
+    def test_comunicado_leido_al_abrirlo(self):
+        comunicado = Comunicado.objects.create(
+            titulo='Corte de agua', contenido='...', autor=self.residente, prioridad='urgente'
+        )
+        ComunicadoUnidad.objects.create(comunicado=comunicado, unidad_habitacional=self.unidad)
+        contadores.recalcular_contadores([self.residente.pk])
+        self.assertEqual(self.contador()['comunicados_urgentes'], 1)
+
+        self.assertEqual(self.cliente.get(reverse('movil_comunicados_detalle', args=[comunicado.pk])).status_code, 200)
+        self.assertEqual(self.contador()['comunicados_no_leidos'], 0)
+        self.assertEqual(self.contador()['comunicados_urgentes'], 0)
+        self.assertIgualAlRecalculo()
+
+    def test_notificacion_masiva_de_vencidas(self):
+        self.notificar(tipo='seguridad')
+        contadores.recalcular_contadores([self.residente.pk])
+        factura = self.crear_factura()
+        Factura.objects.filter(pk=factura.pk).update(fecha_vencimiento=date.today() - timedelta(days=1))
+
+        resultado = facturacion.marcar_vencidas(self.condominio.pk)
+        self.assertEqual(resultado['usuarios_notificados'], 1)
+        contador = self.contador()
+        self.assertEqual(contador['notificaciones_no_leidas'], 2)
+        self.assertEqual(contador['notificaciones_pago'], 1)
+        self.assertEqual(contador['notificaciones_urgentes'], 1)
+        self.assertIgualAlRecalculo()
+
+    def test_resumen_version_2_lee_los_contadores(self):
+        antigua = self.notificar(prioridad='alta')
+        Notificacion.objects.filter(pk=antigua.pk).update(fecha_envio=antigua.fecha_envio - timedelta(days=30))
+        self.notificar(tipo='seguridad')
+        contadores.recalcular_contadores([self.residente.pk])
+        url = reverse('movil_notificaciones_resumen')
+
+        v2 = self.cliente.get(url, {'version': '2'})
+        self.assertFalse(v2.has_header('Deprecation'))
+        self.assertEqual((v2.data['no_leidas'], v2.data['urgentes']), (2, 1))
+
+        # La versión 1 mantiene la ventana de 7 días de las apps publicadas
+        v1 = self.cliente.get(url)
+        self.assertEqual(v1['Deprecation'], 'true')
+        self.assertEqual((v1.data['no_leidas'], v1.data['urgentes']), (1, 0))
+
+    def test_notificacion_masiva_sin_fila_la_calcula(self):
+        factura = self.crear_factura()
+        Factura.objects.filter(pk=factura.pk).update(fecha_vencimiento=date.today() - timedelta(days=1))
+        ContadorUsuario.objects.filter(pk=self.residente.pk).delete()
+
+        facturacion.marcar_vencidas(self.condominio.pk)
+        self.assertEqual(self.contador()['notificaciones_pago'], 1)
+        self.assertIgualAlRecalculo()
+
+
+class SincronizacionTests(MovilTestCase):
+
+    def sincronizar(self, token=None):
+        respuesta = self.cliente.get(reverse('movil_sync'), {'since': token} if token else {})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def ids(self, datos, coleccion):
+        return {fila['id'] for fila in datos[coleccion]['cambios']}
+
+    def test_token_ida_y_vuelta(self):
+        momento = timezone.now()
+        self.assertEqual(leer_token_sync(generar_token_sync(momento)), momento)
+
+        factura = self.crear_factura()
+        completo = self.sincronizar()
+        self.assertTrue(completo['completo'])
+        self.assertIn(factura.pk, self.ids(completo, 'facturas'))
+
+        nueva = self.notificar()
+        borrada = self.notificar()
+        borrada_id = borrada.pk
+        borrada.delete()
+        delta = self.sincronizar(completo['token'])
+        self.assertFalse(delta['completo'])
+        self.assertIn(nueva.pk, self.ids(delta, 'notificaciones'))
+        self.assertEqual(delta['notificaciones']['eliminados'], [borrada_id])
+
+    def test_token_invalido(self):
+        token = generar_token_sync(timezone.now())
+        for invalido in ('basura', token[:-2] + ('AA' if not token.endswith('AA') else 'BB')):
+            respuesta = self.cliente.get(reverse('movil_sync'), {'since': invalido})
+            self.assertEqual(respuesta.status_code, 400)
+
+    def test_token_vencido_sincroniza_completo(self):
+        token = generar_token_sync(timezone.now() - timedelta(days=31))
+        self.assertTrue(self.sincronizar(token)['completo'])
+
+    def test_fin_de_relacion_deja_tombstone_y_fuerza_completo(self):
+        self.crear_factura()
+        token = self.sincronizar()['token']
+
+        self.relacion.fecha_fin = date.today()
+        self.relacion.save()
+        self.assertTrue(RegistroEliminacion.objects.filter(
+            modelo='usuario_unidad', objeto_id=self.relacion.pk, usuario=self.residente, unidad_habitacional=self.unidad
+        ).exists())
+
+        datos = self.sincronizar(token)
+        self.assertTrue(datos['completo'])
+        self.assertEqual(datos['facturas']['cambios'], [])
+
+    def test_mover_relacion_a_otra_unidad(self):
+        self.crear_factura()
+        otra = self.crear_factura(unidad=self.otra_unidad)
+        token = self.sincronizar()['token']
+
+        self.relacion.unidad = self.otra_unidad
+        self.relacion.save()
+        self.assertTrue(RegistroEliminacion.objects.filter(
+            modelo='usuario_unidad', objeto_id=self.relacion.pk, unidad_habitacional=self.unidad
+        ).exists())
+
+        datos = self.sincronizar(token)
+        self.assertTrue(datos['completo'])
+        self.assertEqual(self.ids(datos, 'facturas'), {otra.pk})
+
+    def test_otros_cambios_de_la_relacion_no_dejan_tombstone(self):
+        self.relacion.es_principal = not self.relacion.es_principal
+        self.relacion.save()
+        self.assertFalse(RegistroEliminacion.objects.filter(modelo='usuario_unidad').exists())
+
+    def test_borrar_relacion_activa_deja_tombstone(self):
+        relacion_id = self.relacion.pk
+        self.relacion.delete()
+        self.assertTrue(RegistroEliminacion.objects.filter(modelo='usuario_unidad', objeto_id=relacion_id).exists())
+
+
+class AdminTestCase(CuentasTestCase):
+    """Un administrador (staff) y un cliente autenticado como él"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = Usuario.objects.create_user(
+            email='admin@pruebas.com', password='x', nombre='Ada', apellidos='Quispe', ci='1',
+            tipo='administrador', is_staff=True,
+        )
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.admin)
+
+
+class CamposDinamicosTests(AdminTestCase):
+
+    def listar_facturas(self, **parametros):
+        """(primera fila del listado, SQL del SELECT de facturas)"""
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.cliente.get(reverse('factura-list'), parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        sql = next(
+            q['sql'] for q in consultas.captured_queries
+            if 'FROM "core_factura"' in q['sql'] and 'COUNT(' not in q['sql']
+        )
+        return respuesta.json()['results'][0], sql
+
+    def test_sin_parametros_lee_todas_las_columnas(self):
+        self.crear_factura()
+        fila, sql = self.listar_facturas()
+        self.assertIn('descripcion', fila)
+        self.assertIn('"core_factura"."descripcion"', sql)
+
+    def test_fields_difiere_las_columnas_no_pedidas(self):
+        self.crear_factura()
+        fila, sql = self.listar_facturas(fields='id,monto')
+        self.assertEqual(set(fila), {'id', 'monto'})
+        self.assertIn('"core_factura"."monto"', sql)
+        for columna in ('descripcion', 'fecha_vencimiento', 'periodo'):
+            self.assertNotIn(f'"core_factura"."{columna}"', sql)
+
+    def test_omit_difiere_las_columnas_omitidas(self):
+        self.crear_factura()
+        fila, sql = self.listar_facturas(omit='descripcion,periodo')
+        self.assertNotIn('descripcion', fila)
+        self.assertIn('fecha_vencimiento', fila)
+        self.assertNotIn('"core_factura"."descripcion"', sql)
+        self.assertIn('"core_factura"."fecha_vencimiento"', sql)
+
+    def test_display_conserva_su_columna(self):
+        self.crear_factura()
+        fila, sql = self.listar_facturas(fields='id,estado_display')
+        self.assertEqual(fila['estado_display'], 'Pendiente')
+        self.assertIn('"core_factura"."estado"', sql)
+
+
+class BlobsTests(MovilTestCase):
+    DATOS = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = self.settings(BLOB_STORAGE_ROOT=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.blob = blobs.guardar_bytes(self.DATOS)
+        self.url = reverse('descargar_blob', args=[self.blob.sha256])
+        self.etag = f'"{self.blob.sha256}"'
+
+    def descargar(self, **cabeceras):
+        respuesta = self.cliente.get(self.url, headers=cabeceras)
+        cuerpo = b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+        return respuesta, cuerpo
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        datos_uri = 'data:image/png;base64,' + base64.b64encode(self.DATOS).decode()
+        self.assertEqual(blobs.guardar_base64(datos_uri), self.blob)
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(blobs.leer_base64(self.blob.sha256, self.blob.content_type), datos_uri)
+
+    def test_descarga_completa(self):
+        respuesta, cuerpo = self.descargar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(cuerpo, self.DATOS)
+        self.assertEqual(respuesta['Content-Type'], 'image/png')
+        self.assertEqual(respuesta['ETag'], self.etag)
+        self.assertEqual(respuesta['Content-Length'], str(len(self.DATOS)))
+
+    def test_if_none_match(self):
+        self.assertEqual(self.descargar(if_none_match=self.etag)[0].status_code, 304)
+        self.assertEqual(self.descargar(if_none_match=f'"otro", {self.etag}')[0].status_code, 304)
+        self.assertEqual(self.descargar(if_none_match='*')[0].status_code, 304)
+        self.assertEqual(self.descargar(if_none_match='"otro"')[0].status_code, 200)
+
+    def test_rangos(self):
+        total = len(self.DATOS)
+        casos = [
+            ('bytes=0-99', 0, 99),
+            ('bytes=1000-', 1000, total - 1),
+            ('bytes=-32', total - 32, total - 1),
+            ('bytes=1020-5000', 1020, total - 1),
+        ]
+        for rango, inicio, fin in casos:
+            with self.subTest(rango=rango):
+                respuesta, cuerpo = self.descargar(range=rango)
+                self.assertEqual(respuesta.status_code, 206)
+                self.assertEqual(cuerpo, self.DATOS[inicio:fin + 1])
+                self.assertEqual(respuesta['Content-Range'], f'bytes {inicio}-{fin}/{total}')
+                self.assertEqual(respuesta['Content-Length'], str(fin - inicio + 1))
+
+    def test_rango_fuera_del_archivo_es_416(self):
+        respuesta, _ = self.descargar(range=f'bytes={len(self.DATOS)}-')
+        self.assertEqual(respuesta.status_code, 416)
+        self.assertEqual(respuesta['Content-Range'], f'bytes */{len(self.DATOS)}')
+
+    def test_if_range_distinto_devuelve_todo(self):
+        respuesta, cuerpo = self.descargar(range='bytes=0-99', if_range='"otro"')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(cuerpo, self.DATOS)
+
+    def test_blob_inexistente(self):
+        self.assertEqual(self.cliente.get(reverse('descargar_blob', args=['0' * 64])).status_code, 404)
+
+
+class MetricasTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        parche = mock.patch.object(metricas, 'histograma', metricas.Histograma())
+        self.histograma = parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_server_timing_cuenta_las_consultas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.cliente.get(reverse('factura-list'))
+        self.assertEqual(respuesta.status_code, 200)
+        partes = [parte.strip() for parte in respuesta['Server-Timing'].split(',')]
+        self.assertEqual([parte.split(';')[0] for parte in partes], ['db', 'ser', 'total'])
+        self.assertIn(f'desc="{len(consultas)} consultas"', partes[0])
+
+        estadistica = self.histograma.agregado()[('factura-list', 'GET')]
+        self.assertEqual(estadistica.cantidad, 1)
+        self.assertEqual(estadistica.consultas, len(consultas))
+        self.assertEqual(estadistica.bytes, len(respuesta.content))
+        self.assertGreater(estadistica.serializacion, 0)
+
+    def test_exportar_prometheus_acumula_las_cubetas(self):
+        for latencia in (0.003, 0.2, 20):
+            self.histograma.registrar(('factura-list', 'GET'), latencia, 2, 0.001, 0, 100, 0)
+        self.histograma.registrar(('factura-list', 'GET'), 0.01, 1, 0.001, 0, 10, 1)
+        lineas = metricas.exportar_prometheus().splitlines()
+
+        def valor(metrica, etiquetas='vista="factura-list",metodo="GET"'):
+            return next(linea.rsplit(' ', 1)[1] for linea in lineas if linea.startswith(f'{metricas.PREFIJO}_{metrica}{{{etiquetas}'))
+
+        self.assertEqual(valor('peticion_duracion_segundos_bucket', 'vista="factura-list",metodo="GET",le="0.005"'), '1')
+        self.assertEqual(valor('peticion_duracion_segundos_bucket', 'vista="factura-list",metodo="GET",le="0.25"'), '3')
+        self.assertEqual(valor('peticion_duracion_segundos_bucket', 'vista="factura-list",metodo="GET",le="+Inf"'), '4')
+        self.assertEqual(valor('peticion_duracion_segundos_count'), '4')
+        self.assertEqual(valor('consultas_sql'), '7')
+        self.assertEqual(valor('respuesta_bytes'), '310')
+        self.assertEqual(valor('errores'), '1')
+        self.assertIn(f'# TYPE {metricas.PREFIJO}_consultas_sql counter', lineas)
+
+    def test_endpoint_solo_para_administradores(self):
+        self.cliente.get(reverse('factura-list'))
+        respuesta = self.cliente.get(reverse('admin_metrics'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('vista="factura-list",metodo="GET"', respuesta.content.decode())
+
+        residente = Usuario.objects.create_user(
+            email='residente@pruebas.com', password='x', nombre='Rosa', apellidos='Mamani', ci='2', tipo='residente',
+        )
+        self.cliente.force_authenticate(residente)
+        self.assertEqual(self.cliente.get(reverse('admin_metrics')).status_code, 403)
+
+
+class ConsultasRepetidasTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.facturas = [self.crear_factura() for _ in range(3)]
+
+    def leer_una_por_una(self):
+        for factura in self.facturas:
+            Factura.objects.get(pk=factura.pk)
+
+    def test_lanza_al_llegar_al_umbral(self):
+        with self.assertRaises(ConsultasRepetidasError) as error:
+            with detectar_consultas_repetidas(umbral=3):
+                self.leer_una_por_una()
+        [(sql, cantidad, pila)] = error.exception.repetidas
+        self.assertEqual(cantidad, 3)
+        self.assertIn('"core_factura"', sql)
+        self.assertTrue(any(marco.startswith('core/tests.py') and 'leer_una_por_una' in marco for marco in pila))
+
+    def test_por_debajo_del_umbral_no_lanza(self):
+        with detectar_consultas_repetidas(umbral=4) as detector:
+            self.leer_una_por_una()
+        self.assertEqual(detector.repetidas(), [])
+
+    def test_listas_in_de_distinto_largo_son_la_misma_plantilla(self):
+        with detectar_consultas_repetidas(umbral=3, estricto=False) as detector:
+            for largo in (2, 3, 2):
+                list(Factura.objects.filter(pk__in=[f.pk for f in self.facturas[:largo]]))
+        self.assertEqual([cantidad for _, cantidad, _ in detector.repetidas()], [3])
+
+    def test_insercion_por_lotes_no_cuenta(self):
+        with detectar_consultas_repetidas(umbral=2):
+            for _ in range(3):
+                Notificacion.objects.bulk_create([
+                    Notificacion(usuario=self.admin, titulo='Aviso', mensaje='Aviso') for _ in range(2)
+                ])
+
+    def test_middleware_en_modo_error_falla_las_lecturas(self):
+        with mock.patch.object(FacturaViewSet, 'queryset', Factura.objects.all()), \
+                override_settings(N_MAS_UNO_MODO='error', N_MAS_UNO_UMBRAL=3):
+            with self.assertRaises(ConsultasRepetidasError) as error:
+                self.cliente.get(reverse('factura-list'))
+        self.assertIn('GET /api/facturas/ (factura-list)', str(error.exception))
+
+    def test_middleware_en_modo_log_solo_avisa(self):
+        with mock.patch.object(FacturaViewSet, 'queryset', Factura.objects.all()), \
+                override_settings(N_MAS_UNO_MODO='log', N_MAS_UNO_UMBRAL=3), \
+                self.assertLogs('core.consultas_repetidas', 'WARNING') as registros:
+            respuesta = self.cliente.get(reverse('factura-list'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(all(registro.vista == 'factura-list' for registro in registros.records))
+
+    def test_listado_corregido_no_repite_consultas(self):
+        with override_settings(N_MAS_UNO_UMBRAL=3):
+            self.assertEqual(self.cliente.get(reverse('factura-list')).status_code, 200)
+
+
+class ExportacionTests(AdminTestCase):
+    ESPACIO = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+    def leer_xlsx(self, datos):
+        """{hoja: [[valor de cada celda como texto]]} de un XLSX generado por core/exportacion.py"""
+        with zipfile.ZipFile(io.BytesIO(datos)) as libro:
+            self.assertIsNone(libro.testzip())
+            self.assertIn('[Content_Types].xml', libro.namelist())
+            hojas = ElementTree.fromstring(libro.read('xl/workbook.xml')).iterfind('.//m:sheet', self.ESPACIO)
+            contenido = {}
+            for numero, hoja in enumerate(hojas, start=1):
+                xml = ElementTree.fromstring(libro.read(f'xl/worksheets/sheet{numero}.xml'))
+                contenido[hoja.get('name')] = [
+                    [''.join(celda.itertext()) for celda in fila] for fila in xml.iterfind('.//m:row', self.ESPACIO)
+                ]
+        return contenido
+
+    def test_exportar_facturas_a_xlsx(self):
+        primera = self.crear_factura(monto='150.00')
+        primera.descripcion = 'Cuota <marzo> & extras\x01'
+        primera.save()
+        segunda = self.crear_factura(unidad=self.otra_unidad, monto='99.50', estado='pagada')
+
+        respuesta = self.cliente.get(reverse('factura-exportar'), {'formato': 'xlsx', 'ordering': 'monto'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], exportacion.CONTENT_TYPE_XLSX)
+        self.assertIn('.xlsx"', respuesta['Content-Disposition'])
+
+        [(hoja, filas)] = self.leer_xlsx(b''.join(respuesta.streaming_content)).items()
+        self.assertEqual(hoja, 'Facturas')
+        self.assertEqual(filas[0][:4], ['id', 'condominio', 'unidad', 'concepto'])
+        serial = str((primera.fecha_emision - date(1899, 12, 30)).days)
+        self.assertEqual(filas[1], [
+            str(segunda.pk), 'Condominio Pruebas', 'A-102', 'Cuota de mantenimiento', segunda.descripcion or '',
+            segunda.periodo or '', '99.50', serial, str(int(serial) + 15), 'pagada',
+        ])
+        self.assertEqual(filas[2][0], str(primera.pk))
+        self.assertEqual(filas[2][4], 'Cuota <marzo> & extras')
+        self.assertEqual(len(filas), 3)
+
+    def test_pasa_a_otra_hoja_al_llegar_al_limite(self):
+        for cantidad, por_hoja in ((5, [2, 2, 1]), (4, [2, 2])):
+            with self.subTest(cantidad=cantidad), mock.patch.object(exportacion, 'FILAS_POR_HOJA', 3):
+                filas = [(n, f'fila {n}') for n in range(cantidad)]
+                hojas = self.leer_xlsx(b''.join(exportacion.filas_xlsx(['n', 'texto'], filas)))
+                self.assertEqual(list(hojas)[:2], ['Datos', 'Datos (2)'])
+                self.assertEqual([len(contenido) - 1 for contenido in hojas.values()], por_hoja)
+                self.assertTrue(all(contenido[0] == ['n', 'texto'] for contenido in hojas.values()))
+                self.assertEqual([fila for contenido in hojas.values() for fila in contenido[1:]],
+                                 [[str(n), texto] for n, texto in filas])
+
+    def test_exportar_facturas_a_csv(self):
+        factura = self.crear_factura()
+        respuesta = self.cliente.get(reverse('factura-exportar'))
+        self.assertEqual(respuesta.status_code, 200)
+        lineas = b''.join(respuesta.streaming_content).decode('utf-8').splitlines()
+        self.assertTrue(lineas[0].startswith('\ufeffid,condominio,unidad'))
+        self.assertEqual(len(lineas), 2)
+        self.assertTrue(lineas[1].startswith(f'{factura.pk},Condominio Pruebas,A-101,'))
+
+    def test_exportar_formato_desconocido(self):
+        self.assertEqual(self.cliente.get(reverse('factura-exportar'), {'formato': 'pdf'}).status_code, 400)
+
+
+class SeriesTests(CuentasTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.mes = timezone.localdate().replace(day=1)
+        self.desde = sumar_meses(self.mes, -3)
+
+    def pagar(self, monto, dia):
+        """Pago completado con fecha_pago el día dado (a mediodía); se guarda con save(), como la API"""
+        pago = Pago.objects.create(
+            factura=self.crear_factura(), monto=Decimal(monto), metodo_pago='efectivo', estado='completado'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            pago.fecha_pago = timezone.make_aware(datetime(dia.year, dia.month, dia.day, 12))
+            pago.save()
+        return pago
+
+    def ingresos(self):
+        return [(c['cubeta'], c['total']) for c in series.INGRESOS.calcular(self.desde, timezone.localdate(), 'mes')]
+
+    def test_cubetas_sin_datos_en_cero(self):
+        self.pagar('100.00', sumar_meses(self.mes, -2) + timedelta(days=9))
+        self.pagar('40.00', timezone.localdate())
+        self.assertEqual(self.ingresos(), [
+            (self.desde, 0),
+            (sumar_meses(self.mes, -2), Decimal('100.00')),
+            (sumar_meses(self.mes, -1), 0),
+            (self.mes, Decimal('40.00')),
+        ])
+
+    def test_semanas_empiezan_en_lunes(self):
+        lunes = series.inicio_cubeta(timezone.localdate(), 'semana') - timedelta(days=14)
+        self.pagar('25.00', lunes + timedelta(days=6))
+        resultado = series.INGRESOS.calcular(lunes + timedelta(days=2), lunes + timedelta(days=15), 'semana')
+        self.assertEqual(
+            [(c['cubeta'], c['total']) for c in resultado],
+            [(lunes, Decimal('25.00')), (lunes + timedelta(days=7), 0), (lunes + timedelta(days=14), 0)],
+        )
+
+    def test_cubetas_cerradas_salen_de_la_cache(self):
+        anterior = sumar_meses(self.mes, -1)
+        pago = self.pagar('100.00', anterior)
+        self.assertEqual(self.ingresos()[2], (anterior, Decimal('100.00')))
+
+        # Sin señales la caché no se entera: la cubeta cerrada no se vuelve a consultar
+        Pago.objects.filter(pk=pago.pk).update(monto=Decimal('1.00'))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.ingresos()[2], (anterior, Decimal('100.00')))
+
+    def test_cubeta_abierta_siempre_se_recalcula(self):
+        self.ingresos()
+        self.pagar('40.00', timezone.localdate())
+        self.assertEqual(self.ingresos()[-1], (self.mes, Decimal('40.00')))
+
+    def test_pago_con_fecha_pasada_invalida_la_cache(self):
+        anterior = sumar_meses(self.mes, -1)
+        self.pagar('100.00', anterior)
+        self.assertEqual(self.ingresos()[2], (anterior, Decimal('100.00')))
+
+        self.pagar('30.00', anterior + timedelta(days=3))
+        self.assertEqual(self.ingresos()[2], (anterior, Decimal('130.00')))
+
+    def test_leer_rango_invalido(self):
+        for parametros in (
+            {'granularidad': 'anio'},
+            {'desde': '2026-13-01'},
+            {'desde': '2026-05-01', 'hasta': '2026-04-01'},
+            {'desde': '2000-01-01', 'hasta': '2026-01-01', 'granularidad': 'dia'},
+        ):
+            with self.subTest(parametros=parametros), self.assertRaises(ValueError):
+                series.leer_rango(parametros)
+
+class PagoIdempotenteTests(TransactionTestCase):
+    """pagos/registrar/ con Idempotency-Key (core/idempotencia.py), con transacciones reales"""
+
+    def setUp(self):
+        condominio = Condominio.objects.create(nombre='Condominio Pagos')
+        unidad = UnidadHabitacional.objects.create(
+            condominio=condominio, codigo='B-201', tipo='departamento', estado='ocupada'
+        )
+        concepto = ConceptoCobro.objects.create(
+            nombre='Cuota de mantenimiento', tipo='cuota_mensual', monto=Decimal('150.00'),
+            periodicidad='mensual', condominio=condominio,
+        )
+        self.residente = Usuario.objects.create_user(
+            email='pagador@pruebas.com', password='x', nombre='Luis', apellidos='Rojas', ci='456', tipo='residente'
+        )
+        UsuarioUnidad.objects.create(
+            usuario=self.residente, unidad=unidad, tipo_relacion='propietario', fecha_inicio=date.today()
+        )
+        self.factura = Factura.objects.create(
+            unidad_habitacional=unidad, concepto_cobro=concepto, monto=Decimal('150.00'),
+            fecha_emision=date.today(), fecha_vencimiento=date.today() + timedelta(days=15),
+        )
+        self.url = reverse('pago-registrar')
+
+    def pagar(self, clave, monto='150.00'):
+        cliente = APIClient()
+        cliente.force_authenticate(self.residente)
+        return cliente.post(
+            self.url, {'factura_id': self.factura.pk, 'monto': monto}, format='json',
+            HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def en_paralelo(self, *claves_y_montos):
+        """Envía las peticiones a la vez, cada una en su hilo y su conexión"""
+        respuestas = [None] * len(claves_y_montos)
+        barrera = threading.Barrier(len(claves_y_montos))
+
+        def enviar(indice, clave, monto):
+            try:
+                barrera.wait()
+                respuestas[indice] = self.pagar(clave, monto)
+            finally:
+                connections.close_all()
+
+        original = PagoViewSet.registrar_pago
+
+        def lento(vista, request):
+            respuesta = original(vista, request)
+            time.sleep(0.2)  # La transacción sigue abierta mientras llega la otra petición
+            return respuesta
+
+        with mock.patch.object(PagoViewSet, 'registrar_pago', lento):
+            hilos = [
+                threading.Thread(target=enviar, args=(i, clave, monto))
+                for i, (clave, monto) in enumerate(claves_y_montos)
+            ]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        return respuestas
+
+    def test_misma_clave_repite_la_respuesta(self):
+        primera = self.pagar('clave-1')
+        self.assertEqual(primera.status_code, 201)
+        self.assertFalse(primera.has_header('Idempotent-Replayed'))
+
+        repetida = self.pagar('clave-1')
+        self.assertEqual(repetida.status_code, 201)
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetida.json(), primera.json())
+        self.assertEqual(Pago.objects.count(), 1)
+
+    def test_misma_clave_con_otro_cuerpo_es_422(self):
+        self.assertEqual(self.pagar('clave-1', '50.00').status_code, 201)
+        self.assertEqual(self.pagar('clave-1', '60.00').status_code, 422)
+        self.assertEqual(Pago.objects.count(), 1)
+
+    def test_sin_clave_es_400(self):
+        self.assertEqual(self.pagar('').status_code, 400)
+        self.assertFalse(Pago.objects.exists())
+
+    def test_si_procesar_falla_no_queda_la_clave(self):
+        with mock.patch.object(Pago.objects, 'create', side_effect=DatabaseError('caída')):
+            with self.assertRaises(DatabaseError):
+                self.pagar('clave-1')
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+        self.assertFalse(Pago.objects.exists())
+
+        # El reintento con la misma clave procesa el pago
+        reintento = self.pagar('clave-1')
+        self.assertEqual(reintento.status_code, 201)
+        self.assertFalse(reintento.has_header('Idempotent-Replayed'))
+        self.assertEqual(Pago.objects.count(), 1)
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_misma_clave_en_paralelo_crea_un_pago(self):
+        respuestas = self.en_paralelo(('clave-1', '150.00'), ('clave-1', '150.00'))
+        self.assertEqual([r.status_code for r in respuestas], [201, 201])
+        self.assertEqual(sum(r.has_header('Idempotent-Replayed') for r in respuestas), 1)
+        self.assertEqual(Pago.objects.count(), 1)
+        self.factura.refresh_from_db()
+        self.assertEqual(self.factura.estado, 'pagada')
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_claves_distintas_en_paralelo_no_pagan_de_mas(self):
+        respuestas = self.en_paralelo(('clave-1', '100.00'), ('clave-2', '100.00'))
+        self.assertEqual(sorted(r.status_code for r in respuestas), [201, 400])
+        self.assertEqual(Pago.objects.get().monto, Decimal('100.00'))
+        self.factura.refresh_from_db()
+        self.assertEqual(self.factura.estado, 'pendiente')
+
+
+class EnrutadorReplicaTests(TransactionTestCase):
+    """
+    core/enrutador_bd.py con una réplica 'replica' que es la misma conexión que
+    'default'. Con transacciones reales: dentro de un atomic() todo va a la primaria.
+    """
+
+    def setUp(self):
+        condominio = Condominio.objects.create(nombre='Condominio Réplica')
+        unidad = UnidadHabitacional.objects.create(
+            condominio=condominio, codigo='C-301', tipo='departamento', estado='ocupada'
+        )
+        concepto = ConceptoCobro.objects.create(
+            nombre='Cuota de mantenimiento', tipo='cuota_mensual', monto=Decimal('150.00'),
+            periodicidad='mensual', condominio=condominio,
+        )
+        self.factura = Factura.objects.create(
+            unidad_habitacional=unidad, concepto_cobro=concepto, monto=Decimal('150.00'),
+            fecha_emision=date.today(), fecha_vencimiento=date.today() + timedelta(days=15),
+        )
+        self.admin = Usuario.objects.create_user(
+            email='admin@replica.com', password='x', nombre='Ada', apellidos='Quispe', ci='1',
+            tipo='administrador', is_staff=True,
+        )
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.admin)
+
+        connections['replica'] = connections['default']
+        self.addCleanup(delattr, connections._connections, 'replica')
+        for parche in (
+            mock.patch.object(enrutador_bd, 'alias_replica', return_value='replica'),
+            mock.patch.object(enrutador_bd, 'monitor', enrutador_bd.MonitorRetraso()),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def alias_de_lectura(self, url):
+        """Alias al que el enrutador mandó las lecturas de facturas durante el GET"""
+        alias = set()
+        original = enrutador_bd.EnrutadorReplica.db_for_read
+
+        def db_for_read(enrutador, model, **hints):
+            elegido = original(enrutador, model, **hints)
+            if model is Factura:
+                alias.add(elegido)
+            return elegido
+
+        with mock.patch.object(enrutador_bd.EnrutadorReplica, 'db_for_read', db_for_read):
+            respuesta = self.cliente.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return alias
+
+    def test_listados_leen_de_la_replica(self):
+        self.assertEqual(self.alias_de_lectura(reverse('factura-list')), {'replica'})
+
+    def test_detalle_lee_de_la_primaria(self):
+        self.assertEqual(self.alias_de_lectura(reverse('factura-detail', args=[self.factura.pk])), {'default'})
+
+    def test_despues_de_escribir_lee_de_la_primaria(self):
+        respuesta = self.cliente.post(reverse('condominios-list'), {'nombre': 'Otro condominio'}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.alias_de_lectura(reverse('factura-list')), {'default'})
+
+        # Pasada la pegajosidad vuelve a la réplica
+        cache.clear()
+        self.assertEqual(self.alias_de_lectura(reverse('factura-list')), {'replica'})
+
+    def test_escritura_fallida_no_es_pegajosa(self):
+        respuesta = self.cliente.post(reverse('condominios-list'), {}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.alias_de_lectura(reverse('factura-list')), {'replica'})
+
+    def test_replica_atrasada_lee_de_la_primaria(self):
+        with mock.patch.object(enrutador_bd.MonitorRetraso, 'medir', return_value=60.0):
+            self.assertEqual(self.alias_de_lectura(reverse('factura-list')), {'default'})
@@ -54,19 +54,27 @@ urlpatterns = [
 
     # Dashboard Admin
     path('admin/dashboard/', dashboard_admin, name='admin_dashboard'),
+    path('admin/metrics/', metricas_prometheus, name='admin_metrics'),
 
     # Autenticación MÓVIL
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/logout/', LogoutView.as_view(), name='logout'),
 
+    # Facturación masiva por periodo (solo administradores)
+    path('facturacion/generar/', GenerarFacturacionView.as_view(), name='facturacion-generar'),
+    path('facturacion/conciliar-pagos/', ConciliarPagosView.as_view(), name='facturacion-conciliar-pagos'),
+
     # === NUEVOS ENDPOINTS DE REPORTES ===
     path('reportes/financieros/', IndicadoresFinancierosView.as_view(), name='indicadores-financieros'),
     path('reportes/areas-comunes/', ReporteAreasComunesView.as_view(), name='reporte-areas-comunes'),
     path('reportes/visuales/', ReporteVisualesView.as_view(), name='reporte-visuales'),
+    path('reportes/antiguedad-saldos/', AntiguedadSaldosView.as_view(), name='reporte-antiguedad-saldos'),
+    path('morosidad/predicciones/', PrediccionesMorosidadView.as_view(), name='morosidad-predicciones'),
 
     # Endpoints MÓVIL
     path('movil/dashboard/', dashboard_movil, name='movil_dashboard'),
     path('movil/cuotas-servicios/', consultar_cuotas_servicios, name='movil_consultar_cuotas'),
+    path('movil/sync/', sincronizar_movil, name='movil_sync'),
 
     # COMUNICADOS MÓVIL
     path('movil/comunicados/', listar_comunicados_movil, name='movil_comunicados_lista'),
@@ -83,8 +91,16 @@ urlpatterns = [
     path('movil/notificaciones/actualizar-token/', actualizar_token_notificacion, name='movil_notificaciones_actualizar_token'),
     path('movil/notificaciones/resumen/', resumen_notificaciones_movil, name='movil_notificaciones_resumen'),
 
+    # MÓVIL ASYNC (mismas respuestas; consultas en paralelo, para servir con uvicorn)
+    path('movil/async/dashboard/', dashboard_movil_async, name='movil_dashboard_async'),
+    path('movil/async/cuotas-servicios/', consultar_cuotas_servicios_async, name='movil_consultar_cuotas_async'),
+    path('movil/async/notificaciones/', listar_notificaciones_movil_async, name='movil_notificaciones_lista_async'),
+
     # RECONOCIMIENTO FACIAL
     path('ia/registrar-rostro/<int:usuario_id>/', registrar_rostro_usuario, name='registrar_rostro'),
     path('ia/procesar-acceso/', procesar_acceso_facial, name='procesar_acceso_facial'),
     path('ia/estadisticas-acceso/', obtener_estadisticas_acceso, name='estadisticas_acceso'),
+
+    # IMÁGENES (almacén de blobs)
+    path('blobs/<str:sha256>/', descargar_blob, name='descargar_blob'),
 ]
@@ -4,35 +4,51 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.parsers import MultiPartParser
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken  # si usas JWT
 
-from rest_framework import viewsets, filters
+from rest_framework import filters, serializers
 
 from rest_framework.decorators import api_view, permission_classes, action
 
-from django.db.models import Prefetch, Count, Sum, Case, When, DecimalField, F
-from django.db.models.functions import TruncMonth
+from django.db.models import Count, Sum, Max, F, Exists, OuterRef
+from django.db.models.functions import Greatest
 
 from django.utils import timezone
 from datetime import date, datetime, timedelta
+from decimal import Decimal
 
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 # -----------------API
 import base64
+import csv
+import logging
 import requests
 import json
 import re
 import tempfile
 import os
 from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
 
 
 from .serializers import *
 from .models import *
+from . import (
+    asincrono, blobs, conciliacion, contadores, cuentas, exportacion, facturacion, idempotencia, metricas, morosidad,
+    resumenes, series,
+)
+from .enrutador_bd import alias_lectura
+
+logger = logging.getLogger('core.views')
 
 # -------------------------------------------------------------------
 # Helper para obtener IP del cliente
@@ -84,9 +100,134 @@ class BitacoraCRUDMixin:
         detalles = f"Eliminó {display_obj(instance)} (id={getattr(instance, 'id', '-')})"
         log_bitacora(self.request, "eliminar", self.bitacora_modulo, detalles)
         instance.delete()
+
+# Mixin de campos dinámicos para las lecturas (GET) de los ViewSets:
+#   ?fields=a,b  -> solo esos campos
+#   ?omit=a,b    -> todos menos esos
+#   ?expand=usuario -> el UsuarioSerializer completo en las relaciones de
+#                   usuario_relaciones (con su prefetch)
+# Las columnas del modelo que no se devuelven se excluyen del SELECT con defer().
+class CamposDinamicosMixin:
+    usuario_relaciones = []
+
+    def _parametro_lista(self, nombre):
+        valor = self.request.query_params.get(nombre, '')
+        return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+    def _campos_descartados(self, fields):
+        solo = self._parametro_lista('fields')
+        descartados = {nombre for nombre in fields if solo and nombre not in solo}
+        descartados |= {nombre for nombre in self._parametro_lista('omit') if nombre in fields}
+        return descartados
+
+    def _columnas_diferibles(self, model):
+        fields = self.get_serializer_class()(context=self.get_serializer_context()).fields
+        descartados = self._campos_descartados(fields)
+        if not descartados:
+            return []
+
+        # Atributos del modelo que siguen necesitando los campos devueltos
+        necesarias = set()
+        pendientes = [(campo, True) for nombre, campo in fields.items() if nombre not in descartados]
+        while pendientes:
+            campo, propio = pendientes.pop()
+            if campo.write_only:
+                continue
+            anidado = getattr(campo, 'child', campo)
+            if isinstance(anidado, serializers.ModelSerializer):
+                # Un serializer anidado del mismo modelo puede recibir la misma instancia (caché inversa)
+                pendientes += [(hijo, anidado.Meta.model is model) for hijo in anidado.fields.values()]
+            if not propio:
+                continue
+            fuente = campo.source.split('.')[0]
+            if fuente == '*':
+                return []
+            necesarias.add(fuente)
+            if fuente.startswith('get_') and fuente.endswith('_display'):
+                necesarias.add(fuente[4:-8])
+
+        return [
+            f.name for f in model._meta.concrete_fields
+            if not f.primary_key and not f.is_relation and f.name not in necesarias
+        ]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+
+        diferidas = self._columnas_diferibles(queryset.model)
+        if diferidas:
+            queryset = queryset.defer(*diferidas)
+
+        if 'usuario' in campos_expandidos(self.request) and self.usuario_relaciones:
+            queryset = queryset.prefetch_related(*[
+                f"{relacion}__{ruta}" for relacion in self.usuario_relaciones for ruta in USUARIO_PREFETCH
+            ])
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request.method == 'GET':
+            destino = getattr(serializer, 'child', serializer)
+            for nombre in self._campos_descartados(destino.fields):
+                destino.fields.pop(nombre)
+        return serializer
+
+class BaseModelViewSet(CamposDinamicosMixin, ModelViewSet):
+    """ModelViewSet base de la API (campos dinámicos ?fields= / ?omit= / ?expand=)"""
+    pass
+
+# Mixin de exportación: GET <listado>/exportar/?formato=csv|xlsx con los mismos
+# ?search= y ?ordering= del listado. Lee solo las columnas de columnas_exportacion
+# con values_list().iterator() y escribe el archivo en streaming (core/exportacion.py),
+# así que la memoria no depende de la cantidad de filas.
+class ExportacionMixin:
+    columnas_exportacion = []  # (ruta para values_list, encabezado)
+    nombre_exportacion = 'exportacion'
+
+    @action(detail=False, methods=['get'], url_path='exportar', permission_classes=[IsAdminUser])
+    def exportar(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'xlsx'):
+            return Response({"error": "formato: csv | xlsx"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # El archivo se genera después de salir del middleware: el alias de lectura se fija aquí
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).using(alias_lectura())
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        filas = queryset.values_list(*[ruta for ruta, _ in self.columnas_exportacion]).iterator(chunk_size=2000)
+        encabezados = [encabezado for _, encabezado in self.columnas_exportacion]
+        nombre = f"{self.nombre_exportacion}_{timezone.localdate():%Y%m%d}.{formato}"
+        if formato == 'xlsx':
+            return exportacion.respuesta_xlsx(nombre, encabezados, filas, hoja=self.nombre_exportacion.capitalize())
+        return exportacion.respuesta_csv(nombre, encabezados, filas)
+
+# Mixin que recalcula los contadores de no leídos (ContadorUsuario)
+# de los usuarios afectados por el CRUD
+class ContadoresCRUDMixin:
+    def contadores_usuarios(self, instance):
+        return []
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            contadores.recalcular_contadores(self.contadores_usuarios(serializer.instance))
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            antes = self.contadores_usuarios(serializer.instance)
+            super().perform_update(serializer)
+            contadores.recalcular_contadores(antes + self.contadores_usuarios(serializer.instance))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            antes = self.contadores_usuarios(instance)
+            super().perform_destroy(instance)
+            contadores.recalcular_contadores(antes)
 # -------------------------------------------------------------------
 
-class UsuarioViewSet(BitacoraCRUDMixin, ModelViewSet):
+class UsuarioViewSet(BitacoraCRUDMixin, BaseModelViewSet):
     bitacora_modulo = "Usuarios"
     queryset = Usuario.objects.all().order_by('-id')
     permission_classes = [IsAuthenticated]
@@ -98,6 +239,13 @@ class UsuarioViewSet(BitacoraCRUDMixin, ModelViewSet):
         if self.action in ['create']:
             return UsuarioRegistroSerializer
         return UsuarioSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # UsuarioSerializer completo: unidades, roles, grupos y permisos de todos los usuarios de la página
+        if self.action not in ('create', 'listar_todos'):
+            queryset = queryset.prefetch_related(*USUARIO_PREFETCH)
+        return queryset
     
     # Trae todos
     """@action(detail=False, methods=['get'], url_path='todos')
@@ -164,7 +312,7 @@ class LoginView(APIView):
             'usuario': UsuarioLoginSerializer(user).data
         })
 
-class CondominioViewSet(BitacoraCRUDMixin, ModelViewSet):
+class CondominioViewSet(BitacoraCRUDMixin, BaseModelViewSet):
     bitacora_modulo = "Condominios"
     queryset = Condominio.objects.all()
     serializer_class = CondominioSerializer
@@ -176,9 +324,9 @@ class CondominioViewSet(BitacoraCRUDMixin, ModelViewSet):
         serializer = self.get_serializer(condominios, many=True)
         return Response(serializer.data)
 
-class UnidadHabitacionalViewSet(BitacoraCRUDMixin, ModelViewSet):
+class UnidadHabitacionalViewSet(BitacoraCRUDMixin, BaseModelViewSet):
     bitacora_modulo = "Unidades"
-    queryset = UnidadHabitacional.objects.all()
+    queryset = UnidadHabitacional.objects.select_related('condominio')
     serializer_class = UnidadHabitacionalSerializer
     permission_classes = [IsAuthenticated]
 
@@ -188,7 +336,7 @@ class UnidadHabitacionalViewSet(BitacoraCRUDMixin, ModelViewSet):
         serializer = UnidadHabitacionalSelectSerializer(unidades, many=True)
         return Response(serializer.data)
 
-class UsuarioUnidadViewSet(viewsets.ModelViewSet):
+class UsuarioUnidadViewSet(ContadoresCRUDMixin, BaseModelViewSet):
     queryset = UsuarioUnidad.objects.select_related('usuario', 'unidad', 'unidad__condominio')
     serializer_class = UsuarioUnidadSerializer
     permission_classes = [IsAuthenticated]
@@ -199,6 +347,9 @@ class UsuarioUnidadViewSet(viewsets.ModelViewSet):
         'unidad__codigo', 'unidad__condominio__nombre'
     ]
 
+    def contadores_usuarios(self, instance):
+        return [instance.usuario_id]
+
 # Endpoint útil para gestión de relaciones
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -216,7 +367,9 @@ def gestionar_unidades_usuario(request, usuario_id=None):
         data['usuario'] = usuario_id
         serializer = UsuarioUnidadSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                relacion = serializer.save()
+                contadores.recalcular_contadores([relacion.usuario_id])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -224,8 +377,8 @@ def gestionar_unidades_usuario(request, usuario_id=None):
 # FINANZAS
 # ===================================
 
-class ConceptoCobroViewSet(ModelViewSet):
-    queryset = ConceptoCobro.objects.all()
+class ConceptoCobroViewSet(BaseModelViewSet):
+    queryset = ConceptoCobro.objects.select_related('condominio')
     serializer_class = ConceptoCobroSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -233,16 +386,30 @@ class ConceptoCobroViewSet(ModelViewSet):
     ordering_fields = ['monto', 'aplica_desde', 'aplica_hasta']
 
 
-class FacturaViewSet(ModelViewSet):
-    queryset = Factura.objects.all()
+class FacturaViewSet(ExportacionMixin, BaseModelViewSet):
+    queryset = Factura.objects.select_related('unidad_habitacional__condominio', 'concepto_cobro__condominio')
     serializer_class = FacturaSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['descripcion', 'estado']
     ordering_fields = ['fecha_emision', 'fecha_vencimiento', 'monto']
 
+    nombre_exportacion = 'facturas'
+    columnas_exportacion = [
+        ('id', 'id'),
+        ('unidad_habitacional__condominio__nombre', 'condominio'),
+        ('unidad_habitacional__codigo', 'unidad'),
+        ('concepto_cobro__nombre', 'concepto'),
+        ('descripcion', 'descripcion'),
+        ('periodo', 'periodo'),
+        ('monto', 'monto'),
+        ('fecha_emision', 'fecha_emision'),
+        ('fecha_vencimiento', 'fecha_vencimiento'),
+        ('estado', 'estado'),
+    ]
 
-class PagoViewSet(ModelViewSet):
+
+class PagoViewSet(ExportacionMixin, BaseModelViewSet):
     queryset = Pago.objects.all()
     serializer_class = PagoSerializer
     permission_classes = [IsAuthenticated]
@@ -250,6 +417,181 @@ class PagoViewSet(ModelViewSet):
     search_fields = ['referencia_pago', 'estado', 'metodo_pago']
     ordering_fields = ['fecha_pago', 'monto']
 
+    nombre_exportacion = 'pagos'
+    columnas_exportacion = [
+        ('id', 'id'),
+        ('factura_id', 'factura'),
+        ('factura__unidad_habitacional__condominio__nombre', 'condominio'),
+        ('factura__unidad_habitacional__codigo', 'unidad'),
+        ('monto', 'monto'),
+        ('metodo_pago', 'metodo_pago'),
+        ('referencia_pago', 'referencia_pago'),
+        ('estado', 'estado'),
+        ('fecha_pago', 'fecha_pago'),
+    ]
+
+    @action(detail=False, methods=['post'], url_path='registrar')
+    def registrar(self, request):
+        """
+        Registra un pago completado y marca la factura 'pagada' cuando los pagos cubren su monto.
+        Idempotente: exige el encabezado Idempotency-Key (ver core/idempotencia.py)
+        Body: {"factura_id": id, "monto": "120.00" (defecto: el saldo), "metodo_pago": "app",
+               "referencia_pago": "", "comprobante": ""}
+        """
+        respuesta = idempotencia.responder(request, lambda: self.registrar_pago(request))
+        if respuesta.status_code == status.HTTP_201_CREATED and not respuesta.has_header('Idempotent-Replayed'):
+            log_bitacora(
+                request, "registrar_pago", "Finanzas",
+                f"Pago #{respuesta.data['pago']['id']} de la factura #{respuesta.data['factura']['id']} "
+                f"por {respuesta.data['pago']['monto']}"
+            )
+        return respuesta
+
+    def registrar_pago(self, request):
+        # Corre dentro de la transacción de idempotencia.responder
+        serializer = RegistrarPagoSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        datos = serializer.validated_data
+
+        # La factura queda bloqueada hasta el commit: los pagos simultáneos de una factura van en fila
+        factura = Factura.objects.select_for_update().filter(pk=datos['factura_id']).first()
+        if factura is None or not (
+            request.user.is_staff
+            or unidades_activas_usuario(request.user).filter(pk=factura.unidad_habitacional_id).exists()
+        ):
+            return Response({"error": "Factura no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+        if factura.estado not in ESTADOS_PENDIENTES:
+            return Response({"error": f"La factura está {factura.estado}"}, status=status.HTTP_409_CONFLICT)
+
+        pagado = Pago.objects.filter(factura=factura, estado='completado').aggregate(total=Sum('monto'))['total'] or Decimal('0')
+        saldo = factura.monto - pagado
+        monto = datos.get('monto') or saldo
+        if monto > saldo:
+            return Response({"error": f"El monto supera el saldo de la factura ({saldo})"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Pago y factura pasan por save(): las señales registran ambos en el libro de cuentas
+        pago = Pago.objects.create(
+            factura=factura,
+            monto=monto,
+            metodo_pago=datos['metodo_pago'],
+            referencia_pago=datos.get('referencia_pago'),
+            comprobante=datos.get('comprobante'),
+            estado='completado',
+        )
+        if monto == saldo:
+            factura.estado = 'pagada'
+            factura.save(update_fields=['estado', 'updated_at'])
+
+        return Response({
+            "pago": PagoSerializer(pago).data,
+            "factura": {
+                "id": factura.id,
+                "estado": factura.estado,
+                "monto": str(factura.monto),
+                "pagado": str(pagado + monto),
+                "saldo": str(saldo - monto),
+            },
+        }, status=status.HTTP_201_CREATED)
+
+
+# ===================================
+# FACTURACIÓN MASIVA
+# ===================================
+
+class GenerarFacturacionView(APIView):
+    """
+    Emite las facturas de un condominio para un periodo (ver core/facturacion.py)
+    Body: {"condominio": id, "periodo": "AAAA-MM", "simular": false}
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        condominio_id = request.data.get('condominio')
+        periodo = request.data.get('periodo')
+        simular = str(request.data.get('simular', False)).lower() in ('1', 'true')
+        try:
+            periodo = facturacion.leer_periodo(periodo) if periodo else timezone.localdate().replace(day=1)
+        except (ValueError, AttributeError):
+            return Response(
+                {"error": "Periodo inválido (formato AAAA-MM)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not str(condominio_id or '').isdigit():
+            return Response({"error": "Condominio inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        if not Condominio.objects.filter(pk=condominio_id).exists():
+            return Response(
+                {"error": "Condominio no encontrado"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultado = facturacion.generar_facturas(int(condominio_id), periodo, simular=simular)
+        if not simular:
+            log_bitacora(
+                request, "generar_facturas", "Facturación",
+                f"{resultado['condominio']} {resultado['periodo']}: {resultado['creadas']} facturas"
+            )
+        return Response(resultado, status=status.HTTP_201_CREATED if resultado['creadas'] and not simular else status.HTTP_200_OK)
+
+
+class ConciliarPagosView(APIView):
+    """
+    Concilia los pagos de un extracto bancario (ver core/conciliacion.py)
+    multipart: archivo (CSV o JSONL con factura, unidad, monto, referencia), condominio,
+    formato (csv | jsonl, por defecto según la extensión), metodo_pago (defecto: transferencia)
+    Responde en streaming JSONL: un resultado por línea del archivo y al final {"resumen": {...}}
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        archivo = request.FILES.get('archivo')
+        condominio_id = request.data.get('condominio')
+        formato = request.data.get('formato') or (conciliacion.detectar_formato(archivo.name) if archivo else None)
+        metodo_pago = request.data.get('metodo_pago') or 'transferencia'
+        if archivo is None:
+            return Response({"error": "Falta el archivo"}, status=status.HTTP_400_BAD_REQUEST)
+        if formato not in conciliacion.FORMATOS:
+            return Response({"error": f"Formato inválido: {formato}"}, status=status.HTTP_400_BAD_REQUEST)
+        if metodo_pago not in dict(Pago.METODO_PAGO_CHOICES):
+            return Response({"error": f"Método de pago inválido: {metodo_pago}"}, status=status.HTTP_400_BAD_REQUEST)
+        if not str(condominio_id or '').isdigit():
+            return Response({"error": "Condominio inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        if not Condominio.objects.filter(pk=condominio_id).exists():
+            return Response({"error": "Condominio no encontrado"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            lineas = conciliacion.leer_lineas(archivo.file, formato)
+        except (conciliacion.ArchivoInvalido, UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": f"Archivo inválido: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        proceso = conciliacion.Conciliacion(
+            int(condominio_id), metodo_pago=metodo_pago, origen=archivo.name
+        )
+
+        def reporte():
+            # Los errores a mitad del archivo ya no pueden cambiar el estado HTTP: van como una
+            # línea más y el resumen se emite igual. Lo ya conciliado queda confirmado (un lote por transacción)
+            try:
+                for resultado in proceso.procesar(lineas):
+                    yield json.dumps(resultado, ensure_ascii=False) + '\n'
+            except (UnicodeDecodeError, csv.Error) as e:
+                yield json.dumps({"error": f"Archivo inválido: {e}"}, ensure_ascii=False) + '\n'
+            except DatabaseError:
+                logger.exception("Conciliación de %s interrumpida", archivo.name)
+                yield json.dumps({"error": "Error de base de datos: se detuvo la conciliación"}, ensure_ascii=False) + '\n'
+            resumen = proceso.resumen
+            try:
+                log_bitacora(
+                    request, "conciliar_pagos", "Finanzas",
+                    f"{archivo.name}: {resumen['conciliadas']} de {resumen['lineas']} líneas, "
+                    f"total {resumen['monto_conciliado']}"
+                )
+            except DatabaseError:
+                logger.exception("No se pudo registrar en la bitácora la conciliación de %s", archivo.name)
+            yield json.dumps({"resumen": resumen}, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+        return StreamingHttpResponse(reporte(), content_type='application/x-ndjson; charset=utf-8')
+
 
 class IndicadoresFinancierosView(APIView):
     permission_classes = [IsAuthenticated]
@@ -288,6 +630,129 @@ class IndicadoresFinancierosView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class AntiguedadSaldosPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class AntiguedadSaldosView(APIView):
+    """
+    Antigüedad de saldos: deuda por tramos de días de atraso (ver cuentas.antiguedad_saldos)
+    GET ?fecha=AAAA-MM-DD (defecto: hoy) &condominio=id &nivel=condominio|unidad &formato=json|csv
+    A nivel de unidad la respuesta JSON va paginada (?page=, ?page_size=); el CSV trae todas las filas
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        nivel = request.query_params.get('nivel', 'condominio')
+        formato = request.query_params.get('formato', 'json')
+        condominio_id = request.query_params.get('condominio')
+        try:
+            fecha = date.fromisoformat(request.query_params['fecha']) if request.query_params.get('fecha') else timezone.localdate()
+        except ValueError:
+            return Response({"error": "Fecha inválida (formato AAAA-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+        if nivel not in ('condominio', 'unidad') or formato not in ('json', 'csv'):
+            return Response({"error": "nivel: condominio | unidad, formato: json | csv"}, status=status.HTTP_400_BAD_REQUEST)
+        if condominio_id and not str(condominio_id).isdigit():
+            return Response({"error": "Condominio inválido"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # El CSV se genera después de salir del middleware: el alias de lectura se fija aquí
+        alias = alias_lectura()
+        filas = cuentas.antiguedad_saldos(fecha, nivel, condominio_id).using(alias)
+        tramos = [clave for clave, _, _ in cuentas.TRAMOS_ANTIGUEDAD]
+
+        if formato == 'csv':
+            claves = ['condominio', 'codigo'] if nivel == 'unidad' else ['condominio']
+            columnas = claves + ['facturas'] + tramos + ['total']
+            return exportacion.respuesta_csv(
+                f"antiguedad_saldos_{nivel}_{fecha.isoformat()}.csv",
+                ['unidad' if c == 'codigo' else c for c in columnas],
+                ([fila[c] for c in columnas] for fila in filas.iterator(chunk_size=2000)),
+            )
+
+        if nivel == 'unidad':
+            # Se paginan las unidades y los tramos se calculan solo para las de la página
+            paginator = AntiguedadSaldosPagination()
+            pagina = paginator.paginate_queryset(cuentas.unidades_con_deuda(condominio_id).using(alias), request, view=self)
+            filas = cuentas.antiguedad_saldos(fecha, nivel, unidad_ids=[u['id'] for u in pagina]).using(alias)
+            respuesta = paginator.get_paginated_response(list(filas))
+            respuesta.data['fecha'] = fecha.isoformat()
+            respuesta.data['tramos'] = tramos
+            return respuesta
+
+        condominios = list(filas)
+        totales = {c: sum((fila[c] for fila in condominios), 0) for c in tramos + ['total', 'facturas']}
+        return Response({
+            "fecha": fecha.isoformat(),
+            "tramos": tramos,
+            "condominios": condominios,
+            "totales": totales,
+        })
+
+# ===================================
+# RIESGO DE MOROSIDAD
+# ===================================
+
+class PrediccionesMorosidadPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class PrediccionesMorosidadView(APIView):
+    """
+    Riesgo de morosidad por unidad, de mayor a menor score (ver core/morosidad.py)
+    GET ?periodo=AAAA-MM (defecto: el último puntuado) &condominio=id &score_minimo=0.5 &modelo=id (defecto: el activo)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        for nombre in ('condominio', 'modelo'):
+            if params.get(nombre) and not params[nombre].isdigit():
+                return Response({"error": f"{nombre} inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periodo = facturacion.leer_periodo(params['periodo']) if params.get('periodo') else None
+            score_minimo = float(params['score_minimo']) if params.get('score_minimo') else None
+        except ValueError:
+            return Response({"error": "periodo: AAAA-MM, score_minimo: número entre 0 y 1"}, status=status.HTTP_400_BAD_REQUEST)
+
+        modelo = ModeloIA.objects.filter(pk=params['modelo']).first() if params.get('modelo') else morosidad.modelo_activo()
+        if modelo is None:
+            return Response({"error": "No hay un modelo de morosidad entrenado"}, status=status.HTTP_404_NOT_FOUND)
+        predicciones = PrediccionMorosidad.objects.filter(modelo_ia=modelo)
+        if periodo is None:
+            periodo = predicciones.aggregate(ultimo=Max('periodo_predicho'))['ultimo']
+
+        predicciones = predicciones.filter(periodo_predicho=periodo)
+        if params.get('condominio'):
+            predicciones = predicciones.filter(unidad_habitacional__condominio_id=params['condominio'])
+        if score_minimo is not None:
+            predicciones = predicciones.filter(score_morosidad__gte=score_minimo)
+        predicciones = predicciones.order_by('-score_morosidad', 'unidad_habitacional_id').values(
+            'unidad_habitacional_id', 'score_morosidad', 'fecha_prediccion', 'variables_utilizadas',
+            codigo=F('unidad_habitacional__codigo'),
+            condominio_id=F('unidad_habitacional__condominio_id'),
+            condominio=F('unidad_habitacional__condominio__nombre'),
+        )
+
+        paginator = PrediccionesMorosidadPagination()
+        pagina = paginator.paginate_queryset(predicciones, request, view=self)
+        for fila in pagina:
+            fila['variables_utilizadas'] = json.loads(fila['variables_utilizadas'] or '{}')
+        respuesta = paginator.get_paginated_response(pagina)
+        respuesta.data['periodo'] = f"{periodo:%Y-%m}" if periodo else None
+        respuesta.data['modelo'] = {
+            "id": modelo.id,
+            "nombre": modelo.nombre,
+            "version": modelo.version,
+            "estado": modelo.estado,
+            "auc": modelo.precision,
+            "fecha_entrenamiento": modelo.fecha_entrenamiento,
+        }
+        return respuesta
+
 # ===================================
 # REPORTES - ÁREAS COMUNES
 # ===================================
@@ -348,53 +813,40 @@ class ReporteAreasComunesView(APIView):
 # ===================================
 
 class ReporteVisualesView(APIView):
+    """
+    Series de ingresos y morosidad sin huecos (core/series.py) y reservas por área.
+    Rango: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&granularidad=dia|semana|mes
+    (por defecto, los últimos 12 meses)
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         try:
-            hoy = date.today()
-            hace_12_meses = hoy - timedelta(days=365)
-            hace_6_meses = hoy - timedelta(days=180)
-
-            # === INGRESOS MENSUALES ===
-            pagos = (
-                Pago.objects.filter(estado="completado", fecha_pago__gte=hace_12_meses)
-                .annotate(mes=TruncMonth("fecha_pago"))
-                .values("mes")
-                .annotate(total=Sum("monto"))
-                .order_by("mes")
-            )
+            desde, hasta, granularidad = series.leer_rango(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            def periodo(cubeta):
+                if granularidad == 'mes':
+                    return {"periodo": cubeta.isoformat(), "mes": cubeta.strftime("%Y-%m")}
+                return {"periodo": cubeta.isoformat()}
+
+            # === INGRESOS ===
             ingresos_mensuales = [
-                {"mes": p["mes"].strftime("%Y-%m"), "total": float(p["total"] or 0)}
-                for p in pagos if p["mes"]
+                {**periodo(c['cubeta']), "total": float(c['total'])}
+                for c in series.INGRESOS.calcular(desde, hasta, granularidad)
             ]
 
-            # === MOROSIDAD MENSUAL ===
-            facturas = (
-                Factura.objects.filter(fecha_vencimiento__gte=hace_12_meses)
-                .annotate(mes=TruncMonth("fecha_vencimiento"))
-                .values("mes", "estado")
-                .annotate(total=Count("id"))
-                .order_by("mes")
-            )
-            morosidad_dict = {}
-            for f in facturas:
-                mes = f["mes"].strftime("%Y-%m") if f["mes"] else "N/A"
-                if mes not in morosidad_dict:
-                    morosidad_dict[mes] = {"pendientes": 0, "vencidas": 0}
-                if f["estado"] == "pendiente":
-                    morosidad_dict[mes]["pendientes"] = f["total"]
-                elif f["estado"] == "vencida":
-                    morosidad_dict[mes]["vencidas"] = f["total"]
-
+            # === MOROSIDAD ===
             morosidad_mensual = [
-                {"mes": mes, **valores} for mes, valores in morosidad_dict.items()
+                {**periodo(c['cubeta']), "pendientes": c['pendientes'], "vencidas": c['vencidas']}
+                for c in series.MOROSIDAD.calcular(desde, hasta, granularidad)
             ]
 
             # === RESERVAS POR ÁREA ===
             reservas = (
                 Reserva.objects.filter(
-                    fecha_reserva__gte=hace_6_meses,
+                    fecha_reserva__gte=timezone.localdate() - timedelta(days=180),
                     estado__in=["confirmada", "completada"]
                 )
                 .values("area_comun__nombre")
@@ -407,6 +859,10 @@ class ReporteVisualesView(APIView):
             ]
 
             return Response({
+                "granularidad": granularidad,
+                "desde": desde,
+                "hasta": hasta,
+                "zona_horaria": str(timezone.get_current_timezone()),
                 "ingresos_mensuales": ingresos_mensuales,
                 "morosidad_mensual": morosidad_mensual,
                 "reservas_por_area": reservas_por_area
@@ -422,50 +878,69 @@ class ReporteVisualesView(APIView):
 # COMUNICACIÓN
 # ===================================
 
-class ComunicadoViewSet(ModelViewSet):
-    queryset = Comunicado.objects.all()
+class ComunicadoViewSet(ContadoresCRUDMixin, BaseModelViewSet):
+    queryset = Comunicado.objects.select_related('autor')
+    usuario_relaciones = ['autor']
     serializer_class = ComunicadoSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['titulo', 'contenido', 'prioridad']
     ordering_fields = ['fecha_publicacion', 'prioridad']
 
+    def contadores_usuarios(self, instance):
+        return contadores.usuarios_de_comunicado(instance.id)
 
-class ComunicadoUnidadViewSet(ModelViewSet):
-    queryset = ComunicadoUnidad.objects.all()
+
+class ComunicadoUnidadViewSet(ContadoresCRUDMixin, BaseModelViewSet):
+    queryset = ComunicadoUnidad.objects.select_related(
+        'comunicado__autor', 'unidad_habitacional__condominio'
+    )
+    usuario_relaciones = ['comunicado__autor']
     serializer_class = ComunicadoUnidadSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['comunicado', 'unidad_habitacional']
 
-class ComunicadoLeidoViewSet(viewsets.ModelViewSet):
+    def contadores_usuarios(self, instance):
+        return contadores.usuarios_de_unidad(instance.unidad_habitacional_id)
+
+class ComunicadoLeidoViewSet(ContadoresCRUDMixin, BaseModelViewSet):
     queryset = ComunicadoLeido.objects.all()
     serializer_class = ComunicadoLeidoSerializer
     permission_classes = [IsAuthenticated]
 
+    def contadores_usuarios(self, instance):
+        return [instance.usuario_id]
+
     def perform_create(self, serializer):
         comunicado = serializer.validated_data['comunicado']
         usuario = self.request.user
         if ComunicadoLeido.objects.filter(comunicado=comunicado, usuario=usuario).exists():
             raise serializers.ValidationError("Este comunicado ya fue marcado como leído.")
-        serializer.save(usuario=usuario)
+        with transaction.atomic():
+            serializer.save(usuario=usuario)
+            contadores.recalcular_contadores([usuario.id])
 
 # ===================================
 # NOTIFICACIONES
 # ===================================
 
-class NotificacionViewSet(ModelViewSet):
-    queryset = Notificacion.objects.all()
+class NotificacionViewSet(ContadoresCRUDMixin, BaseModelViewSet):
+    queryset = Notificacion.objects.select_related('usuario', 'unidad_habitacional__condominio')
+    usuario_relaciones = ['usuario']
     serializer_class = NotificacionSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['titulo', 'mensaje', 'tipo', 'prioridad']
     ordering_fields = ['fecha_envio', 'prioridad', 'enviada', 'es_leida']
 
+    def contadores_usuarios(self, instance):
+        return [instance.usuario_id]
+
 
-class AreaComunViewSet(BitacoraCRUDMixin, viewsets.ModelViewSet):
+class AreaComunViewSet(BitacoraCRUDMixin, BaseModelViewSet):
     bitacora_modulo = "Áreas Comunes"
-    queryset = AreaComun.objects.all().order_by('-id')
+    queryset = AreaComun.objects.select_related('condominio').order_by('-id')
     serializer_class = AreaComunSerializer
     permission_classes = [IsAuthenticated]
 
@@ -481,7 +956,7 @@ class AreaComunViewSet(BitacoraCRUDMixin, viewsets.ModelViewSet):
             queryset = queryset.filter(condominio_id=condominio_id)
         return queryset
 
-class ReservaViewSet(viewsets.ModelViewSet):
+class ReservaViewSet(BaseModelViewSet):
     queryset = Reserva.objects.all()
     serializer_class = ReservaSerializer
     permission_classes = [IsAuthenticated]
@@ -506,7 +981,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class CategoriaMantenimientoViewSet(viewsets.ModelViewSet):
+class CategoriaMantenimientoViewSet(BaseModelViewSet):
     queryset = CategoriaMantenimiento.objects.all().order_by('-id')
     serializer_class = CategoriaMantenimientoSerializer
     permission_classes = [IsAuthenticated]
@@ -523,7 +998,7 @@ class CategoriaMantenimientoViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(condominio_id=condominio_id)
         return queryset
 
-class SolicitudMantenimientoViewSet(viewsets.ModelViewSet):
+class SolicitudMantenimientoViewSet(BaseModelViewSet):
     queryset = SolicitudMantenimiento.objects.all()
     serializer_class = SolicitudMantenimientoSerializer
     permission_classes = [IsAuthenticated]
@@ -553,7 +1028,7 @@ class SolicitudMantenimientoViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class TareaMantenimientoViewSet(viewsets.ModelViewSet):
+class TareaMantenimientoViewSet(BaseModelViewSet):
     queryset = TareaMantenimiento.objects.all()
     serializer_class = TareaMantenimientoSerializer
     permission_classes = [IsAuthenticated]
@@ -580,7 +1055,7 @@ class TareaMantenimientoViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-class MantenimientoPreventivoViewSet(viewsets.ModelViewSet):
+class MantenimientoPreventivoViewSet(BaseModelViewSet):
     queryset = MantenimientoPreventivo.objects.all()
     serializer_class = MantenimientoPreventivoSerializer
     permission_classes = [IsAuthenticated]
@@ -607,8 +1082,9 @@ class MantenimientoPreventivoViewSet(viewsets.ModelViewSet):
 # IA Y SEGURIDAD - VIEWS
 # ===================================
 
-class VehiculoViewSet(viewsets.ModelViewSet):
+class VehiculoViewSet(BaseModelViewSet):
     queryset = Vehiculo.objects.select_related('usuario')
+    usuario_relaciones = ['usuario']
     serializer_class = VehiculoSerializer
     permission_classes = [IsAuthenticated]
 
@@ -622,26 +1098,43 @@ class VehiculoViewSet(viewsets.ModelViewSet):
         serializer = VehiculoSelectSerializer(unidades, many=True)
         return Response(serializer.data)
 
-class RegistroAccesoViewSet(viewsets.ModelViewSet):
-    queryset = RegistroAcceso.objects.select_related('usuario', 'vehiculo').order_by('-fecha_hora')
+class RegistroAccesoViewSet(ExportacionMixin, BaseModelViewSet):
+    queryset = RegistroAcceso.objects.select_related('usuario', 'vehiculo__usuario').order_by('-fecha_hora')
+    usuario_relaciones = ['usuario', 'vehiculo__usuario']
     serializer_class = RegistroAccesoSerializer
     permission_classes = [IsAuthenticated]
 
-class VisitanteViewSet(viewsets.ModelViewSet):
+    nombre_exportacion = 'accesos'
+    columnas_exportacion = [
+        ('id', 'id'),
+        ('fecha_hora', 'fecha_hora'),
+        ('tipo', 'tipo'),
+        ('direccion', 'direccion'),
+        ('metodo', 'metodo'),
+        ('usuario__email', 'usuario'),
+        ('vehiculo__placa', 'vehiculo'),
+        ('reconocimiento_exitoso', 'reconocimiento_exitoso'),
+        ('confidence_score', 'confidence_score'),
+    ]
+
+class VisitanteViewSet(BaseModelViewSet):
     queryset = Visitante.objects.select_related('anfitrion').order_by('-fecha_entrada')
+    usuario_relaciones = ['anfitrion']
     serializer_class = VisitanteSerializer
     permission_classes = [IsAuthenticated]
 
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre', 'documento_identidad', 'telefono']
 
-class IncidenteSeguridadViewSet(viewsets.ModelViewSet):
+class IncidenteSeguridadViewSet(BaseModelViewSet):
     queryset = IncidenteSeguridad.objects.select_related('usuario_reporta', 'usuario_asignado').order_by('-fecha_hora')
+    usuario_relaciones = ['usuario_reporta', 'usuario_asignado']
     serializer_class = IncidenteSeguridadSerializer
     permission_classes = [IsAuthenticated]
 
-class BitacoraViewSet(viewsets.ModelViewSet):
+class BitacoraViewSet(BaseModelViewSet):
     queryset = Bitacora.objects.select_related('usuario').order_by('-created_at')
+    usuario_relaciones = ['usuario']
     serializer_class = BitacoraSerializer
     permission_classes = [IsAuthenticated]
 
@@ -654,7 +1147,7 @@ class BitacoraViewSet(viewsets.ModelViewSet):
     ordering_fields = ['id', 'created_at']
     ordering = ['-created_at']
 
-class CamaraSeguridadViewSet(viewsets.ModelViewSet):
+class CamaraSeguridadViewSet(BaseModelViewSet):
     queryset = CamaraSeguridad.objects.select_related('condominio')
     serializer_class = CamaraSeguridadSerializer
     permission_classes = [IsAuthenticated]
@@ -688,6 +1181,92 @@ class LogoutView(APIView):
 
 # Cuotas y Servicios
 
+ESTADOS_PENDIENTES = ['pendiente', 'vencida']
+
+def unidades_activas_usuario(usuario):
+    return UnidadHabitacional.objects.filter(
+        usuariounidad__usuario=usuario,
+        usuariounidad__fecha_fin__isnull=True
+    ).select_related('condominio').distinct()
+
+def consultas_cuotas_servicios(unidades):
+    """
+    Consultas independientes de consultar_cuotas_servicios: la vista síncrona
+    las ejecuta en orden y la async (ASGI) a la vez
+    """
+    # Facturas de TODAS las unidades del usuario en los últimos 6 meses
+    seis_meses_atras = date.today() - timedelta(days=180)  # 6 meses aprox
+    facturas = Factura.objects.filter(
+        unidad_habitacional_id__in=[unidad.id for unidad in unidades],
+        fecha_emision__gte=seis_meses_atras
+    )
+    pendientes = models.Q(estado__in=ESTADOS_PENDIENTES)
+    pagadas = models.Q(estado='pagada')
+    
+    def listado(filtro):
+        def consulta():
+            return FacturaMovilSerializer(
+                facturas.filter(filtro).select_related(
+                    'concepto_cobro', 'unidad_habitacional', 'unidad_habitacional__condominio'
+                ).order_by('-fecha_emision', '-estado'),
+                many=True
+            ).data
+        return consulta
+    
+    def resumen():
+        # Pendiente y pagado de los últimos 6 meses (las mismas facturas que se listan), en una consulta agrupada
+        ventana = {
+            fila['unidad_habitacional']: fila
+            for fila in facturas.values('unidad_habitacional').annotate(
+                total_pendiente=Sum('monto', filter=pendientes),
+                cantidad_pendientes=Count('id', filter=pendientes),
+                total_pagado=Sum('monto', filter=pagadas),
+                cantidad_pagadas=Count('id', filter=pagadas),
+            ).order_by()
+        }
+        # Deuda de siempre: saldo materializado de cada unidad (core/cuentas.py), incluye facturas de más de 6 meses
+        saldos = cuentas.saldos_de(unidad.id for unidad in unidades)
+        return {
+            unidad_id: {
+                **ventana.get(unidad_id, {}),
+                'saldo_total': saldo['saldo'],
+                'cantidad_pendientes_total': saldo['facturas_pendientes'],
+            }
+            for unidad_id, saldo in saldos.items()
+        }
+    
+    return {
+        'facturas_pendientes': listado(pendientes),
+        'facturas_pagadas': listado(pagadas),
+        'resumen': resumen,
+    }
+
+def respuesta_cuotas_servicios(unidades, resultados):
+    resumen_unidades = []
+    for unidad in unidades:
+        fila = resultados['resumen'].get(unidad.id, {})
+        resumen_unidades.append({
+            "unidad_id": unidad.id,
+            "codigo": unidad.codigo,
+            "condominio": unidad.condominio.nombre,
+            "total_pendiente": float(fila.get('total_pendiente') or 0),
+            "total_pagado": float(fila.get('total_pagado') or 0),
+            "cantidad_pendientes": fila.get('cantidad_pendientes', 0),
+            "cantidad_pagadas": fila.get('cantidad_pagadas', 0),
+            "saldo_total": float(fila.get('saldo_total') or 0),
+            "cantidad_pendientes_total": fila.get('cantidad_pendientes_total', 0),
+        })
+    
+    return {
+        "resumen_unidades": resumen_unidades,
+        "facturas_pendientes": resultados['facturas_pendientes'],
+        "facturas_pagadas": resultados['facturas_pagadas'],
+        "total_general_pendiente": sum(u['total_pendiente'] for u in resumen_unidades),
+        "total_general_pagado": sum(u['total_pagado'] for u in resumen_unidades),
+        "total_general_saldo": sum(u['saldo_total'] for u in resumen_unidades),
+        "unidades_activas": [unidad.codigo for unidad in unidades]
+    }
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def consultar_cuotas_servicios(request):
@@ -696,64 +1275,20 @@ def consultar_cuotas_servicios(request):
     VERSIÓN CORREGIDA - SIN RECURSIÓN
     """
     try:
-        usuario = request.user
-        
         # Obtener las unidades habitacionales activas del usuario
-        unidades_usuario = UnidadHabitacional.objects.filter(
-            usuariounidad__usuario=usuario,
-            usuariounidad__fecha_fin__isnull=True
-        ).distinct()
+        unidades_usuario = list(unidades_activas_usuario(request.user))
         
-        if not unidades_usuario.exists():
+        if not unidades_usuario:
             return Response(
                 {"error": "No tiene unidades habitacionales asignadas"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Consultar facturas de TODAS las unidades del usuario en los últimos 6 meses
-        hoy = date.today()
-        seis_meses_atras = hoy - timedelta(days=180)  # 6 meses aprox
-        
-        # Pre-cargar facturas de todas las unidades del usuario
-        facturas = Factura.objects.filter(
-            unidad_habitacional__in=unidades_usuario,
-            fecha_emision__gte=seis_meses_atras
-        ).select_related(
-            'concepto_cobro', 'unidad_habitacional', 'unidad_habitacional__condominio'
-        ).prefetch_related(
-            Prefetch('pago_set', queryset=Pago.objects.filter(estado='completado'))
-        ).order_by('-fecha_emision', '-estado')
-        
-        # Agrupar por estado para facilitar el display en móvil
-        facturas_pendientes = facturas.filter(estado__in=['pendiente', 'vencida'])
-        facturas_pagadas = facturas.filter(estado='pagada')
-        
-        # Calcular totales por unidad
-        resumen_unidades = []
-        for unidad in unidades_usuario:
-            facturas_unidad = facturas.filter(unidad_habitacional=unidad)
-            pendientes_unidad = facturas_unidad.filter(estado__in=['pendiente', 'vencida'])
-            pagadas_unidad = facturas_unidad.filter(estado='pagada')
-            
-            resumen_unidades.append({
-                "unidad_id": unidad.id,
-                "codigo": unidad.codigo,
-                "condominio": unidad.condominio.nombre,
-                "total_pendiente": float(sum(f.monto for f in pendientes_unidad)),
-                "total_pagado": float(sum(f.monto for f in pagadas_unidad)),
-                "cantidad_pendientes": pendientes_unidad.count(),
-                "cantidad_pagadas": pagadas_unidad.count()
-            })
+        consultas = consultas_cuotas_servicios(unidades_usuario)
+        resultados = {clave: consulta() for clave, consulta in consultas.items()}
         
         # USAR SERIALIZERS SIMPLIFICADOS PARA MÓVIL
-        return Response({
-            "resumen_unidades": resumen_unidades,
-            "facturas_pendientes": FacturaMovilSerializer(facturas_pendientes, many=True).data,
-            "facturas_pagadas": FacturaMovilSerializer(facturas_pagadas, many=True).data,
-            "total_general_pendiente": float(sum(f.monto for f in facturas_pendientes)),
-            "total_general_pagado": float(sum(f.monto for f in facturas_pagadas)),
-            "unidades_activas": [unidad.codigo for unidad in unidades_usuario]
-        })
+        return Response(respuesta_cuotas_servicios(unidades_usuario, resultados))
     
     except Exception as e:
         return Response(
@@ -761,103 +1296,132 @@ def consultar_cuotas_servicios(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def dashboard_movil(request):
+def consultas_dashboard_movil(usuario, unidades):
     """
-    Dashboard completo para la app móvil
+    Consultas independientes del dashboard móvil: dashboard_movil las ejecuta
+    en orden y dashboard_movil_async a la vez
     """
-    try:
-        usuario = request.user
-        
-        # 1. Obtener unidades activas del usuario
-        unidades_activas = UnidadHabitacional.objects.filter(
-            usuariounidad__usuario=usuario,
-            usuariounidad__fecha_fin__isnull=True
-        ).distinct()
-        
-        if not unidades_activas.exists():
-            return Response(
-                {"error": "No tiene unidades habitacionales asignadas"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # 2. Facturas pendientes de todas las unidades (últimos 3 meses)
-        tres_meses_atras = date.today() - timedelta(days=90)
-        facturas_pendientes = Factura.objects.filter(
-            unidad_habitacional__in=unidades_activas,
-            estado__in=['pendiente', 'vencida'],
-            fecha_emision__gte=tres_meses_atras
+    hoy = date.today()
+    unidades_ids = [unidad.id for unidad in unidades]
+    
+    def facturas_pendientes():
+        # Facturas pendientes de todas las unidades (últimos 3 meses)
+        facturas = Factura.objects.filter(
+            unidad_habitacional_id__in=unidades_ids,
+            estado__in=ESTADOS_PENDIENTES,
+            fecha_emision__gte=hoy - timedelta(days=90)
         ).select_related('concepto_cobro', 'unidad_habitacional')[:10]
-        
-        # 3. Comunicados no leídos para las unidades del usuario (últimos 15 días)
-        quince_dias_atras = date.today() - timedelta(days=15)
-        comunicados_no_leidos = Comunicado.objects.filter(
-            comunicadounidad__unidad_habitacional__in=unidades_activas,
-            fecha_publicacion__gte=quince_dias_atras
+        return FacturaSerializer(facturas, many=True).data
+    
+    def comunicados_no_leidos():
+        # Comunicados no leídos para las unidades del usuario (últimos 15 días)
+        comunicados = Comunicado.objects.filter(
+            comunicadounidad__unidad_habitacional_id__in=unidades_ids,
+            fecha_publicacion__gte=hoy - timedelta(days=15)
         ).exclude(
             comunicadoleido__usuario=usuario
         ).select_related('autor').distinct()[:5]
-        
-        # 4. Próximas reservas del usuario (próximos 30 días)
-        proximas_reservas = Reserva.objects.filter(
+        return ComunicadoSerializer(comunicados, many=True).data
+    
+    def proximas_reservas():
+        # Próximas reservas del usuario (próximos 30 días)
+        reservas = Reserva.objects.filter(
             usuario=usuario,
-            fecha_reserva__gte=date.today(),
-            fecha_reserva__lte=date.today() + timedelta(days=30),
+            fecha_reserva__gte=hoy,
+            fecha_reserva__lte=hoy + timedelta(days=30),
             estado='confirmada'
         ).select_related('area_comun')[:5]
-        
-        # 5. Notificaciones no leídas del usuario
-        notificaciones_no_leidas = Notificacion.objects.filter(
+        return ReservaSerializer(reservas, many=True).data
+    
+    def notificaciones():
+        # Notificaciones no leídas del usuario
+        no_leidas = Notificacion.objects.filter(
             usuario=usuario,
             leida=False
         ).order_by('-fecha_envio')[:10]
-        
-        # 6. Solicitudes de mantenimiento abiertas del usuario
-        solicitudes_abiertas = SolicitudMantenimiento.objects.filter(
+        return NotificacionSerializer(no_leidas, many=True).data
+    
+    def solicitudes_mantenimiento():
+        # Solicitudes de mantenimiento abiertas del usuario
+        solicitudes = SolicitudMantenimiento.objects.filter(
             usuario_reporta=usuario,
             estado__in=['pendiente', 'asignado', 'en_proceso']
         ).select_related('categoria_mantenimiento')[:5]
-        
-        # 7. Resumen financiero
-        total_pendiente = Factura.objects.filter(
-            unidad_habitacional__in=unidades_activas,
-            estado__in=['pendiente', 'vencida']
-        ).aggregate(total=models.Sum('monto'))['total'] or 0
-        
-        # 8. Alertas de seguridad (con manejo de errores)
-        alertas_seguridad = []
+        return SolicitudMantenimientoSerializer(solicitudes, many=True).data
+    
+    def resumen_financiero():
+        # Saldos materializados por unidad (core/cuentas.py): lectura por clave primaria
+        saldos = cuentas.saldos_de(unidades_ids).values()
+        total_pendiente = sum((saldo['saldo'] for saldo in saldos), 0)
+        unidades_con_deuda = sum(1 for saldo in saldos if saldo['facturas_pendientes'])
+        return float(total_pendiente), unidades_con_deuda
+    
+    def alertas_seguridad():
+        # Alertas de seguridad (con manejo de errores)
         try:
             alertas = IncidenteSeguridad.objects.filter(
                 fecha_hora__gte=timezone.now() - timedelta(hours=24),
                 gravedad__in=['alta', 'media']
             ).order_by('-fecha_hora')[:3]
-            alertas_seguridad = IncidenteSeguridadSerializer(alertas, many=True).data
+            return IncidenteSeguridadSerializer(alertas, many=True).data
         except Exception as e:
             # Si hay error, simplemente no mostrar alertas
-            alertas_seguridad = []
+            return []
+    
+    return {
+        'facturas_pendientes': facturas_pendientes,
+        'comunicados_no_leidos': comunicados_no_leidos,
+        'proximas_reservas': proximas_reservas,
+        'notificaciones': notificaciones,
+        'solicitudes_mantenimiento': solicitudes_mantenimiento,
+        'resumen_financiero': resumen_financiero,
+        'alertas_seguridad': alertas_seguridad,
+    }
+
+def respuesta_dashboard_movil(usuario, unidades, resultados):
+    total_pendiente, unidades_con_deuda = resultados['resumen_financiero']
+    return {
+        "usuario": {
+            "nombre": usuario.nombre,
+            "email": usuario.email,
+            "tipo": usuario.tipo,
+            "unidades_activas": [f"{u.codigo} - {u.condominio.nombre}" for u in unidades]
+        },
+        "resumen_financiero": {
+            "total_pendiente": total_pendiente,
+            "facturas_pendientes_count": len(resultados['facturas_pendientes']),
+            "unidades_con_deuda": unidades_con_deuda
+        },
+        "facturas_pendientes": resultados['facturas_pendientes'],
+        "comunicados_no_leidos": resultados['comunicados_no_leidos'],
+        "proximas_reservas": resultados['proximas_reservas'],
+        "notificaciones": resultados['notificaciones'],
+        "solicitudes_mantenimiento": resultados['solicitudes_mantenimiento'],
+        "alertas_seguridad": resultados['alertas_seguridad']
+    }
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_movil(request):
+    """
+    Dashboard completo para la app móvil
+    """
+    try:
+        usuario = request.user
         
-        return Response({
-            "usuario": {
-                "nombre": usuario.nombre,
-                "email": usuario.email,
-                "tipo": usuario.tipo,
-                "unidades_activas": [f"{u.codigo} - {u.condominio.nombre}" for u in unidades_activas]
-            },
-            "resumen_financiero": {
-                "total_pendiente": float(total_pendiente),
-                "facturas_pendientes_count": facturas_pendientes.count(),
-                "unidades_con_deuda": unidades_activas.filter(
-                    factura__estado__in=['pendiente', 'vencida']
-                ).distinct().count()
-            },
-            "facturas_pendientes": FacturaSerializer(facturas_pendientes, many=True).data,
-            "comunicados_no_leidos": ComunicadoSerializer(comunicados_no_leidos, many=True).data,
-            "proximas_reservas": ReservaSerializer(proximas_reservas, many=True).data,
-            "notificaciones": NotificacionSerializer(notificaciones_no_leidas, many=True).data,
-            "solicitudes_mantenimiento": SolicitudMantenimientoSerializer(solicitudes_abiertas, many=True).data,
-            "alertas_seguridad": alertas_seguridad
-        })
+        # Obtener unidades activas del usuario
+        unidades_activas = list(unidades_activas_usuario(usuario))
+        
+        if not unidades_activas:
+            return Response(
+                {"error": "No tiene unidades habitacionales asignadas"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        consultas = consultas_dashboard_movil(usuario, unidades_activas)
+        resultados = {clave: consulta() for clave, consulta in consultas.items()}
+        
+        return Response(respuesta_dashboard_movil(usuario, unidades_activas, resultados))
     
     except Exception as e:
         return Response(
@@ -902,10 +1466,13 @@ def marcar_comunicado_leido(request, comunicado_id):
             )
         
         # Crear registro de lectura
-        ComunicadoLeido.objects.get_or_create(
-            comunicado=comunicado,
-            usuario=request.user
-        )
+        with transaction.atomic():
+            _, creado = ComunicadoLeido.objects.get_or_create(
+                comunicado=comunicado,
+                usuario=request.user
+            )
+            if creado:
+                contadores.comunicado_leido(request.user.id, comunicado)
         
         return Response({"message": "Comunicado marcado como leído"})
     
@@ -921,8 +1488,9 @@ def marcar_notificacion_leida(request, notificacion_id):
     """Marca una notificación como leída"""
     try:
         notificacion = Notificacion.objects.get(id=notificacion_id, usuario=request.user)
-        notificacion.leida = True
-        notificacion.save()
+        with transaction.atomic():
+            if Notificacion.objects.filter(id=notificacion.id, leida=False).update(leida=True, updated_at=timezone.now()):
+                contadores.notificacion_leida(notificacion)
         
         return Response({"message": "Notificación marcada como leída"})
     
@@ -936,11 +1504,18 @@ def marcar_notificacion_leida(request, notificacion_id):
 # APIs PARA COMUNICADOS MÓVIL
 # ===================================
 
+class ComunicadoMovilCursorPagination(CursorPagination):
+    """Paginación por cursor para el scroll infinito de comunicados en móvil"""
+    page_size = 10
+    ordering = ('-fecha_publicacion', '-id')
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_comunicados_movil(request):
     """
     Lista comunicados para residente/inquilino en móvil
+    - ?paginacion=cursor activa la paginación por cursor (scroll infinito)
     """
     try:
         usuario = request.user
@@ -956,7 +1531,7 @@ def listar_comunicados_movil(request):
         unidades_usuario = UnidadHabitacional.objects.filter(
             usuariounidad__usuario=usuario,
             usuariounidad__fecha_fin__isnull=True
-        ).distinct()
+        )
         
         if not unidades_usuario.exists():
             return Response(
@@ -964,20 +1539,28 @@ def listar_comunicados_movil(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Filtrar comunicados activos para las unidades del usuario
+        # Filtrar comunicados activos para las unidades del usuario.
+        # Se usa EXISTS en lugar del join + distinct() y el estado de lectura
+        # se anota en la misma consulta (evita un query por comunicado).
         hoy = date.today()
         comunicados = Comunicado.objects.filter(
             # Comunicados asignados a las unidades del usuario
-            comunicadounidad__unidad_habitacional__in=unidades_usuario
+            Exists(ComunicadoUnidad.objects.filter(
+                comunicado=OuterRef('pk'),
+                unidad_habitacional__in=unidades_usuario
+            ))
         ).filter(
             # Comunicados no expirados (o sin fecha de expiración)
             models.Q(fecha_expiracion__gte=hoy) | models.Q(fecha_expiracion__isnull=True)
         ).filter(
             # Solo comunicados publicados
             fecha_publicacion__lte=timezone.now()
-        ).select_related('autor').prefetch_related(
-            Prefetch('comunicadoleido_set', queryset=ComunicadoLeido.objects.filter(usuario=usuario))
-        ).distinct().order_by('-fecha_publicacion', '-prioridad')
+        ).annotate(
+            leido=Exists(ComunicadoLeido.objects.filter(
+                comunicado=OuterRef('pk'),
+                usuario=usuario
+            ))
+        )
         
         # Aplicar filtros desde query parameters
         prioridad = request.GET.get('prioridad')
@@ -988,39 +1571,32 @@ def listar_comunicados_movil(request):
         if tipo_destinatario:
             comunicados = comunicados.filter(destinatarios=tipo_destinatario)
         
-        # Paginación para móvil (CON IMPORT CORREGIDO)
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
+        # Resumen en una sola consulta con agregados condicionales
+        resumen = comunicados.aggregate(
+            total=Count('id'),
+            no_leidos=Count('id', filter=models.Q(leido=False)),
+            urgentes=Count('id', filter=models.Q(prioridad='urgente'))
+        )
+        
+        comunicados = comunicados.select_related('autor').only(
+            'id', 'titulo', 'contenido', 'fecha_publicacion', 'prioridad', 'autor__nombre'
+        )
+        
+        # Paginación para móvil: por número de página (defecto) o por cursor
+        if request.GET.get('paginacion') == 'cursor':
+            paginator = ComunicadoMovilCursorPagination()
+        else:
+            paginator = PageNumberPagination()
+            paginator.page_size = 10
+            comunicados = comunicados.order_by('-fecha_publicacion', '-prioridad')
         comunicados_paginados = paginator.paginate_queryset(comunicados, request)
         
         # Serializar con datos adicionales para móvil
-        comunicados_data = []
-        for comunicado in comunicados_paginados:
-            leido = ComunicadoLeido.objects.filter(
-                comunicado=comunicado, 
-                usuario=usuario
-            ).exists()
-            
-            comunicados_data.append({
-                'id': comunicado.id,
-                'titulo': comunicado.titulo,
-                'contenido_preview': comunicado.contenido[:100] + '...' if len(comunicado.contenido) > 100 else comunicado.contenido,
-                'fecha_publicacion': comunicado.fecha_publicacion,
-                'prioridad': comunicado.prioridad,
-                'prioridad_display': comunicado.get_prioridad_display(),
-                'autor_nombre': comunicado.autor.nombre if comunicado.autor else 'Administración',
-                'leido': leido,
-                'tiene_adjuntos': False,  # Puedes implementar adjuntos después
-                'obligatorio': comunicado.prioridad in ['alta', 'urgente']  # Regla de negocio
-            })
+        comunicados_data = [comunicado_movil_data(comunicado) for comunicado in comunicados_paginados]
         
         return paginator.get_paginated_response({
             'comunicados': comunicados_data,
-            'resumen': {
-                'total': comunicados.count(),
-                'no_leidos': comunicados.exclude(comunicadoleido__usuario=usuario).count(),
-                'urgentes': comunicados.filter(prioridad='urgente').count()
-            }
+            'resumen': resumen
         })
     
     except Exception as e:
@@ -1029,6 +1605,21 @@ def listar_comunicados_movil(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def comunicado_movil_data(comunicado):
+    """Datos de lista de un comunicado para móvil (requiere la anotación 'leido')"""
+    return {
+        'id': comunicado.id,
+        'titulo': comunicado.titulo,
+        'contenido_preview': comunicado.contenido[:100] + '...' if len(comunicado.contenido) > 100 else comunicado.contenido,
+        'fecha_publicacion': comunicado.fecha_publicacion,
+        'prioridad': comunicado.prioridad,
+        'prioridad_display': comunicado.get_prioridad_display(),
+        'autor_nombre': comunicado.autor.nombre if comunicado.autor else 'Administración',
+        'leido': comunicado.leido,
+        'tiene_adjuntos': False,  # Puedes implementar adjuntos después
+        'obligatorio': comunicado.prioridad in ['alta', 'urgente']  # Regla de negocio
+    }
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def detalle_comunicado_movil(request, comunicado_id):
@@ -1064,10 +1655,13 @@ def detalle_comunicado_movil(request, comunicado_id):
             )
         
         # Marcar como leído automáticamente al abrir (regla de negocio)
-        ComunicadoLeido.objects.get_or_create(
-            comunicado=comunicado,
-            usuario=usuario
-        )
+        with transaction.atomic():
+            _, creado = ComunicadoLeido.objects.get_or_create(
+                comunicado=comunicado,
+                usuario=usuario
+            )
+            if creado:
+                contadores.comunicado_leido(usuario.id, comunicado)
         
         # Serializar datos completos
         comunicado_data = {
@@ -1136,10 +1730,13 @@ def confirmar_lectura_obligatoria(request, comunicado_id):
             )
         
         # Marcar como leído con confirmación explícita
-        leido, created = ComunicadoLeido.objects.get_or_create(
-            comunicado=comunicado,
-            usuario=usuario
-        )
+        with transaction.atomic():
+            leido, created = ComunicadoLeido.objects.get_or_create(
+                comunicado=comunicado,
+                usuario=usuario
+            )
+            if created:
+                contadores.comunicado_leido(usuario.id, comunicado)
         
         # Registrar confirmación adicional (podrías agregar un campo de confirmación)
         return Response({
@@ -1155,43 +1752,69 @@ def confirmar_lectura_obligatoria(request, comunicado_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+# Resúmenes móviles versionados con ?version=2: solo los contadores materializados
+# (no leídos de siempre), una lectura por clave primaria. Sin el parámetro se responde
+# la versión 1 de las apps publicadas (ventana de 7 días, una consulta agregada) con la
+# cabecera Deprecation; se retira cuando ninguna app la pida.
+def resumen_movil_v2(request):
+    return request.query_params.get('version') == '2'
+
+def resumen_movil_v1(datos):
+    respuesta = Response(datos)
+    respuesta['Deprecation'] = 'true'
+    return respuesta
+
 @api_view(['GET']) #no
 @permission_classes([IsAuthenticated])
 def resumen_comunicados_movil(request):
     """
-    Resumen rápido de comunicados para el dashboard móvil
+    Resumen rápido de comunicados para el dashboard móvil. Con ?version=2, los no
+    leídos desde los contadores materializados; sin él, los de los últimos 7 días
+    en una consulta agregada
     """
     try:
         usuario = request.user
+
+        if resumen_movil_v2(request):
+            contador = contadores.obtener_contador(usuario)
+            return Response({
+                'version': 2,
+                'no_leidos': contador.comunicados_no_leidos,
+                'urgentes': contador.comunicados_urgentes,
+                'ultimo_comunicado': contador.ultimo_comunicado,
+            })
         
         # Obtener unidades activas del usuario
         unidades_usuario = UnidadHabitacional.objects.filter(
             usuariounidad__usuario=usuario,
             usuariounidad__fecha_fin__isnull=True
-        ).distinct()
+        )
         
         if not unidades_usuario.exists():
             return Response({"error": "No tiene unidades asignadas"}, status=400)
         
-        hoy = date.today()
-        
-        # Comunicados activos no leídos (últimos 7 días)
-        comunicados_recientes = Comunicado.objects.filter(
-            comunicadounidad__unidad_habitacional__in=unidades_usuario,
-            fecha_publicacion__gte=hoy - timedelta(days=7)
-        ).filter(
-            models.Q(fecha_expiracion__gte=hoy) | models.Q(fecha_expiracion__isnull=True)
-        ).distinct()
-        
-        no_leidos = comunicados_recientes.exclude(comunicadoleido__usuario=usuario)
-        urgentes = comunicados_recientes.filter(prioridad='urgente')
+        ahora = timezone.now()
+        hoy = timezone.localdate()
+        
+        # Comunicados publicados en los últimos 7 días, vigentes
+        resumen = Comunicado.objects.filter(
+            Exists(ComunicadoUnidad.objects.filter(
+                comunicado=OuterRef('pk'),
+                unidad_habitacional__in=unidades_usuario
+            )),
+            models.Q(fecha_expiracion__gte=hoy) | models.Q(fecha_expiracion__isnull=True),
+            fecha_publicacion__gte=ahora - timedelta(days=7),
+            fecha_publicacion__lte=ahora,
+        ).annotate(
+            leido=Exists(ComunicadoLeido.objects.filter(comunicado=OuterRef('pk'), usuario=usuario))
+        ).aggregate(
+            total_recientes=Count('id'),
+            no_leidos=Count('id', filter=models.Q(leido=False)),
+            urgentes=Count('id', filter=models.Q(prioridad='urgente')),
+            ultimo_comunicado=Max('fecha_publicacion'),
+        )
         
-        return Response({
-            'total_recientes': comunicados_recientes.count(),
-            'no_leidos': no_leidos.count(),
-            'urgentes': urgentes.count(),
-            'ultimo_comunicado': comunicados_recientes.first().fecha_publicacion if comunicados_recientes.exists() else None
-        })
+        return resumen_movil_v1(resumen)
     
     except Exception as e:
         return Response(
@@ -1203,6 +1826,52 @@ def resumen_comunicados_movil(request):
 # APIs PARA NOTIFICACIONES MÓVIL - CU21
 # ===================================
 
+def consultas_notificaciones_movil(usuario, request):
+    """
+    Página y resumen de listar_notificaciones_movil (request de DRF): la vista
+    síncrona los ejecuta en orden y la async a la vez
+    """
+    # Obtener notificaciones del usuario (últimos 30 días)
+    treinta_dias_atras = timezone.now() - timedelta(days=30)
+    
+    notificaciones = Notificacion.objects.filter(
+        usuario=usuario,
+        fecha_envio__gte=treinta_dias_atras
+    ).order_by('-fecha_envio', '-prioridad')
+    
+    # Aplicar filtros desde query parameters
+    tipo_notificacion = request.GET.get('tipo')
+    if tipo_notificacion:
+        notificaciones = notificaciones.filter(tipo=tipo_notificacion)
+        
+    solo_no_leidas = request.GET.get('no_leidas')
+    if solo_no_leidas and solo_no_leidas.lower() == 'true':
+        notificaciones = notificaciones.filter(leida=False)
+    
+    def pagina():
+        # Paginación para móvil
+        paginator = PageNumberPagination()
+        paginator.page_size = 15
+        notificaciones_paginadas = paginator.paginate_queryset(notificaciones, request)
+        return paginator, [notificacion_movil_data(notificacion) for notificacion in notificaciones_paginadas]
+    
+    def resumen():
+        # Resumen en una sola consulta con agregados condicionales
+        return notificaciones.aggregate(
+            total=Count('id'),
+            no_leidas=Count('id', filter=models.Q(leida=False)),
+            urgentes=Count('id', filter=models.Q(prioridad='alta'))
+        )
+    
+    return {'pagina': pagina, 'resumen': resumen}
+
+def respuesta_notificaciones_movil(resultados):
+    paginator, notificaciones_data = resultados['pagina']
+    return paginator.get_paginated_response({
+        'notificaciones': notificaciones_data,
+        'resumen': resultados['resumen']
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_notificaciones_movil(request):
@@ -1210,60 +1879,9 @@ def listar_notificaciones_movil(request):
     CU21: Lista notificaciones para el usuario en móvil
     """
     try:
-        usuario = request.user
-        
-        # Obtener notificaciones del usuario (últimos 30 días)
-        treinta_dias_atras = timezone.now() - timedelta(days=30)
-        
-        notificaciones = Notificacion.objects.filter(
-            usuario=usuario,
-            fecha_envio__gte=treinta_dias_atras
-        ).order_by('-fecha_envio', '-prioridad')
-        
-        # Aplicar filtros desde query parameters
-        tipo_notificacion = request.GET.get('tipo')
-        if tipo_notificacion:
-            notificaciones = notificaciones.filter(tipo=tipo_notificacion)
-            
-        solo_no_leidas = request.GET.get('no_leidas')
-        if solo_no_leidas and solo_no_leidas.lower() == 'true':
-            notificaciones = notificaciones.filter(leida=False)
-        
-        # Paginación para móvil
-        paginator = PageNumberPagination()
-        paginator.page_size = 15
-        notificaciones_paginadas = paginator.paginate_queryset(notificaciones, request)
-        
-        # Serializar para móvil
-        notificaciones_data = []
-        for notificacion in notificaciones_paginadas:
-            # Determinar acción según el tipo de notificación
-            accion = obtener_accion_notificacion(notificacion.tipo)
-            
-            notificaciones_data.append({
-                'id': notificacion.id,
-                'titulo': notificacion.titulo,
-                'mensaje': notificacion.mensaje,
-                'tipo': notificacion.tipo,
-                'tipo_display': notificacion.get_tipo_display(),
-                'prioridad': notificacion.prioridad,
-                'prioridad_display': notificacion.get_prioridad_display(),
-                'fecha_envio': notificacion.fecha_envio,
-                'leida': notificacion.leida,
-                'accion': accion,
-                'icono': obtener_icono_notificacion(notificacion.tipo),
-                'relacion_con_id': notificacion.relacion_con_id,
-                'tipo_relacion': notificacion.tipo_relacion
-            })
-        
-        return paginator.get_paginated_response({
-            'notificaciones': notificaciones_data,
-            'resumen': {
-                'total': notificaciones.count(),
-                'no_leidas': notificaciones.filter(leida=False).count(),
-                'urgentes': notificaciones.filter(prioridad='alta').count()
-            }
-        })
+        consultas = consultas_notificaciones_movil(request.user, request)
+        resultados = {clave: consulta() for clave, consulta in consultas.items()}
+        return respuesta_notificaciones_movil(resultados)
     
     except Exception as e:
         return Response(
@@ -1294,8 +1912,9 @@ def detalle_notificacion_movil(request, notificacion_id):
         
         # Marcar como leída al abrir (regla de negocio)
         if not notificacion.leida:
-            notificacion.leida = True
-            notificacion.save()
+            with transaction.atomic():
+                if Notificacion.objects.filter(id=notificacion.id, leida=False).update(leida=True, updated_at=timezone.now()):
+                    contadores.notificacion_leida(notificacion)
         
         # Obtener datos adicionales según el tipo de notificación
         datos_adicionales = obtener_datos_adicionales(notificacion)
@@ -1346,8 +1965,9 @@ def marcar_notificacion_leida(request, notificacion_id):
             )
         
         if not notificacion.leida:
-            notificacion.leida = True
-            notificacion.save()
+            with transaction.atomic():
+                if Notificacion.objects.filter(id=notificacion.id, leida=False).update(leida=True, updated_at=timezone.now()):
+                    contadores.notificacion_leida(notificacion)
         
         return Response({
             "message": "Notificación marcada como leída",
@@ -1375,8 +1995,9 @@ def marcar_todas_leidas(request):
             leida=False
         )
         
-        cantidad_marcadas = notificaciones_no_leidas.count()
-        notificaciones_no_leidas.update(leida=True)
+        with transaction.atomic():
+            cantidad_marcadas = notificaciones_no_leidas.update(leida=True, updated_at=timezone.now())
+            contadores.todas_notificaciones_leidas(usuario.id)
         
         return Response({
             "message": f"{cantidad_marcadas} notificaciones marcadas como leídas",
@@ -1423,34 +2044,46 @@ def actualizar_token_notificacion(request):
 @permission_classes([IsAuthenticated])
 def resumen_notificaciones_movil(request):
     """
-    CU21: Resumen rápido de notificaciones para el dashboard móvil
+    CU21: Resumen rápido de notificaciones para el dashboard móvil. Con ?version=2,
+    las no leídas desde los contadores materializados; sin él, las de los últimos
+    7 días en una consulta agrupada por tipo
     """
     try:
         usuario = request.user
+
+        if resumen_movil_v2(request):
+            contador = contadores.obtener_contador(usuario)
+            return Response({
+                'version': 2,
+                'no_leidas': contador.notificaciones_no_leidas,
+                'urgentes': contador.notificaciones_urgentes,
+                'por_tipo': [
+                    {'tipo': tipo, 'no_leidas': getattr(contador, campo)}
+                    for tipo, campo in contadores.CAMPOS_TIPO_NOTIFICACION.items()
+                ],
+                'ultima_notificacion': contador.ultima_notificacion,
+            })
         
-        # Notificaciones de los últimos 7 días
+        # Notificaciones de los últimos 7 días, contadas por tipo
         siete_dias_atras = timezone.now() - timedelta(days=7)
-        
-        notificaciones_recientes = Notificacion.objects.filter(
-            usuario=usuario,
-            fecha_envio__gte=siete_dias_atras
-        )
-        
-        no_leidas = notificaciones_recientes.filter(leida=False)
-        urgentes = notificaciones_recientes.filter(prioridad='alta')
-        
-        # Contar por tipo
-        por_tipo = notificaciones_recientes.values('tipo').annotate(
-            total=models.Count('id'),
-            no_leidas=models.Count('id', filter=models.Q(leida=False))
+        por_tipo = list(
+            Notificacion.objects.filter(usuario=usuario, fecha_envio__gte=siete_dias_atras)
+            .values('tipo')
+            .annotate(
+                total=models.Count('id'),
+                no_leidas=models.Count('id', filter=models.Q(leida=False)),
+                urgentes=models.Count('id', filter=models.Q(prioridad='alta')),
+                ultima=models.Max('fecha_envio'),
+            )
+            .order_by('tipo')
         )
         
-        return Response({
-            'total_recientes': notificaciones_recientes.count(),
-            'no_leidas': no_leidas.count(),
-            'urgentes': urgentes.count(),
-            'por_tipo': list(por_tipo),
-            'ultima_notificacion': notificaciones_recientes.first().fecha_envio if notificaciones_recientes.exists() else None
+        return resumen_movil_v1({
+            'total_recientes': sum(t['total'] for t in por_tipo),
+            'no_leidas': sum(t['no_leidas'] for t in por_tipo),
+            'urgentes': sum(t.pop('urgentes') for t in por_tipo),
+            'ultima_notificacion': max((t.pop('ultima') for t in por_tipo), default=None),
+            'por_tipo': por_tipo,
         })
     
     except Exception as e:
@@ -1463,6 +2096,25 @@ def resumen_notificaciones_movil(request):
 # MÉTODOS AUXILIARES PARA NOTIFICACIONES
 # ===================================
 
+def notificacion_movil_data(notificacion):
+    """Datos de lista de una notificación para móvil"""
+    return {
+        'id': notificacion.id,
+        'titulo': notificacion.titulo,
+        'mensaje': notificacion.mensaje,
+        'tipo': notificacion.tipo,
+        'tipo_display': notificacion.get_tipo_display(),
+        'prioridad': notificacion.prioridad,
+        'prioridad_display': notificacion.get_prioridad_display(),
+        'fecha_envio': notificacion.fecha_envio,
+        'leida': notificacion.leida,
+        # Determinar acción según el tipo de notificación
+        'accion': obtener_accion_notificacion(notificacion.tipo),
+        'icono': obtener_icono_notificacion(notificacion.tipo),
+        'relacion_con_id': notificacion.relacion_con_id,
+        'tipo_relacion': notificacion.tipo_relacion
+    }
+
 def obtener_accion_notificacion(tipo_notificacion):
     """Determina la acción a realizar según el tipo de notificación"""
     acciones = {
@@ -1519,6 +2171,212 @@ def obtener_datos_adicionales(notificacion):
     
     return {}
 
+# ===================================
+# SINCRONIZACIÓN INCREMENTAL MÓVIL
+# ===================================
+
+SYNC_SALT = 'movil-sync'
+
+def generar_token_sync(momento):
+    """Token opaco (firmado) con el instante de la sincronización"""
+    return signing.dumps({'ts': momento.isoformat()}, salt=SYNC_SALT, compress=True)
+
+def leer_token_sync(token):
+    datos = signing.loads(token, salt=SYNC_SALT)
+    return datetime.fromisoformat(datos['ts'])
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sincronizar_movil(request):
+    """
+    Sincronización incremental para móvil (notificaciones, comunicados, facturas y reservas)
+    - Sin ?since: estado completo, con las mismas ventanas que las listas móviles
+    - Con ?since=<token>: solo lo creado, modificado o eliminado desde ese token
+    Siempre devuelve un nuevo token para la siguiente llamada.
+    """
+    try:
+        usuario = request.user
+        ahora = timezone.now()
+        hoy = date.today()
+        
+        desde = None
+        token = request.GET.get('since')
+        if token:
+            try:
+                desde = leer_token_sync(token)
+            except (signing.BadSignature, KeyError, ValueError):
+                return Response(
+                    {"error": "Token de sincronización inválido"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Los borrados se conservan un tiempo limitado: tokens más viejos => sincronización completa
+            retencion = getattr(settings, 'MOVIL_SYNC_RETENCION_DIAS', 30)
+            if desde < ahora - timedelta(days=retencion):
+                desde = None
+        
+        margen = timedelta(seconds=getattr(settings, 'MOVIL_SYNC_MARGEN_SEGUNDOS', 5))
+        if desde is not None and RegistroEliminacion.objects.filter(
+            modelo='usuario_unidad', usuario=usuario, eliminado_en__gt=desde - margen
+        ).exists():
+            # Dejó una unidad: el dispositivo tiene facturas y comunicados que ya no le corresponden
+            desde = None
+        
+        unidades_usuario = UnidadHabitacional.objects.filter(
+            usuariounidad__usuario=usuario,
+            usuariounidad__fecha_fin__isnull=True
+        )
+        
+        notificaciones = Notificacion.objects.filter(usuario=usuario)
+        comunicados = Comunicado.objects.filter(
+            Exists(ComunicadoUnidad.objects.filter(
+                comunicado=OuterRef('pk'),
+                unidad_habitacional__in=unidades_usuario
+            ))
+        ).filter(
+            models.Q(fecha_expiracion__gte=hoy) | models.Q(fecha_expiracion__isnull=True),
+            # Los programados llegan al publicarse, como en listar_comunicados_movil
+            fecha_publicacion__lte=ahora
+        ).annotate(
+            leido=Exists(ComunicadoLeido.objects.filter(comunicado=OuterRef('pk'), usuario=usuario))
+        ).select_related('autor')
+        facturas = Factura.objects.filter(
+            unidad_habitacional__in=unidades_usuario
+        ).select_related('concepto_cobro', 'unidad_habitacional__condominio')
+        reservas = Reserva.objects.filter(usuario=usuario)
+        
+        eliminados = {}
+        if desde is None:
+            notificaciones = notificaciones.filter(fecha_envio__gte=ahora - timedelta(days=30))
+            facturas = facturas.filter(fecha_emision__gte=hoy - timedelta(days=180))
+            reservas = reservas.filter(fecha_reserva__gte=hoy - timedelta(days=30))
+        else:
+            # Margen para no perder filas de transacciones que confirmaron tarde
+            corte = desde - margen
+            
+            notificaciones = notificaciones.filter(updated_at__gt=corte)
+            # Llegar a la fecha de publicación no modifica updated_at
+            comunicados = comunicados.annotate(
+                cambio=Greatest('updated_at', 'fecha_publicacion')
+            ).filter(
+                models.Q(cambio__gt=corte) |
+                models.Q(Exists(ComunicadoLeido.objects.filter(
+                    comunicado=OuterRef('pk'), usuario=usuario, fecha_leido__gt=corte
+                )))
+            )
+            facturas = facturas.filter(updated_at__gt=corte)
+            reservas = reservas.filter(updated_at__gt=corte)
+            
+            borrados = RegistroEliminacion.objects.filter(eliminado_en__gt=corte).filter(
+                models.Q(modelo__in=['notificacion', 'reserva'], usuario=usuario) |
+                models.Q(modelo='factura', unidad_habitacional__in=unidades_usuario) |
+                # Comunicados borrados, o quitados de alguna de sus unidades
+                models.Q(modelo='comunicado', unidad_habitacional__isnull=True) |
+                models.Q(modelo='comunicado', unidad_habitacional__in=unidades_usuario)
+            ).values_list('modelo', 'objeto_id')
+            for modelo, objeto_id in borrados:
+                eliminados.setdefault(modelo, []).append(objeto_id)
+            if eliminados.get('comunicado'):
+                # Los que sigue viendo por otra de sus unidades no se borran
+                visibles = set(ComunicadoUnidad.objects.filter(
+                    comunicado_id__in=eliminados['comunicado'], unidad_habitacional__in=unidades_usuario
+                ).values_list('comunicado_id', flat=True))
+                eliminados['comunicado'] = sorted(set(eliminados['comunicado']) - visibles)
+        
+        return Response({
+            'token': generar_token_sync(ahora),
+            'completo': desde is None,
+            'notificaciones': {
+                'cambios': [notificacion_movil_data(n) for n in notificaciones.order_by('-fecha_envio')],
+                'eliminados': eliminados.get('notificacion', [])
+            },
+            'comunicados': {
+                'cambios': [comunicado_movil_data(c) for c in comunicados.order_by('-fecha_publicacion')],
+                'eliminados': eliminados.get('comunicado', [])
+            },
+            'facturas': {
+                'cambios': FacturaMovilSerializer(facturas.order_by('-fecha_emision'), many=True).data,
+                'eliminados': eliminados.get('factura', [])
+            },
+            'reservas': {
+                'cambios': ReservaSerializer(reservas.order_by('-fecha_reserva'), many=True).data,
+                'eliminados': eliminados.get('reserva', [])
+            }
+        })
+    
+    except Exception as e:
+        return Response(
+            {"error": f"Error al sincronizar: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+# ===================================
+# APIs MÓVIL ASYNC (ASGI)
+# ===================================
+# Mismas respuestas que las vistas síncronas, pero las consultas independientes
+# se ejecutan a la vez (asincrono.en_paralelo). Solo liberan el worker mientras
+# esperan a la base de datos si se sirven con uvicorn (ver asgi.py).
+
+async def unidades_activas_async(usuario):
+    return await asincrono.consultar(lambda: list(unidades_activas_usuario(usuario)))
+
+async def ejecutar_consultas_async(consultas):
+    valores = await asincrono.en_paralelo(*consultas.values())
+    return dict(zip(consultas, valores))
+
+@asincrono.vista_async('GET')
+async def consultar_cuotas_servicios_async(request):
+    """Versión async de consultar_cuotas_servicios"""
+    try:
+        unidades_usuario = await unidades_activas_async(request.user)
+        if not unidades_usuario:
+            return asincrono.respuesta(
+                {"error": "No tiene unidades habitacionales asignadas"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        resultados = await ejecutar_consultas_async(consultas_cuotas_servicios(unidades_usuario))
+        return asincrono.respuesta(respuesta_cuotas_servicios(unidades_usuario, resultados))
+    
+    except Exception as e:
+        return asincrono.respuesta(
+            {"error": f"Error al consultar facturas: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@asincrono.vista_async('GET')
+async def dashboard_movil_async(request):
+    """Versión async de dashboard_movil: sus siete bloques de consultas van en paralelo"""
+    try:
+        usuario = request.user
+        unidades_activas = await unidades_activas_async(usuario)
+        if not unidades_activas:
+            return asincrono.respuesta(
+                {"error": "No tiene unidades habitacionales asignadas"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        resultados = await ejecutar_consultas_async(consultas_dashboard_movil(usuario, unidades_activas))
+        return asincrono.respuesta(respuesta_dashboard_movil(usuario, unidades_activas, resultados))
+    
+    except Exception as e:
+        return asincrono.respuesta(
+            {"error": f"Error al cargar dashboard: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@asincrono.vista_async('GET')
+async def listar_notificaciones_movil_async(request):
+    """Versión async de listar_notificaciones_movil"""
+    try:
+        # La paginación de DRF necesita su Request (query_params y URLs absolutas)
+        consultas = consultas_notificaciones_movil(request.user, Request(request))
+        resultados = await ejecutar_consultas_async(consultas)
+        return asincrono.respuesta(respuesta_notificaciones_movil(resultados).data)
+    
+    except Exception as e:
+        return asincrono.respuesta(
+            {"error": f"Error al obtener notificaciones: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 # ===================================
 # DASHBOARD PARA EL ADMINISTRADOR
 # ===================================
@@ -1531,33 +2389,11 @@ def dashboard_admin(request):
         # Usuarios por tipo
         usuarios_por_tipo = User.objects.values('tipo').annotate(total=Count('id'))
 
-        # Usuarios por condominio y tipo (desde UsuarioUnidad)
-        usuarios_condominio_tipo = UsuarioUnidad.objects.filter(
-            fecha_fin__isnull=True
-        ).values(
-            condominio_nombre=F('unidad__condominio__nombre'),
-            tipo_usuario=F('usuario__tipo')
-        ).annotate(total=Count('usuario')).order_by('condominio_nombre', 'tipo_usuario')
-
-        # Resumen de facturas por condominio (desde Factura)
-        resumen_facturacion = Factura.objects.values(
-            condominio_nombre=F('unidad_habitacional__condominio__nombre')
-        ).annotate(
-            total_facturado=Sum('monto'),
-            total_pagado=Sum('pago__monto'),  # asumiendo relación inversa desde Pago
-            total_pendiente=Sum(
-                Case(
-                    When(estado='pendiente', then='monto'),
-                    default=0,
-                    output_field=DecimalField()
-                )
-            )
-        ).order_by('condominio_nombre')
-
+        # Usuarios por condominio y tipo y facturación por condominio: hechos
+        # precalculados (core/resumenes.py), unas pocas filas por condominio
         return Response({
             'usuarios_por_tipo': list(usuarios_por_tipo),
-            'usuarios_por_condominio_y_tipo': list(usuarios_condominio_tipo),
-            'facturacion_por_condominio': list(resumen_facturacion)
+            **resumenes.tablero(),
         })
 
     except Exception as e:
@@ -1566,6 +2402,16 @@ def dashboard_admin(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metricas_prometheus(request):
+    """Latencia, consultas y tamaño de respuesta por ruta (ver core/metricas.py), para Prometheus"""
+    return HttpResponse(
+        metricas.exportar_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
 # ===================================
 # RECONOCIMIENTO FACIAL - GOOGLE VISION API + DEEPFACE
 # ===================================
@@ -1693,13 +2539,15 @@ def procesar_acceso_facial(request):
             # Notificar a seguridad
             personal_seguridad = Usuario.objects.filter(tipo='seguridad', estado='activo')
             for seguridad in personal_seguridad:
-                Notificacion.objects.create(
-                    usuario=seguridad,
-                    titulo="Persona no identificada en acceso",
-                    mensaje=f"Cámara {camara.nombre}: {descripcion}",
-                    tipo='seguridad',
-                    prioridad='alta'
-                )
+                with transaction.atomic():
+                    notificacion = Notificacion.objects.create(
+                        usuario=seguridad,
+                        titulo="Persona no identificada en acceso",
+                        mensaje=f"Cámara {camara.nombre}: {descripcion}",
+                        tipo='seguridad',
+                        prioridad='alta'
+                    )
+                    contadores.notificacion_creada(notificacion)
         
         return Response({
             "reconocimiento_exitoso": reconocimiento_exitoso,
@@ -2130,4 +2978,74 @@ def calcular_similitud_embedding(embedding1, embedding2):
 def simular_verificacion_deepface():
     """Simular verificación DeepFace para desarrollo"""
     import random
-    return round(random.uniform(0.1, 0.95), 2)
\ No newline at end of file
+    return round(random.uniform(0.1, 0.95), 2)
+
+# ===================================
+# DESCARGA DE IMÁGENES (ALMACÉN DE BLOBS)
+# ===================================
+
+RANGO_BYTES = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def descargar_blob(request, sha256):
+    """
+    GET /api/blobs/<sha256>/
+    Descarga en streaming una imagen del almacén de blobs.
+    - ETag = sha256 (el contenido nunca cambia): If-None-Match responde 304
+    - Range: bytes=inicio-fin | inicio- | -sufijo responde 206 con ese tramo
+    """
+    try:
+        blob = Blob.objects.get(sha256=sha256)
+    except Blob.DoesNotExist:
+        return Response({"error": "Imagen no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+
+    ruta = blobs.ruta_blob(blob.sha256)
+    if not ruta.exists():
+        return Response({"error": "Archivo de imagen no disponible"}, status=status.HTTP_404_NOT_FOUND)
+    tamano = ruta.stat().st_size
+
+    etag = f'"{blob.sha256}"'
+    cabeceras = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, max-age=31536000, immutable',
+    }
+
+    if_none_match = [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]
+    if etag in if_none_match or '*' in if_none_match:
+        respuesta = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        for clave, valor in cabeceras.items():
+            respuesta[clave] = valor
+        return respuesta
+
+    inicio, fin, estado = 0, tamano - 1, status.HTTP_200_OK
+    rango = RANGO_BYTES.match(request.headers.get('Range', '').strip())
+    if_range = request.headers.get('If-Range')
+    # Rangos múltiples o mal formados se ignoran y se devuelve el archivo completo
+    if rango and (rango.group(1) or rango.group(2)) and (not if_range or if_range == etag):
+        if rango.group(1):
+            inicio = int(rango.group(1))
+            if rango.group(2):
+                fin = min(int(rango.group(2)), tamano - 1)
+        else:
+            inicio = max(tamano - int(rango.group(2)), 0)
+
+        if inicio > fin:
+            respuesta = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            respuesta['Content-Range'] = f'bytes */{tamano}'
+            return respuesta
+        estado = status.HTTP_206_PARTIAL_CONTENT
+
+    respuesta = StreamingHttpResponse(
+        blobs.leer_rango(blob.sha256, inicio, fin),
+        status=estado,
+        content_type=blob.content_type,
+    )
+    respuesta['Content-Length'] = str(fin - inicio + 1)
+    if estado == status.HTTP_206_PARTIAL_CONTENT:
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+    for clave, valor in cabeceras.items():
+        respuesta[clave] = valor
+    return respuesta
@@ -3,6 +3,12 @@ ASGI config for smart_condominium_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Para las vistas async de la app móvil (movil/async/...) se sirve con workers de uvicorn:
+
+    gunicorn smart_condominium_backend.asgi:application -k uvicorn_worker.UvicornWorker --workers 4
+
+`python manage.py bench_asgi` lo compara con el despliegue WSGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
+from importlib.util import find_spec
 # ===================================
 # RECONOCIMIENTO FACIAL - CONFIGURACIÓN
 # ===================================
@@ -72,12 +74,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metricas.MetricasMiddleware',  # Primero: mide la petición completa
+    'core.consultas_repetidas.ConsultasRepetidasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.enrutador_bd.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -105,6 +110,19 @@ WSGI_APPLICATION = 'smart_condominium_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Pool de conexiones nativo de Django (psycopg 3 + psycopg_pool). Hay un pool por
+# proceso de gunicorn: el máximo real es workers × DB_POOL_MAX_POR_WORKER.
+# Sin psycopg_pool (o con DB_POOL=0) se usan conexiones persistentes.
+DB_POOL = os.getenv('DB_POOL', '1') == '1' and find_spec('psycopg') is not None and find_spec('psycopg_pool') is not None
+DB_POOL_OPCIONES = {
+    'min_size': int(os.getenv('DB_POOL_MIN', 2)),
+    'max_size': int(os.getenv('DB_POOL_MAX_POR_WORKER', 10)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),          # Espera máxima por una conexión libre (s)
+    'max_waiting': int(os.getenv('DB_POOL_MAX_ESPERA', 50)),     # Peticiones en cola antes de rechazar (0 = sin límite)
+    'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),       # Cierra conexiones ociosas por encima de min_size
+    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+}
+
 DATABASES = {
     'default': {
         #'ENGINE': 'django.db.backends.sqlite3',
@@ -115,12 +133,54 @@ DATABASES = {
         'PASSWORD': '12345',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Con pool Django exige CONN_MAX_AGE = 0; sin pool, la conexión se reutiliza entre peticiones
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,  # Verifica la conexión (del pool o persistente) antes de reutilizarla
         'OPTIONS': {
             'client_encoding': 'UTF8',
+            **({'pool': DB_POOL_OPCIONES} if DB_POOL else {}),
         },
     }
 }
 
+# Caché compartida entre workers (requiere el paquete redis). Sin REDIS_URL, Django usa
+# LocMemCache: una por proceso, que no sirve para la pegajosidad de la réplica.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Vida de las cubetas cerradas de los reportes en la caché (core/series.py). Con LocMemCache la
+# invalidación solo llega al proceso que escribió: es lo que otro worker puede servir desactualizado
+SERIES_CACHE_SEGUNDOS = int(os.getenv('SERIES_CACHE_SEGUNDOS', 600))
+
+# Réplica de lectura para reportes, listados y exportaciones (core/enrutador_bd.py).
+# Solo se configura con DB_REPLICA_HOST; comparte usuario y opciones con la primaria.
+# La pegajosidad tras escribir se guarda en la caché, que debe ser compartida (REDIS_URL):
+# el check core.E001 falla si hay réplica con una caché por proceso.
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'OPTIONS': {**DATABASES['default']['OPTIONS']},
+        'TEST': {'MIRROR': 'default'},  # En los tests la réplica es la propia base de pruebas
+    }
+
+# Hilos con los que las vistas async (core/asincrono.py) ejecutan consultas en paralelo;
+# cada uno usa su propia conexión, así que no conviene superar el máximo del pool
+ASYNC_HILOS_BD = int(os.getenv('ASYNC_HILOS_BD', DB_POOL_OPCIONES['max_size']))
+
+DATABASE_ROUTERS = ['core.enrutador_bd.EnrutadorReplica']
+DB_REPLICA_ALIAS = 'replica'
+DB_REPLICA_MAX_RETRASO_SEGUNDOS = float(os.getenv('DB_REPLICA_MAX_RETRASO_SEGUNDOS', 5))  # Por encima se lee de la primaria
+DB_REPLICA_INTERVALO_SEGUNDOS = float(os.getenv('DB_REPLICA_INTERVALO_SEGUNDOS', 5))  # Cada cuánto se mide el retraso
+DB_REPLICA_PEGAJOSIDAD_SEGUNDOS = int(os.getenv('DB_REPLICA_PEGAJOSIDAD_SEGUNDOS', 10))  # Lecturas en la primaria tras escribir
+
 AUTH_USER_MODEL = 'core.Usuario'
 
 # Password validation
@@ -192,6 +252,25 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Sincronización incremental móvil (/api/movil/sync/)
+MOVIL_SYNC_RETENCION_DIAS = 30   # Antigüedad máxima de un token antes de forzar sincronización completa
+MOVIL_SYNC_MARGEN_SEGUNDOS = 5   # Solape para no perder escrituras confirmadas tarde
+
+# Claves Idempotency-Key de los POST idempotentes (core/idempotencia.py)
+IDEMPOTENCIA_RETENCION_HORAS = 24
+
+# Almacén de imágenes direccionado por contenido (fotos de perfil y evidencias, ver core/blobs.py)
+BLOB_STORAGE_ROOT = os.getenv('BLOB_STORAGE_ROOT', str(BASE_DIR / 'blobs'))
+
+# Métricas por petición (core/metricas.py, expuestas en /api/admin/metrics/)
+METRICAS_PRESUPUESTO_CONSULTAS = int(os.getenv('METRICAS_PRESUPUESTO_CONSULTAS', 50))  # Se registra en el log al superarlo
+METRICAS_PRESUPUESTO_MS = int(os.getenv('METRICAS_PRESUPUESTO_MS', 1000))
+
+# Detección de consultas N+1 (core/consultas_repetidas.py)
+N_MAS_UNO_UMBRAL = int(os.getenv('N_MAS_UNO_UMBRAL', 10))  # Repeticiones de una misma consulta en una petición
+# error | log | off. 'error' solo al correr los tests: con 'log' el servidor de desarrollo responde igual que producción
+N_MAS_UNO_MODO = os.getenv('N_MAS_UNO_MODO', 'error' if sys.argv[1:2] == ['test'] or 'pytest' in sys.modules else 'log')
+
 
 CORS_ALLOW_HEADERS = [
     'accept',
@@ -203,8 +282,11 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
+CORS_EXPOSE_HEADERS = ['idempotent-replayed']
+
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',